@@ -0,0 +1,128 @@
+# benchlog.py
+# Results of the /bench rendering benchmark (static/js/bench.js): one JSON line per run in
+# BENCH_FILE, plus comparison tables of the median percentiles per scene, browser and build.
+#   python benchlog.py [--scene s250-i20-t50-z20-r1]     print the tables
+import argparse, json, os, re, statistics, sys, time
+import hblock
+
+BENCH_FILE = os.environ.get("HBLOCK_BENCH_FILE", os.path.join(hblock.PROJECT_DIR, ".bench", "results.jsonl"))
+MAX_RESULT_BYTES = 64 * 1024
+# what bench.js measures, in table order
+METRICS = ("redraw_work_ms", "redraw_frame_ms", "drag_work_ms", "drag_frame_ms", "hit_us")
+PERCENTILES = ("p50", "p95", "p99")
+
+# most specific first: Edge and Opera also say Chrome, Chrome also says Safari
+_BROWSERS = [("Edge", r"Edg/(\d+)"), ("Opera", r"OPR/(\d+)"), ("Firefox", r"Firefox/(\d+)"),
+             ("Chrome", r"Chrome/(\d+)"), ("Safari", r"Version/(\d+)[.\d]* .*Safari/")]
+
+def browser_of(user_agent):
+    """'Chrome 126' style name for grouping runs; 'other' when nothing matches."""
+    for name, pattern in _BROWSERS:
+        m = re.search(pattern, user_agent or "")
+        if m:
+            return "%s %s" % (name, m.group(1))
+    return "other"
+
+def _clean_metrics(metrics):
+    out = {}
+    for name in METRICS:
+        m = metrics.get(name)
+        if isinstance(m, dict) and all(isinstance(m.get(p), (int, float)) for p in PERCENTILES):
+            out[name] = {k: m[k] for k in ("n", "p50", "p95", "p99", "max") if isinstance(m.get(k), (int, float))}
+    return out
+
+def record(result, user_agent, path=BENCH_FILE):
+    """Validate one posted run and append it; returns the stored entry (ValueError if unusable)."""
+    if not isinstance(result, dict) or not isinstance(result.get("metrics"), dict):
+        raise ValueError("expected {build, scene, metrics}")
+    metrics = _clean_metrics(result["metrics"])
+    if not metrics:
+        raise ValueError("no known metrics")
+    entry = {
+        "time": round(time.time(), 3), "browser": browser_of(user_agent), "ua": (user_agent or "")[:300],
+        "build": str(result.get("build") or "")[:40], "label": str(result.get("label") or "")[:80],
+        "scene": str(result.get("scene") or "")[:80], "objects": result.get("objects"), "metrics": metrics,
+    }
+    line = json.dumps(entry, separators=(",", ":")) + "\n"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # one write() on an O_APPEND file, so lines from several workers don't interleave
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+    return entry
+
+def load(path=BENCH_FILE):
+    if not os.path.exists(path):
+        return []
+    runs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                continue
+    return runs
+
+def compare(runs, scene=None):
+    """Tables keyed by (scene, browser): one row per build in the order builds first appeared.
+
+    Each row has the run count and, per metric, the median over runs of each percentile plus
+    the change of the p95 median against the previous build's row.
+    """
+    groups = {}
+    for run in runs:
+        if scene and run.get("scene") != scene:
+            continue
+        key = (run.get("scene", ""), run.get("browser", "other"))
+        groups.setdefault(key, {}).setdefault(run.get("build", ""), []).append(run)
+    tables = []
+    for (sc, browser), builds in sorted(groups.items()):
+        rows, prev = [], None
+        for build, build_runs in builds.items():   # dicts keep first-seen order
+            row = {"build": build, "runs": len(build_runs), "labels": sorted({r["label"] for r in build_runs if r.get("label")}),
+                   "last": max(r["time"] for r in build_runs), "metrics": {}}
+            for name in METRICS:
+                values = [r["metrics"][name] for r in build_runs if name in r.get("metrics", {})]
+                if not values:
+                    continue
+                m = {p: round(statistics.median(v[p] for v in values), 3) for p in PERCENTILES}
+                if prev and name in prev["metrics"] and prev["metrics"][name]["p95"]:
+                    m["p95_change"] = round(m["p95"] / prev["metrics"][name]["p95"] - 1, 3)
+                row["metrics"][name] = m
+            rows.append(row)
+            prev = row
+        tables.append({"scene": sc, "browser": browser, "rows": rows})
+    return tables
+
+def format_tables(tables):
+    lines = []
+    for t in tables:
+        lines.append("%s — %s" % (t["scene"], t["browser"]))
+        lines.append("  %-14s %4s  " % ("build", "runs") + "  ".join("%-24s" % m for m in METRICS))
+        for row in t["rows"]:
+            cells = []
+            for name in METRICS:
+                m = row["metrics"].get(name)
+                cell = "%s/%s/%s" % (m["p50"], m["p95"], m["p99"]) if m else "-"
+                if m and "p95_change" in m:
+                    cell += " (%+.0f%%)" % (m["p95_change"] * 100)
+                cells.append("%-24s" % cell)
+            lines.append("  %-14s %4d  " % (row["build"], row["runs"]) + "  ".join(cells))
+        lines.append("")
+    return "\n".join(lines)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Compare /bench results by browser and build (p50/p95/p99)")
+    p.add_argument("--file", default=BENCH_FILE)
+    p.add_argument("--scene", default=None)
+    args = p.parse_args(argv)
+    tables = compare(load(args.file), args.scene)
+    if not tables:
+        print("no results in %s" % args.file, file=sys.stderr)
+        sys.exit(1)
+    print(format_tables(tables))
+
+if __name__ == "__main__":
+    main()
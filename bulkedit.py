@@ -0,0 +1,459 @@
+# bulkedit.py
+# Edit many objects at once with filter-and-update expressions, run over a columnar view of the
+# project (one NumPy array per field, one row per object in every window):
+#   python bulkedit.py project.Hblock "where kill: color = '#f00'; size *= 1.5" [-o out.Hblock]
+# (POST /projects/<id>/bulk does the same to a stored project.)
+# A program is assignments separated by ";" or newlines. "where <condition>:" makes the
+# assignments after it, up to the next "where", apply only to the rows it matches; conditions
+# and values are Python expressions over the columns:
+#   x y size w h     numbers (size: shapes and texts, w h: event zones)
+#   color            '#f00', ... (shapes and texts; only compared with == and != or assigned)
+#   type             'shape', 'text', 'eventZone' or 'tiles' (read-only, == and != only)
+#   player collide kill   True/False (shapes)
+#   window           window number (read-only)
+# with and, or, not, comparisons, + - * / // %, abs(), min(), max() and round().
+# Assignments only touch the rows that have the field, so "size *= 2" leaves zones alone.
+# Instances of inventory items read the item's fields they don't override; an edit makes an override.
+import argparse, ast, collections, functools, itertools, json, operator, sys, time
+import numpy as np
+import hblock
+
+TYPES = ("shape", "text", "eventZone", "tiles")   # type codes 0.., anything else is len(TYPES)
+SHAPE, TEXT, ZONE, TILES = range(4)
+TYPE_CODES = {t: i for i, t in enumerate(TYPES)}
+FLAGS = ("player", "collide", "kill")
+DEFAULT_SIZE = {SHAPE: 50, TEXT: 24}              # what the editor draws when "size" is missing
+DEFAULT_COLOR = {SHAPE: "blue", TEXT: "#000"}
+SPARSE_SHARE = 4   # an assignment to fewer than 1/SPARSE_SHARE of the rows reads only those (see run)
+NUMBERS = ("x", "y", "size", "w", "h")
+WRITABLE = NUMBERS + ("color",) + FLAGS
+READABLE = WRITABLE + ("type", "window")
+FUNCTIONS = {"abs": np.abs, "min": np.minimum, "max": np.maximum, "round": np.round}
+BINOPS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide,
+          ast.FloorDiv: np.floor_divide, ast.Mod: np.mod}
+COMPARE = {ast.Eq: np.equal, ast.NotEq: np.not_equal, ast.Lt: np.less, ast.LtE: np.less_equal,
+           ast.Gt: np.greater, ast.GtE: np.greater_equal}
+
+class BulkEditError(ValueError):
+    pass
+
+#########################
+# project <-> columns
+#########################
+def _field(objs, key, default=None):
+    """[o.get(key, default) for o in objs]"""
+    return [o.get(key, default) for o in objs]
+
+def _factorize(values):
+    """(int32 codes, distinct values): values[i] == distinct[codes[i]]."""
+    index = dict.fromkeys(values)
+    for i, v in enumerate(index):
+        index[v] = i
+    return np.fromiter(map(index.__getitem__, values), np.int32, len(values)), list(index)
+
+def _assign(objs, key, values):
+    """objs[i][key] = values[i] for every i, without a Python-level loop."""
+    collections.deque(map(operator.setitem, objs, itertools.repeat(key), values), maxlen=0)
+
+def _has(name, types):
+    """Rows (of these type codes) that have the field, which is not x or y: every row has those."""
+    if name in ("size", "color"):
+        return (types == SHAPE) | (types == TEXT)
+    if name in ("w", "h"):
+        return types == ZONE
+    return types == SHAPE   # player, collide, kill
+
+class Columns:
+    """The objects of every window as parallel arrays; rows are in window order.
+
+    Field columns are read from the objects the first time they are used, so a program only
+    pays for the fields it mentions. A column that is assigned to before anything reads it
+    only reads, and keeps, the rows the assignment matched (see run and sparse).
+    """
+
+    def __init__(self, project):
+        protos = {it["id"]: it for it in project.get("inventory") or [] if isinstance(it, dict) and "id" in it}
+        self.objects, counts = [], []
+        for w in project.get("windows") or []:
+            if set(map(type, w)) - {dict}:
+                w = [o for o in w if isinstance(o, dict)]
+            self.objects += w
+            counts.append(len(w))
+        # instances with their item's fields filled in, for reading only
+        self.view = self.objects
+        if protos:
+            self.view = [o if "proto" not in o or o["proto"] not in protos else dict(protos[o["proto"]], **o) for o in self.objects]
+        self.window = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        self.original = {}   # assigned column -> its values before the program, for write_back
+        self.sparse = {}     # column assigned before it was read -> (rows, values before, values after)
+
+    def _read(self, key, dtype, default=None, rows=None):
+        """The column, or only its values at rows (an index array)."""
+        view = self.view if rows is None else list(map(self.view.__getitem__, rows.tolist()))
+        types = lambda: self.type if rows is None else self.type[rows]   # x and y never need them
+        missing = False if dtype is bool else np.nan
+        try:
+            column = np.fromiter(_field(view, key, missing), dtype, len(view))   # null: NaN or False too
+        except (TypeError, ValueError, OverflowError):
+            raise BulkEditError("an object has a %s that is not a number" % key)
+        if dtype is np.float64:
+            # what the editor does with missing values: `o.size || 50`
+            missing = np.isnan(column) | (column == 0)
+            column[missing] = 0
+            if default and missing.any():
+                for t, value in default.items():
+                    column[missing & (types() == t)] = value
+        if key not in ("x", "y"):
+            column[~_has(key, types())] = 0
+        return column if rows is not None else self._with_edit(key, column)
+
+    def _with_edit(self, key, column):
+        """A column read in full after an assignment kept only the rows it changed: apply those."""
+        edit = self.sparse.pop(key, None)
+        if edit is not None:
+            rows, _, after = edit
+            self.original[key] = column.copy()
+            column[rows] = [self.color_code(c) for c in after] if key == "color" else after
+        return column
+
+    def read_rows(self, name, rows):
+        """Values of a writable column at rows, as the editor sees them (colors as strings)."""
+        if name == "color":
+            colors = []
+            for o, t in zip(map(self.view.__getitem__, rows.tolist()), self.type[rows].tolist()):
+                c = o.get("color")
+                if isinstance(c, (list, dict)):
+                    raise BulkEditError("an object has a color that is not a string")
+                colors.append(c if isinstance(c, str) and c else DEFAULT_COLOR.get(t))
+            return colors
+        if name in FLAGS:
+            return self._read(name, bool, rows=rows)
+        return self._read(name, np.float64, DEFAULT_SIZE if name == "size" else None, rows)
+
+    @functools.cached_property
+    def type(self):
+        other = len(TYPES)
+        try:
+            codes = [TYPE_CODES.get(o.get("type"), other) for o in self.view]
+        except TypeError:   # a list or object for a type
+            codes = [TYPE_CODES.get(t, other) if isinstance(t, str) else other for t in _field(self.view, "type")]
+        return np.fromiter(codes, np.uint8, len(codes))
+
+    @functools.cached_property
+    def x(self):
+        return self._read("x", np.float64)
+
+    @functools.cached_property
+    def y(self):
+        return self._read("y", np.float64)
+
+    @functools.cached_property
+    def size(self):
+        return self._read("size", np.float64, DEFAULT_SIZE)
+
+    @functools.cached_property
+    def w(self):
+        return self._read("w", np.float64)
+
+    @functools.cached_property
+    def h(self):
+        return self._read("h", np.float64)
+
+    @functools.cached_property
+    def player(self):
+        return self._read("player", bool)
+
+    @functools.cached_property
+    def collide(self):
+        return self._read("collide", bool)
+
+    @functools.cached_property
+    def kill(self):
+        return self._read("kill", bool)
+
+    @functools.cached_property
+    def color(self):
+        # indices into self.colors, so comparing and assigning colors is integer work
+        try:
+            codes, self.colors = _factorize(_field(self.view, "color"))
+        except TypeError:
+            raise BulkEditError("an object has a color that is not a string")
+        self.color_index = {c: i for i, c in enumerate(self.colors) if isinstance(c, str) and c}
+        # what the editor does with missing colors: `o.color || 'blue'`
+        missing = np.isin(codes, [i for i, c in enumerate(self.colors) if c not in self.color_index])
+        for t, c in DEFAULT_COLOR.items():
+            codes[missing & (self.type == t)] = self.color_code(c)
+        codes[~self.has("color")] = -1
+        return self._with_edit("color", codes)
+
+    def has(self, name):
+        """Rows that have the field: the ones an assignment to it may change."""
+        if name in ("x", "y"):
+            return np.ones(len(self), bool)   # without reading the types
+        return _has(name, self.type)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def column(self, name):
+        return getattr(self, name)
+
+    def assigned(self, name):
+        """The column, to be changed in place; write_back compares it with what it was now."""
+        column = getattr(self, name)
+        if name not in self.original:
+            self.original[name] = column.copy()
+        return column
+
+    def color_code(self, value):
+        """Index of a color string, added to the table if it is new."""
+        i = self.color_index.get(value)
+        if i is None:
+            i = self.color_index[value] = len(self.colors)
+            self.colors.append(value)
+        return i
+
+    def _write(self, key, objs, values):
+        """objs[i][key] = values[i], in the form the file keeps them."""
+        if key in NUMBERS:
+            values = np.asarray(values)
+            if (values % 1 == 0).all():
+                values = values.astype(np.int64)   # whole numbers stay ints in the file
+            _assign(objs, key, values.tolist())
+        elif key == "color":
+            _assign(objs, key, values)
+        else:
+            for o, on in zip(objs, values):
+                if on or "proto" in o:
+                    o[key] = on   # an instance needs False spelled out to override its item
+                else:
+                    o.pop(key, None)
+
+    def write_back(self):
+        """Copy the changed rows of the assigned columns into the object dicts; returns how many objects changed."""
+        touched = np.zeros(len(self), bool)
+        objs = self.objects
+        for key, before in self.original.items():
+            column = getattr(self, key)
+            changed = column != before
+            touched |= changed
+            if changed.all():
+                values, targets = column, objs
+            else:
+                rows = np.flatnonzero(changed)
+                values, targets = column[rows], list(map(objs.__getitem__, rows.tolist()))
+            if key == "color":
+                values = list(map(self.colors.__getitem__, values.tolist()))
+            elif key in FLAGS:
+                values = values.tolist()
+            self._write(key, targets, values)
+            self.original[key] = column.copy()
+        for key, (rows, before, after) in self.sparse.items():
+            if key == "color":
+                changed = np.fromiter(map(operator.ne, before, after), bool, len(rows))
+                after = [c for c, ch in zip(after, changed.tolist()) if ch]
+            else:
+                changed = before != after
+                after = after[changed]
+                if key in FLAGS:
+                    after = after.tolist()
+            rows = rows[changed]
+            touched[rows] = True
+            self._write(key, list(map(objs.__getitem__, rows.tolist())), after)
+        self.sparse.clear()
+        return int(touched.sum())
+
+#########################
+# programs
+#########################
+def _split(text, seps):
+    """text cut at any char in seps outside quotes."""
+    parts, start, quote = [], 0, None
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch in seps:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+def _expr(source):
+    try:
+        return ast.parse(source.strip(), mode="eval").body
+    except SyntaxError:
+        raise BulkEditError("can't read %r" % source.strip())
+
+def parse(program):
+    """[(condition AST or None, column, operator class or None, value AST), ...]"""
+    steps, where = [], None
+    for stmt in _split(program, ";\n"):
+        stmt = stmt.strip()
+        if stmt.startswith("where ") or stmt.startswith("where("):
+            head = _split(stmt, ":")
+            if len(head) < 2:
+                raise BulkEditError("missing ':' after the where condition in %r" % stmt)
+            where = _expr(head[0][len("where"):])
+            stmt = ":".join(head[1:]).strip()
+        if not stmt:
+            continue
+        try:
+            node = ast.parse(stmt).body
+        except SyntaxError:
+            raise BulkEditError("can't read %r" % stmt)
+        if len(node) != 1 or not isinstance(node[0], (ast.Assign, ast.AugAssign)):
+            raise BulkEditError("expected an assignment like 'size *= 2', got %r" % stmt)
+        node = node[0]
+        target = node.targets[0] if isinstance(node, ast.Assign) else node.target
+        if isinstance(node, ast.Assign) and len(node.targets) != 1 or not isinstance(target, ast.Name):
+            raise BulkEditError("can only assign to one column at a time: %r" % stmt)
+        if target.id not in WRITABLE:
+            raise BulkEditError("can't assign to %r; columns that can be changed: %s" % (target.id, ", ".join(WRITABLE)))
+        op = None
+        if isinstance(node, ast.AugAssign):
+            op = type(node.op)
+            if op not in BINOPS or target.id not in NUMBERS:
+                raise BulkEditError("can't use %s= on %s" % (type(node.op).__name__, target.id))
+        steps.append((where, target.id, op, node.value))
+    return steps
+
+def _categorical(cols, name, value):
+    """Code of a string compared with the color or type column; one no row has if it is unknown."""
+    if name == "type":
+        return TYPES.index(value) if value in TYPES else 255
+    cols.color   # read the column first: that fills the color table
+    return cols.color_index.get(value, -2)   # -1 is "no color"
+
+def evaluate(node, cols):
+    """Value of an expression AST over the columns: an array or a scalar."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (bool, int, float)):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in READABLE:
+            raise BulkEditError("no column %r; columns: %s" % (node.id, ", ".join(READABLE)))
+        return cols.column(node.id)
+    if isinstance(node, ast.BoolOp):
+        values = [np.asarray(evaluate(v, cols), bool) for v in node.values]
+        return np.logical_and.reduce(values) if isinstance(node.op, ast.And) else np.logical_or.reduce(values)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return np.logical_not(evaluate(node.operand, cols))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        v = evaluate(node.operand, cols)
+        return -v if isinstance(node.op, ast.USub) else v
+    if isinstance(node, ast.BinOp) and type(node.op) in BINOPS:
+        return BINOPS[type(node.op)](_number(node.left, cols), _number(node.right, cols))
+    if isinstance(node, ast.Compare):
+        out, left = True, node.left
+        for op, right in zip(node.ops, node.comparators):
+            if type(op) not in COMPARE:
+                raise BulkEditError("unsupported comparison %s" % type(op).__name__)
+            strings = [n for n in (left, right) if isinstance(n, ast.Constant) and isinstance(n.value, str)]
+            if strings:
+                other = right if left is strings[0] else left
+                if not (isinstance(other, ast.Name) and other.id in ("color", "type")) or type(op) not in (ast.Eq, ast.NotEq):
+                    raise BulkEditError("strings can only be compared with == or != to color or type")
+                out = out & COMPARE[type(op)](cols.column(other.id), _categorical(cols, other.id, strings[0].value))
+            else:
+                out = out & COMPARE[type(op)](_number(left, cols), _number(right, cols))
+            left = right
+        return out
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+        args = [_number(a, cols) for a in node.args]
+        if node.func.id in ("abs", "round") and len(args) != 1 or node.func.id in ("min", "max") and len(args) != 2:
+            raise BulkEditError("wrong number of arguments to %s()" % node.func.id)
+        return FUNCTIONS[node.func.id](*args)
+    raise BulkEditError("unsupported expression: %s" % ast.dump(node)[:80])
+
+def _number(node, cols):
+    if isinstance(node, ast.Name) and node.id in ("color", "type"):
+        raise BulkEditError("%s can only be compared with == or != to a string" % node.id)
+    return evaluate(node, cols)
+
+def run(cols, steps):
+    """Apply parsed steps to the columns; returns how many rows each step matched."""
+    matched = []
+    for where, name, op, value in steps:
+        mask = cols.has(name)
+        if where is not None:
+            mask = mask & np.broadcast_to(np.asarray(evaluate(where, cols), bool), mask.shape)
+        if name == "color":
+            if not (isinstance(value, ast.Constant) and isinstance(value.value, str)):
+                raise BulkEditError("color can only be set to a string like '#f00'")
+            new = value.value
+        elif name in FLAGS:
+            new = np.broadcast_to(np.asarray(evaluate(value, cols), bool), mask.shape)
+        else:
+            new = np.broadcast_to(np.asarray(_number(value, cols), np.float64), mask.shape)
+        rows = None
+        if name not in cols.__dict__ and name not in cols.sparse:
+            rows = np.flatnonzero(mask)
+            if len(rows) * SPARSE_SHARE > len(cols):
+                rows = None   # most rows: reading the whole column is cheaper than picking them out
+        if rows is not None:
+            # nothing has read this column yet: only read and keep the rows this step changes
+            before = cols.read_rows(name, rows)
+            if name == "color":
+                after = [new] * len(rows)
+            else:
+                after = new[rows]
+                if op is not None:
+                    after = BINOPS[op](before, after)
+            cols.sparse[name] = (rows, before, after)
+        elif name == "color":
+            column = cols.assigned("color")   # read before coding the new color: reading it fills the color table
+            column[mask] = cols.color_code(new)
+        elif name in FLAGS:
+            cols.assigned(name)[mask] = new[mask]
+        else:
+            column = cols.assigned(name)
+            if op is not None:
+                new = BINOPS[op](column, new)
+            column[mask] = new[mask]
+        matched.append(int(mask.sum()))
+    return matched
+
+def apply(project, program):
+    """Run a program on a project in place; returns {"objects", "matched", "changed"}.
+
+    BulkEditError (a ValueError) if the program can't be read or run; the project is then untouched.
+    """
+    steps = parse(program)
+    cols = Columns(project)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        matched = run(cols, steps)
+    for key in NUMBERS:
+        if key in cols.sparse:
+            values = cols.sparse[key][2]
+        elif key in cols.original:
+            values = getattr(cols, key)
+        else:
+            continue
+        if not np.isfinite(values).all():
+            raise BulkEditError("the program makes %s infinite or not a number (division by zero?)" % key)
+    return {"objects": len(cols), "matched": matched, "changed": cols.write_back()}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Edit many objects of a project with filter-and-update expressions")
+    p.add_argument("project")
+    p.add_argument("program", help="e.g. \"where kill: color = '#f00'; size *= 1.5\"")
+    p.add_argument("-o", "--out", help="where to write the result (default: over the project)")
+    p.add_argument("-n", "--dry-run", action="store_true", help="only report what would change")
+    args = p.parse_args(argv)
+    t0 = time.perf_counter()
+    project = hblock.load(args.project)
+    t1 = time.perf_counter()
+    try:
+        result = apply(project, args.program)
+    except BulkEditError as e:
+        print("bulkedit: %s" % e, file=sys.stderr)
+        sys.exit(1)
+    t2 = time.perf_counter()
+    if not args.dry_run:
+        hblock.write_atomic(args.out or args.project, hblock.dumps(project))
+    print(json.dumps(dict(result, load_ms=round((t1 - t0) * 1000), edit_ms=round((t2 - t1) * 1000))))
+
+if __name__ == "__main__":
+    main()
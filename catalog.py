@@ -0,0 +1,211 @@
+# catalog.py
+# Searchable index of the projects stored on the server, in SQLite with FTS5. /save updates a
+# project's row; nothing is ever re-read from the .Hblock files except by "rebuild".
+# Per project: name, window and object counts, the text of text objects, the event types used
+# (both full-text searchable) and the hashes of its images (hblock.asset_key of the data URL,
+# the same for a given image in every project, whatever key the file stores it under).
+#   python catalog.py rebuild                  index every stored project from scratch
+# A project gets a new rowid every time it is indexed, so rowid order is save order and
+# "newest first" pages walk an index instead of sorting every match.
+#   python catalog.py search castle level [--page 2] [--event addShape] [--asset <hash>] [--recent]
+import argparse, os, re, sqlite3, threading, time
+import hblock
+
+CATALOG_DB = os.environ.get("HBLOCK_CATALOG_DB", os.path.join(hblock.PROJECT_DIR, ".catalog.sqlite"))
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_TEXT_CHARS = 100000   # indexed text per project; the rest is not searchable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    rowid INTEGER PRIMARY KEY,   -- reassigned on every update, see above
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    saved REAL NOT NULL,
+    size INTEGER, sha256 TEXT,
+    windows INTEGER NOT NULL, shapes INTEGER NOT NULL, texts INTEGER NOT NULL,
+    zones INTEGER NOT NULL, tiles INTEGER NOT NULL, inventory INTEGER NOT NULL
+);
+-- rowid = projects.rowid
+CREATE VIRTUAL TABLE IF NOT EXISTS project_text USING fts5 (name, texts, events, tokenize = 'unicode61 remove_diacritics 2');
+CREATE TABLE IF NOT EXISTS project_assets (
+    asset TEXT NOT NULL,
+    project INTEGER NOT NULL,
+    PRIMARY KEY (asset, project)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS project_assets_by_project ON project_assets (project);
+CREATE TABLE IF NOT EXISTS project_events (
+    event TEXT NOT NULL,
+    project INTEGER NOT NULL,
+    PRIMARY KEY (event, project)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS project_events_by_project ON project_events (project);
+"""
+
+COUNT_FIELDS = ("windows", "shapes", "texts", "zones", "tiles", "inventory")
+_TYPE_FIELD = {"shape": "shapes", "text": "texts", "eventZone": "zones", "tiles": "tiles"}
+
+_local = threading.local()
+
+def connect(path=CATALOG_DB):
+    """This thread's connection to the catalog at path, created (with its schema) on first use."""
+    conns = _local.__dict__.setdefault("conns", {})
+    conn = conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        # WAL: searches in one worker don't wait for a save in another
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conns[path] = conn
+    return conn
+
+#########################
+# indexing
+#########################
+def summarize(project_id, project):
+    """(row fields, searchable text fields, event types, asset hashes) for one project."""
+    assets = project.get("assets") or {}
+    counts = dict.fromkeys(COUNT_FIELDS, 0)
+    windows = project.get("windows") or []
+    counts["windows"] = len(windows)
+    counts["inventory"] = len(project.get("inventory") or [])
+    texts, events, size = [], set(), 0
+    for w in windows:
+        for o in w:
+            if not isinstance(o, dict):
+                continue
+            field = _TYPE_FIELD.get(o.get("type"))
+            if field:
+                counts[field] += 1
+            if o.get("type") == "text" and isinstance(o.get("text"), str) and size < MAX_TEXT_CHARS:
+                texts.append(o["text"])
+                size += len(o["text"])
+            ev = o.get("event")
+            if isinstance(ev, dict) and isinstance(ev.get("type"), str):
+                events.add(ev["type"])
+                # the text an addText event puts up is as much the project's text as a text object
+                params = ev.get("params")
+                text = params.get("text") if isinstance(params, dict) else None
+                if isinstance(text, str) and size < MAX_TEXT_CHARS:
+                    texts.append(text)
+                    size += len(text)
+    hashes = set()
+    for o in hblock.iter_image_holders(project):
+        img = o.get("image")
+        if isinstance(img, str) and img.startswith(hblock.ASSET_PREFIX):
+            img = assets.get(img[len(hblock.ASSET_PREFIX):])
+        if isinstance(img, str) and img.startswith("data:"):
+            hashes.add(hblock.asset_key(img))
+    name = project.get("name") if isinstance(project.get("name"), str) and project.get("name").strip() else project_id
+    row = dict(counts, name=name)
+    text = {"name": name, "texts": "\n".join(texts)[:MAX_TEXT_CHARS], "events": " ".join(sorted(events))}
+    return row, text, events, hashes
+
+def update(project_id, project, size=None, sha256=None, saved=None, db=CATALOG_DB):
+    """Index (or re-index) one project; called after every save."""
+    row, text, events, hashes = summarize(project_id, project)
+    row.update(id=project_id, size=size, sha256=sha256, saved=saved or time.time())
+    cols = sorted(row)
+    conn = connect(db)
+    with conn:   # one transaction: searches see the old entry or the new one, never half
+        found = conn.execute("SELECT rowid FROM projects WHERE id = ?", (project_id,)).fetchone()
+        if found is not None:
+            for table, key in (("projects", "rowid"), ("project_text", "rowid"), ("project_assets", "project"), ("project_events", "project")):
+                conn.execute("DELETE FROM %s WHERE %s = ?" % (table, key), (found[0],))
+        # re-inserted rather than updated: the new rowid is the highest, keeping rowid order = save order
+        rowid = conn.execute("INSERT INTO projects (%s) VALUES (%s)" % (", ".join(cols), ", ".join("?" * len(cols))),
+                             [row[c] for c in cols]).lastrowid
+        conn.execute("INSERT INTO project_text (rowid, name, texts, events) VALUES (?, ?, ?, ?)",
+                     (rowid, text["name"], text["texts"], text["events"]))
+        conn.executemany("INSERT INTO project_assets (asset, project) VALUES (?, ?)", [(h, rowid) for h in sorted(hashes)])
+        conn.executemany("INSERT INTO project_events (event, project) VALUES (?, ?)", [(e, rowid) for e in sorted(events)])
+
+def rebuild(db=CATALOG_DB, project_dir=hblock.PROJECT_DIR):
+    """Index every <id>.Hblock in project_dir, oldest first; returns how many were indexed."""
+    files = []
+    for name in os.listdir(project_dir):
+        project_id, ext = os.path.splitext(name)
+        if ext == ".Hblock" and hblock.PROJECT_ID_RE.match(project_id):
+            st = os.stat(os.path.join(project_dir, name))
+            files.append((st.st_mtime, st.st_size, project_id))
+    n = 0
+    for mtime, size, project_id in sorted(files):
+        try:
+            project = hblock.load(os.path.join(project_dir, project_id + ".Hblock"))
+            if isinstance(project, dict):
+                hblock.check_project(project)   # files from before saves were checked
+        except ValueError:
+            continue
+        if not isinstance(project, dict):
+            continue
+        update(project_id, project, size, None, mtime, db)
+        n += 1
+    return n
+
+#########################
+# search
+#########################
+def fts_query(q):
+    """Words of a user's query as an FTS5 query: every word must match, each as a prefix."""
+    return " ".join('"%s"*' % w for w in re.findall(r"\w+", q or ""))
+
+def search(q="", page=1, per_page=PAGE_SIZE, event=None, asset=None, recent=False, db=CATALOG_DB):
+    """One page of matching projects: best match first, or newest first if recent or without words.
+
+    Ranking has to score every match, so broad words are faster with recent.
+    has_more tells whether there is a next page, so no query has to count every match.
+    """
+    page, per_page = max(1, page), max(1, min(MAX_PAGE_SIZE, per_page))
+    match = fts_query(q)
+    where, args = [], []
+    if match:
+        where.append("project_text MATCH ?")
+        args.append(match)
+    for table, column, value in (("project_events", "event", event), ("project_assets", "asset", asset)):
+        if value:
+            where.append("p.rowid IN (SELECT project FROM %s WHERE %s = ?)" % (table, column))
+            args.append(value)
+    if match:
+        sql = ("SELECT p.*, snippet(project_text, 1, '[', ']', '…', 10) AS snippet FROM project_text "
+               "JOIN projects p ON p.rowid = project_text.rowid")
+    else:
+        sql = "SELECT p.*, NULL AS snippet FROM projects p"
+    # ordered by project_text's own rowid when matching, so FTS5 can return matches newest first
+    rowid = "project_text.rowid" if match else "p.rowid"
+    order = "bm25(project_text, 10.0, 1.0, 2.0), %s DESC" % rowid if match and not recent else rowid + " DESC"
+    sql += (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY " + order + " LIMIT ? OFFSET ?"
+    rows = connect(db).execute(sql, args + [per_page + 1, (page - 1) * per_page]).fetchall()
+    results = [{
+        "id": r["id"], "name": r["name"], "saved": r["saved"], "size": r["size"],
+        "windows": r["windows"], "objects": {f: r[f] for f in COUNT_FIELDS[1:]}, "snippet": r["snippet"],
+    } for r in rows[:per_page]]
+    return {"results": results, "page": page, "per_page": per_page, "has_more": len(rows) > per_page}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Catalog of the server's stored projects")
+    p.add_argument("--db", default=CATALOG_DB)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("rebuild").add_argument("--projects", default=hblock.PROJECT_DIR)
+    s = sub.add_parser("search")
+    s.add_argument("words", nargs="*")
+    s.add_argument("--page", type=int, default=1)
+    s.add_argument("--event")
+    s.add_argument("--asset")
+    s.add_argument("--recent", action="store_true", help="newest first instead of best match first")
+    args = p.parse_args(argv)
+    if args.cmd == "rebuild":
+        t0 = time.perf_counter()
+        n = rebuild(args.db, args.projects)
+        print("indexed %d projects in %.1fs" % (n, time.perf_counter() - t0))
+    else:
+        t0 = time.perf_counter()
+        res = search(" ".join(args.words), args.page, event=args.event, asset=args.asset, recent=args.recent, db=args.db)
+        for r in res["results"]:
+            print("%-34s %-30s %s" % (r["id"], r["name"][:30], r["snippet"] or ""))
+        print("page %d%s, %.1f ms" % (res["page"], " (more)" if res["has_more"] else "", (time.perf_counter() - t0) * 1000))
+
+if __name__ == "__main__":
+    main()
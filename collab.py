@@ -0,0 +1,390 @@
+# collab.py
+# Real-time collaboration server for the editor. Runs next to the Flask app:
+#   python collab.py serve --port 5001      (set HBLOCK_COLLAB_URL=ws://host:5001 for editor.py)
+#   python collab.py bench --clients 50     (scripted in-process clients, prints throughput)
+#
+# Wire format (JSON text frames):
+#   client -> server  {"t":"join","room":"<project id>"} once, then arrays of ops
+#   server -> client  {"t":"s","v":version,"project":{...}}  snapshot on join
+#                     {"t":"d","v":version,"ops":[...]}      one delta per tick with changes
+# Ops are short arrays addressed by object id (obj.id):
+#   ["m", id, x, y]        move
+#   ["e", id, {props}]     edit properties
+#   ["a", where, obj]      add; where is a window index or "inv" for the inventory
+#   ["d", id]              delete
+#   ["w", n]               make sure there are at least n windows (idempotent, so echoes are harmless)
+import argparse, asyncio, hashlib, json, os, random, statistics, sys, time, traceback
+import hblock, projstore
+
+TICK_HZ = 30
+MAX_BACKLOG = 256   # queued outgoing messages before a slow client is dropped (it can rejoin for a snapshot)
+
+def encode(msg):
+    return json.dumps(msg, separators=(",", ":"))
+
+class ProjectState:
+    """A project plus an id -> (container, obj) index so ops never scan the windows."""
+
+    def __init__(self, project):
+        self.project = project
+        self.index = {}
+        project.setdefault("windows", [[]])
+        project.setdefault("inventory", [])
+        containers = project["windows"] + [project["inventory"]]
+        unnamed = []
+        for container in containers:
+            for o in container:
+                if isinstance(o, dict):
+                    if isinstance(o.get("id"), str):
+                        self._register(container, o)
+                    else:
+                        unnamed.append((container, o))
+        # older files have no object ids; the room hands them out before anyone sees a snapshot
+        n = 0
+        for container, o in unnamed:
+            while "s%d" % n in self.index:
+                n += 1
+            o["id"] = "s%d" % n
+            self._register(container, o)
+
+    def _register(self, container, obj):
+        self.index[obj["id"]] = (container, obj)
+
+    def apply(self, op):
+        """Apply one op; returns False if it is malformed or refers to something that is gone."""
+        if not valid_op(op):
+            return False
+        kind = op[0]
+        if kind == "m" and len(op) == 4:
+            entry = self.index.get(op[1])
+            if entry is None or not all(isinstance(v, (int, float)) for v in op[2:]):
+                return False
+            entry[1]["x"], entry[1]["y"] = op[2], op[3]
+        elif kind == "e" and len(op) == 3 and isinstance(op[2], dict):
+            entry = self.index.get(op[1])
+            if entry is None or "id" in op[2] or not well_formed(dict(entry[1], **op[2])):
+                return False
+            entry[1].update(op[2])
+        elif kind == "a" and len(op) == 3 and isinstance(op[2], dict):
+            obj, where = op[2], op[1]
+            if not isinstance(obj.get("id"), str) or obj["id"] in self.index or not well_formed(obj):
+                return False
+            if where == "inv":
+                container = self.project["inventory"]
+            elif isinstance(where, int) and 0 <= where < len(self.project["windows"]):
+                container = self.project["windows"][where]
+            else:
+                return False
+            container.append(obj)
+            self._register(container, obj)
+        elif kind == "d" and len(op) == 2:
+            entry = self.index.pop(op[1], None)
+            if entry is None:
+                return False
+            container, obj = entry
+            for i in range(len(container) - 1, -1, -1):
+                if container[i] is obj:
+                    del container[i]
+                    break
+        elif kind == "w" and len(op) == 2 and isinstance(op[1], int):
+            windows = self.project["windows"]
+            if not len(windows) < op[1] <= len(windows) + 8:
+                return False
+            while len(windows) < op[1]:
+                windows.append([])
+        else:
+            return False
+        return True
+
+# kind -> length of a well-formed op (see the wire format above)
+OP_LENGTHS = {"m": 4, "e": 3, "a": 3, "d": 2, "w": 2}
+
+def valid_op(op):
+    """Shape check for an op off the wire, so nothing after it trips over a client's garbage."""
+    if not isinstance(op, list) or not op or OP_LENGTHS.get(op[0] if isinstance(op[0], str) else None) != len(op):
+        return False
+    kind = op[0]
+    if kind in ("m", "e", "d") and (not isinstance(op[1], (str, int)) or isinstance(op[1], bool)):
+        return False
+    if kind == "e":
+        return isinstance(op[2], dict)
+    if kind == "a":
+        return isinstance(op[2], dict) and (op[1] == "inv" or isinstance(op[1], int) and not isinstance(op[1], bool))
+    if kind == "w":
+        return isinstance(op[1], int) and not isinstance(op[1], bool)
+    return True
+
+def well_formed(obj):
+    """Whether obj passes hblock.check_object, so the room never holds what a save would refuse."""
+    try:
+        hblock.check_object(obj)
+    except ValueError:
+        return False
+    return True
+
+def op_target(op):
+    if op[0] in ("m", "e", "d"):
+        return op[1]
+    if op[0] == "a" and isinstance(op[2], dict):
+        return op[2].get("id")
+    return None
+
+def coalesce(ops):
+    """Fold runs of moves on the same object into the latest one, keeping everything else in order."""
+    batch, last = [], {}
+    for op in ops:
+        if not valid_op(op):
+            continue
+        target = op_target(op)
+        if op[0] == "m" and target is not None:
+            i = last.get(target)
+            if i is not None and batch[i][0] == "m":
+                batch[i] = op
+                continue
+        if isinstance(target, (str, int)):
+            last[target] = len(batch)
+        batch.append(op)
+    return batch
+
+class Room:
+    def __init__(self, name, project=None, base=None):
+        self.name = name
+        self.base = base   # sha256 of the stored file the room started from; None: there was none
+        self.state = ProjectState(project or hblock.empty_project())
+        self.clients = set()
+        self.pending = []
+        self.version = 0
+        self.dirty = False
+        self.stats = {"received": 0, "applied": 0, "coalesced": 0, "rejected": 0, "messages": 0, "bytes": 0}
+
+    def join(self, client):
+        # snapshot and the following deltas are both produced on the event loop thread,
+        # so nothing can slip in between them
+        client.send(encode({"t": "s", "v": self.version, "project": self.state.project}))
+        self.clients.add(client)
+
+    def leave(self, client):
+        self.clients.discard(client)
+
+    def submit(self, ops):
+        """Queue a client's ops for the next tick; malformed ones are dropped (and counted) here."""
+        good = [op for op in ops if valid_op(op)]
+        self.pending.extend(good)
+        self.stats["received"] += len(ops)
+        self.stats["rejected"] += len(ops) - len(good)
+
+    def safe_tick(self):
+        """tick() for the server loop: a failure is reported and costs this room one tick, not the server."""
+        try:
+            return self.tick()
+        except Exception:
+            print("collab: room %r failed to tick" % self.name, file=sys.stderr)
+            traceback.print_exc()
+            return 0
+
+    def tick(self):
+        """Apply everything received since the last tick in arrival order and broadcast one delta."""
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, []
+        batch = coalesce(pending)
+        applied = [op for op in batch if self.state.apply(op)]
+        self.stats["coalesced"] += len(pending) - len(batch)
+        self.stats["rejected"] += len(batch) - len(applied)
+        if not applied:
+            return 0
+        self.version += 1
+        self.dirty = True
+        msg = encode({"t": "d", "v": self.version, "ops": applied})
+        for client in list(self.clients):
+            client.send(msg)
+        self.stats["applied"] += len(applied)
+        self.stats["messages"] += len(self.clients)
+        self.stats["bytes"] += len(msg) * len(self.clients)
+        return len(applied)
+
+#########################
+# WebSocket transport
+#########################
+class SocketClient:
+    def __init__(self, ws):
+        self.ws = ws
+        self.queue = asyncio.Queue()
+
+    def send(self, msg):
+        if self.queue.qsize() >= MAX_BACKLOG:
+            asyncio.ensure_future(self.ws.close(1013, "too far behind"))
+            return
+        self.queue.put_nowait(msg)
+
+    async def pump(self):
+        while True:
+            await self.ws.send(await self.queue.get())
+
+def open_room(rooms, name):
+    room = rooms.get(name)
+    if room is None:
+        path = hblock.stored_path(name)
+        project = base = None
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            project, base = json.loads(data), hashlib.sha256(data).hexdigest()
+        room = rooms[name] = Room(name, project, base)
+    return room
+
+def close_room(rooms, room):
+    """Store a changed room like a save (versioned, indexed); the ack, or None if nothing changed.
+
+    If a save replaced the project while the room was open, the room is stored as a copy
+    next to it, <name>-room-<hash>, instead of overwriting that save.
+    """
+    del rooms[room.name]
+    if not room.dirty or hblock.stored_path(room.name) is None:
+        return None
+    hblock.check_project(room.state.project)   # ops can add objects no save would have let in
+    try:
+        return projstore.store(room.name, room.state.project, expect=room.base)
+    except projstore.Conflict:
+        copy = "%s-room-%s" % (room.name[:48], hashlib.sha256(hblock.dumps(room.state.project)).hexdigest()[:8])
+        print("collab: %r was saved while its room was open; the room is stored as %r" % (room.name, copy), file=sys.stderr)
+        return projstore.store(copy, room.state.project)
+
+async def serve(host, port):
+    import websockets
+    rooms = {}
+
+    async def handler(ws, *_):
+        try:
+            hello = json.loads(await ws.recv())
+        except (ValueError, websockets.ConnectionClosed):
+            return
+        if not isinstance(hello, dict) or hello.get("t") != "join" or hblock.stored_path(hello.get("room")) is None:
+            await ws.close(1008, "bad join")
+            return
+        room = open_room(rooms, hello["room"])
+        client = SocketClient(ws)
+        room.join(client)
+        pump = asyncio.ensure_future(client.pump())
+        try:
+            async for message in ws:
+                try:
+                    ops = json.loads(message)
+                except ValueError:
+                    continue
+                if isinstance(ops, list):
+                    room.submit(ops)
+                else:
+                    room.stats["rejected"] += 1
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            pump.cancel()
+            room.leave(client)
+            if not room.clients:
+                room.safe_tick()
+                try:
+                    close_room(rooms, room)
+                except Exception:
+                    print("collab: could not save room %r" % room.name, file=sys.stderr)
+                    traceback.print_exc()
+
+    async with websockets.serve(handler, host, port, max_size=64 * 1024 * 1024):
+        print(f"collab server on ws://{host}:{port}")
+        while True:
+            await asyncio.sleep(1 / TICK_HZ)
+            for room in list(rooms.values()):
+                room.safe_tick()
+
+#########################
+# Scripted in-process benchmark
+#########################
+class ScriptedClient:
+    """Keeps its own replica by applying every snapshot and delta, like the editor does."""
+
+    def __init__(self):
+        self.replica = None
+        self.version = -1
+        self.inbox = []
+
+    def send(self, msg):
+        self.inbox.append(msg)
+
+    def drain(self):
+        for msg in self.inbox:
+            self.receive(msg)
+        self.inbox.clear()
+
+    def receive(self, msg):
+        data = json.loads(msg)
+        if data["t"] == "s":
+            self.replica = ProjectState(data["project"])
+        else:
+            assert data["v"] == self.version + 1, "delta out of order"
+            for op in data["ops"]:
+                self.replica.apply(op)
+        self.version = data["v"]
+
+def bench(clients=50, seconds=5.0, drag_hz=60, edit_rate=0.05, objects=2000, seed=1):
+    rng = random.Random(seed)
+    project = hblock.empty_project()
+    project["windows"][0] = [{"id": f"o{i}", "type": "shape", "x": rng.randrange(900), "y": rng.randrange(600),
+                              "size": 40, "color": "blue", "shape": "square"} for i in range(objects)]
+    room = Room("bench", project)
+    scripted = [ScriptedClient() for _ in range(clients)]
+    for c in scripted:
+        room.join(c)
+        c.drain()
+    ticks = int(seconds * TICK_HZ)
+    moves_per_tick = max(1, drag_hz // TICK_HZ)
+    tick_ms, server_s = [], 0.0
+    start = time.perf_counter()
+    for t in range(ticks):
+        t0 = time.perf_counter()
+        for n in range(clients):
+            # each client drags its own object and now and then edits or adds something
+            target = f"o{n % objects}"
+            room.submit([["m", target, rng.randrange(900), rng.randrange(600)] for _ in range(moves_per_tick)])
+            r = rng.random()
+            if r < edit_rate:
+                room.submit([["e", f"o{rng.randrange(objects)}", {"color": rng.choice(["red", "green", "blue"])}]])
+            elif r < edit_rate * 1.5:
+                room.submit([["a", 0, {"id": f"c{n}-{t}", "type": "text", "x": 10, "y": 10, "text": "hi", "size": 20}]])
+        room.tick()
+        dt = time.perf_counter() - t0
+        server_s += dt
+        tick_ms.append(dt * 1000)
+        for c in scripted:
+            c.drain()
+    wall = time.perf_counter() - start
+    stats = room.stats
+    converged = all(c.replica.project == room.state.project for c in scripted)
+    q = statistics.quantiles(tick_ms, n=100)
+    return {
+        "clients": clients, "ticks": ticks, "tick_hz": TICK_HZ,
+        "ops_received": stats["received"], "ops_applied": stats["applied"], "ops_coalesced": stats["coalesced"],
+        "ops_per_s": round(stats["received"] / server_s), "messages_per_s": round(stats["messages"] / server_s),
+        "broadcast_mb_per_s": round(stats["bytes"] / server_s / 1e6, 2),
+        "tick_ms_p50": round(q[49], 3), "tick_ms_p99": round(q[98], 3),
+        "tick_budget_ms": round(1000 / TICK_HZ, 1), "wall_s_with_clients": round(wall, 2), "converged": converged,
+    }
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="HBlock collaboration server")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=5001)
+    b = sub.add_parser("bench")
+    b.add_argument("--clients", type=int, default=50)
+    b.add_argument("--seconds", type=float, default=5.0)
+    b.add_argument("--objects", type=int, default=2000)
+    args = p.parse_args(argv)
+    if args.cmd == "serve":
+        asyncio.run(serve(args.host, args.port))
+    else:
+        json.dump(bench(args.clients, args.seconds, objects=args.objects), sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+# conftest.py
+# The modules read their data paths from the environment when they are imported; point them all
+# at a scratch directory so the tests never write into the checkout's projects/.
+import atexit, os, shutil, tempfile
+
+os.environ["HBLOCK_PROJECT_DIR"] = tempfile.mkdtemp(prefix="hblock-test-")
+atexit.register(shutil.rmtree, os.environ["HBLOCK_PROJECT_DIR"], True)
+for name in ("HBLOCK_HISTORY_DIR", "HBLOCK_CATALOG_DB", "HBLOCK_UPLOAD_DIR", "HBLOCK_TELEMETRY_DB",
+             "HBLOCK_BENCH_FILE", "HBLOCK_SHARED_CACHE_DIR"):
+    os.environ.pop(name, None)
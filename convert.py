@@ -0,0 +1,206 @@
+# convert.py
+# Batch-normalize an archive of .Hblock files:
+#   python convert.py OLD_PROJECTS/ OUT/ -j 8
+# Every file is stripped of runtime/default fields, its images are deduplicated into the
+# assets table and downscaled (needs Pillow; skipped without it), and it is re-encoded
+# compactly. Outputs are written atomically under OUT with the same relative paths.
+# OUT/manifest.jsonl records the source hash, mtime and size of every finished file, so an
+# interrupted run picks up where it stopped: a file is skipped unread while its mtime and size
+# match, and otherwise only if its content still has that hash.
+# Files that can't be converted (not JSON, not a project, unreadable) are reported and counted, not fatal.
+import argparse, base64, hashlib, io, json, os, shutil, sys, time
+from concurrent.futures import ProcessPoolExecutor
+import hblock
+
+try:
+    from PIL import Image
+except ImportError:  # downscaling is optional
+    Image = None
+
+MANIFEST = "manifest.jsonl"
+DEFAULT_MAX_IMAGE_PX = 512   # shapes draw at most 300px, leave headroom for hi-dpi
+
+#########################
+# per-file work (runs in the pool)
+#########################
+_done = {}        # source hash -> output relpath, from the manifest
+_finished = {}    # source relpath -> hash it had when converted
+_options = {}
+
+def _init_worker(done, finished, options):
+    _done.update(done)
+    _finished.update(finished)
+    _options.update(options)
+
+def downscale(data_url, max_px):
+    """Smaller data URL for an oversized image, or the original if that would not help."""
+    head, _, b64 = data_url.partition(",")
+    if not head.endswith(";base64"):
+        return data_url
+    try:
+        img = Image.open(io.BytesIO(base64.b64decode(b64)))
+        if max(img.size) <= max_px:
+            return data_url
+        fmt = "JPEG" if img.format == "JPEG" else "PNG"
+        img.thumbnail((max_px, max_px))
+        out = io.BytesIO()
+        if fmt == "JPEG":
+            img.convert("RGB").save(out, "JPEG", quality=85, optimize=True)
+        else:
+            img.save(out, "PNG", optimize=True)
+    except Exception:
+        return data_url   # unreadable or exotic image: keep it as it is
+    small = "data:image/%s;base64,%s" % (fmt.lower(), base64.b64encode(out.getvalue()).decode("ascii"))
+    return small if len(small) < len(data_url) else data_url
+
+def optimize(project, max_px):
+    hblock.unpack_assets(project)   # files that were already packed get re-packed below
+    hblock.normalize(project)
+    if Image is not None and max_px:
+        shrunk = {}
+        for o in hblock.iter_image_holders(project):
+            img = o.get("image")
+            if isinstance(img, str) and img.startswith("data:"):
+                if img not in shrunk:
+                    shrunk[img] = downscale(img, max_px)
+                o["image"] = shrunk[img]
+    return hblock.pack_assets(project)
+
+def convert_one(rel):
+    result = {"src": rel, "in_bytes": 0}
+    try:
+        return _convert(rel, result)
+    except Exception as e:   # unreadable, unwritable, or a bug: that file fails, not the batch
+        return dict(result, error="%s: %s" % (type(e).__name__, e))
+
+def _convert(rel, result):
+    src = os.path.join(_options["src"], rel)
+    dst = os.path.join(_options["out"], rel)
+    with open(src, "rb") as f:
+        st = os.fstat(f.fileno())
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    result.update(sha256=digest, in_bytes=len(data), mtime_ns=st.st_mtime_ns)
+    if _finished.get(rel, {}).get("sha256") == digest and os.path.exists(dst):
+        # touched but not changed: the new manifest line saves hashing it next time
+        return dict(result, out_bytes=os.path.getsize(dst), skipped=True)
+    if digest in _done:
+        # same content as a file finished earlier (maybe in a previous run)
+        if not os.path.exists(dst):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copyfile(os.path.join(_options["out"], _done[digest]), dst)
+        return dict(result, out_bytes=os.path.getsize(dst), skipped=True)
+    try:
+        project = json.loads(data)
+    except ValueError as e:
+        return dict(result, error="not JSON: %s" % e)
+    if not isinstance(project, dict):
+        return dict(result, error="not a project: JSON %s" % type(project).__name__)
+    try:
+        hblock.check_project(project)
+        out = hblock.dumps(optimize(project, _options["max_image_px"]))
+    except Exception as e:
+        return dict(result, error="malformed project: %s: %s" % (type(e).__name__, e))
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    hblock.write_atomic(dst, out)
+    return dict(result, out_bytes=len(out))
+
+#########################
+# driver
+#########################
+def find_projects(src):
+    for root, dirs, files in os.walk(src):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".Hblock"):
+                yield os.path.relpath(os.path.join(root, name), src)
+
+def read_manifest(path):
+    """(hash -> an output with that source content, relpath -> its latest manifest entry)."""
+    finished = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    finished[entry["src"]] = {"sha256": entry["sha256"], "mtime_ns": entry.get("mtime_ns"),
+                                              "size": entry.get("in_bytes")}   # a re-converted file: the later line wins
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue   # torn last line from a killed run
+    done = {}
+    for rel, entry in finished.items():
+        done.setdefault(entry["sha256"], rel)
+    return done, finished
+
+def unchanged(src, out, rel, finished):
+    """Output size if rel still has the mtime and size it was converted at (no need to hash it), else None."""
+    entry = finished.get(rel)
+    if entry is None or entry["mtime_ns"] is None:
+        return None
+    try:
+        st = os.stat(os.path.join(src, rel))
+        if (st.st_mtime_ns, st.st_size) == (entry["mtime_ns"], entry["size"]):
+            return os.path.getsize(os.path.join(out, rel))
+    except OSError:
+        pass   # gone since it was listed, or its output is: let the worker sort it out
+    return None
+
+def run(src, out, workers=None, max_image_px=DEFAULT_MAX_IMAGE_PX, log=sys.stderr):
+    os.makedirs(out, exist_ok=True)
+    manifest_path = os.path.join(out, MANIFEST)
+    done, finished = read_manifest(manifest_path)
+    start = last_report = time.perf_counter()
+    totals = {"files": 0, "skipped": 0, "errors": 0, "in_bytes": 0, "out_bytes": 0}
+    todo = []
+    for rel in find_projects(src):
+        # finished files whose mtime and size still match are skipped here, unread;
+        # the rest go to the workers, which skip them too if their hash still matches
+        out_bytes = unchanged(src, out, rel, finished)
+        if out_bytes is None:
+            todo.append(rel)
+            continue
+        totals["files"] += 1
+        totals["skipped"] += 1
+        totals["in_bytes"] += finished[rel]["size"]
+        totals["out_bytes"] += out_bytes
+    workers = workers or os.cpu_count() or 1
+    if Image is None and max_image_px:
+        print("Pillow is not installed; images will be deduplicated but not downscaled", file=log)
+    options = {"src": src, "out": out, "max_image_px": max_image_px}
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(done, finished, options)) as pool, \
+            open(manifest_path, "a", encoding="utf-8") as manifest:
+        chunksize = max(1, min(64, len(todo) // (workers * 8)))
+        for result in pool.map(convert_one, todo, chunksize=chunksize):
+            totals["files"] += 1
+            totals["in_bytes"] += result["in_bytes"]
+            if "error" in result:
+                totals["errors"] += 1
+                print("%s: %s" % (result["src"], result["error"]), file=log)
+                continue
+            totals["skipped"] += bool(result.get("skipped"))
+            totals["out_bytes"] += result["out_bytes"]
+            manifest.write(json.dumps(result) + "\n")
+            manifest.flush()
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                last_report = now
+                print("%d/%d files, %.1f files/s" % (totals["files"], totals["skipped"] + len(todo), totals["files"] / (now - start)), file=log)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    return dict(totals, workers=workers, seconds=round(elapsed, 3),
+                files_per_s=round(totals["files"] / elapsed, 1),
+                mb_per_s=round(totals["in_bytes"] / elapsed / 1e6, 2),
+                ratio=round(totals["out_bytes"] / totals["in_bytes"], 3) if totals["in_bytes"] else None)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Normalize and re-encode a directory of .Hblock files")
+    p.add_argument("src")
+    p.add_argument("out")
+    p.add_argument("-j", "--workers", type=int, default=None, help="processes (default: all cores)")
+    p.add_argument("--max-image-px", type=int, default=DEFAULT_MAX_IMAGE_PX, help="0 keeps image sizes")
+    args = p.parse_args(argv)
+    stats = run(args.src, args.out, args.workers, args.max_image_px)
+    print("%(files)d files (%(skipped)d already done, %(errors)d failed) in %(seconds)ss: "
+          "%(files_per_s)s files/s, %(mb_per_s)s MB/s, output %(ratio)s of input" % stats)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,34 @@
 # editor.py
-from flask import Flask, render_template_string, request, send_file
-import json, io
-
-app = Flask(__name__)
+from flask import Flask, render_template_string, request, send_file, send_from_directory, jsonify, abort
+import os, json, uuid, hashlib, tempfile
+import hblock
+from hblock import PROJECT_DIR, stored_path
+import benchlog, bulkedit, catalog, export, history, projstore, telemetry, uploads
+from projcache import cache as project_cache
+
+# static files are only served fingerprinted, from /assets/<hash>/<path>
+app = Flask(__name__, static_folder=None)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# modules the editor imports on first use (see loadModule in static/js/core.js)
+LAZY_MODULES = {
+    "shape": "js/menus/shape.js",
+    "text": "js/menus/text.js",
+    "player": "js/menus/player.js",
+    "events": "js/menus/events.js",
+    "inventory": "js/menus/inventory.js",
+    "tiles": "js/menus/tiles.js",
+    "play": "js/play.js",
+    "collab": "js/collab.js",
+    "bench": "js/bench.js",
+    "telemetry": "js/telemetry.js",
+    "upload": "js/upload.js",
+}
+CHUNK_SIZE = 64 * 1024
+# the collaboration server (collab.py) runs as its own process next to this app
+COLLAB_URL = os.environ.get("HBLOCK_COLLAB_URL", "")
+# how much the editor's undo history may hold (see Undo / redo in static/js/core.js)
+UNDO_BYTES = int(os.environ.get("HBLOCK_UNDO_BYTES", 16 * 1024 * 1024))
 
 HTML = """
 <!doctype html>
@@ -10,27 +36,7 @@ HTML = """
 <head>
   <meta name="viewport" content="width=device-width,initial-scale=1">
   <title>HBlock — All-in-One Game Editor</title>
-  <style>
-    :root { --bg:#222; --panel:#333; --white:#fff; }
-    html,body { height:100%; margin:0; background:var(--bg); color:var(--white); font-family:Inter, Arial, sans-serif; }
-    #topbar { display:flex; gap:8px; padding:10px; align-items:center; background:var(--panel); flex-wrap:wrap; }
-    button, input[type="range"], input[type="color"] { cursor:pointer; }
-    button { background:#555; color:white; border:0; padding:8px 10px; border-radius:8px; }
-    #canvasWrap { display:flex; justify-content:center; padding:12px; }
-    canvas { background:white; border:2px solid #000; touch-action: none; }
-    .menu { position:absolute; background:white; color:black; padding:10px; border-radius:10px; box-shadow:0 6px 24px rgba(0,0,0,0.5); display:none; z-index:50; min-width:240px; }
-    .menu h3 { margin:0 0 8px 0; font-size:16px; }
-    .menu label { display:block; margin:6px 0; font-size:13px; }
-    .small { padding:6px 8px; font-size:13px; }
-    #windowSlider { width:200px; }
-    #inventoryButton { background:#4a90e2; }
-    #mobileTapButton { position:fixed; right:18px; bottom:18px; padding:12px 16px; border-radius:12px; background:#1abc9c; color:#fff; border:0; z-index:60; display:none; }
-    #inventoryPreview { display:flex; gap:8px; flex-wrap:wrap; margin-top:8px; }
-    .invItem { background:#eee; color:#000; padding:6px; border-radius:6px; display:flex; gap:6px; align-items:center; }
-    .tiny { font-size:12px; padding:4px 6px; }
-    /* small helper UI */
-    #status { margin-left:8px; color:#ddd; font-size:13px; }
-  </style>
+  <link rel="stylesheet" href="{{ asset_url('editor.css') }}">
 </head>
 <body>
   <div id="topbar">
@@ -39,8 +45,27 @@ HTML = """
     <button onclick="openPlayerMenu()">Player Settings</button>
     <button onclick="openEventMenu()">Events</button>
     <button id="inventoryButton" onclick="openInventoryMenu()">Inventory</button>
+    <button onclick="openTileMenu()">Tiles</button>
+    <button id="undoButton" onclick="undo()" title="Undo (Ctrl+Z)" disabled>Undo</button>
+    <button id="redoButton" onclick="redo()" title="Redo (Ctrl+Shift+Z)" disabled>Redo</button>
     <button onclick="saveFile()">Save .Hblock</button>
     <button onclick="openFile()">Open .Hblock</button>
+    <button onclick="saveToServer()">Save to Server</button>
+    <button onclick="openFromServer()">Open from Server</button>
+    <button onclick="exportGame()">Export Game</button>
+    <button id="playButton" onclick="togglePlay()">Play</button>
+    <button id="collabButton" onclick="toggleCollab()">Collaborate</button>
+    <button id="zoomButton" onclick="resetView()" title="Zoom (wheel to change, click to reset the view)">100%</button>
+    <span id="selectionBar" style="display:none;align-items:center;gap:4px;" title="Shift-click or shift-drag to select">
+      <span id="selectionCount" class="tiny"></span>
+      <button onclick="scaleSelection(0.8)" title="Shrink the selection">&minus;</button>
+      <button onclick="scaleSelection(1.25)" title="Grow the selection">+</button>
+      <button onclick="deleteSelection()">Delete</button>
+      <button onclick="selectionToInventory()">To Inventory</button>
+    </span>
+    <label class="tiny" style="display:flex;align-items:center;gap:4px;">
+      <input id="telemetryToggle" type="checkbox" onchange="setTelemetry(this.checked)"> Share performance data
+    </label>
     <label style="display:flex;align-items:center;gap:8px;">
       Window:
       <input id="windowSlider" type="range" min="0" max="0" value="0" oninput="switchWindow(this.value)">
@@ -58,6 +83,7 @@ HTML = """
       <div id="playerMenu" class="menu"></div>
       <div id="eventMenu" class="menu"></div>
       <div id="inventoryMenu" class="menu"></div>
+      <div id="tileMenu" class="menu"></div>
     </div>
   </div>
 
@@ -66,1087 +92,333 @@ HTML = """
 
   <input type="file" id="fileInput" accept=".Hblock" style="display:none" />
 
-<script>
-/*
-HBlock Editor — single-file JS editor inside Flask template.
-Data model:
-- windows: array of arrays. each window is list of objects.
-- object types: shape, text, eventZone
-- inventory: array of inventory items (shapes)
-- playerSettings: { count, speed, controls } controls mapping action->keyString
-- events assigned to eventZones: zone.event = { type: "addShape"|"newWindow"|"inventoryEquip"|"addText"|"removeText", params: {...} }
-- save: serializes windows, inventory, playerSettings
-*/
-
-/////////////////////////
-// editor state
-/////////////////////////
-let windows = [[]];          // array of windows (each window is array of objects)
-let currentWindow = 0;
-let inventory = [];          // stored shapes (objects)
-let playerSettings = { count:0, speed:5, controls: {} }; // controls: action->key
-let equipped = null;         // when equipping an inventory item (preview)
-let mobileTapBindings = {};  // inventoryIndex -> true (show mobile tap button)
-let mobileTapAssignedIndex = null; // which inventory item currently assigned to mobile button
-let eventZones = [];         // we also store zones inside windows but keep helper array if needed
-
-const canvas = document.getElementById('gameCanvas');
-const ctx = canvas.getContext('2d');
-const shapeMenu = document.getElementById('shapeMenu');
-const textMenu = document.getElementById('textMenu');
-const playerMenu = document.getElementById('playerMenu');
-const eventMenu = document.getElementById('eventMenu');
-const inventoryMenu = document.getElementById('inventoryMenu');
-const fileInput = document.getElementById('fileInput');
-const windowSlider = document.getElementById('windowSlider');
-const statusSpan = document.getElementById('status');
-const mobileTapButton = document.getElementById('mobileTapButton');
-
-let dragTarget = null;
-let dragOffset = {x:0,y:0};
-let dragStart = {x:0,y:0};
-let dragging = false;
-let maybeClickTarget = null;
-let clickMoved = false;
-const clickThreshold = 6;
-
-let zoneEditing = null; // eventZone being edited/resized
-let zoneResizeHandle = null;
-
-// small helpers
-function objects() { return windows[currentWindow]; }
-function clamp(v,a,b) { return Math.max(a, Math.min(b, v)); }
-
-/////////////////////////
-// Drawing
-/////////////////////////
-function drawAll(){
-  ctx.clearRect(0,0,canvas.width,canvas.height);
-  // background white is already canvas background
-  let objs = objects();
-  for(let obj of objs){
-    if(obj.type === 'shape'){
-      if(obj.image){
-        let img = new Image();
-        img.src = obj.image;
-        // draw once loaded (simple approach)
-        img.onload = () => { ctx.drawImage(img, obj.x, obj.y, obj.size, obj.size); }
-        // draw placeholder rect while loading
-        ctx.fillStyle = obj.color || 'blue';
-        ctx.fillRect(obj.x, obj.y, obj.size, obj.size);
-      } else {
-        ctx.fillStyle = obj.color || 'blue';
-        if(obj.shape === 'square') ctx.fillRect(obj.x, obj.y, obj.size, obj.size);
-        else if(obj.shape === 'circle'){
-          ctx.beginPath();
-          ctx.arc(obj.x + obj.size/2, obj.y + obj.size/2, obj.size/2, 0, Math.PI*2);
-          ctx.fill();
-        } else if(obj.shape === 'triangle'){
-          ctx.beginPath();
-          ctx.moveTo(obj.x + obj.size/2, obj.y);
-          ctx.lineTo(obj.x, obj.y + obj.size);
-          ctx.lineTo(obj.x + obj.size, obj.y + obj.size);
-          ctx.closePath();
-          ctx.fill();
-        } else if(obj.shape === 'hexagon'){
-          ctx.beginPath();
-          let s = obj.size/2;
-          let cx = obj.x + s, cy = obj.y + s;
-          for(let i=0;i<6;i++){
-            let a = Math.PI/3*i;
-            let px = cx + s*Math.cos(a), py = cy + s*Math.sin(a);
-            if(i===0) ctx.moveTo(px,py); else ctx.lineTo(px,py);
-          }
-          ctx.closePath();
-          ctx.fill();
-        }
-      }
-
-      // overlay indicators for player/collide/kill
-      if(obj.player){
-        ctx.strokeStyle = '#FF0000';
-        ctx.lineWidth = 2;
-        ctx.strokeRect(obj.x-2, obj.y-2, obj.size+4, obj.size+4);
-      } else if(obj.collide){
-        ctx.strokeStyle = '#0000FF';
-        ctx.lineWidth = 1.5;
-        ctx.strokeRect(obj.x-2, obj.y-2, obj.size+4, obj.size+4);
-      }
-      if(obj.kill){
-        ctx.beginPath();
-        ctx.moveTo(obj.x, obj.y);
-        ctx.lineTo(obj.x+obj.size, obj.y+obj.size);
-        ctx.moveTo(obj.x+obj.size, obj.y);
-        ctx.lineTo(obj.x, obj.y+obj.size);
-        ctx.strokeStyle = '#000';
-        ctx.stroke();
-      }
-
-    } else if(obj.type === 'text'){
-      ctx.fillStyle = obj.color || '#000';
-      ctx.font = (obj.size || 24) + 'px Arial';
-      ctx.fillText(obj.text || '', obj.x, obj.y);
-    } else if(obj.type === 'eventZone'){
-      if(obj.visible){
-        ctx.strokeStyle = 'rgba(255,0,0,0.9)';
-        ctx.lineWidth = 2;
-        ctx.strokeRect(obj.x, obj.y, obj.w, obj.h);
-        // corner handles
-        ctx.fillStyle = 'rgba(255,0,0,0.9)';
-        let hs = 8;
-        [[obj.x,obj.y],[obj.x+obj.w,obj.y],[obj.x,obj.y+obj.h],[obj.x+obj.w,obj.y+obj.h]].forEach(p=>{
-          ctx.fillRect(p[0]-hs/2, p[1]-hs/2, hs, hs);
-        });
-      }
-    }
-  }
-
-  // draw equipped preview following mouse if exists
-  if(equipped && equipped.previewPos){
-    ctx.save();
-    ctx.globalAlpha = 0.8;
-    let eq = equipped.item;
-    if(eq.type === 'shape'){
-      ctx.fillStyle = eq.color || 'blue';
-      if(eq.image){
-        let img = new Image(); img.src = eq.image;
-        img.onload = ()=>{ ctx.drawImage(img, equipped.previewPos.x, equipped.previewPos.y, eq.size, eq.size); }
-        ctx.fillRect(equipped.previewPos.x, equipped.previewPos.y, eq.size, eq.size);
-      } else {
-        if(eq.shape === 'square') ctx.fillRect(equipped.previewPos.x, equipped.previewPos.y, eq.size, eq.size);
-        else if(eq.shape === 'circle'){
-          ctx.beginPath();
-          ctx.arc(equipped.previewPos.x + eq.size/2, equipped.previewPos.y + eq.size/2, eq.size/2, 0, Math.PI*2);
-          ctx.fill();
-        } else if(eq.shape === 'triangle'){
-          ctx.beginPath();
-          ctx.moveTo(equipped.previewPos.x + eq.size/2, equipped.previewPos.y);
-          ctx.lineTo(equipped.previewPos.x, equipped.previewPos.y + eq.size);
-          ctx.lineTo(equipped.previewPos.x + eq.size, equipped.previewPos.y + eq.size);
-          ctx.closePath();
-          ctx.fill();
-        } else if(eq.shape === 'hexagon'){
-          ctx.beginPath();
-          let s = eq.size/2;
-          let cx = equipped.previewPos.x + s, cy = equipped.previewPos.y + s;
-          for(let i=0;i<6;i++){
-            let a = Math.PI/3*i;
-            let px = cx + s*Math.cos(a), py = cy + s*Math.sin(a);
-            if(i===0) ctx.moveTo(px,py); else ctx.lineTo(px,py);
-          }
-          ctx.closePath();
-          ctx.fill();
-        }
-      }
-    }
-    ctx.restore();
-  }
-}
-
-/////////////////////////
-// Utilities for hit testing
-/////////////////////////
-function findTopObjectAt(x,y){
-  let objs = objects();
-  for(let i=objs.length-1;i>=0;i--){
-    let o = objs[i];
-    if(o.type === 'shape'){
-      if(x >= o.x && x <= o.x+o.size && y >= o.y && y <= o.y+o.size) return o;
-    } else if(o.type === 'text'){
-      // approximate bounding box width 200
-      if(x >= o.x && x <= o.x+200 && y >= o.y - o.size && y <= o.y) return o;
-    } else if(o.type === 'eventZone'){
-      if(x >= o.x && x <= o.x+o.w && y >= o.y && y <= o.y+o.h) return o;
-    }
-  }
-  return null;
-}
-
-/////////////////////////
-// Mouse / touch events: drag vs click logic
-/////////////////////////
-canvas.addEventListener('pointerdown', (ev)=>{
-  ev.preventDefault();
-  const rect = canvas.getBoundingClientRect();
-  const x = ev.clientX - rect.left, y = ev.clientY - rect.top;
-  dragStart = {x,y};
-  clickMoved = false;
-  dragging = true;
-
-  // if editing a zone, check handles
-  let top = findTopObjectAt(x,y);
-  if(top && top.type === 'eventZone' && top.visible){
-    // check corner handles
-    let hs = 10;
-    let corners = [
-      {name:'tl', x:top.x, y:top.y},
-      {name:'tr', x:top.x+top.w, y:top.y},
-      {name:'bl', x:top.x, y:top.y+top.h},
-      {name:'br', x:top.x+top.w, y:top.y+top.h}
-    ];
-    for(let c of corners){
-      if(Math.abs(x-c.x) <= hs && Math.abs(y-c.y) <= hs){
-        zoneEditing = top;
-        zoneResizeHandle = c.name;
-        return;
-      }
-    }
-    // else select zone for dragging
-    if(top.type === 'eventZone'){
-      zoneEditing = top;
-      zoneResizeHandle = null;
-      dragOffset.x = x - top.x;
-      dragOffset.y = y - top.y;
-      return;
-    }
-  }
-
-  // otherwise select object for dragging
-  if(top && (top.type === 'shape' || top.type === 'text')){
-    dragTarget = top;
-    dragOffset.x = x - dragTarget.x;
-    dragOffset.y = y - dragTarget.y;
-    maybeClickTarget = top;
-  } else {
-    dragTarget = null;
-    maybeClickTarget = null;
-  }
-});
-
-canvas.addEventListener('pointermove', (ev)=>{
-  if(!dragging) return;
-  const rect = canvas.getBoundingClientRect();
-  const x = ev.clientX - rect.left, y = ev.clientY - rect.top;
-  if(zoneEditing){
-    // resize or move zoneEditing
-    if(zoneResizeHandle){
-      // resize by handle name
-      if(zoneResizeHandle === 'tl'){
-        let newx = x, newy = y;
-        let oldr = zoneEditing.x + zoneEditing.w, oldb = zoneEditing.y + zoneEditing.h;
-        zoneEditing.x = Math.min(newx, oldr-10);
-        zoneEditing.y = Math.min(newy, oldb-10);
-        zoneEditing.w = oldr - zoneEditing.x;
-        zoneEditing.h = oldb - zoneEditing.y;
-      } else if(zoneResizeHandle === 'tr'){
-        let oldl = zoneEditing.x, oldb = zoneEditing.y + zoneEditing.h;
-        zoneEditing.y = Math.min(y, oldb-10);
-        zoneEditing.w = Math.max(10, x - zoneEditing.x);
-        zoneEditing.h = oldb - zoneEditing.y;
-      } else if(zoneResizeHandle === 'bl'){
-        let oldr = zoneEditing.x + zoneEditing.w, oldt = zoneEditing.y;
-        zoneEditing.x = Math.min(x, oldr-10);
-        zoneEditing.w = oldr - zoneEditing.x;
-        zoneEditing.h = Math.max(10, y - zoneEditing.y);
-      } else if(zoneResizeHandle === 'br'){
-        zoneEditing.w = Math.max(10, x - zoneEditing.x);
-        zoneEditing.h = Math.max(10, y - zoneEditing.y);
-      }
-      drawAll();
-      clickMoved = true;
-      return;
-    } else {
-      // dragging zone
-      zoneEditing.x = x - dragOffset.x;
-      zoneEditing.y = y - dragOffset.y;
-      drawAll();
-      clickMoved = true;
-      return;
-    }
-  }
-
-  if(dragTarget){
-    // move object
-    dragTarget.x = x - dragOffset.x;
-    dragTarget.y = y - dragOffset.y;
-    drawAll();
-    clickMoved = true;
-    return;
-  }
-
-  // if equipped preview, update preview pos
-  if(equipped){
-    equipped.previewPos = {x: x - (equipped.item.size||50)/2, y: y - (equipped.item.size||50)/2};
-    drawAll();
-  }
-});
-
-canvas.addEventListener('pointerup', (ev)=>{
-  dragging = false;
-  // if there was zone editing and we weren't moving significantly, maybe open zone menu on click
-  if(zoneEditing){
-    if(!clickMoved){
-      openZoneMenu(zoneEditing);
-    }
-    zoneEditing = null;
-    zoneResizeHandle = null;
-    return;
-  }
-
-  if(dragTarget){
-    // if mouse didn't move (a click) then treat as click: open menu
-    if(!clickMoved && maybeClickTarget){
-      if(maybeClickTarget.type === 'shape') openShapeMenu(maybeClickTarget);
-      else if(maybeClickTarget.type === 'text') openTextMenu(maybeClickTarget);
-    }
-  } else {
-    // if no object and equipped present and no big move, then place the equipped item
-    const rect = canvas.getBoundingClientRect();
-    const x = ev.clientX - rect.left, y = ev.clientY - rect.top;
-    if(equipped && !clickMoved){
-      // place copy
-      let copy = JSON.parse(JSON.stringify(equipped.item));
-      copy.x = x - (copy.size||50)/2;
-      copy.y = y - (copy.size||50)/2;
-      objects().push(copy);
-      // if the inventory item wanted to be removed on place, we could do that, but for now leave inventory untouched
-      equipped = null;
-      mobileTapButton.style.display = mobileTapAssignedIndex !== null ? 'inline-block' : 'none';
-      drawAll();
-    }
-  }
-
-  dragTarget = null;
-  maybeClickTarget = null;
-  clickMoved = false;
-});
-
-/////////////////////////
-// Create / Add items
-/////////////////////////
-function addShape(){
-  let obj = { type:'shape', x:120, y:120, size:80, color:'blue', shape:'square', image:null, player:false, collide:false, kill:false, speed:playerSettings.speed || 5, controls:{} };
-  objects().push(obj);
-  drawAll();
-}
-
-function addText(){
-  let obj = { type:'text', x:200, y:200, text:'Hello world', color:'#000000', size:28 };
-  objects().push(obj);
-  drawAll();
-}
-
-/////////////////////////
-// Menus: shape & text
-/////////////////////////
-function closeAllMenus(){
-  [shapeMenu, textMenu, playerMenu, eventMenu, inventoryMenu].forEach(m => m.style.display = 'none');
-}
-
-function openShapeMenu(obj){
-  closeAllMenus();
-  shapeMenu.style.left = (canvas.getBoundingClientRect().left + 20) + 'px';
-  shapeMenu.style.top = (canvas.getBoundingClientRect().top + 20) + 'px';
-  shapeMenu.innerHTML = `
-    <h3>Shape Options</h3>
-    <label>Color <input id="shapeColor" type="color" value="${obj.color || '#0000ff'}"></label>
-    <label>Shape
-      <select id="shapeType">
-        <option value="square">Square</option>
-        <option value="circle">Circle</option>
-        <option value="triangle">Triangle</option>
-        <option value="hexagon">Hexagon</option>
-      </select>
-    </label>
-    <label>Import Image <input id="shapeImage" type="file" accept="image/*"></label>
-    <div style="display:flex;gap:6px;margin-top:8px;">
-      <button class="small" id="makePlayerBtn">Make Player</button>
-      <button class="small" id="makeCollideBtn">Make Collideable</button>
-      <button class="small" id="makeKillBtn">Make Kill</button>
-    </div>
-    <label>Size <input id="shapeSize" type="range" min="20" max="300" value="${obj.size}"></label>
-    <div style="display:flex;gap:6px;margin-top:8px;">
-      <button onclick="deleteObject()" class="small">Delete</button>
-      <button onclick="closeAllMenus()" class="small">Close</button>
-    </div>
-  `;
-  // set select to current shape
-  shapeMenu.querySelector('#shapeType').value = obj.shape || 'square';
-
-  // attach events
-  shapeMenu.querySelector('#shapeColor').oninput = (e)=>{ obj.color = e.target.value; drawAll(); }
-  shapeMenu.querySelector('#shapeType').onchange = (e)=>{ obj.shape = e.target.value; obj.image = null; drawAll(); }
-  shapeMenu.querySelector('#shapeSize').oninput = (e)=>{ obj.size = parseInt(e.target.value); drawAll(); }
-
-  shapeMenu.querySelector('#shapeImage').onchange = (ev)=>{
-    let f = ev.target.files[0];
-    let r = new FileReader();
-    r.onload = ()=>{ obj.image = r.result; drawAll(); }
-    r.readAsDataURL(f);
-  }
-
-  shapeMenu.querySelector('#makePlayerBtn').onclick = ()=>{
-    obj.player = true;
-    obj.collide = false;
-    obj.kill = false;
-    drawAll();
-  }
-  shapeMenu.querySelector('#makeCollideBtn').onclick = ()=>{
-    obj.collide = true;
-    obj.player = false;
-    drawAll();
-  }
-  shapeMenu.querySelector('#makeKillBtn').onclick = ()=>{
-    obj.kill = true;
-    obj.player = false;
-    drawAll();
-  }
-
-  // show menu
-  shapeMenu.style.display = 'block';
-}
-
-function openTextMenu(obj){
-  closeAllMenus();
-  textMenu.style.left = (canvas.getBoundingClientRect().left + 40) + 'px';
-  textMenu.style.top = (canvas.getBoundingClientRect().top + 40) + 'px';
-  textMenu.innerHTML = `
-    <h3>Text Options</h3>
-    <label>Content <input id="textContent" type="text" value="${escapeHtml(obj.text || '')}"></label>
-    <label>Color <input id="textColor" type="color" value="${obj.color || '#000000'}"></label>
-    <label>Size <input id="textSize" type="range" min="8" max="120" value="${obj.size || 24}"></label>
-    <div style="display:flex;gap:6px;margin-top:8px;">
-      <button onclick="deleteObject()" class="small">Delete</button>
-      <button onclick="closeAllMenus()" class="small">Close</button>
-    </div>
-  `;
-
-  textMenu.querySelector('#textContent').oninput = (e)=>{ obj.text = e.target.value; drawAll(); }
-  textMenu.querySelector('#textColor').oninput = (e)=>{ obj.color = e.target.value; drawAll(); }
-  textMenu.querySelector('#textSize').oninput = (e)=>{ obj.size = parseInt(e.target.value); drawAll(); }
-
-  textMenu.style.display = 'block';
-}
-
-function deleteObject(){
-  // find and remove current open-target by checking menus to see which object they reference (quick approach: capture last clicked object by maybeClickTarget)
-  // Simpler: allow delete of top-most object under the last click position by re-using maybeClickTarget or search selected shapes in proximity of menu
-  // For safety: remove last object in objects() that intersects with the menu left/top area
-  // But to make it reliable: we will store a lastSelected global whenever opening menus.
-  if(window.lastSelected){
-    let arr = objects();
-    let idx = arr.indexOf(window.lastSelected);
-    if(idx !== -1) arr.splice(idx,1);
-    window.lastSelected = null;
-  }
-  closeAllMenus();
-  drawAll();
-}
-
-function escapeHtml(s){ return s.replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;'); }
-
-/////////////////////////
-// Track lastSelected for delete operations
-/////////////////////////
-function openShapeMenu(obj){
-  window.lastSelected = obj;
-  closeAllMenus();
-  shapeMenu.style.left = (canvas.getBoundingClientRect().left + 20) + 'px';
-  shapeMenu.style.top = (canvas.getBoundingClientRect().top + 20) + 'px';
-  shapeMenu.innerHTML = `
-    <h3>Shape Options</h3>
-    <label>Color <input id="shapeColor" type="color" value="${obj.color || '#0000ff'}"></label>
-    <label>Shape
-      <select id="shapeType">
-        <option value="square">Square</option>
-        <option value="circle">Circle</option>
-        <option value="triangle">Triangle</option>
-        <option value="hexagon">Hexagon</option>
-      </select>
-    </label>
-    <label>Import Image <input id="shapeImage" type="file" accept="image/*"></label>
-    <div style="display:flex;gap:6px;margin-top:8px;">
-      <button class="small" id="makePlayerBtn">${obj.player? 'Player ✓' : 'Make Player'}</button>
-      <button class="small" id="makeCollideBtn">${obj.collide? 'Collide ✓' : 'Make Collideable'}</button>
-      <button class="small" id="makeKillBtn">${obj.kill? 'Kill ✓' : 'Make Kill'}</button>
-    </div>
-    <label>Size <input id="shapeSize" type="range" min="20" max="300" value="${obj.size}"></label>
-    <div style="display:flex;gap:6px;margin-top:8px;">
-      <button onclick="deleteObject()" class="small">Delete</button>
-      <button onclick="closeAllMenus()" class="small">Close</button>
-    </div>
-  `;
-  shapeMenu.querySelector('#shapeType').value = obj.shape || 'square';
-  shapeMenu.querySelector('#shapeColor').oninput = (e)=>{ obj.color = e.target.value; drawAll(); }
-  shapeMenu.querySelector('#shapeType').onchange = (e)=>{ obj.shape = e.target.value; obj.image = null; drawAll(); }
-  shapeMenu.querySelector('#shapeSize').oninput = (e)=>{ obj.size = parseInt(e.target.value); drawAll(); }
-  shapeMenu.querySelector('#shapeImage').onchange = (ev)=>{
-    let f = ev.target.files[0];
-    let r = new FileReader();
-    r.onload = ()=>{ obj.image = r.result; drawAll(); }
-    r.readAsDataURL(f);
-  }
-  shapeMenu.querySelector('#makePlayerBtn').onclick = ()=>{
-    obj.player = !obj.player;
-    if(obj.player){ obj.collide = false; obj.kill = false; }
-    openShapeMenu(obj); // refresh
-  }
-  shapeMenu.querySelector('#makeCollideBtn').onclick = ()=>{
-    obj.collide = !obj.collide;
-    if(obj.collide) obj.player = false;
-    openShapeMenu(obj);
-  }
-  shapeMenu.querySelector('#makeKillBtn').onclick = ()=>{
-    obj.kill = !obj.kill;
-    if(obj.kill) obj.player = false;
-    openShapeMenu(obj);
-  }
-  shapeMenu.style.display = 'block';
-}
-
-function openTextMenu(obj){
-  window.lastSelected = obj;
-  closeAllMenus();
-  textMenu.style.left = (canvas.getBoundingClientRect().left + 40) + 'px';
-  textMenu.style.top = (canvas.getBoundingClientRect().top + 40) + 'px';
-  textMenu.innerHTML = `
-    <h3>Text Options</h3>
-    <label>Content <input id="textContent" type="text" value="${escapeHtml(obj.text || '')}"></label>
-    <label>Color <input id="textColor" type="color" value="${obj.color || '#000000'}"></label>
-    <label>Size <input id="textSize" type="range" min="8" max="120" value="${obj.size || 24}"></label>
-    <div style="display:flex;gap:6px;margin-top:8px;">
-      <button onclick="deleteObject()" class="small">Delete</button>
-      <button onclick="closeAllMenus()" class="small">Close</button>
-    </div>
-  `;
-  textMenu.querySelector('#textContent').oninput = (e)=>{ obj.text = e.target.value; drawAll(); }
-  textMenu.querySelector('#textColor').oninput = (e)=>{ obj.color = e.target.value; drawAll(); }
-  textMenu.querySelector('#textSize').oninput = (e)=>{ obj.size = parseInt(e.target.value); drawAll(); }
-  textMenu.style.display = 'block';
-}
-
-/////////////////////////
-// Player settings menu
-/////////////////////////
-function openPlayerMenu(){
-  closeAllMenus();
-  playerMenu.style.left = (canvas.getBoundingClientRect().left + 60) + 'px';
-  playerMenu.style.top = (canvas.getBoundingClientRect().top + 60) + 'px';
-  playerMenu.innerHTML = `
-    <h3>Player Settings</h3>
-    <label>How many players? <input id="playerCount" type="number" min="1" max="10" value="${playerSettings.count || 0}"></label>
-    <label>Default player speed <input id="playerSpeed" type="number" value="${playerSettings.speed || 5}"></label>
-    <div style="margin-top:6px;">Assign Controls (press a key after clicking action):</div>
-    <div style="display:flex;gap:6px;flex-wrap:wrap;margin-top:6px;">
-      <button class="tiny" onclick="assignControl('jump')">Jump</button>
-      <button class="tiny" onclick="assignControl('noGravityJump')">NoGravityJump</button>
-      <button class="tiny" onclick="assignControl('right')">Right</button>
-      <button class="tiny" onclick="assignControl('left')">Left</button>
-      <button class="tiny" onclick="assignControl('up')">Up</button>
-      <button class="tiny" onclick="assignControl('down')">Down</button>
-    </div>
-    <div style="display:flex;gap:8px;margin-top:8px;">
-      <button onclick="applyPlayerSettings()" class="small">Apply</button>
-      <button onclick="closeAllMenus()" class="small">Close</button>
-    </div>
-    <div style="margin-top:8px;font-size:12px;color:#444">Current key bindings: <pre id="bindingsPre" style="display:inline-block;margin:0">${JSON.stringify(playerSettings.controls)}</pre></div>
-  `;
-  playerMenu.style.display = 'block';
-}
-
-function applyPlayerSettings(){
-  const cnt = parseInt(playerMenu.querySelector('#playerCount').value) || 0;
-  const spd = parseFloat(playerMenu.querySelector('#playerSpeed').value) || 5;
-  playerSettings.count = clamp(cnt,1,10);
-  playerSettings.speed = spd;
-  // create that many player shapes if not present (simple approach: append new players)
-  // first, remove existing player flags from shapes so duplicates aren't created automatically
-  // We'll create N players placed at top-left spaced apart
-  // Remove previous player shapes of the current window to avoid doubling
-  // But user expects global number of players => create players in current window
-  // For simplicity we will append players until count reached (per current window)
-  let existingPlayers = objects().filter(o=>o.type==='shape' && o.player);
-  if(existingPlayers.length < playerSettings.count){
-    let toAdd = playerSettings.count - existingPlayers.length;
-    for(let i=0;i<toAdd;i++){
-      objects().push({type:'shape', x:20+80*i, y:20, size:60, color:'#ff4d4d', shape:'square', player:true, speed:playerSettings.speed, controls: {}});
-    }
-  } else if(existingPlayers.length > playerSettings.count){
-    // turn extras into non-player shapes (or remove them). We'll simply set player=false on extras.
-    let extras = existingPlayers.slice(playerSettings.count);
-    for(let ex of extras) ex.player = false;
-  }
-  // apply speed to all players
-  for(let o of objects()) if(o.player) o.speed = playerSettings.speed;
-  closeAllMenus();
-  drawAll();
-}
-
-function assignControl(action){
-  closeAllMenus();
-  playerMenu.style.display = 'block';
-  playerMenu.querySelector('#bindingsPre').textContent = JSON.stringify(playerSettings.controls);
-  alert("Press a key now to bind '"+action+"' (press Esc to cancel).");
-  function handler(e){
-    if(e.key === 'Escape'){ window.removeEventListener('keydown', handler); alert('Cancelled'); return; }
-    playerSettings.controls[action] = e.key;
-    window.removeEventListener('keydown', handler);
-    playerMenu.querySelector('#bindingsPre').textContent = JSON.stringify(playerSettings.controls);
-  }
-  window.addEventListener('keydown', handler);
-}
-
-/////////////////////////
-// Events: create zone, finalize (make invisible), assign event
-/////////////////////////
-function openEventMenu(){
-  closeAllMenus();
-  eventMenu.style.left = (canvas.getBoundingClientRect().left + 80) + 'px';
-  eventMenu.style.top = (canvas.getBoundingClientRect().top + 80) + 'px';
-  eventMenu.innerHTML = `
-    <h3>Events</h3>
-    <button onclick="createEventZone()" class="small">Select Event Activation (create zone)</button>
-    <button onclick="toggleZonesVisible()" class="small">Show/Hide Zones</button>
-    <button onclick="makeNewWindowFromMenu()" class="small">Make New Game Window</button>
-    <button onclick="addShapeToInventoryFromMenu()" class="small">Add Selected Shape To Inventory</button>
-    <div style="margin-top:8px;font-size:12px;color:#444">After creating a zone: drag to move, use corners to resize. Click zone to assign event. Finalize hides it (invisible).</div>
-    <div style="display:flex;gap:8px;margin-top:8px;">
-      <button onclick="closeAllMenus()" class="small">Close</button>
-    </div>
-  `;
-  eventMenu.style.display = 'block';
-}
-
-function createEventZone(){
-  // create an event zone object that is visible and editable
-  let z = { type:'eventZone', x:250, y:200, w:160, h:120, visible:true, finalized:false, event: null };
-  objects().push(z);
-  drawAll();
-  closeAllMenus();
-  // zoneEditing will allow immediate resizing/moving by user because pointerdown logic handles it
-}
-
-function toggleZonesVisible(){
-  for(let w of windows){
-    for(let o of w) if(o.type === 'eventZone') o.visible = !o.visible;
-  }
-  drawAll();
-}
-
-function openZoneMenu(zone){
-  closeAllMenus();
-  shapeMenu.style.display = 'none';
-  // reuse shapeMenu to show zone options for simplicity
-  eventMenu.style.left = (canvas.getBoundingClientRect().left + 100) + 'px';
-  eventMenu.style.top = (canvas.getBoundingClientRect().top + 100) + 'px';
-  eventMenu.innerHTML = `
-    <h3>Event Zone</h3>
-    <label>Event:
-      <select id="zoneEventType">
-        <option value="">(none)</option>
-        <option value="addShape">Add Shape</option>
-        <option value="newWindow">Make New Window</option>
-        <option value="addInventory">Add Shape To Inventory</option>
-        <option value="addText">Add Text</option>
-        <option value="removeText">Remove Text</option>
-      </select>
-    </label>
-    <div id="zoneParams"></div>
-    <div style="display:flex;gap:6px;margin-top:8px;">
-      <button onclick="finalizeZone()" class="small">Finalize (make invisible)</button>
-      <button onclick="deleteEventZone()" class="small">Delete Zone</button>
-      <button onclick="closeAllMenus()" class="small">Close</button>
-    </div>
-  `;
-  // set currently assigned event
-  let sel = eventMenu.querySelector('#zoneEventType');
-  sel.value = zone.event ? zone.event.type : '';
-  sel.onchange = ()=>{ renderZoneParams(zone); }
-  renderZoneParams(zone);
-  eventMenu.style.display = 'block';
-}
-
-function renderZoneParams(zone){
-  const paramsDiv = eventMenu.querySelector('#zoneParams');
-  paramsDiv.innerHTML = '';
-  const type = eventMenu.querySelector('#zoneEventType').value;
-  if(type === 'addShape'){
-    paramsDiv.innerHTML = `
-      <label>Shape color <input id="zshapeColor" type="color" value="#00ff00"></label>
-      <label>Shape size <input id="zshapeSize" type="number" value="50"></label>
-      <label>How many to add? <input id="zshapeCount" type="number" value="1" min="1"></label>
-      <button onclick="assignZoneAddShape()">Assign</button>
-    `;
-  } else if(type === 'newWindow'){
-    paramsDiv.innerHTML = `<div style="font-size:13px">Creates a new game window and switches to it when event triggers.</div><button onclick="assignZoneNewWindow()">Assign</button>`;
-  } else if(type === 'addInventory'){
-    paramsDiv.innerHTML = `
-      <label>Choose inventory item index <input id="zInvIdx" type="number" min="0" max="${Math.max(0,inventory.length-1)}" value="0"></label>
-      <button onclick="assignZoneAddInventory()">Assign</button>
-    `;
-  } else if(type === 'addText'){
-    paramsDiv.innerHTML = `
-      <label>Text content <input id="zTextContent" type="text" value="Hello!"></label>
-      <label>Color <input id="zTextColor" type="color" value="#000000"></label>
-      <label>Size <input id="zTextSize" type="number" value="28"></label>
-      <button onclick="assignZoneAddText()">Assign</button>
-    `;
-  } else if(type === 'removeText'){
-    paramsDiv.innerHTML = `
-      <label>Remove most recent text? (yes removes one)</label>
-      <button onclick="assignZoneRemoveText()">Assign</button>
-    `;
-  } else {
-    paramsDiv.innerHTML = `<div style="font-size:12px;color:#333">Choose an event to assign to this zone.</div>`;
-    zone.event = null;
-  }
-}
-
-function assignZoneAddShape(){
-  let color = eventMenu.querySelector('#zshapeColor').value;
-  let size = parseInt(eventMenu.querySelector('#zshapeSize').value) || 50;
-  let count = parseInt(eventMenu.querySelector('#zshapeCount').value) || 1;
-  window.lastZone.event = { type:'addShape', params:{ color, size, count } };
-  alert('Zone assigned: addShape x'+count);
-  closeAllMenus();
-}
-
-function assignZoneNewWindow(){
-  window.lastZone.event = { type:'newWindow', params:{} };
-  alert('Zone assigned: newWindow');
-  closeAllMenus();
-}
-
-function assignZoneAddInventory(){
-  let idx = parseInt(eventMenu.querySelector('#zInvIdx').value) || 0;
-  if(!inventory[idx]) { alert('No inventory item at index '+idx); return; }
-  window.lastZone.event = { type:'addInventory', params:{ index: idx } };
-  alert('Zone assigned: add inventory item idx '+idx);
-  closeAllMenus();
-}
-
-function assignZoneAddText(){
-  let txt = eventMenu.querySelector('#zTextContent').value;
-  let color = eventMenu.querySelector('#zTextColor').value;
-  let size = parseInt(eventMenu.querySelector('#zTextSize').value) || 28;
-  window.lastZone.event = { type:'addText', params:{ text:txt, color, size } };
-  alert('Zone assigned: add text "'+txt+'"');
-  closeAllMenus();
-}
-
-function assignZoneRemoveText(){
-  window.lastZone.event = { type:'removeText', params:{} };
-  alert('Zone assigned: remove text');
-  closeAllMenus();
-}
-
-function finalizeZone(){
-  // finalize by setting finalized true and visible false
-  if(window.lastZone){
-    window.lastZone.finalized = true;
-    window.lastZone.visible = false;
-    alert('Zone finalized (now invisible). You can still edit by using Events menu -> show zones -> click zone.');
-    closeAllMenus();
-    drawAll();
-  }
-}
-
-function deleteEventZone(){
-  if(window.lastZone){
-    let arr = objects();
-    let idx = arr.indexOf(window.lastZone);
-    if(idx !== -1) arr.splice(idx,1);
-    window.lastZone = null;
-    closeAllMenus();
-    drawAll();
-  }
-}
-
-/////////////////////////
-// Inventory
-/////////////////////////
-function openInventoryMenu(){
-  closeAllMenus();
-  inventoryMenu.style.left = (canvas.getBoundingClientRect().left + 120) + 'px';
-  inventoryMenu.style.top = (canvas.getBoundingClientRect().top + 60) + 'px';
-  let html = `<h3>Inventory</h3><div id="invList" style="max-height:240px;overflow:auto"></div>
-  <div style="margin-top:8px;">
-    <button onclick="captureSelectedToInventory()" class="small">Capture Selected Shape Into Inventory</button>
-    <button onclick="closeAllMenus()" class="small">Close</button>
-  </div>
-  <div style="margin-top:6px;font-size:12px;color:#333">Assign a keyboard key or mobile tap to equip an inventory item.</div>`;
-  inventoryMenu.innerHTML = html;
-  const invList = inventoryMenu.querySelector('#invList');
-  invList.innerHTML = '';
-  inventory.forEach((it, idx)=>{
-    const s = `<div class="invItem">
-      <div style="width:40px;height:40px;display:flex;align-items:center;justify-content:center;background:#ddd;border-radius:4px;overflow:hidden;">
-        ${it.image ? '<img src="'+it.image+'" style="width:100%;height:100%;object-fit:cover"/>' : renderMiniShape(it)}
-      </div>
-      <div style="display:flex;flex-direction:column;">
-        <div>Idx ${idx}</div>
-        <div style="display:flex;gap:6px;margin-top:4px;">
-          <button onclick="editInventoryItem(${idx})" class="tiny">Edit</button>
-          <button onclick="assignKeyToInventory(${idx})" class="tiny">Assign Key</button>
-          <button onclick="assignTapToInventory(${idx})" class="tiny">Assign Tap</button>
-          <button onclick="removeInventory(${idx})" class="tiny">Remove</button>
-        </div>
-        <div style="font-size:12px;color:#666;margin-top:4px">Key: ${it.keyBinding || '(none)'} Tap: ${it.tapBinding? 'yes' : 'no'}</div>
-      </div>
-    </div>`;
-    invList.insertAdjacentHTML('beforeend', s);
-  });
-  inventoryMenu.style.display = 'block';
-}
-
-function renderMiniShape(it){
-  // returns simple svg or char to represent shape
-  if(it.shape === 'circle') return '<svg width="40" height="40"><circle cx="20" cy="20" r="12" fill="'+it.color+'"/></svg>';
-  if(it.shape === 'triangle') return '<svg width="40" height="40"><polygon points="20,6 6,34 34,34" fill="'+it.color+'"/></svg>';
-  if(it.shape === 'hexagon') return '<svg width="40" height="40"><polygon points="12,6 28,6 36,20 28,34 12,34 4,20" fill="'+it.color+'"/></svg>';
-  return '<svg width="40" height="40"><rect x="8" y="8" width="24" height="24" fill="'+it.color+'"/></svg>';
-}
-
-function captureSelectedToInventory(){
-  // capture lastSelected shape into inventory
-  if(!window.lastSelected || window.lastSelected.type !== 'shape'){ alert('Select a shape first (click it)'); return; }
-  let copy = JSON.parse(JSON.stringify(window.lastSelected));
-  // trim runtime-only props
-  delete copy.controls;
-  inventory.push(copy);
-  openInventoryMenu();
-}
-
-function editInventoryItem(idx){
-  let it = inventory[idx];
-  // open small edit popup inside inventoryMenu
-  const html = `
-    <div style="margin-top:8px;">
-      <label>Color <input type="color" id="invColor" value="${it.color || '#00ff00'}"></label>
-      <label>Size <input type="number" id="invSize" value="${it.size || 60}"></label>
-      <label>Shape <select id="invShape">
-        <option value="square">Square</option>
-        <option value="circle">Circle</option>
-        <option value="triangle">Triangle</option>
-        <option value="hexagon">Hexagon</option>
-      </select></label>
-      <label>Import Image <input type="file" id="invImage" accept="image/*"></label>
-      <div style="display:flex;gap:6px;margin-top:6px;">
-        <button onclick="applyInventoryEdit(${idx})" class="small">Apply</button>
-        <button onclick="openInventoryMenu()" class="small">Cancel</button>
-      </div>
-    </div>
-  `;
-  inventoryMenu.querySelector('#invList').insertAdjacentHTML('afterend', html);
-  inventoryMenu.querySelector('#invShape').value = it.shape || 'square';
-  inventoryMenu.querySelector('#invImage').onchange = (ev)=>{ let f = ev.target.files[0]; let r = new FileReader(); r.onload=()=>{ it.image = r.result; }; r.readAsDataURL(f); }
-}
-
-function applyInventoryEdit(idx){
-  let it = inventory[idx];
-  it.color = inventoryMenu.querySelector('#invColor').value;
-  it.size = parseInt(inventoryMenu.querySelector('#invSize').value) || it.size;
-  it.shape = inventoryMenu.querySelector('#invShape').value;
-  openInventoryMenu();
-}
-
-function assignKeyToInventory(idx){
-  alert('Press a key now to assign to inventory index '+idx+'. Press Escape to cancel.');
-  function handler(e){
-    if(e.key === 'Escape'){ window.removeEventListener('keydown', handler); alert('Cancelled'); return; }
-    inventory[idx].keyBinding = e.key;
-    window.removeEventListener('keydown', handler);
-    openInventoryMenu();
-  }
-  window.addEventListener('keydown', handler);
-}
-
-function assignTapToInventory(idx){
-  // assign the mobile tap to this index (only one tap button allowed)
-  // toggle assignment
-  if(mobileTapAssignedIndex === idx){
-    mobileTapAssignedIndex = null;
-    mobileTapButton.style.display = 'none';
-    inventory[idx].tapBinding = false;
-  } else {
-    // clear previous
-    if(mobileTapAssignedIndex !== null) inventory[mobileTapAssignedIndex].tapBinding = false;
-    mobileTapAssignedIndex = idx;
-    inventory[idx].tapBinding = true;
-    mobileTapButton.style.display = 'inline-block';
-    mobileTapButton.textContent = 'Tap (inv '+idx+')';
-  }
-  openInventoryMenu();
-}
-
-function removeInventory(idx){
-  inventory.splice(idx,1);
-  openInventoryMenu();
-}
-
-function mobileTapEquip(ev){
-  ev.preventDefault();
-  if(mobileTapAssignedIndex === null) return;
-  let it = inventory[mobileTapAssignedIndex];
-  if(!it) return;
-  // equip it
-  equipped = { item: JSON.parse(JSON.stringify(it)), previewPos: {x: canvas.width/2 - it.size/2, y: canvas.height/2 - it.size/2} };
-  mobileTapButton.style.display = 'none';
-  drawAll();
-}
-
-/////////////////////////
-// Equip by key: when user presses a bound key assigned to inventory item, equip it
-/////////////////////////
-window.addEventListener('keydown', (e)=>{
-  // check inventory key bindings
-  for(let i=0;i<inventory.length;i++){
-    if(inventory[i].keyBinding && e.key === inventory[i].keyBinding){
-      equipped = { item: JSON.parse(JSON.stringify(inventory[i])), previewPos: {x: canvas.width/2 - inventory[i].size/2, y: canvas.height/2 - inventory[i].size/2} };
-      drawAll();
-      return;
-    }
-  }
-  // other global shortcuts
-  if(e.key === 's' && (e.ctrlKey || e.metaKey)){ e.preventDefault(); saveFile(); }
-});
-
-/////////////////////////
-// Window management
-/////////////////////////
-function makeNewWindowFromMenu(){ windows.push([]); windowSlider.max = windows.length - 1; windowSlider.value = windows.length -1; switchWindow(windows.length-1); closeAllMenus(); }
-function switchWindow(n){ currentWindow = parseInt(n); statusSpan.textContent = 'Window ' + currentWindow; drawAll(); }
-
-/////////////////////////
-// Add shape to inventory via Events menu: copies selected shape to inventory immediately
-/////////////////////////
-function addShapeToInventoryFromMenu(){
-  if(!window.lastSelected || window.lastSelected.type !== 'shape'){ alert('Select a shape and click "Add Selected Shape To Inventory"'); return;}
-  inventory.push(JSON.parse(JSON.stringify(window.lastSelected)));
-  alert('Added to inventory (idx ' + (inventory.length-1) + ')');
-  closeAllMenus();
-}
-
-/////////////////////////
-// Save / Open .Hblock
-/////////////////////////
-function saveFile(){
-  const payload = {
-    windows: windows,
-    inventory: inventory,
-    playerSettings: playerSettings,
-    mobileTapAssignedIndex: mobileTapAssignedIndex
-  };
-  fetch('/save', { method:'POST', headers: {'Content-Type':'application/json'}, body: JSON.stringify(payload) })
-    .then(r=>r.blob())
-    .then(blob=>{
-      const url = URL.createObjectURL(blob);
-      const a = document.createElement('a');
-      a.href = url;
-      a.download = 'project.Hblock';
-      a.click();
-    });
-}
-
-function openFile(){
-  fileInput.click();
-}
-fileInput.addEventListener('change', (ev)=>{
-  const f = ev.target.files[0];
-  if(!f) return;
-  const r = new FileReader();
-  r.onload = (e)=>{
-    try{
-      const data = JSON.parse(e.target.result);
-      windows = data.windows || [[]];
-      inventory = data.inventory || [];
-      playerSettings = data.playerSettings || {count:0, speed:5, controls:{}};
-      mobileTapAssignedIndex = data.mobileTapAssignedIndex || null;
-      windowSlider.max = windows.length - 1;
-      windowSlider.value = 0;
-      currentWindow = 0;
-      statusSpan.textContent = 'Window ' + currentWindow;
-      // mobile button
-      if(mobileTapAssignedIndex !== null) { mobileTapButton.style.display = 'inline-block'; mobileTapButton.textContent = 'Tap (inv '+mobileTapAssignedIndex+')'; }
-      drawAll();
-      alert('Loaded .Hblock');
-    }catch(err){
-      alert('Failed to load file: ' + err);
-    }
-  }
-  r.readAsText(f);
-});
-
-/////////////////////////
-// Zone event trigger preview (simulate when clicking an invisible zone via a debug viewer)
-// We'll provide a simple "test trigger" tool: when events menu open, show zones visible and clicking triggers their event logic (editor-simulated)
-// For now, implement a simple function to trigger a zone manually (for debugging)
-/////////////////////////
-function triggerZone(zone){
-  if(!zone.event) { alert('Zone has no event assigned'); return; }
-  const ev = zone.event;
-  if(ev.type === 'addShape'){
-    const p = ev.params;
-    for(let i=0;i<(p.count||1);i++){
-      let s = { type:'shape', x: zone.x + 10 + i*10, y: zone.y + 10 + i*10, size: p.size || 50, color: p.color || '#00ff00', shape: 'square'};
-      objects().push(s);
-    }
-    drawAll();
-  } else if(ev.type === 'newWindow'){
-    windows.push([]);
-    windowSlider.max = windows.length-1;
-    switchWindow(windows.length-1);
-    drawAll();
-  } else if(ev.type === 'addInventory'){
-    const idx = ev.params.index;
-    if(inventory[idx]) inventory.push(JSON.parse(JSON.stringify(inventory[idx])));
-    drawAll();
-  } else if(ev.type === 'addText'){
-    const p = ev.params;
-    objects().push({ type:'text', x: zone.x + 10, y: zone.y + 30, text: p.text, color: p.color, size: p.size });
-    drawAll();
-  } else if(ev.type === 'removeText'){
-    // remove last text in this window
-    for(let i = objects().length-1; i>=0; i--){
-      if(objects()[i].type === 'text'){ objects().splice(i,1); break; }
-    }
-    drawAll();
-  }
-}
-
-/////////////////////////
-// UI helpers: open zone editor when clicking a zone (we do this by setting window.lastZone before opening)
-/////////////////////////
-canvas.addEventListener('click', (ev)=>{
-  // find top object — if it's an eventZone (even if invisible and finalized) we should detect if the user had toggled zones visible
-  const rect = canvas.getBoundingClientRect();
-  const x = ev.clientX - rect.left, y = ev.clientY - rect.top;
-  let top = findTopObjectAt(x,y);
-  if(top && top.type === 'eventZone'){
-    window.lastZone = top;
-    openZoneMenu(top);
-  }
-});
-
-/////////////////////////
-// Startup
-/////////////////////////
-window.addEventListener('load', ()=>{
-  // friendly quick-start: add a blue square under Add Shape button description
-  // (not necessary but nice)
-  windowSlider.max = 0;
-  windowSlider.value = 0;
-  statusSpan.textContent = 'Window ' + currentWindow;
-  drawAll();
-});
+<script>const HBLOCK = {{ config|tojson }};</script>
+<script src="{{ asset_url('js/core.js') }}" defer></script>
+</body>
+</html>
+"""
 
-</script>
+BENCH_RESULTS_HTML = """
+<!doctype html>
+<html>
+<head>
+  <title>HBlock — bench results</title>
+  <style>
+    body { font-family: Arial, sans-serif; margin: 16px; }
+    table { border-collapse: collapse; margin-bottom: 24px; font-size: 13px; }
+    th, td { border: 1px solid #ccc; padding: 4px 8px; text-align: right; }
+    th:first-child, td:first-child { text-align: left; }
+    .worse { color: #b00; } .better { color: #070; }
+  </style>
+</head>
+<body>
+  <h2>Bench results</h2>
+  <p>Median over runs of each percentile (p50 / p95 / p99); the change is p95 against the build above.
+     Run <a href="/bench">/bench</a> to add one.</p>
+  {% for t in tables %}
+  <h3>{{ t.scene }} — {{ t.browser }}</h3>
+  <table>
+    <tr><th>build</th><th>runs</th>{% for m in metrics %}<th>{{ m }}</th>{% endfor %}</tr>
+    {% for row in t.rows %}
+    <tr><td>{{ row.build }}{% if row.labels %} ({{ row.labels|join(", ") }}){% endif %}</td><td>{{ row.runs }}</td>
+      {% for m in metrics %}{% set v = row.metrics.get(m) %}
+      <td>{% if v %}{{ v.p50 }} / {{ v.p95 }} / {{ v.p99 }}
+        {% if v.p95_change is defined %}<span class="{{ 'worse' if v.p95_change > 0.05 else 'better' if v.p95_change < -0.05 else '' }}">({{ "%+.0f"|format(v.p95_change * 100) }}%)</span>{% endif %}
+      {% else %}-{% endif %}</td>
+      {% endfor %}
+    </tr>
+    {% endfor %}
+  </table>
+  {% else %}
+  <p>No results yet.</p>
+  {% endfor %}
 </body>
 </html>
 """
 
+_asset_hashes = None
+
+def asset_hashes():
+    """static/ relative path -> content fingerprint; recomputed per request in debug so edits show up."""
+    global _asset_hashes
+    if _asset_hashes is None or app.debug:
+        hashes = {}
+        for root, _, files in os.walk(STATIC_DIR):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    rel = os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+                    hashes[rel] = hashlib.sha256(f.read()).hexdigest()[:12]
+        _asset_hashes = hashes
+    return _asset_hashes
+
+def asset_url(rel):
+    return "/assets/%s/%s" % (asset_hashes()[rel], rel)
+
+def build_id():
+    """Fingerprint of all the editor's scripts, used to tell builds apart in bench results and telemetry."""
+    js = sorted((rel, h) for rel, h in asset_hashes().items() if rel.startswith("js/"))
+    return hashlib.sha256(repr(js).encode()).hexdigest()[:12]
+
+@app.route("/assets/<digest>/<path:name>")
+def assets(digest, name):
+    # a URL names exactly one version of a file, so browsers may keep it forever
+    if asset_hashes().get(name) != digest:
+        abort(404)
+    resp = send_from_directory(STATIC_DIR, name, max_age=365 * 24 * 3600)
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
+def editor_page(**extra):
+    config = dict({"collabUrl": COLLAB_URL, "build": build_id(), "undoBytes": UNDO_BYTES, "modules": {k: asset_url(v) for k, v in LAZY_MODULES.items()}}, **extra)
+    resp = app.make_response(render_template_string(HTML, asset_url=asset_url, config=config))
+    # the page itself is tiny and must be revalidated so new fingerprints are picked up
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
 @app.route("/")
 def index():
-    return render_template_string(HTML)
+    return editor_page()
+
+@app.route("/bench")
+def bench():
+    # the editor itself, told to build a synthetic scene and time it (static/js/bench.js)
+    arg = lambda name, default, hi: max(0, min(hi, request.args.get(name, default, type=int)))
+    params = {"shapes": arg("shapes", 250, 20000), "images": arg("images", 20, 2000), "texts": arg("texts", 50, 20000),
+              "zones": arg("zones", 20, 20000), "frames": max(10, arg("frames", 120, 2000)),
+              "hits": max(100, arg("hits", 5000, 1000000)), "seed": arg("seed", 1, 2**31 - 1)}
+    params["scene"] = "s%(shapes)d-i%(images)d-t%(texts)d-z%(zones)d-r%(seed)d" % params
+    # ?telemetry=1 runs with the hot paths instrumented; its own build row shows what that costs
+    params["telemetry"] = bool(request.args.get("telemetry", 0, type=int))
+    params["build"] = build_id() + ("+tm" if params["telemetry"] else "")
+    params["label"] = request.args.get("label", "")
+    return editor_page(bench=params)
+
+@app.route("/bench/results", methods=["GET", "POST"])
+def bench_results():
+    if request.method == "POST":
+        if (request.content_length or 0) > benchlog.MAX_RESULT_BYTES:
+            abort(413)
+        try:
+            entry = benchlog.record(request.get_json(force=True, silent=True), request.headers.get("User-Agent"))
+        except ValueError as e:
+            abort(400, str(e))
+        return jsonify(browser=entry["browser"], build=entry["build"], scene=entry["scene"])
+    tables = benchlog.compare(benchlog.load(), request.args.get("scene"))
+    if request.args.get("format") == "json":
+        return jsonify(tables)
+    return render_template_string(BENCH_RESULTS_HTML, tables=tables, metrics=benchlog.METRICS)
+
+def project_path(project_id):
+    path = stored_path(project_id)
+    if path is None:
+        abort(400, "bad project id")
+    return path
 
 @app.route("/save", methods=["POST"])
 def save():
-    data = request.get_json()
-    # ensure JSON bytes
-    buf = io.BytesIO()
-    buf.write(json.dumps(data).encode('utf-8'))
-    buf.seek(0)
-    return send_file(buf, as_attachment=True, download_name="project.Hblock", mimetype="application/octet-stream")
+    # stream the body straight to disk so a worker never holds the whole project,
+    # then answer with a small ack instead of echoing the bytes back
+    project_id = request.args.get("id") or uuid.uuid4().hex
+    path = project_path(project_id)
+    os.makedirs(PROJECT_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=PROJECT_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = request.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+        if size == 0:
+            abort(400, "empty project")
+        try:
+            hblock.check_file(tmp)   # streamed too: one object at a time, never the whole file
+        except ValueError as e:
+            abort(400, str(e))
+        ack = projstore.replace(project_id, tmp, size, digest.hexdigest())
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return jsonify(ack)
+
+@app.route("/uploads", methods=["POST"])
+def start_upload():
+    # big saves go up in resumable chunks (see uploads.py and static/js/upload.js)
+    body = request.get_json(silent=True) or {}
+    size = body.get("size")
+    try:
+        return jsonify(uploads.create(size))
+    except ValueError as e:
+        abort(413 if isinstance(size, int) and size > uploads.MAX_UPLOAD else 400, str(e))
+
+@app.route("/uploads/<uid>")
+def upload_status(uid):
+    try:
+        return jsonify(uploads.status(uid))
+    except KeyError:
+        abort(404)
+
+@app.route("/uploads/<uid>", methods=["PUT"])
+def upload_chunk(uid):
+    try:
+        offset = int(request.args.get("offset", ""))
+        crc = int(request.headers.get("X-Chunk-CRC32", ""), 16)
+    except ValueError:
+        abort(400, "expected ?offset=<n> and an X-Chunk-CRC32 header")
+    if request.content_length is None or offset < 0:
+        abort(400, "expected a Content-Length and offset >= 0")
+    try:
+        offset = uploads.append(uid, offset, request.stream, request.content_length, crc)
+    except KeyError:
+        abort(404)
+    except uploads.OffsetMismatch as e:
+        return jsonify(offset=e.offset), 409
+    except ValueError as e:
+        abort(400, str(e))
+    return jsonify(offset=offset)
+
+@app.route("/uploads/<uid>/commit", methods=["POST"])
+def commit_upload(uid):
+    body = request.get_json(silent=True) or {}
+    crc = body.get("crc32")
+    if crc is not None and (not isinstance(crc, int) or isinstance(crc, bool)):
+        abort(400, "crc32 must be an integer")
+    project_id = request.args.get("id") or uuid.uuid4().hex
+    path = project_path(project_id)
+    os.makedirs(PROJECT_DIR, exist_ok=True)
+    with projstore.locked(project_id):
+        try:
+            size, digest = uploads.commit(uid, path, body.get("sha256"), crc, check=hblock.check_file)
+        except KeyError:
+            abort(404)
+        except uploads.OffsetMismatch as e:
+            return jsonify(offset=e.offset), 409
+        except ValueError as e:
+            abort(400, str(e))
+        # big uploads are versioned and indexed by a child process, so this worker never loads them
+        return jsonify(projstore.saved(project_id, path, size, digest))
+
+@app.route("/projects/<project_id>")
+def load_project(project_id):
+    path = project_path(project_id)
+    if not os.path.exists(path):
+        abort(404)
+    # conditional=True gives us ETag/If-None-Match and Range requests for free
+    return send_file(path, as_attachment=True, download_name="project.Hblock",
+                     mimetype="application/octet-stream", conditional=True)
+
+def project_version(project_id, n):
+    project_path(project_id)
+    try:
+        return history.version(project_id, n)
+    except KeyError:
+        abort(404)
+
+@app.route("/projects/<project_id>/versions")
+def project_versions(project_id):
+    project_path(project_id)
+    return jsonify(versions=history.versions(project_id))
+
+@app.route("/projects/<project_id>/versions/<int:n>")
+def load_project_version(project_id, n):
+    project = history.load_project(project_version(project_id, n)["manifest"])
+    resp = app.make_response(hblock.dumps(project))
+    resp.headers["Content-Type"] = "application/octet-stream"
+    resp.headers["Content-Disposition"] = 'attachment; filename="project-v%d.Hblock"' % n
+    return resp
+
+@app.route("/projects/<project_id>/versions/<int:n>/restore", methods=["POST"])
+def restore_project_version(project_id, n):
+    # the old version becomes the stored project again, and the newest version
+    project = history.load_project(project_version(project_id, n)["manifest"])
+    return jsonify(projstore.store(project_id, project, restored_from=n))
+
+@app.route("/projects/<project_id>/versions/<int:a>/diff/<int:b>")
+def diff_project_versions(project_id, a, b):
+    project_version(project_id, a)
+    project_version(project_id, b)
+    return jsonify(history.diff(project_id, a, b))
+
+@app.route("/projects/<project_id>/bulk", methods=["POST"])
+def bulk_edit_project(project_id):
+    # {"program": "where kill: color = '#f00'; size *= 1.5", "dry_run": false}; see bulkedit.py
+    body = request.get_json(silent=True) or {}
+    program = body.get("program")
+    if not isinstance(program, str) or not program.strip():
+        abort(400, "expected {\"program\": ...}")
+    path = project_path(project_id)
+    if not os.path.exists(path):
+        abort(404)
+    try:
+        project = hblock.load(path)   # a copy of our own; the cached one is shared
+        result = bulkedit.apply(project, program)
+    except ValueError as e:
+        abort(400, str(e))
+    result["id"] = project_id
+    if result["changed"] and not body.get("dry_run"):
+        result.update(projstore.store(project_id, project, bulk_edit=program))
+    return jsonify(result)
+
+@app.route("/search")
+def search():
+    # ?q=words (prefix matches on name, text and event types), &event=, &asset=<image hash>,
+    # &sort=recent (default: best match first when there are words), &page=, &per_page=
+    return jsonify(catalog.search(request.args.get("q", ""), request.args.get("page", 1, type=int),
+                                  request.args.get("per_page", catalog.PAGE_SIZE, type=int),
+                                  request.args.get("event"), request.args.get("asset"),
+                                  request.args.get("sort") == "recent"))
+
+@app.route("/telemetry", methods=["GET", "POST"])
+def telemetry_reports():
+    if request.method == "POST":
+        # sendBeacon posts as text/plain on some browsers, hence force=True
+        if (request.content_length or 0) > telemetry.MAX_REPORT_BYTES:
+            abort(413)
+        try:
+            ack = telemetry.record(request.get_json(force=True, silent=True))
+        except ValueError as e:
+            abort(400, str(e))
+        return jsonify(ack)
+    return jsonify(telemetry.summary(request.args.get("build")))
+
+@app.route("/export", methods=["POST"])
+@app.route("/export/<project_id>")
+def export_game(project_id=None):
+    # the posted project (the editor's current state) or a stored one, as a standalone game page
+    if project_id is None:
+        try:
+            project = json.loads(request.get_data())
+        except ValueError:
+            abort(400, "not a .Hblock project")
+    else:
+        path = project_path(project_id)
+        if not os.path.exists(path):
+            abort(404)
+        try:
+            project = project_cache.get_file(path)
+        except ValueError:
+            abort(422, "the stored project is not JSON")
+    if not isinstance(project, dict):
+        abort(400, "not a .Hblock project")
+    try:
+        hblock.check_project(project)
+    except ValueError as e:
+        abort(400, str(e))
+    resp = app.make_response(export.build(project, request.args.get("title") or "HBlock game"))
+    resp.headers["Content-Type"] = "text/html; charset=utf-8"
+    resp.headers["Content-Disposition"] = 'attachment; filename="game.html"'
+    return resp
+
+@app.route("/cache/stats")
+def cache_stats():
+    # per worker: each gunicorn worker answers with its own counters (see "pid")
+    return jsonify(project_cache.stats())
 
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
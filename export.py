@@ -0,0 +1,224 @@
+# export.py
+# Compile a .Hblock project into one self-contained HTML file that plays the game:
+#   python export.py project.Hblock -o game.html
+# (the editor's Export Game button does the same through POST /export).
+# The page holds static/player/runtime.js (no editor code), the project compiled into the
+# compact indexed form that runtime reads, and every image packed into one atlas, each
+# scaled to the largest size it is drawn at (needs Pillow; without it images are kept
+# separately as they are).
+import argparse, base64, io, json, os, sys
+import hblock
+
+try:
+    from PIL import Image
+except ImportError:  # the atlas is optional
+    Image = None
+
+RUNTIME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "player", "runtime.js")
+FORMAT_VERSION = 1
+ATLAS_MAX_WIDTH = 2048
+SHAPES = {"square": 0, "circle": 1, "triangle": 2, "hexagon": 3}
+F_PLAYER, F_COLLIDE, F_KILL = 1, 2, 4
+PREFAB_ONLY = ("id", "proto", "keyBinding", "tapBinding")   # as in core.js
+
+PAGE = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>%(title)s</title>
+<style>html,body{margin:0;height:100%%;background:#222}body{display:flex;align-items:center;justify-content:center}canvas{background:#fff;max-width:100vw;max-height:100vh}</style>
+</head>
+<body>
+<canvas id="screen" width="%(width)d" height="%(height)d"></canvas>
+<script type="application/json" id="game">%(data)s</script>
+<script>%(runtime)s</script>
+</body>
+</html>
+"""
+
+#########################
+# project -> compiled data
+#########################
+class Compiler:
+    def __init__(self, project):
+        self.assets = project.get("assets") or {}
+        self.protos = {it["id"]: it for it in project.get("inventory") or [] if isinstance(it, dict) and "id" in it}
+        self.styles, self.style_index = [], {}
+        self.images, self.image_index = [], {}   # distinct data URLs, and the largest px each is drawn at
+        self.events = []
+
+    def image(self, ref, px):
+        if isinstance(ref, str) and ref.startswith(hblock.ASSET_PREFIX):
+            ref = self.assets.get(ref[len(hblock.ASSET_PREFIX):])
+        if not isinstance(ref, str) or not ref.startswith("data:"):
+            return -1
+        i = self.image_index.get(ref)
+        if i is None:
+            i = self.image_index[ref] = len(self.images)
+            self.images.append([ref, 0])
+        self.images[i][1] = max(self.images[i][1], int(px))
+        return i
+
+    def style(self, o, size):
+        flags = (F_PLAYER if o.get("player") else 0) | (F_COLLIDE if o.get("collide") else 0) | (F_KILL if o.get("kill") else 0)
+        st = [o.get("color") or "blue", SHAPES.get(o.get("shape"), 0), self.image(o.get("image"), size), flags]
+        if flags & F_PLAYER:
+            st += [o.get("speed") or 0, o.get("controls") or {}]
+        key = json.dumps(st, sort_keys=True)
+        i = self.style_index.get(key)
+        if i is None:
+            i = self.style_index[key] = len(self.styles)
+            self.styles.append(st)
+        return i
+
+    def resolve(self, o):
+        """An instance with its inventory item's fields filled in; other objects as they are."""
+        item = self.protos.get(o.get("proto"))
+        if item is None:
+            return o
+        flat = {k: v for k, v in item.items() if k not in PREFAB_ONLY}
+        flat.update(o)
+        return flat
+
+    def event(self, ev):
+        if not isinstance(ev, dict) or ev.get("type") not in ("addShape", "newWindow", "addText", "removeText"):
+            return -1   # addInventory only changes the editor's inventory, nothing to play
+        params = dict(ev.get("params") or {})
+        if ev["type"] == "addShape":
+            params["style"] = self.style({"color": params.get("color") or "#00ff00"}, params.get("size") or 50)
+        self.events.append([ev["type"], params])
+        return len(self.events) - 1
+
+    def window(self, objs):
+        shapes, texts, zones, tiles = [], [], [], None
+        for o in objs:
+            if not isinstance(o, dict):
+                continue
+            kind = o.get("type")
+            if kind == "shape":
+                o = self.resolve(o)
+                size = o.get("size") or 50
+                shapes += (o.get("x", 0), o.get("y", 0), size, self.style(o, size))
+            elif kind == "text":
+                texts.append([len(shapes) // 4, o.get("x", 0), o.get("y", 0), o.get("size"), o.get("color"), o.get("text", "")])
+            elif kind == "eventZone":
+                event = self.event(o.get("event"))
+                if event >= 0:
+                    zones.append([o.get("x", 0), o.get("y", 0), o.get("w", 0), o.get("h", 0), event])
+            elif kind == "tiles" and tiles is None:
+                cell = o.get("cell") or 32
+                n = o.get("cols", 0) * o.get("rows", 0)
+                tiles = {"x": o.get("x", 0), "y": o.get("y", 0), "cell": cell, "cols": o.get("cols", 0), "rows": o.get("rows", 0),
+                         "rle": hblock.rle_encode(hblock.rle_decode(o.get("rle") or [], n)),
+                         "pal": [self.style(p, cell) for p in o.get("palette") or []]}
+        return {"s": shapes, "t": texts, "z": zones, "tl": tiles}
+
+def compile_project(project):
+    """(compiled data without the atlas, [(data URL, drawn px), ...] in image index order).
+
+    Doesn't modify project, so it can come straight from the project cache.
+    """
+    c = Compiler(project)
+    settings = project.get("playerSettings") or {}
+    data = {
+        "v": FORMAT_VERSION, "width": 900, "height": 600,
+        "windows": [c.window(w) for w in project.get("windows") or [[]]],
+        "controls": settings.get("controls") or {}, "speed": settings.get("speed") or 5,
+    }
+    data.update(styles=c.styles, events=c.events)
+    return data, [tuple(i) for i in c.images]
+
+#########################
+# image atlas
+#########################
+def decode_image(data_url):
+    head, _, b64 = data_url.partition(",")
+    if not head.endswith(";base64"):
+        return None
+    try:
+        img = Image.open(io.BytesIO(base64.b64decode(b64)))
+        img.load()
+    except Exception:
+        return None   # unreadable or exotic image: ship it as it is
+    return img.convert("RGBA")
+
+def build_atlas(images, scale=1.0):
+    """(sheets, rects): sheets are data URLs, rects [sheet, x, y, w, h] per image (w = 0: whole sheet)."""
+    sheets, rects = [], [None] * len(images)
+    packed = []
+    for i, (url, px) in enumerate(images):
+        img = decode_image(url) if Image is not None else None
+        if img is None:
+            rects[i] = [len(sheets), 0, 0, 0, 0]
+            sheets.append(url)
+            continue
+        side = max(1, min(max(img.size), int(round(px * scale))))
+        if max(img.size) > side:
+            img.thumbnail((side, side))
+        packed.append((i, img))
+    if not packed:
+        return sheets, rects
+    # shelf packing, tallest first
+    packed.sort(key=lambda e: -e[1].size[1])
+    width = min(ATLAS_MAX_WIDTH, max(max(img.size[0] for _, img in packed),
+                                      int(sum(img.size[0] * img.size[1] for _, img in packed) ** 0.5 * 1.2)))
+    x = y = shelf = 0
+    spots = []
+    for i, img in packed:
+        w, h = img.size
+        if x + w > width:
+            x, y, shelf = 0, y + shelf, 0
+        spots.append((i, img, x, y))
+        x += w
+        shelf = max(shelf, h)
+    atlas = Image.new("RGBA", (width, y + shelf), (0, 0, 0, 0))
+    sheet = len(sheets)
+    for i, img, sx, sy in spots:
+        atlas.paste(img, (sx, sy))
+        rects[i] = [sheet, sx, sy, img.size[0], img.size[1]]
+    out = io.BytesIO()
+    atlas.save(out, "PNG", optimize=True)
+    sheets.append("data:image/png;base64," + base64.b64encode(out.getvalue()).decode("ascii"))
+    return sheets, rects
+
+#########################
+# page
+#########################
+def build(project, title="HBlock game", image_scale=1.0):
+    """The exported game as HTML bytes."""
+    data, images = compile_project(project)
+    data["atlas"], data["images"] = build_atlas(images, image_scale)
+    with open(RUNTIME, encoding="utf-8") as f:
+        runtime = f.read()
+    # "</" can't appear inside the inline scripts
+    payload = json.dumps(data, separators=(",", ":"), ensure_ascii=False).replace("</", "<\\/")
+    html = PAGE % {"title": title.replace("&", "&amp;").replace("<", "&lt;"), "width": data["width"], "height": data["height"],
+                   "data": payload, "runtime": runtime.replace("</script", "<\\/script")}
+    return html.encode("utf-8")
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Export a .Hblock project as a standalone HTML game")
+    p.add_argument("project")
+    p.add_argument("-o", "--out", help="output file (default: the project name with .html)")
+    p.add_argument("--title", default=None)
+    p.add_argument("--image-scale", type=float, default=1.0, help="atlas pixels per drawn pixel, e.g. 2 for hi-dpi screens")
+    args = p.parse_args(argv)
+    if Image is None:
+        print("Pillow is not installed; images are embedded as they are instead of in an atlas", file=sys.stderr)
+    name = os.path.splitext(os.path.basename(args.project))[0]
+    try:
+        project = hblock.load(args.project)
+        if not isinstance(project, dict):
+            raise ValueError("not a .Hblock project")
+        hblock.check_project(project)
+    except ValueError as e:
+        print("%s: %s" % (args.project, e), file=sys.stderr)
+        sys.exit(1)
+    html = build(project, args.title or name, args.image_scale)
+    out = args.out or os.path.splitext(args.project)[0] + ".html"
+    hblock.write_atomic(out, html)
+    print("%s: %d bytes" % (out, len(html)))
+
+if __name__ == "__main__":
+    main()
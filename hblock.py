@@ -0,0 +1,294 @@
+# hblock.py
+# .Hblock project format helpers shared by the Flask app and the standalone servers/tools
+import hashlib, itertools, json, math, os, re, tempfile
+from array import array
+import stats
+
+# objects with "proto" are prefab instances of the inventory item with that id: every key they
+# leave out is taken from the item, every key they have overrides it
+# {"type": "tiles"} objects are tile layers: a cols x rows grid of palette indices (0 = empty,
+# i = palette[i-1]) stored run-length encoded as "rle": [count, value, count, value, ...]
+# "name" (optional) is the project's display name, shown and searched in the catalog
+# images can be stored once in a top-level "assets" table and referenced as "asset:<key>"
+ASSET_PREFIX = "asset:"
+
+# where persistent saves live; one <id>.Hblock file per project
+PROJECT_DIR = os.environ.get("HBLOCK_PROJECT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "projects"))
+PROJECT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def empty_project():
+    return {"windows": [[]], "inventory": [], "playerSettings": {"count": 0, "speed": 5, "controls": {}},
+            "mobileTapAssignedIndex": None}
+
+def dumps(project):
+    """Compact UTF-8 encoding used for everything we write."""
+    return json.dumps(project, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def load(path):
+    with open(path, "rb") as f:
+        return json.loads(f.read())
+
+def write_atomic(path, data):
+    """Write bytes to path via a temp file in the same directory, so readers never see half a file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def stored_path(project_id):
+    """Path of a persistent save; None if the ID is not one we would have issued."""
+    if not PROJECT_ID_RE.match(project_id or ""):
+        return None
+    return os.path.join(PROJECT_DIR, project_id + ".Hblock")
+
+def check_project(project):
+    """ValueError unless every field the tools index or compute with has a type they can use.
+
+    That is the history, the catalog, the exporter and convert: lists of windows and objects,
+    objects as check_object describes them, an assets table and a playerSettings object.
+    """
+    windows = project.get("windows") or []
+    if not isinstance(windows, list) or not all(isinstance(w, list) for w in windows):
+        raise ValueError("\"windows\" must be a list of lists of objects")
+    if not isinstance(project.get("inventory") or [], list):
+        raise ValueError("\"inventory\" must be a list of objects")
+    if not isinstance(project.get("assets") or {}, dict):
+        raise ValueError("\"assets\" must be an object")
+    if not isinstance(project.get("playerSettings") or {}, dict):
+        raise ValueError("\"playerSettings\" must be an object")
+    for o in iter_objects(project):
+        check_object(o)
+
+def _is_key(v):
+    return isinstance(v, (str, int)) and not isinstance(v, bool)
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+
+def check_object(o):
+    """ValueError unless ids are strings or numbers, sizes are numbers, event params an object
+    and a tile layer's grid, runs and palette are something rle_decode and the exporter can expand."""
+    where = "object %r" % (o.get("id"),)
+    for key in ("id", "proto"):
+        if o.get(key) is not None and not _is_key(o[key]):
+            raise ValueError("%s: \"%s\" must be a string or a number" % (where, key))
+    for key in ("type", "shape"):
+        if o.get(key) is not None and not isinstance(o[key], str):
+            raise ValueError("%s: \"%s\" must be a string" % (where, key))
+    for key in ("size", "cell"):
+        if o.get(key) is not None and not _is_number(o[key]):
+            raise ValueError("%s: \"%s\" must be a number" % (where, key))
+    ev = o.get("event")
+    if isinstance(ev, dict):
+        params = ev.get("params") or {}
+        if not isinstance(params, dict):
+            raise ValueError("%s: event \"params\" must be an object" % where)
+        if params.get("size") is not None and not _is_number(params["size"]):
+            raise ValueError("%s: event \"size\" must be a number" % where)
+    if o.get("type") == "tiles":
+        if not all(_is_count(o.get(k, 0)) for k in ("cols", "rows")):
+            raise ValueError("%s: \"cols\" and \"rows\" must be counts" % where)
+        check_runs(o.get("rle") or [])
+        palette = o.get("palette") or []
+        if not isinstance(palette, list) or not all(isinstance(p, dict) for p in palette):
+            raise ValueError("%s: \"palette\" must be a list of objects" % where)
+        for p in palette:
+            check_object(p)
+
+class _NotJSON(Exception):
+    pass
+
+def _json_events(f):
+    try:
+        for kind, value, _, _ in stats.JsonEvents(f):
+            yield kind, value
+    except ValueError as e:
+        raise _NotJSON(e)
+
+def _elements(events):
+    """(kind, value) that starts each element of the array just opened; read each one before the next."""
+    for kind, value in events:
+        if kind == "end_array":
+            return
+        yield kind, value
+
+def _build(events, kind, value):
+    """The value that starts with (kind, value); long strings come back cut short (see stats.JsonEvents)."""
+    if kind == "string":
+        return value
+    if kind == "scalar":
+        try:
+            return json.loads(value)
+        except ValueError as e:
+            raise _NotJSON(e)
+    if kind == "start_array":
+        return [_build(events, k, v) for k, v in _elements(events)]
+    if kind == "start_map":
+        out = {}
+        for kind, key in events:
+            if kind == "end_map":
+                return out
+            if kind != "key":
+                break
+            kind, value = next(events, (None, None))
+            out[key] = _build(events, kind, value)
+    raise _NotJSON("unexpected %s" % kind)
+
+def check_file(path):
+    """check_project for the project in the file at path, reading and checking one object at a time.
+
+    False if the file is not a JSON object (it is stored as it is), else True, or ValueError.
+    A bad object is only reported once the whole file has parsed, like check_project after json.loads.
+    """
+    errors = []
+    def check(o):
+        if isinstance(o, dict) and not errors:
+            try:
+                check_object(o)
+            except ValueError as e:
+                errors.append(e)
+    project = {}
+    with open(path, "rb") as f:
+        events = _json_events(f)
+        try:
+            if next(events, (None, None))[0] != "start_map":
+                return False
+            for kind, key in events:
+                if kind == "end_map":
+                    break
+                if kind != "key":
+                    raise _NotJSON("expected a key")
+                kind, value = next(events, (None, None))
+                if key in ("windows", "inventory") and kind == "start_array":
+                    project[key] = []   # checked here instead of kept
+                    for kind, value in _elements(events):
+                        if key == "inventory":
+                            check(_build(events, kind, value))
+                        elif kind != "start_array":
+                            _build(events, kind, value)
+                            project[key] = [None]   # check_project reports it
+                        else:
+                            for kind, value in _elements(events):
+                                check(_build(events, kind, value))
+                else:
+                    project[key] = _build(events, kind, value)
+        except _NotJSON:
+            return False
+        except RecursionError:
+            return False   # nested deeper than json.loads would read either
+    if errors:
+        raise errors[0]
+    check_project(project)
+    return True
+
+def iter_objects(project):
+    """Every object dict in the project: all windows, then the inventory."""
+    for w in project.get("windows") or []:
+        for o in w:
+            if isinstance(o, dict):
+                yield o
+    for o in project.get("inventory") or []:
+        if isinstance(o, dict):
+            yield o
+
+def iter_tile_layers(project):
+    for w in project.get("windows") or []:
+        for o in w:
+            if isinstance(o, dict) and o.get("type") == "tiles":
+                yield o
+
+def iter_image_holders(project):
+    """Every dict that may carry an "image": the objects, then the tile palette entries."""
+    yield from iter_objects(project)
+    for layer in iter_tile_layers(project):
+        for p in layer.get("palette") or []:
+            if isinstance(p, dict):
+                yield p
+
+#########################
+# tile grids
+#########################
+def rle_encode(values):
+    """[count, value, count, value, ...] for a flat sequence of tile indices."""
+    out = []
+    for value, run in itertools.groupby(values):
+        out += (sum(1 for _ in run), value)
+    return out
+
+TILE_MAX = 0xFFFF   # tile indices are stored as array('H')
+
+def _is_count(v):
+    return isinstance(v, int) and not isinstance(v, bool) and v >= 0
+
+def check_runs(rle):
+    """ValueError unless rle is a flat list of count, tile index pairs with indices in 0..TILE_MAX."""
+    if not isinstance(rle, list):
+        raise ValueError("tile runs must be a list")
+    for k, v in enumerate(rle):
+        if not _is_count(v) or (k % 2 and v > TILE_MAX):
+            raise ValueError("tile run %d: %r is not a %s" % (k // 2, v, "tile index" if k % 2 else "count"))
+
+def rle_decode(rle, n):
+    """The n tile indices as array('H'); runs past the end are cut off, missing ones read as empty."""
+    check_runs(rle)
+    grid = array("H", bytes(2 * n))
+    i = 0
+    for k in range(0, len(rle) - 1, 2):
+        if i >= n:
+            break
+        end = min(n, i + rle[k])
+        grid[i:end] = array("H", [rle[k + 1]]) * (end - i)
+        i = end
+    return grid
+
+# keys the editor writes with values that mean the same as leaving them out
+DEFAULT_FIELDS = {"image": None, "player": False, "collide": False, "kill": False, "controls": {}, "proto": None}
+
+def normalize(project):
+    """Drop runtime-only and default-valued fields in place; the editor treats missing keys the same."""
+    for o in iter_objects(project):
+        for key in [k for k in o if k.startswith("_") or k == "previewPos"]:
+            del o[key]
+        if o.get("type") == "tiles":
+            # canonical runs, exactly cols*rows long
+            o["rle"] = rle_encode(rle_decode(o.get("rle") or [], o.get("cols", 0) * o.get("rows", 0)))
+            continue
+        if o.get("proto") is not None:
+            continue   # instance: its keys are overrides of the item, even the default-looking ones
+        for key, default in DEFAULT_FIELDS.items():
+            if key in o and o[key] == default:
+                del o[key]
+        # speed only matters on players
+        if o.get("type") == "shape" and not o.get("player"):
+            o.pop("speed", None)
+    return project
+
+def asset_key(data_url):
+    return hashlib.sha1(data_url.encode("utf-8")).hexdigest()[:16]
+
+def pack_assets(project):
+    """Move inline images into project["assets"] so each distinct image is stored once."""
+    assets = project.setdefault("assets", {})
+    for o in iter_image_holders(project):
+        img = o.get("image")
+        if isinstance(img, str) and img.startswith("data:"):
+            key = asset_key(img)
+            assets[key] = img
+            o["image"] = ASSET_PREFIX + key
+    if not assets:
+        del project["assets"]
+    return project
+
+def unpack_assets(project):
+    """Inverse of pack_assets: put the images back inline."""
+    assets = project.pop("assets", None) or {}
+    for o in iter_image_holders(project):
+        img = o.get("image")
+        if isinstance(img, str) and img.startswith(ASSET_PREFIX):
+            o["image"] = assets.get(img[len(ASSET_PREFIX):])
+    return project
@@ -0,0 +1,257 @@
+# history.py
+# Version history of server saves, stored as deduplicated chunks.
+# Every save of <id>.Hblock is split into chunks that are stored once by content hash under
+# HISTORY_DIR/chunks (zlib compressed):
+#   - one per asset (image data URL)
+#   - per window and for the inventory, batches of objects with content-defined boundaries:
+#     a batch ends after an object whose hash hits BOUNDARY_MASK, so editing or inserting an
+#     object only changes the batch it is in
+#   - one for the remaining top-level fields (player settings, ...)
+# plus a manifest chunk naming them. HISTORY_DIR/<id>.versions has one JSON line per version
+# (version n = line n), so a lightly edited project costs a manifest and a few batches per save.
+#   python history.py list <id>
+#   python history.py diff <id> <a> <b>
+#   python history.py restore <id> <n>
+#   python history.py stats
+import argparse, hashlib, json, os, sys, time, zlib
+import hblock
+
+HISTORY_DIR = os.environ.get("HBLOCK_HISTORY_DIR", os.path.join(hblock.PROJECT_DIR, ".history"))
+BOUNDARY_MASK = 0xF    # ~16 objects per batch on average
+MAX_BATCH = 64
+
+#########################
+# chunk store
+#########################
+def _chunk_path(digest, root):
+    return os.path.join(root, "chunks", digest[:2], digest)
+
+def put_chunk(data, root=HISTORY_DIR):
+    """Store bytes once; returns (hash, stored bytes added, 0 if it was already there)."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = _chunk_path(digest, root)
+    if os.path.exists(path):
+        return digest, 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    packed = zlib.compress(data, 6)
+    hblock.write_atomic(path, packed)
+    return digest, len(packed)
+
+def get_chunk(digest, root=HISTORY_DIR):
+    with open(_chunk_path(digest, root), "rb") as f:
+        return zlib.decompress(f.read())
+
+def _encode(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+#########################
+# project <-> chunks
+#########################
+def _ref_image(holder, assets):
+    """holder with an inline image swapped for an asset reference (a copy; the project is shared)."""
+    img = holder.get("image")
+    if not (isinstance(img, str) and img.startswith("data:")):
+        return holder
+    key = hblock.asset_key(img)
+    assets[key] = img
+    return dict(holder, image=hblock.ASSET_PREFIX + key)
+
+def _split_objects(objs, assets):
+    """Encoded batches of objects, cut at content-defined boundaries."""
+    batches, batch = [], []
+    for o in objs:
+        if isinstance(o, dict):
+            o = _ref_image(o, assets)
+            if o.get("type") == "tiles" and o.get("palette"):
+                o = dict(o, palette=[_ref_image(p, assets) if isinstance(p, dict) else p for p in o["palette"]])
+        data = _encode(o)
+        batch.append(data)
+        if len(batch) >= MAX_BATCH or (zlib.crc32(data) & BOUNDARY_MASK) == 0:
+            batches.append(b"[" + b",".join(batch) + b"]")
+            batch = []
+    if batch:
+        batches.append(b"[" + b",".join(batch) + b"]")
+    return batches
+
+def store_project(project, root=HISTORY_DIR):
+    """Chunk a project into the store without modifying it; returns (manifest hash, stored bytes added)."""
+    added = 0
+    def put(data):
+        nonlocal added
+        digest, n = put_chunk(data, root)
+        added += n
+        return digest
+    assets = dict(project.get("assets") or {})
+    manifest = {
+        "windows": [[put(b) for b in _split_objects(w, assets)] for w in project.get("windows") or []],
+        "inventory": [put(b) for b in _split_objects(project.get("inventory") or [], assets)],
+        "rest": put(_encode({k: v for k, v in project.items() if k not in ("windows", "inventory", "assets")})),
+    }
+    manifest["assets"] = {key: put(url.encode("utf-8")) for key, url in sorted(assets.items()) if isinstance(url, str)}
+    return put(_encode(manifest)), added
+
+def load_manifest(digest, root=HISTORY_DIR):
+    return json.loads(get_chunk(digest, root))
+
+def load_project(manifest_hash, root=HISTORY_DIR):
+    """The project of a manifest, with its images in an "assets" table (as the editor saves them)."""
+    m = load_manifest(manifest_hash, root)
+    batch = lambda digest: json.loads(get_chunk(digest, root))
+    project = json.loads(get_chunk(m["rest"], root))
+    project["windows"] = [[o for digest in w for o in batch(digest)] for w in m["windows"]]
+    project["inventory"] = [o for digest in m["inventory"] for o in batch(digest)]
+    if m["assets"]:
+        project["assets"] = {key: get_chunk(digest, root).decode("utf-8") for key, digest in m["assets"].items()}
+    return project
+
+#########################
+# versions
+#########################
+def _versions_path(project_id, root):
+    return os.path.join(root, project_id + ".versions")
+
+def versions(project_id, root=HISTORY_DIR):
+    """[{"version", "time", "manifest", "size", "sha256", "added", ...}, ...] oldest first."""
+    path = _versions_path(project_id, root)
+    if not os.path.exists(path):
+        return []
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue   # a line cut short by a crash; later versions keep their numbers
+            entry["version"] = n
+            out.append(entry)
+    return out
+
+def version(project_id, n, root=HISTORY_DIR):
+    """One version's entry; KeyError if there is no version n."""
+    for v in versions(project_id, root):
+        if v["version"] == n:
+            return v
+    raise KeyError(n)
+
+def record(project_id, project, size, sha256, root=HISTORY_DIR, **extra):
+    """Add project as the newest version of project_id, unless it is the same as the newest.
+
+    Returns the version entry.
+    """
+    manifest, added = store_project(project, root)
+    vs = versions(project_id, root)
+    if vs and vs[-1]["manifest"] == manifest:
+        return vs[-1]
+    entry = dict({"time": round(time.time(), 3), "manifest": manifest, "size": size, "sha256": sha256, "added": added}, **extra)
+    # one write() on an O_APPEND file, so lines from several workers don't interleave
+    fd = os.open(_versions_path(project_id, root), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, _encode(entry) + b"\n")
+    finally:
+        os.close(fd)
+    entry["version"] = (vs[-1]["version"] if vs else 0) + 1   # may be off by one if another worker appended meanwhile
+    return entry
+
+#########################
+# diff
+#########################
+def _object_key(o):
+    if isinstance(o, dict) and isinstance(o.get("id"), (str, int)) and not isinstance(o["id"], bool):
+        return o["id"]
+    return "#" + hashlib.sha1(_encode(o)).hexdigest()[:12]   # objects from before ids, or with odd ones
+
+def _diff_objects(a_batches, b_batches, root):
+    """Object ids added, removed and changed between two batch lists; shared batches are not read."""
+    common = set(a_batches) & set(b_batches)
+    def objects(batches):
+        out = {}
+        for digest in batches:
+            if digest not in common:
+                for o in json.loads(get_chunk(digest, root)):
+                    out[_object_key(o)] = o
+        return out
+    a, b = objects(a_batches), objects(b_batches)
+    return {"added": [k for k in b if k not in a], "removed": [k for k in a if k not in b],
+            "changed": [k for k in a if k in b and a[k] != b[k]]}
+
+def diff(project_id, a, b, root=HISTORY_DIR):
+    """What changed from version a to version b, per window, in the inventory, assets and settings."""
+    ma = load_manifest(version(project_id, a, root)["manifest"], root)
+    mb = load_manifest(version(project_id, b, root)["manifest"], root)
+    windows = []
+    for i in range(max(len(ma["windows"]), len(mb["windows"]))):
+        wa = ma["windows"][i] if i < len(ma["windows"]) else []
+        wb = mb["windows"][i] if i < len(mb["windows"]) else []
+        if wa != wb:
+            d = _diff_objects(wa, wb, root)
+            d["window"] = i
+            if i >= len(ma["windows"]):
+                d["status"] = "added"
+            elif i >= len(mb["windows"]):
+                d["status"] = "removed"
+            windows.append(d)
+    return {
+        "from": a, "to": b, "windows": windows,
+        "inventory": _diff_objects(ma["inventory"], mb["inventory"], root),
+        "assets": {"added": sorted(set(mb["assets"]) - set(ma["assets"])), "removed": sorted(set(ma["assets"]) - set(mb["assets"]))},
+        "settings_changed": ma["rest"] != mb["rest"],
+    }
+
+def stats(root=HISTORY_DIR):
+    """Stored chunk bytes against the total size of every version as saved."""
+    chunks = stored = 0
+    for dirpath, _, files in os.walk(os.path.join(root, "chunks")):
+        for name in files:
+            chunks += 1
+            stored += os.path.getsize(os.path.join(dirpath, name))
+    projects = saved = count = 0
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            if name.endswith(".versions"):
+                vs = versions(name[:-len(".versions")], root)
+                projects += 1
+                count += len(vs)
+                saved += sum(v.get("size") or 0 for v in vs)
+    return {"projects": projects, "versions": count, "saved_bytes": saved, "chunks": chunks, "stored_bytes": stored}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Inspect and restore the version history of server saves")
+    p.add_argument("--dir", default=HISTORY_DIR)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list").add_argument("id")
+    d = sub.add_parser("diff")
+    d.add_argument("id")
+    d.add_argument("a", type=int)
+    d.add_argument("b", type=int)
+    r = sub.add_parser("restore", help="write version n to a file (default: over the stored project)")
+    r.add_argument("id")
+    r.add_argument("n", type=int)
+    r.add_argument("-o", "--out")
+    sub.add_parser("stats")
+    args = p.parse_args(argv)
+    try:
+        if args.cmd == "list":
+            for v in versions(args.id, args.dir):
+                print("%4d  %s  %9d bytes  +%d stored%s" % (v["version"], time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(v["time"])),
+                      v["size"], v["added"], "  (restored from %d)" % v["restored_from"] if "restored_from" in v else
+                      "  (bulk edit: %s)" % v["bulk_edit"] if "bulk_edit" in v else ""))
+        elif args.cmd == "diff":
+            print(json.dumps(diff(args.id, args.a, args.b, args.dir), indent=2))
+        elif args.cmd == "restore":
+            out = args.out or hblock.stored_path(args.id)
+            if out is None:
+                p.error("bad project id")
+            project = load_project(version(args.id, args.n, args.dir)["manifest"], args.dir)
+            data = hblock.dumps(project)
+            hblock.write_atomic(out, data)
+            if not args.out:
+                record(args.id, project, len(data), hashlib.sha256(data).hexdigest(), args.dir, restored_from=args.n)
+            print("%s: version %d, %d bytes" % (out, args.n, len(data)))
+        else:
+            print(json.dumps(stats(args.dir), indent=2))
+    except KeyError as e:
+        print("no version %s of %s" % (e.args[0], args.id), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { loadEditor } from './dom.mjs';
+
+const canvas = loadEditor({ play: 'js/play.js' });
+const ptr = (type, x, y)=>canvas.dispatch(type, {clientX:x, clientY:y, preventDefault(){}, pointerId:1, button:0});
+// 20k shapes spread over a 20000 x 20000 world
+const objs = [];
+for(let i=0; i<20000; i++) objs.push({ id:'s'+i, type:'shape', x:(i*7919)%20000, y:Math.floor(i*104729/1000)%20000, size:20, color:'red', shape: i%2 ? 'circle' : 'square' });
+windows = [objs]; currentWindow = 0;
+
+function drawCalls(){
+  const ctx = canvas.getContext('2d'), before = ctx.count;
+  drawAll();
+  return ctx.count - before;
+}
+
+test('only objects in the viewport are drawn', ()=>{
+  resetView();
+  const near = drawCalls();
+  camera = {x:0, y:0, zoom:1};
+  zoomAt(0, 0, 0.05);
+  assert.ok(near < 2000, 'drew ' + near + ' calls for a 900x600 view');
+  assert.ok(drawCalls() > near, 'zoomed out shows more');
+  resetView();
+});
+
+test('hit tests and drags work in world coordinates after panning', ()=>{
+  const o = objs[12345], x0 = o.x;
+  camera.x = o.x - 100; camera.y = o.y - 100;
+  drawAll();
+  assert.equal(findTopObjectAt(o.x + 5, o.y + 5), o);
+  ptr('pointerdown', 105, 105); ptr('pointermove', 205, 155); ptr('pointerup', 205, 155);
+  assert.equal(o.x, x0 + 100);
+  assert.equal(findTopObjectAt(o.x + 5, o.y + 5), o, 'the moved object is re-filed in the index');
+});
+
+test('dragging empty space pans', ()=>{
+  camera.x = -5000; camera.y = -5000;
+  const cx = camera.x;
+  ptr('pointerdown', 800, 20); ptr('pointermove', 700, 20); ptr('pointerup', 700, 20);
+  assert.equal(camera.x, cx + 100);
+});
+
+test('zoom keeps the point under the cursor', ()=>{
+  const at = ()=>({x: camera.x + 300 / camera.zoom, y: camera.y + 200 / camera.zoom});
+  const before = at();
+  zoomAt(300, 200, 2);
+  const after = at();
+  assert.ok(Math.abs(before.x - after.x) < 1e-6 && Math.abs(before.y - after.y) < 1e-6);
+  resetView();
+});
+
+test('deletes and adds keep the index current', ()=>{
+  const o = objs[500];
+  camera.x = o.x - 100; camera.y = o.y - 100;
+  window.lastSelected = o;
+  deleteObject();
+  assert.notEqual(findTopObjectAt(o.x + 5, o.y + 5), o);
+  addShape();
+  const added = objs[objs.length - 1];
+  assert.equal(findTopObjectAt(added.x + 1, added.y + 1), added);
+});
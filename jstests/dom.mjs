@@ -0,0 +1,79 @@
+// Minimal DOM and canvas stand-ins, enough to run the editor scripts under node (see test_js.py)
+import vm from 'node:vm';
+import fs from 'node:fs';
+import { fileURLToPath } from 'node:url';
+const noop = () => {};
+function makeCtx(){
+  const calls = {count:0};
+  return new Proxy(calls, { get(t, k){ if(k in t) return t[k]; if(k==='measureText') return (s)=>({width: String(s).length*8}); if(k==='createImageData'||k==='getImageData') return (w,h)=>({data:new Uint8ClampedArray((w||1)*(h||1)*4), width:w, height:h}); return (...a)=>{ t.count++; }; }, set(t,k,v){ t[k]=v; return true; } });
+}
+class El {
+  constructor(id, tag='div'){ this.id=id; this.tagName=tag.toUpperCase(); this.style={}; this.children=[]; this._html=''; this.listeners={}; this.value=''; this.dataset={}; this.width=900; this.height=600; this.textContent=''; this.files=[]; this.classList={add:noop,remove:noop,toggle:noop,contains:()=>false}; this.scrollTop=0; this.clientHeight=240; this.clientWidth=240; this.parentNode=null; }
+  set innerHTML(v){ this._html=v; this._q={}; }
+  get innerHTML(){ return this._html; }
+  insertAdjacentHTML(pos, html){ this._html += html; }
+  querySelector(sel){ this._q=this._q||{}; return this._q[sel] || (this._q[sel]=new El(sel)); }
+  querySelectorAll(){ return []; }
+  addEventListener(t, fn){ (this.listeners[t]=this.listeners[t]||[]).push(fn); }
+  removeEventListener(){ }
+  dispatch(t, ev){ for(const fn of this.listeners[t]||[]) fn(ev); }
+  getContext(){ return this._ctx || (this._ctx = makeCtx()); }
+  getBoundingClientRect(){ return {left:0, top:0, width:this.width, height:this.height}; }
+  appendChild(c){ this.children.push(c); c.parentNode=this; return c; }
+  removeChild(c){ this.children=this.children.filter(x=>x!==c); }
+  remove(){ if(this.parentNode) this.parentNode.removeChild(this); }
+  replaceChildren(...c){ this.children=c; }
+  setAttribute(k,v){ this[k]=v; }
+  click(){ this.dispatch('click', {}); }
+  focus(){ }
+  setPointerCapture(){ } releasePointerCapture(){ }
+  toDataURL(){ return 'data:image/png;base64,AAAA'; }
+  transferControlToOffscreen(){ return this; }
+  get firstChild(){ return this.children[0]||null; }
+}
+export function setup(){
+  const els = {};
+  globalThis.document = {
+    getElementById(id){ return els[id] || (els[id] = new El(id, id==='gameCanvas'?'canvas':'div')); },
+    createElement(t){ return new El('', t); },
+    addEventListener: noop, body: new El('body'), head: new El('head'), visibilityState: 'visible',
+    querySelector(){ return null; }
+  };
+  globalThis.window = globalThis;
+  const winListeners = {};
+  globalThis.addEventListener = (t, fn)=>{ (winListeners[t]=winListeners[t]||[]).push(fn); };
+  globalThis.removeEventListener = (t, fn)=>{ winListeners[t]=(winListeners[t]||[]).filter(f=>f!==fn); };
+  globalThis.fireWindow = (t, ev)=>{ for(const fn of (winListeners[t]||[]).slice()) fn(ev); };
+  globalThis.alert = (m)=>{ globalThis.lastAlert = m; };
+  globalThis.prompt = ()=>globalThis.promptAnswer ?? null;
+  globalThis.confirm = ()=>true;
+  globalThis.Image = class { constructor(){ this.complete=true; this.naturalWidth=10; } set src(v){ this._src=v; } addEventListener(){ } get src(){ return this._src; } };
+  globalThis.requestAnimationFrame = (fn)=>{ globalThis._raf = fn; return 1; };
+  globalThis.cancelAnimationFrame = noop;
+  globalThis.URL.createObjectURL = ()=>'blob:x'; globalThis.URL.revokeObjectURL = noop;
+  globalThis.fetches = [];
+  globalThis.fetch = async (url, opts)=>{ globalThis.fetches.push([url, opts]); return { ok:true, status:200, json: async()=>({id:'abc', size:1}), text: async()=>'', arrayBuffer: async()=>new ArrayBuffer(0) }; };
+  globalThis.FileReader = class { readAsText(){} readAsDataURL(){} };
+  globalThis.WebSocket = class { constructor(u){ this.url=u; this.sent=[]; this.readyState=1; globalThis.lastWS=this; } send(m){ this.sent.push(m); } close(){ this.onclose && this.onclose(); } };
+  globalThis.WebSocket.OPEN = 1;
+  globalThis.location = { hostname:'localhost', protocol:'http:', host:'localhost:5000', search:'' };
+  Object.defineProperty(globalThis, 'navigator', {value: { userAgent:'node', hardwareConcurrency: 4, deviceMemory: 8, sendBeacon: ()=>true }, configurable:true});
+  globalThis.PerformanceObserver = class { constructor(cb){ this.cb=cb; } observe(){ } disconnect(){} static get supportedEntryTypes(){ return ['longtask']; } };
+  return els;
+}
+export const STATIC = fileURLToPath(new URL('../static/', import.meta.url));
+
+// runs a classic (non-module) script like a <script> tag: its top-level functions become globals
+export function loadClassic(rel){
+  const path = STATIC + rel;
+  vm.runInThisContext(fs.readFileSync(path, 'utf8'), {filename: path, importModuleDynamically: vm.constants.USE_MAIN_CONTEXT_DEFAULT_LOADER});
+}
+
+// the editor page with core.js loaded and started; modules are static/js paths of lazily imported ones
+export function loadEditor(modules = {}){
+  setup();
+  globalThis.HBLOCK = { collabUrl: '', build: 'test', modules: Object.fromEntries(Object.entries(modules).map(([k, v])=>[k, STATIC + v])) };
+  loadClassic('js/core.js');
+  fireWindow('load', {});
+  return document.getElementById('gameCanvas');
+}
@@ -0,0 +1,66 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { loadEditor } from './dom.mjs';
+
+const canvas = loadEditor({ play: 'js/play.js', inventory: 'js/menus/inventory.js', shape: 'js/menus/shape.js' });
+const ptr = (type, x, y, shift)=>canvas.dispatch(type, {clientX:x, clientY:y, shiftKey:!!shift, preventDefault(){}, pointerId:1, button:0});
+const frame = ()=>{ const f = globalThis._raf; globalThis._raf = null; if(f) f(performance.now()); };
+let draws = 0;
+const realDraw = globalThis.drawAll;
+globalThis.drawAll = function(){ draws++; return realDraw(); };
+// a 200 x 100 grid of 20px shapes, 30px apart
+const objs = [];
+for(let i=0; i<20000; i++) objs.push({ id:'s'+i, type:'shape', x:(i%200)*30, y:Math.floor(i/200)*30, size:20, color: i%2 ? 'red' : 'blue', shape:'square' });
+windows = [objs]; currentWindow = 0;
+frame();
+
+test('shift-click toggles one object', ()=>{
+  ptr('pointerdown', 5, 5, true); ptr('pointerup', 5, 5, true);
+  assert.deepEqual([...selection], [objs[0]]);
+  ptr('pointerdown', 5, 5, true); ptr('pointerup', 5, 5, true);
+  assert.equal(selection.size, 0);
+});
+
+let box;
+test('shift-drag on empty space selects everything the box touches', ()=>{
+  ptr('pointerdown', 25, 25, true);
+  for(let k=0; k<20; k++) ptr('pointermove', 25 + k*14, 25 + k*6, true);
+  ptr('pointerup', 305, 145, true);
+  box = objs.filter(o=>o.x <= 305 && o.x + o.size >= 25 && o.y <= 145 && o.y + o.size >= 25);
+  assert.equal(selection.size, box.length);
+  assert.ok(box.every(o=>selection.has(o)));
+});
+
+test('a group drag moves every selected object once per frame', ()=>{
+  const a = box[0], last = box[box.length - 1], ax = a.x, ay = a.y, lx = last.x;
+  frame(); draws = 0;
+  ptr('pointerdown', ax + 5, ay + 5);
+  for(let k=1; k<=100; k++) ptr('pointermove', ax + 5 + k, ay + 5);
+  assert.equal(a.x, ax, 'nothing moves before the frame');
+  frame();
+  assert.equal(draws, 1);
+  assert.equal(a.x, ax + 100); assert.equal(last.x, lx + 100);
+  ptr('pointermove', ax + 155, ay + 15); ptr('pointerup', ax + 155, ay + 15);
+  assert.equal(a.x, ax + 150); assert.equal(a.y, ay + 10); assert.equal(last.x, lx + 150);
+  assert.equal(findTopObjectAt(a.x + 1, a.y + 1), a);
+});
+
+test('scale, copy to inventory and delete work on the whole selection', ()=>{
+  scaleSelection(2);
+  assert.ok([...selection].every(o=>o.size === 40));
+  const items = inventory.length;
+  selectionToInventory();
+  assert.equal(inventory.length, items + 2, 'one item per distinct shape');
+  const n = objs.length, k = selection.size, a = box[0];
+  deleteSelection();
+  assert.equal(objs.length, n - k);
+  assert.equal(selection.size, 0);
+  assert.notEqual(findTopObjectAt(a.x + 1, a.y + 1), a);
+});
+
+test('a plain click on empty space clears the selection', ()=>{
+  ptr('pointerdown', 305, 305, true); ptr('pointermove', 400, 400, true); ptr('pointerup', 400, 400, true);
+  assert.ok(selection.size > 0);
+  ptr('pointerdown', 6050, 50); ptr('pointerup', 6050, 50);
+  assert.equal(selection.size, 0);
+});
@@ -0,0 +1,381 @@
+# loadtest.py
+# Load test for the gunicorn deployment of editor:app. For each worker count it starts
+#   gunicorn -w <n> editor:app
+# on a free local port with a throwaway HBLOCK_PROJECT_DIR, then runs --clients simulated
+# editors in one asyncio process for --seconds. Each editor loops: think (exponential, mean
+# --think), then either loads the page (GET /), saves its project (POST /save?id=...) or
+# re-opens it (GET /projects/<id>), picked by --mix. Saves come from synthetic projects in the
+# size classes of --sizes, generated once up front:
+#   small   60 shapes/texts in one window, no images                     ~7 KB
+#   medium  3 windows of 800 objects, 4 images of 48 KB                 ~560 KB
+#   large   5 windows of 4000 objects, 16 images of 160 KB              ~6 MB
+# (images are stored once in the assets table, as the editor saves them)
+# Output is one JSON document on stdout (or -o): per worker count the throughput, error rate,
+# p50/p95/p99 latency overall and per request kind, and the server's RSS sampled from /proc
+# (master and workers; Linux only, null elsewhere). A one-line summary per run goes to stderr.
+#   python loadtest.py --workers 1,2,4,8 --clients 200 --seconds 30 -o load.json
+#   python loadtest.py --mix load=0.5,save=0.4,open=0.1 --sizes small=0.5,medium=0.4,large=0.1
+# The HTTP client is a minimal HTTP/1.1 one on asyncio streams (keep-alive when the server
+# allows it, which gunicorn's sync workers don't), so nothing beyond requirements.txt is needed.
+# One client process tops out at a few thousand requests per second; past that the numbers
+# describe the generator, not the server.
+import argparse, asyncio, base64, json, os, random, shutil, socket, statistics, subprocess, sys, tempfile, time, uuid
+import hblock
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+KINDS = ("load", "save", "open")
+# objects per window, windows, images, bytes per image
+SIZE_CLASSES = {
+    "small": (60, 1, 0, 0),
+    "medium": (800, 3, 4, 48 * 1024),
+    "large": (4000, 5, 16, 160 * 1024),
+}
+VARIANTS = 3          # distinct projects per size class; a client's saves cycle through them
+RSS_EVERY = 0.5
+START_TIMEOUT = 30.0
+
+#########################
+# Synthetic projects
+#########################
+def synthetic_project(size_class, seed):
+    """A plausible editor project: shapes, texts, event zones, an inventory and images."""
+    per_window, windows, images, image_bytes = SIZE_CLASSES[size_class]
+    rng = random.Random(seed)
+    pictures = ["data:image/png;base64," + base64.b64encode(rng.randbytes(image_bytes)).decode("ascii")
+                for _ in range(images)]
+    project = hblock.empty_project()
+    project["name"] = "load test %s %d" % (size_class, seed)
+    project["windows"] = []
+    n = 0
+    for _ in range(windows):
+        w = []
+        for _ in range(per_window):
+            n += 1
+            r = rng.random()
+            x, y = rng.randrange(4000), rng.randrange(3000)
+            if r < 0.8:
+                w.append({"id": "o%d" % n, "type": "shape", "x": x, "y": y, "size": rng.randrange(20, 120),
+                          "color": rng.choice(["blue", "red", "#33aa55", "#ffcc00"]),
+                          "shape": rng.choice(["square", "circle", "triangle", "hexagon"]),
+                          "image": rng.choice(pictures) if pictures and rng.random() < 0.05 else None,
+                          "collide": rng.random() < 0.3, "kill": rng.random() < 0.05})
+            elif r < 0.95:
+                w.append({"id": "o%d" % n, "type": "text", "x": x, "y": y, "text": "label %d" % n,
+                          "color": "#000000", "size": 24})
+            else:
+                w.append({"id": "o%d" % n, "type": "eventZone", "x": x, "y": y, "w": 160, "h": 120,
+                          "visible": False, "finalized": True,
+                          "event": {"type": "addText", "params": {"text": "hi", "color": "#000000", "size": 28}}})
+        project["windows"].append(w)
+    project["inventory"] = [{"id": "i%d" % i, "type": "shape", "size": 50, "color": "green", "shape": "circle",
+                             "image": pictures[i] if i < len(pictures) else None} for i in range(4)]
+    return project
+
+def payloads(sizes):
+    """size class -> [encoded project, ...] for every class with a non-zero share."""
+    return {name: [hblock.dumps(hblock.pack_assets(synthetic_project(name, seed))) for seed in range(VARIANTS)]
+            for name, share in sizes.items() if share > 0}
+
+#########################
+# HTTP client
+#########################
+class Connection:
+    """One keep-alive HTTP/1.1 connection that reconnects when the server closes it."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=b"", content_type="application/octet-stream"):
+        """(status, response body length); a reused connection that turns out closed is retried once."""
+        for attempt in (0, 1):
+            fresh = self.writer is None
+            if fresh:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                return await self._exchange(method, path, body, content_type)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if fresh or attempt:
+                    raise
+
+    async def _exchange(self, method, path, body, content_type):
+        head = "%s %s HTTP/1.1\r\nHost: %s:%d\r\nContent-Length: %d\r\n" % (method, path, self.host, self.port, len(body))
+        if body:
+            head += "Content-Type: %s\r\n" % content_type
+        self.writer.write(head.encode("ascii") + b"\r\n")
+        if body:
+            self.writer.write(body)
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("closed before the status line")
+        status = int(line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = line.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip().lower()
+        size = 0
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                n = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(n + 2)
+                size += n
+                if n == 0:
+                    break
+        elif "content-length" in headers:
+            size = int(headers["content-length"])
+            await self.reader.readexactly(size)
+        else:
+            size = len(await self.reader.read())
+            headers["connection"] = "close"
+        if headers.get("connection") == "close":
+            self.close()
+        return status, size
+
+#########################
+# Simulated editors
+#########################
+def _pick(rng, shares):
+    r, acc = rng.random() * sum(shares.values()), 0.0
+    for name, share in shares.items():
+        acc += share
+        if r < acc:
+            return name
+    return name
+
+async def editor(n, port, args, bodies, samples, t_record, t_end):
+    """One simulated editor; appends (kind, start, latency s, status, bytes) to samples."""
+    rng = random.Random(args.seed * 100003 + n)
+    conn = Connection("127.0.0.1", port)
+    project_id = "lt%d-%s" % (n, uuid.uuid4().hex[:8])
+    size_class = _pick(rng, {k: v for k, v in args.sizes.items() if k in bodies})
+    saves = 0
+    await asyncio.sleep(rng.random() * args.ramp)
+    try:
+        while time.perf_counter() < t_end:
+            if args.think > 0:
+                await asyncio.sleep(rng.expovariate(1 / args.think))
+            kind = _pick(rng, args.mix)
+            if kind == "open" and not saves:
+                kind = "load"   # nothing stored yet
+            t0 = time.perf_counter()
+            if t0 >= t_end:
+                break
+            try:
+                if kind == "load":
+                    status, size = await conn.request("GET", "/")
+                elif kind == "save":
+                    body = bodies[size_class][saves % len(bodies[size_class])]
+                    status, size = await conn.request("POST", "/save?id=" + project_id, body, "application/json")
+                    saves += 1
+                    size = len(body)
+                else:
+                    status, size = await conn.request("GET", "/projects/" + project_id)
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                conn.close()
+                status, size = 0, 0   # connection refused/reset or a garbled response
+            if t0 >= t_record:
+                samples.append((kind, t0, time.perf_counter() - t0, status, size))
+    finally:
+        conn.close()
+
+#########################
+# Server and its memory
+#########################
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _rss_kb(pid):
+    try:
+        with open("/proc/%d/status" % pid) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _children(pid):
+    out = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open("/proc/%s/stat" % name) as f:
+                # the command name may hold spaces; the ppid is the 2nd field after its ")"
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                    out.append(int(name))
+        except (OSError, IndexError, ValueError):
+            pass
+    return out
+
+def rss_sample(master):
+    """{"master": kB, "workers": [kB, ...]}, or None without /proc."""
+    m = _rss_kb(master)
+    if m is None:
+        return None
+    return {"master": m, "workers": [kb for kb in map(_rss_kb, _children(master)) if kb is not None]}
+
+async def watch_rss(master, out, stop):
+    while not stop.is_set():
+        s = rss_sample(master)
+        if s is not None:
+            out.append(s)
+        try:
+            await asyncio.wait_for(stop.wait(), RSS_EVERY)
+        except asyncio.TimeoutError:
+            pass
+
+def start_server(workers, port, data_dir, args):
+    env = dict(os.environ, HBLOCK_PROJECT_DIR=data_dir)
+    cmd = [sys.executable, "-m", "gunicorn", "--bind", "127.0.0.1:%d" % port, "--workers", str(workers),
+           "--worker-class", args.worker_class, "--timeout", "120", "--log-level", "warning", "editor:app"]
+    if args.worker_class == "gthread":
+        cmd[-1:-1] = ["--threads", str(args.threads)]
+    proc = subprocess.Popen(cmd, cwd=APP_DIR, env=env)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited with %d (is it installed?)" % proc.returncode)
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as s:
+                s.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+                if s.recv(16).startswith(b"HTTP/1.1 200"):
+                    return proc
+        except OSError:
+            pass
+        time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError("gunicorn did not answer GET / within %ds" % START_TIMEOUT)
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+#########################
+# Runs and reports
+#########################
+def latency_summary(samples):
+    if not samples:
+        return {"requests": 0, "errors": 0}
+    ms = sorted(s[2] * 1000 for s in samples)
+    q = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else [ms[0]] * 99
+    errors = sum(1 for s in samples if not 200 <= s[3] < 300)
+    return {"requests": len(samples), "errors": errors, "error_rate": round(errors / len(samples), 4),
+            "p50_ms": round(q[49], 2), "p95_ms": round(q[94], 2), "p99_ms": round(q[98], 2),
+            "max_ms": round(ms[-1], 2), "mean_ms": round(statistics.fmean(ms), 2)}
+
+def rss_summary(rss):
+    if not rss:
+        return None
+    mb = lambda kb: round(kb / 1024, 1)
+    totals = [s["master"] + sum(s["workers"]) for s in rss]
+    per_worker = [kb for s in rss for kb in s["workers"]]
+    return {"samples": len(rss), "total_peak_mb": mb(max(totals)), "total_mean_mb": mb(statistics.fmean(totals)),
+            "master_peak_mb": mb(max(s["master"] for s in rss)),
+            "worker_peak_mb": mb(max(per_worker)) if per_worker else None,
+            "worker_mean_mb": mb(statistics.fmean(per_worker)) if per_worker else None}
+
+async def drive(port, master, args, bodies):
+    samples, rss, stop = [], [], asyncio.Event()
+    now = time.perf_counter()
+    t_record, t_end = now + args.warmup, now + args.warmup + args.seconds
+    watcher = asyncio.create_task(watch_rss(master, rss, stop))
+    await asyncio.gather(*(editor(n, port, args, bodies, samples, t_record, t_end) for n in range(args.clients)))
+    stop.set()
+    await watcher
+    return samples, rss
+
+def run(workers, args, bodies):
+    """One worker count: fresh server and data directory, returns its report."""
+    data_dir = tempfile.mkdtemp(prefix="hblock-load-")
+    port = _free_port()
+    proc = start_server(workers, port, data_dir, args)
+    try:
+        samples, rss = asyncio.run(drive(port, proc.pid, args, bodies))
+    finally:
+        stop_server(proc)
+        if not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    report = {"workers": workers, "seconds": args.seconds, "throughput_rps": round(len(samples) / args.seconds, 1)}
+    report.update(latency_summary(samples))
+    report["by_kind"] = {}
+    for kind in KINDS:
+        mine = [s for s in samples if s[0] == kind]
+        if mine:
+            report["by_kind"][kind] = dict(latency_summary(mine), throughput_rps=round(len(mine) / args.seconds, 1),
+                                           mb_per_s=round(sum(s[4] for s in mine) / args.seconds / 1e6, 2))
+    statuses = {}
+    for s in samples:
+        statuses[str(s[3])] = statuses.get(str(s[3]), 0) + 1
+    report["statuses"] = statuses   # "0": no HTTP answer at all
+    report["rss"] = rss_summary(rss)
+    if args.keep:
+        report["data_dir"] = data_dir
+    return report
+
+def _shares(text, allowed):
+    """"a=0.7,b=0.3" -> {"a": 0.7, "b": 0.3}; argparse reports the ValueError."""
+    out = {}
+    for part in text.split(","):
+        name, _, share = part.partition("=")
+        if name.strip() not in allowed:
+            raise ValueError("unknown %r (expected %s)" % (name, ", ".join(allowed)))
+        out[name.strip()] = float(share)
+    if sum(out.values()) <= 0 or min(out.values()) < 0:
+        raise ValueError("shares must be >= 0 and not all 0")
+    return out
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Load test gunicorn editor:app with simulated editors")
+    p.add_argument("--workers", default="1,2,4", help="comma-separated worker counts, one run each")
+    p.add_argument("--worker-class", default="sync", help="gunicorn worker class (sync, gthread, ...)")
+    p.add_argument("--threads", type=int, default=4, help="threads per worker with --worker-class gthread")
+    p.add_argument("--clients", type=int, default=100, help="concurrent simulated editors")
+    p.add_argument("--seconds", type=float, default=20.0, help="measured time per run")
+    p.add_argument("--warmup", type=float, default=3.0, help="unmeasured time before it")
+    p.add_argument("--ramp", type=float, default=2.0, help="editors start spread over this many seconds")
+    p.add_argument("--think", type=float, default=1.0, help="mean pause between an editor's requests (0: none)")
+    p.add_argument("--mix", default="load=0.6,save=0.3,open=0.1", type=lambda s: _shares(s, KINDS))
+    p.add_argument("--sizes", default="small=0.7,medium=0.25,large=0.05", type=lambda s: _shares(s, SIZE_CLASSES))
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--keep", action="store_true", help="keep each run's project directory")
+    p.add_argument("-o", "--out", help="write the JSON report here instead of stdout")
+    args = p.parse_args(argv)
+    counts = [int(w) for w in args.workers.split(",")]
+    bodies = payloads(args.sizes)
+    result = {"config": {"clients": args.clients, "seconds": args.seconds, "warmup": args.warmup, "think": args.think,
+                         "worker_class": args.worker_class, "mix": args.mix, "sizes": args.sizes,
+                         "payload_bytes": {k: [len(b) for b in v] for k, v in bodies.items()}},
+              "runs": []}
+    for workers in counts:
+        report = run(workers, args, bodies)
+        result["runs"].append(report)
+        print("workers %2d: %7.1f req/s  errors %5.2f%%  p50 %7.1f ms  p95 %7.1f ms  p99 %7.1f ms  rss %s MB" % (
+            workers, report["throughput_rps"], 100 * report.get("error_rate", 0), report.get("p50_ms", 0),
+            report.get("p95_ms", 0), report.get("p99_ms", 0), (report["rss"] or {}).get("total_peak_mb")), file=sys.stderr)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# projcache.py
+# Cache of parsed .Hblock projects, keyed by content hash.
+# Two levels:
+#   - per worker: an LRU of decoded projects bounded by the size of their marshal encoding
+#     (the same bytes the shared level stores, so both levels count in one unit)
+#   - shared by every gunicorn worker on the host: <hash>.bin files holding the marshal
+#     encoding, read through mmap so the page cache is shared and decoding skips JSON parsing
+# Projects handed out are shared between callers; copy before mutating.
+import hashlib, json, marshal, mmap, os, sys, tempfile, threading
+from collections import OrderedDict
+import hblock
+
+MEMORY_BYTES = int(os.environ.get("HBLOCK_CACHE_BYTES", 256 * 1024 * 1024))
+SHARED_DIR = os.environ.get("HBLOCK_SHARED_CACHE_DIR", os.path.join(hblock.PROJECT_DIR, ".cache"))
+SHARED_BYTES = int(os.environ.get("HBLOCK_SHARED_CACHE_BYTES", 2 * 1024 * 1024 * 1024))
+MARSHAL_VERSION = 4
+MAX_PATHS = 4096   # files whose hash is remembered
+
+class ProjectCache:
+    def __init__(self, max_bytes=MEMORY_BYTES, shared_dir=SHARED_DIR, shared_max_bytes=SHARED_BYTES):
+        self.max_bytes = max_bytes
+        # marshal output is only readable by the same Python minor version
+        self.shared_dir = shared_dir and os.path.join(shared_dir, "py%d%d" % sys.version_info[:2])
+        self.shared_max_bytes = shared_max_bytes
+        self.entries = OrderedDict()   # hash -> (project, nbytes)
+        self.bytes = 0
+        self.hashes = OrderedDict()    # path -> ((mtime_ns, size), hash), so unchanged files are not re-hashed; LRU
+        self.shared_bytes = None       # running estimate of the shared dir size; None until first scanned
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(("hits", "shared_hits", "misses", "evictions", "shared_writes", "shared_evictions"), 0)
+
+    #########################
+    # lookups
+    #########################
+    def get_file(self, path):
+        st = os.stat(path)
+        sig = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            known = self.hashes.get(path)
+            if known:
+                self.hashes.move_to_end(path)
+        if known and known[0] == sig:
+            project = self._lookup(known[1])
+            if project is not None:
+                return project
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        self._note_hash(path, sig, digest)
+        return self.get_bytes(data, digest)
+
+    def get_bytes(self, data, digest=None):
+        digest = digest or hashlib.sha256(data).hexdigest()
+        project = self._lookup(digest)
+        if project is None:
+            project = json.loads(data)
+            self.counters["misses"] += 1
+            encoded = marshal.dumps(project, MARSHAL_VERSION)
+            self._remember(digest, project, len(encoded))
+            self._write_shared(digest, encoded)
+        return project
+
+    def note_saved(self, path, digest):
+        """Record the hash of a file we just wrote so the next read skips hashing it."""
+        st = os.stat(path)
+        self._note_hash(path, (st.st_mtime_ns, st.st_size), digest)
+
+    def _note_hash(self, path, sig, digest):
+        with self.lock:
+            self.hashes[path] = (sig, digest)
+            self.hashes.move_to_end(path)
+            while len(self.hashes) > MAX_PATHS:
+                self.hashes.popitem(last=False)
+
+    def _lookup(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is not None:
+                self.entries.move_to_end(digest)
+                self.counters["hits"] += 1
+                return entry[0]
+        project, nbytes = self._read_shared(digest)
+        if project is not None:
+            self.counters["shared_hits"] += 1
+            self._remember(digest, project, nbytes)
+        return project
+
+    def _remember(self, digest, project, nbytes):
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            if digest in self.entries:
+                return
+            self.entries[digest] = (project, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                _, (_, old) = self.entries.popitem(last=False)
+                self.bytes -= old
+                self.counters["evictions"] += 1
+
+    #########################
+    # shared on-disk level
+    #########################
+    def _shared_path(self, digest):
+        return os.path.join(self.shared_dir, digest + ".bin")
+
+    def _read_shared(self, digest):
+        if not self.shared_dir:
+            return None, 0
+        path = self._shared_path(digest)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                project = marshal.loads(mm)
+                nbytes = len(mm)
+        except (OSError, ValueError, EOFError, TypeError):
+            return None, 0
+        try:
+            os.utime(path)   # mtime doubles as the shared level's LRU clock
+        except OSError:
+            pass
+        return project, nbytes
+
+    def _write_shared(self, digest, data):
+        if not self.shared_dir:
+            return
+        if len(data) > self.shared_max_bytes:
+            return
+        os.makedirs(self.shared_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.shared_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp, self._shared_path(digest))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self.counters["shared_writes"] += 1
+        if self.shared_bytes is None:
+            self.shared_bytes = self._scan_shared()[1]
+        else:
+            self.shared_bytes += len(data)
+        if self.shared_bytes > self.shared_max_bytes:
+            self._evict_shared()
+
+    def _scan_shared(self):
+        files, total = [], 0
+        for name in os.listdir(self.shared_dir):
+            if not name.endswith(".bin"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.shared_dir, name))
+            except OSError:
+                continue   # another worker evicted it
+            files.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        return files, total
+
+    def _evict_shared(self):
+        # other workers write here too, so rescan instead of trusting our running total;
+        # trim to 90% of the budget so we don't rescan on every following write
+        files, total = self._scan_shared()
+        files.sort()
+        target = self.shared_max_bytes * 0.9
+        for _, size, name in files:
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.shared_dir, name))
+            except OSError:
+                continue
+            total -= size
+            self.counters["shared_evictions"] += 1
+        self.shared_bytes = total
+
+    #########################
+    # reporting
+    #########################
+    def stats(self):
+        c = self.counters
+        lookups = c["hits"] + c["shared_hits"] + c["misses"]
+        return dict(c, pid=os.getpid(), entries=len(self.entries), bytes=self.bytes, max_bytes=self.max_bytes,
+                    hit_rate=round(c["hits"] / lookups, 4) if lookups else 0.0,
+                    shared_hit_rate=round(c["shared_hits"] / lookups, 4) if lookups else 0.0,
+                    shared_bytes=self.shared_bytes, shared_max_bytes=self.shared_max_bytes)
+
+# one cache per worker process
+cache = ProjectCache()
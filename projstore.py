@@ -0,0 +1,147 @@
+# projstore.py
+# Storing projects on the server. Everything that replaces an <id>.Hblock (/save, upload commits,
+# restores and bulk edits in editor.py, rooms closing in collab.py) goes through here, so every
+# stored file is versioned (history.py), indexed (catalog.py) and known to the project cache,
+# with one writer at a time per project (a flock on PROJECT_DIR/.locks/<id>).
+# Files bigger than INLINE_BYTES are versioned and indexed by a child process instead,
+#   python projstore.py index <id> <sha256>
+# so the worker that took a big upload never reads it whole; their ack has "version": null.
+import argparse, fcntl, hashlib, json, os, subprocess, sys
+from contextlib import contextmanager
+import catalog, hblock, history, projcache
+
+INLINE_BYTES = int(os.environ.get("HBLOCK_INLINE_INDEX_BYTES", 16 * 1024 * 1024))
+READ_SIZE = 1024 * 1024
+ANY = object()   # store(expect=ANY): replace whatever is stored
+_children = []   # index processes not waited for yet
+
+class Conflict(Exception):
+    """The stored project is not the one the caller started from; .sha256 is what is stored (None: nothing)."""
+    def __init__(self, sha256):
+        super().__init__("the stored project has changed")
+        self.sha256 = sha256
+
+@contextmanager
+def locked(project_id):
+    """Hold project_id's lock, so replacing its file and recording that version are one step."""
+    lock_dir = os.path.join(hblock.PROJECT_DIR, ".locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    fd = os.open(os.path.join(lock_dir, project_id), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)   # releases the lock
+
+def _path(project_id):
+    path = hblock.stored_path(project_id)
+    if path is None:
+        raise ValueError("bad project id")
+    return path
+
+def _record(project_id, project, size, digest, **extra):
+    entry = history.record(project_id, project, size, digest, **extra)
+    catalog.update(project_id, project, size, digest)
+    return {"id": project_id, "size": size, "sha256": digest, "version": entry["version"]}
+
+def saved(project_id, path, size, digest):
+    """Version and index the file just written to path, under locked(project_id); returns the ack."""
+    projcache.cache.note_saved(path, digest)
+    if size > INLINE_BYTES:
+        _index_later(project_id, digest)
+        return {"id": project_id, "size": size, "sha256": digest, "version": None}
+    try:
+        project = projcache.cache.get_file(path)
+    except ValueError:
+        project = None   # not JSON: stored as it is, but there is nothing to version or index
+    if not isinstance(project, dict):
+        return {"id": project_id, "size": size, "sha256": digest, "version": None}
+    return _record(project_id, project, size, digest)
+
+def replace(project_id, tmp, size, digest):
+    """Make the checked file at tmp the stored project_id; returns the ack."""
+    path = _path(project_id)
+    with locked(project_id):
+        os.replace(tmp, path)
+        return saved(project_id, path, size, digest)
+
+def stored_sha256(project_id):
+    """sha256 hex of the stored project_id's file, None if there is none."""
+    digest = hashlib.sha256()
+    try:
+        with open(_path(project_id), "rb") as f:
+            for block in iter(lambda: f.read(READ_SIZE), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+def store(project_id, project, expect=ANY, **extra):
+    """Make a project built on the server the stored one, versioned and indexed like a save.
+
+    expect: the sha256 of the file the project was built from (None: there was none); Conflict,
+    and nothing is written, if a save has replaced it since.
+    """
+    path = _path(project_id)
+    data = hblock.dumps(project)
+    digest = hashlib.sha256(data).hexdigest()
+    os.makedirs(hblock.PROJECT_DIR, exist_ok=True)
+    with locked(project_id):
+        if expect is not ANY:
+            current = stored_sha256(project_id)
+            if current != expect:
+                raise Conflict(current)
+        hblock.write_atomic(path, data)
+        projcache.cache.note_saved(path, digest)
+        return _record(project_id, project, len(data), digest, **extra)
+
+#########################
+# big files
+#########################
+def _index_later(project_id, digest):
+    _children[:] = [p for p in _children if p.poll() is None]
+    # the child reads the same directories this process writes to, whatever it was started with
+    env = dict(os.environ, HBLOCK_PROJECT_DIR=hblock.PROJECT_DIR, HBLOCK_HISTORY_DIR=history.HISTORY_DIR,
+               HBLOCK_CATALOG_DB=catalog.CATALOG_DB)
+    _children.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), "index", project_id, digest],
+                                      env=env, stdin=subprocess.DEVNULL))
+
+def index(project_id, digest):
+    """Version and index the stored project_id if it is still the file with this sha256; returns the ack or None."""
+    path = _path(project_id)
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if hashlib.sha256(data).hexdigest() != digest:
+        return None   # replaced since: that save versions itself
+    try:
+        project = json.loads(data)
+    except ValueError:
+        return None
+    del data
+    if not isinstance(project, dict):
+        return None
+    with locked(project_id):
+        now = os.stat(path)
+        if (now.st_ino, now.st_mtime_ns) != (st.st_ino, st.st_mtime_ns):
+            return None   # replaced while we parsed it
+        return _record(project_id, project, st.st_size, digest)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Version and index a stored project (run by the server for big saves)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    i = sub.add_parser("index")
+    i.add_argument("id")
+    i.add_argument("sha256")
+    args = p.parse_args(argv)
+    ack = index(args.id, args.sha256)
+    if ack is None:
+        print("%s: no longer the stored version, or not a project; nothing recorded" % args.id, file=sys.stderr)
+    else:
+        print(json.dumps(ack))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+// Rendering benchmark (loaded by /bench instead of waiting for user input)
+// Builds a seeded synthetic window, then times the editor's own drawAll, drag handling and
+// findTopObjectAt, and posts the percentiles to /bench/results (see benchlog.py).
+
+/////////////////////////
+// Benchmark
+/////////////////////////
+const BENCH_SHAPES = ['square', 'circle', 'triangle', 'hexagon'];
+const HIT_BATCH = 100;   // findTopObjectAt calls per timing sample (one call is below timer resolution)
+
+function benchRandom(seed){
+  // mulberry32: same scene for the same seed in every browser
+  return ()=>{
+    seed = (seed + 0x6D2B79F5) | 0;
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+function benchImage(i){
+  const c = document.createElement('canvas');
+  c.width = c.height = 64;
+  const g = c.getContext('2d');
+  g.fillStyle = 'hsl(' + (i * 47 % 360) + ',70%,50%)';
+  g.fillRect(0, 0, 64, 64);
+  g.fillStyle = '#fff';
+  g.font = '28px Arial';
+  g.fillText(String(i), 8, 42);
+  return c.toDataURL();
+}
+
+async function benchScene(p){
+  const rnd = benchRandom(p.seed);
+  const objs = [];
+  const at = (size)=>({ x: Math.floor(rnd() * (canvas.width - size)), y: Math.floor(rnd() * (canvas.height - size)) });
+  const color = ()=>'#' + Math.floor(rnd() * 0xffffff).toString(16).padStart(6, '0');
+  for(const shape of BENCH_SHAPES){
+    for(let i = 0; i < p.shapes; i++){
+      const size = 20 + Math.floor(rnd() * 60);
+      objs.push(Object.assign({ id: newId(), type: 'shape', size, color: color(), shape, image: null, collide: rnd() < 0.2 }, at(size)));
+    }
+  }
+  const images = [];
+  for(let i = 0; i < p.images; i++){
+    const size = 30 + Math.floor(rnd() * 50);
+    const src = benchImage(i);
+    images.push(cachedImage(src).decode().catch(()=>{}));
+    objs.push(Object.assign({ id: newId(), type: 'shape', size, color: '#000', shape: 'square', image: src }, at(size)));
+  }
+  for(let i = 0; i < p.texts; i++){
+    const size = 12 + Math.floor(rnd() * 24);
+    const pos = at(200);
+    objs.push({ id: newId(), type: 'text', x: pos.x, y: pos.y + size, text: 'Text ' + i, color: color(), size });
+  }
+  for(let i = 0; i < p.zones; i++){
+    const w = 40 + Math.floor(rnd() * 120), h = 40 + Math.floor(rnd() * 120);
+    objs.push(Object.assign({ id: newId(), type: 'eventZone', w, h, visible: true, event: { type: 'removeText', params: {} } }, at(Math.max(w, h))));
+  }
+  // shuffle so kinds interleave in draw order like a real window
+  for(let i = objs.length - 1; i > 0; i--){ const j = Math.floor(rnd() * (i + 1)); [objs[i], objs[j]] = [objs[j], objs[i]]; }
+  windows = [objs];
+  inventory = [];
+  currentWindow = 0;
+  await Promise.all(images);
+  return objs;
+}
+
+const nextFrame = ()=>new Promise(r=>requestAnimationFrame(r));
+
+// runs fn once per animation frame; frame = time between frames, work = time inside fn
+async function benchFrames(n, fn){
+  const frame = [], work = [];
+  let last = await nextFrame();
+  for(let i = 0; i < n; i++){
+    const t0 = performance.now();
+    fn(i);
+    work.push(performance.now() - t0);
+    const now = await nextFrame();
+    frame.push(now - last);
+    last = now;
+  }
+  return { frame, work };
+}
+
+function pointer(type, x, y){
+  const rect = canvas.getBoundingClientRect();
+  canvas.dispatchEvent(new PointerEvent(type, { clientX: rect.left + x, clientY: rect.top + y, pointerId: 1, bubbles: true }));
+}
+
+function percentiles(samples){
+  const s = samples.slice().sort((a, b)=>a - b);
+  const q = (f)=>s[Math.min(s.length - 1, Math.floor(f * s.length))];
+  const r = (v)=>Math.round(v * 1000) / 1000;
+  return { n: s.length, p50: r(q(0.5)), p95: r(q(0.95)), p99: r(q(0.99)), max: r(s[s.length - 1]) };
+}
+
+export async function runBench(p){
+  const panel = document.createElement('pre');
+  panel.style.cssText = 'position:fixed;right:8px;bottom:8px;margin:0;padding:8px;background:#fff;color:#000;border:1px solid #888;font-size:12px;z-index:50;max-width:420px;white-space:pre-wrap';
+  document.body.appendChild(panel);
+  const say = (s)=>{ panel.textContent = s; };
+  say('Building scene...');
+  // instrumented like an opted-in editor, but keeping its samples to itself
+  if(p.telemetry) (await loadModule('telemetry')).startTelemetry({ send: false });
+  const objs = await benchScene(p);
+  say('Running ' + objs.length + ' objects...');
+  const metrics = {};
+
+  const redraw = await benchFrames(p.frames, ()=>drawAll());
+  metrics.redraw_frame_ms = percentiles(redraw.frame);
+  metrics.redraw_work_ms = percentiles(redraw.work);
+
+  // drag the top shape around a circle through the real pointer handlers
+  const target = objs.filter(o=>o.type === 'shape').pop();
+  const cx = target.x + target.size/2, cy = target.y + target.size/2;
+  pointer('pointerdown', cx, cy);
+  const drag = await benchFrames(p.frames, (i)=>{
+    const a = i / p.frames * Math.PI * 4;
+    pointer('pointermove', clamp(cx + Math.cos(a) * 150, 0, canvas.width), clamp(cy + Math.sin(a) * 150, 0, canvas.height));
+  });
+  pointer('pointerup', target.x + target.size/2, target.y + target.size/2);
+  metrics.drag_frame_ms = percentiles(drag.frame);
+  metrics.drag_work_ms = percentiles(drag.work);
+
+  const rnd = benchRandom(p.seed + 1);
+  const hits = [];
+  let found = 0;
+  for(let b = 0; b < Math.ceil(p.hits / HIT_BATCH); b++){
+    const t0 = performance.now();
+    for(let i = 0; i < HIT_BATCH; i++) if(findTopObjectAt(rnd() * canvas.width, rnd() * canvas.height)) found++;
+    hits.push((performance.now() - t0) / HIT_BATCH * 1000);
+  }
+  metrics.hit_us = percentiles(hits);
+
+  const result = { build: p.build, label: p.label, scene: p.scene, objects: objs.length, found, metrics };
+  const lines = Object.entries(metrics).map(([k, m])=>k.padEnd(16) + ' p50 ' + m.p50 + '  p95 ' + m.p95 + '  p99 ' + m.p99);
+  say(lines.join('\n') + '\nPosting...');
+  try{
+    const r = await fetch('/bench/results', { method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(result) });
+    if(!r.ok) throw new Error('HTTP ' + r.status);
+    const ack = await r.json();
+    panel.textContent = lines.join('\n') + '\nSaved as ' + ack.browser + ', build ' + p.build + '\n';
+  }catch(err){
+    panel.textContent = lines.join('\n') + '\nCould not post results: ' + err + '\n';
+  }
+  const link = document.createElement('a');
+  link.href = '/bench/results?scene=' + encodeURIComponent(p.scene);
+  link.textContent = 'Compare with other runs';
+  panel.appendChild(link);
+}
@@ -0,0 +1,126 @@
+// Collaboration client for collab.py (loaded when Collaborate is first pressed)
+
+/////////////////////////
+// Collaboration
+// Joins a room on the collab.py server. Local edits go out as small ops (see collab.py for
+// the wire format); drag moves are coalesced per object and flushed at the server tick rate.
+// The server answers with a snapshot, then one ordered delta per tick that everyone applies,
+// including the sender (its own ops are no-ops by then).
+/////////////////////////
+const COLLAB_URL = HBLOCK.collabUrl || ('ws://' + location.hostname + ':5001');
+const COLLAB_FLUSH_MS = 1000/30;
+
+export function toggleCollab(){ if(collab) collabLeave(); else collabJoin(); }
+
+function collabJoin(){
+  const room = prompt('Room (project ID) to join:', projectId || '');
+  if(!room) return;
+  const ws = new WebSocket(COLLAB_URL);
+  // core.js only knows the session through these methods (see collabSend/collabAdd there)
+  collab = { ws, room, outbox: [], last: new Map(), timer: 0, index: new Map(), deferred: [], ready: false,
+             send: collabSend, add: collabAdd, resync: collabResync, leave: collabLeave };
+  ws.onopen = ()=>{ ws.send(JSON.stringify({t:'join', room})); };
+  ws.onmessage = (ev)=>{
+    const msg = JSON.parse(ev.data);
+    if(play){ collab.deferred.push(msg); return; }
+    collabReceive(msg);
+  };
+  ws.onclose = ()=>{
+    if(collab && collab.ws === ws){ collab = null; collabButton.textContent = 'Collaborate'; alert('Left collaboration room ' + room); }
+  };
+  collabButton.textContent = 'Leave ' + room;
+}
+
+function collabLeave(){
+  const ws = collab.ws;
+  clearTimeout(collab.timer);
+  collab = null;
+  collabButton.textContent = 'Collaborate';
+  ws.close();
+}
+
+function collabReceive(msg){
+  if(msg.t === 's'){
+    loadProject(msg.project);
+    projectId = collab.room;
+    collab.ready = true;
+    collabReindex();
+  } else if(msg.t === 'd'){
+    for(let op of msg.ops) collabApply(op);
+    drawAll();
+  }
+}
+
+// after play restores the editor arrays the index points at stale lists
+function collabResync(){
+  collabReindex();
+  const pending = collab.deferred;
+  collab.deferred = [];
+  for(let msg of pending) collabReceive(msg);
+}
+
+function collabReindex(){
+  collab.index.clear();
+  for(let w of windows) for(let o of w) collab.index.set(o.id, {list:w, obj:o});
+  for(let it of inventory) collab.index.set(it.id, {list:inventory, obj:it});
+}
+
+function collabApply(op){
+  const kind = op[0];
+  if(kind === 'm' || kind === 'e'){
+    const e = collab.index.get(op[1]);
+    // don't yank what the user is dragging right now back to an older echoed position
+    if(!e || e.obj === dragTarget || e.obj === zoneEditing || groupDrag && groupDrag.start.has(e.obj)) return;
+    if(kind === 'm'){ e.obj.x = op[2]; e.obj.y = op[3]; }
+    else {
+      Object.assign(e.obj, op[2]);
+      if(op[2].proto === null) Object.setPrototypeOf(e.obj, Object.prototype); // baked instance
+      if(op[2].rle) setTileData(e.obj); // painted or resized tile layer
+    }
+  } else if(kind === 'a'){
+    const obj = reviveObject(op[2]);
+    const list = op[1] === 'inv' ? inventory : windows[op[1]];
+    if(!list || collab.index.has(obj.id)) return;
+    list.push(obj);
+    collab.index.set(obj.id, {list, obj});
+  } else if(kind === 'd'){
+    const e = collab.index.get(op[1]);
+    if(!e) return;
+    collab.index.delete(op[1]);
+    const i = e.list.indexOf(e.obj);
+    if(i !== -1) e.list.splice(i, 1);
+    if(selection.has(e.obj)){ const next = new Set(selection); next.delete(e.obj); setSelection(next); }
+  } else if(kind === 'w'){
+    while(windows.length < op[1]) windows.push([]);
+    windowSlider.max = windows.length - 1;
+  }
+  viewIndexOp(op);
+}
+
+function collabAdd(where, obj){
+  if(!collab || play) return;
+  collab.index.set(obj.id, {list: where === 'inv' ? inventory : windows[where], obj});
+  collabSend(['a', where, obj]);
+}
+
+function collabSend(op){
+  if(!collab || play || !collab.ready) return;
+  if(op[0] === 'd') collab.index.delete(op[1]);
+  // a move replaces the previous queued move of the same object
+  const id = op[0] === 'a' ? op[2].id : op[1];
+  const i = collab.last.get(id);
+  if(op[0] === 'm' && i !== undefined && collab.outbox[i][0] === 'm') collab.outbox[i] = op;
+  else {
+    if(op[0] !== 'w') collab.last.set(id, collab.outbox.length);
+    collab.outbox.push(op);
+  }
+  if(!collab.timer) collab.timer = setTimeout(collabFlush, COLLAB_FLUSH_MS);
+}
+
+function collabFlush(){
+  if(!collab) return;
+  collab.timer = 0;
+  if(collab.outbox.length && collab.ws.readyState === WebSocket.OPEN) collab.ws.send(JSON.stringify(collab.outbox));
+  collab.outbox = [];
+  collab.last.clear();
+}
@@ -0,0 +1,1482 @@
+/*
+HBlock Editor — canvas core. Loaded first as a plain script; its top-level state and
+functions are globals, so the lazily imported modules (menus/, play.js, collab.js) use them directly.
+Data model:
+- windows: array of arrays. each window is list of objects.
+- object types: shape, text, eventZone; every object carries a unique id (newId) used by collaboration ops
+- inventory: array of inventory items (shapes)
+- tile layer: at most one {type:'tiles'} object per window, a grid of palette indices (see Tile layers)
+- prefab instances: shapes placed from the inventory hold { proto: <item id> } plus their own overrides (see Prefab instances)
+- playerSettings: { count, speed, controls } controls mapping action->keyString
+- events assigned to eventZones: zone.event = { type: "addShape"|"newWindow"|"inventoryEquip"|"addText"|"removeText", params: {...} }
+- play mode: fixed-timestep loop moves player shapes; collide/kill/eventZone bodies sit in a spatial hash
+- selection: shift-click / shift-drag a box to select shapes and texts, then move, scale, delete or copy them together
+- undo: edits record inverse ops (old values, deleted objects) in a byte-bounded history (see Undo / redo)
+- save: serializes name, windows, inventory, playerSettings
+  - images live once in a top-level assets table, objects hold "asset:<key>" refs
+  - saveFile() builds the .Hblock locally; saveToServer() stores it under projectId (GET /projects/<id>)
+*/
+
+/////////////////////////
+// editor state
+/////////////////////////
+let windows = [[]];          // array of windows (each window is array of objects)
+let currentWindow = 0;
+let inventory = [];          // stored shapes (objects)
+let playerSettings = { count:0, speed:5, controls: {} }; // controls: action->key
+let equipped = null;         // when equipping an inventory item (preview)
+let mobileTapBindings = {};  // inventoryIndex -> true (show mobile tap button)
+let mobileTapAssignedIndex = null; // which inventory item currently assigned to mobile button
+let eventZones = [];         // we also store zones inside windows but keep helper array if needed
+let projectId = null;        // server-side ID once the project has been saved to the server
+let projectName = null;      // display name in the server's project catalog; asked for on the first server save
+let play = null;             // play-mode runtime state while the game is running (see Play mode)
+let collab = null;           // collaboration session while joined to a room (see Collaboration)
+let tileBrush = null;        // {layer, value, from, to} while painting tiles
+const clientTag = Math.random().toString(36).slice(2, 8);
+let idCounter = 0;
+
+const canvas = document.getElementById('gameCanvas');
+const ctx = canvas.getContext('2d');
+const shapeMenu = document.getElementById('shapeMenu');
+const textMenu = document.getElementById('textMenu');
+const playerMenu = document.getElementById('playerMenu');
+const eventMenu = document.getElementById('eventMenu');
+const inventoryMenu = document.getElementById('inventoryMenu');
+const tileMenu = document.getElementById('tileMenu');
+const fileInput = document.getElementById('fileInput');
+const windowSlider = document.getElementById('windowSlider');
+const statusSpan = document.getElementById('status');
+const mobileTapButton = document.getElementById('mobileTapButton');
+const playButton = document.getElementById('playButton');
+const collabButton = document.getElementById('collabButton');
+const zoomButton = document.getElementById('zoomButton');
+const selectionBar = document.getElementById('selectionBar');
+
+let dragTarget = null;
+let dragOffset = {x:0,y:0};
+let dragStart = {x:0,y:0};
+let dragging = false;
+let maybeClickTarget = null;
+let clickMoved = false;
+const clickThreshold = 6;
+
+let zoneEditing = null; // eventZone being edited/resized
+let zoneResizeHandle = null;
+let panning = null;     // {sx, sy, x, y}: pointer and camera where a pan started
+
+// small helpers
+function objects() { return windows[currentWindow]; }
+function newId() { return clientTag + '-' + (idCounter++).toString(36); }
+function withNewId(obj) { obj.id = newId(); return obj; }
+function ensureIds() {
+  for(let w of windows) for(let o of w) if(!o.id) o.id = newId();
+  for(let it of inventory) if(!it.id) it.id = newId();
+}
+function clamp(v,a,b) { return Math.max(a, Math.min(b, v)); }
+
+/////////////////////////
+// Prefab instances
+// Placing an inventory item adds {id, type, proto:<item id>, x, y}; anything else set on it
+// (color, size, ...) is a per-instance override. The item is the instance's JS prototype, so
+// every property the instance doesn't set is read from the item when drawing, JSON.stringify
+// writes only the reference and overrides, and editing the item changes all its instances.
+/////////////////////////
+const PREFAB_ONLY = new Set(['id', 'proto', 'keyBinding', 'tapBinding']); // never copied out of an item
+
+function makeInstance(item, x, y){
+  return Object.assign(Object.create(item), { id:newId(), type:'shape', proto:item.id, x, y });
+}
+
+// parsed object -> instance linked to its item (returned unchanged if it isn't one)
+function linkInstance(o, byId){
+  const item = o.proto && (byId ? byId.get(o.proto) : inventory.find(it=>it.id === o.proto));
+  if(!item || Object.getPrototypeOf(o) === item) return o;
+  return Object.assign(Object.create(item), o);
+}
+
+// objects as parsed from a file or a collab message -> live objects (instances linked, tile grids decoded)
+function reviveObject(o, byId){
+  if(o.type === 'tiles') return makeTileLayer(o);
+  return linkInstance(o, byId);
+}
+
+function reviveAll(){
+  const byId = new Map(inventory.map(it=>[it.id, it]));
+  for(let w of windows) for(let i=0;i<w.length;i++) w[i] = reviveObject(w[i], byId);
+}
+
+// deep copy with the item's fields filled in, e.g. to capture an instance into the inventory
+function resolvedCopy(o){
+  const flat = {};
+  for(const k in o) if(!PREFAB_ONLY.has(k)) flat[k] = o[k];
+  return JSON.parse(JSON.stringify(flat));
+}
+
+// make an instance standalone (its item is going away); returns the props that changed
+function bakeInstance(o){
+  const patch = {};
+  for(const k in o) if(!Object.hasOwn(o, k) && !PREFAB_ONLY.has(k)) patch[k] = o[k];
+  undoProps(o, Object.keys(patch).concat('proto'));
+  Object.setPrototypeOf(o, Object.prototype);
+  Object.assign(o, JSON.parse(JSON.stringify(patch)), {proto: null});
+  return Object.assign(patch, {proto: null});
+}
+
+/////////////////////////
+// Tile layers
+// A tile layer is a cols x rows grid of palette indices in a Uint16Array (0 = empty,
+// i = palette[i-1]) drawn at x,y with square cells of `cell` px. Palette entries are
+// {color, image, collide, kill}. Files and collab ops carry the grid run-length encoded as
+// rle: [count, value, count, value, ...] (hblock.py has the same encoder).
+/////////////////////////
+function rleEncode(data){
+  const out = [];
+  for(let i=0; i<data.length; ){
+    const v = data[i];
+    let j = i + 1;
+    while(j < data.length && data[j] === v) j++;
+    out.push(j - i, v);
+    i = j;
+  }
+  return out;
+}
+
+function rleDecode(rle, n){
+  const data = new Uint16Array(n);
+  for(let k=0, i=0; k+1 < rle.length && i < n; k += 2){
+    const end = Math.min(n, i + rle[k]);
+    data.fill(rle[k+1], i, end);
+    i = end;
+  }
+  return data;
+}
+
+// the grid is a non-enumerable property, so copies and JSON.stringify go through here
+function tileLayerToJSON(){
+  const out = {};
+  for(const k in this) out[k] = this[k];
+  out.rle = rleEncode(this.data);
+  return out;
+}
+
+function makeTileLayer(props){
+  const t = Object.assign({ type:'tiles', x:0, y:0, cell:32, cols:0, rows:0, palette:[] }, props);
+  Object.defineProperty(t, 'data', { value: null, writable: true });
+  Object.defineProperty(t, 'toJSON', { value: tileLayerToJSON });
+  setTileData(t);
+  return t;
+}
+
+// decode t.rle (e.g. just assigned by a collab edit) into the grid
+function setTileData(t){
+  t.data = rleDecode(t.rle || [], t.cols * t.rows);
+  delete t.rle;
+}
+
+function tileLayerOf(list){
+  for(let o of list) if(o.type === 'tiles') return o;
+  return null;
+}
+
+// grid cell under a canvas point, clamped to the layer
+function tileCellAt(t, x, y){
+  return { c: clamp(Math.floor((x - t.x) / t.cell), 0, t.cols - 1), r: clamp(Math.floor((y - t.y) / t.cell), 0, t.rows - 1) };
+}
+
+// rectangular brush: fill the cells between two corners with one palette index
+function paintTiles(t, a, b, value){
+  const c0 = Math.min(a.c, b.c), c1 = Math.max(a.c, b.c);
+  undoProps(t, ['rle']);
+  for(let r = Math.min(a.r, b.r); r <= Math.max(a.r, b.r); r++) t.data.fill(value, r*t.cols + c0, r*t.cols + c1 + 1);
+  collabSend(['e', t.id, {rle: rleEncode(t.data)}]);
+  drawAll();
+}
+
+// draws only the cells inside the view box; runs of the same tile in a row are one fillRect
+function drawTileLayer(c, t, vx, vy, vw, vh){
+  const cell = t.cell, cols = t.cols, data = t.data;
+  const c0 = Math.max(0, Math.floor((vx - t.x) / cell)), c1 = Math.min(cols - 1, Math.floor((vx + vw - t.x) / cell));
+  const r0 = Math.max(0, Math.floor((vy - t.y) / cell)), r1 = Math.min(t.rows - 1, Math.floor((vy + vh - t.y) / cell));
+  for(let r = r0; r <= r1; r++){
+    const y = t.y + r*cell, base = r*cols;
+    for(let col = c0; col <= c1; ){
+      const v = data[base + col];
+      let end = col + 1;
+      while(end <= c1 && data[base + end] === v) end++;
+      const def = v && t.palette[v - 1];
+      if(def){
+        const img = def.image && cachedImage(def.image);
+        if(img && img.complete && img.naturalWidth){
+          for(let k = col; k < end; k++) c.drawImage(img, t.x + k*cell, y, cell, cell);
+        } else {
+          c.fillStyle = def.color || '#888';
+          c.fillRect(t.x + col*cell, y, (end - col)*cell, cell);
+        }
+      }
+      col = end;
+    }
+  }
+}
+
+/////////////////////////
+// Camera
+// The canvas is a view of an unbounded world: world point (x, y) is drawn at
+// ((x - camera.x) * zoom, (y - camera.y) * zoom). Pointer handlers and findTopObjectAt work in
+// world coordinates (eventPoint). The wheel (or a pinch) zooms around the pointer, dragging
+// empty canvas pans, the zoom button resets the view.
+/////////////////////////
+const MIN_ZOOM = 0.05, MAX_ZOOM = 8;
+let camera = { x: 0, y: 0, zoom: 1 };
+
+// world point under a pointer/mouse event
+function eventPoint(ev){
+  const rect = canvas.getBoundingClientRect();
+  return { x: camera.x + (ev.clientX - rect.left) / camera.zoom, y: camera.y + (ev.clientY - rect.top) / camera.zoom };
+}
+
+// the part of the world the canvas shows
+function viewBox(){
+  return { x: camera.x, y: camera.y, w: canvas.width / camera.zoom, h: canvas.height / camera.zoom };
+}
+
+// zoom by factor keeping the world point under canvas pixel (sx, sy) in place
+function zoomAt(sx, sy, factor){
+  const z = clamp(camera.zoom * factor, MIN_ZOOM, MAX_ZOOM);
+  camera.x += sx / camera.zoom - sx / z;
+  camera.y += sy / camera.zoom - sy / z;
+  camera.zoom = z;
+  zoomButton.textContent = Math.round(z * 100) + '%';
+  drawAll();
+}
+
+function resetView(){
+  camera = { x: 0, y: 0, zoom: 1 };
+  zoomButton.textContent = '100%';
+  drawAll();
+}
+
+canvas.addEventListener('wheel', (ev)=>{
+  ev.preventDefault();
+  const rect = canvas.getBoundingClientRect();
+  zoomAt(ev.clientX - rect.left, ev.clientY - rect.top, Math.exp(-ev.deltaY * (ev.deltaMode ? 0.05 : 0.0015)));
+}, { passive: false });
+
+/////////////////////////
+// View index
+// A grid over the current window's objects, so drawing and hit testing only look at the cells
+// the view (or the pointer) covers: frame cost follows what is visible, not the world size.
+// Tile layers are kept aside; they are their own grid. Like play mode's index it is rebuilt when
+// the window changes or loses objects, and appended to when objects are pushed. Moves and edits
+// reach it through the ops they already send to collaborators (collabSend and collab.js call
+// viewIndexOp), so an object is re-filed only when it changes.
+/////////////////////////
+const VIEW_CELL = 256;
+const VIEW_MAX_CELLS = 64;  // objects spanning more cells than this sit in one list that every query checks
+const TEXT_HIT_W = 200;     // approximate text width for hit testing
+let viewIndex = null;
+
+// world box an object draws into (text width is a generous guess)
+function objectBounds(o, b){
+  if(o.type === 'shape'){ b.x = o.x; b.y = o.y; b.w = b.h = o.size; }
+  else if(o.type === 'text'){
+    const size = o.size || 24;
+    b.x = o.x; b.y = o.y - size; b.h = size * 1.3;
+    b.w = Math.max(TEXT_HIT_W, (o.text || '').length * size * 0.7);
+  }
+  else if(o.type === 'eventZone'){ b.x = o.x; b.y = o.y; b.w = o.w; b.h = o.h; }
+  else return false;
+  return true;
+}
+
+function viewIndexBuild(){
+  const list = objects();
+  // entries: id -> {obj, i (list position), x, y, w, h, cell range, big, mark}
+  viewIndex = { list, count: 0, cells: new Map(), big: [], entries: new Map(), tiles: [], hits: [], mark: 0 };
+  viewIndexAppend();
+}
+
+// files objects pushed since the last build/append
+function viewIndexAppend(){
+  const vi = viewIndex, list = vi.list;
+  for(let i = vi.count; i < list.length; i++){
+    const o = list[i];
+    if(o.type === 'tiles'){ vi.tiles.push(o); continue; }
+    const e = { obj: o, i, x: 0, y: 0, w: 0, h: 0, c0: 0, r0: 0, c1: -1, r1: -1, big: false, mark: 0 };
+    if(!objectBounds(o, e)) continue;
+    vi.entries.set(o.id, e);
+    viewIndexFile(e);
+  }
+  vi.count = list.length;
+}
+
+function viewIndexFile(e){
+  const vi = viewIndex;
+  e.c0 = Math.floor(e.x / VIEW_CELL); e.c1 = Math.floor((e.x + e.w) / VIEW_CELL);
+  e.r0 = Math.floor(e.y / VIEW_CELL); e.r1 = Math.floor((e.y + e.h) / VIEW_CELL);
+  e.big = (e.c1 - e.c0 + 1) * (e.r1 - e.r0 + 1) > VIEW_MAX_CELLS;
+  if(e.big){ vi.big.push(e); return; }
+  for(let r = e.r0; r <= e.r1; r++){
+    for(let c = e.c0; c <= e.c1; c++){
+      const k = (c + 32768) * 65536 + (r + 32768);
+      let list = vi.cells.get(k);
+      if(!list) vi.cells.set(k, list = []);
+      list.push(e);
+    }
+  }
+}
+
+function viewIndexUnfile(e){
+  const vi = viewIndex;
+  const drop = (list)=>{ const i = list.indexOf(e); if(i !== -1){ list[i] = list[list.length - 1]; list.pop(); } };
+  if(e.big){ drop(vi.big); return; }
+  for(let r = e.r0; r <= e.r1; r++) for(let c = e.c0; c <= e.c1; c++){
+    const list = vi.cells.get((c + 32768) * 65536 + (r + 32768));
+    if(list) drop(list);
+  }
+}
+
+// an object's position or size changed
+function viewIndexTouch(o){
+  const e = viewIndex && viewIndex.entries.get(o.id);
+  if(!e || e.obj !== o) return;
+  objectBounds(o, e);
+  const moved = Math.floor(e.x / VIEW_CELL) !== e.c0 || Math.floor((e.x + e.w) / VIEW_CELL) !== e.c1 ||
+                Math.floor(e.y / VIEW_CELL) !== e.r0 || Math.floor((e.y + e.h) / VIEW_CELL) !== e.r1;
+  if(moved){ viewIndexUnfile(e); viewIndexFile(e); }
+}
+
+// ops as sent to / received from collaborators
+function viewIndexOp(op){
+  if(!viewIndex) return;
+  const e = (op[0] === 'm' || op[0] === 'e') && viewIndex.entries.get(op[1]);
+  if(e) viewIndexTouch(e.obj);
+  // an edited inventory item resizes its instances; a delete shifts list positions: rebuild on next use
+  else if(op[0] === 'd' || op[0] === 'e' && !viewIndex.tiles.some(t=>t.id === op[1])) viewIndex = null;
+}
+
+// entries overlapping the box, in draw order; the returned array is reused by the next query
+function viewQuery(x, y, w, h){
+  const list = objects();
+  if(!viewIndex || viewIndex.list !== list || list.length < viewIndex.count) viewIndexBuild();
+  else if(list.length > viewIndex.count) viewIndexAppend();
+  const vi = viewIndex, mark = ++vi.mark, hits = vi.hits;
+  hits.length = 0;
+  const take = (e)=>{
+    if(e.mark === mark) return;
+    e.mark = mark;
+    if(x <= e.x + e.w && x + w >= e.x && y <= e.y + e.h && y + h >= e.y) hits.push(e);
+  };
+  const c0 = Math.floor(x / VIEW_CELL), c1 = Math.floor((x + w) / VIEW_CELL);
+  const r0 = Math.floor(y / VIEW_CELL), r1 = Math.floor((y + h) / VIEW_CELL);
+  for(let r = r0; r <= r1; r++){
+    for(let c = c0; c <= c1; c++){
+      const cell = vi.cells.get((c + 32768) * 65536 + (r + 32768));
+      if(cell) for(const e of cell) take(e);
+    }
+  }
+  for(const e of vi.big) take(e);
+  hits.sort((a, b)=>a.i - b.i);
+  return hits;
+}
+
+/////////////////////////
+// Drawing
+/////////////////////////
+// decoded images keyed by data URL, so redraws never re-decode the same picture
+const imageCache = new Map();
+function cachedImage(src){
+  let img = imageCache.get(src);
+  if(!img){
+    img = new Image();
+    img.onload = () => drawAll();
+    img.src = src;
+    imageCache.set(src, img);
+  }
+  return img;
+}
+
+// fills one shape (or its image) at x,y; shared by drawAll, the equip preview and inventory thumbnails
+function drawShapeBody(c, o, x, y, size){
+  c.fillStyle = o.color || 'blue';
+  if(o.image){
+    let img = cachedImage(o.image);
+    if(img.complete && img.naturalWidth) c.drawImage(img, x, y, size, size);
+    else c.fillRect(x, y, size, size); // placeholder while loading
+  } else if(o.shape === 'circle'){
+    c.beginPath();
+    c.arc(x + size/2, y + size/2, size/2, 0, Math.PI*2);
+    c.fill();
+  } else if(o.shape === 'triangle'){
+    c.beginPath();
+    c.moveTo(x + size/2, y);
+    c.lineTo(x, y + size);
+    c.lineTo(x + size, y + size);
+    c.closePath();
+    c.fill();
+  } else if(o.shape === 'hexagon'){
+    c.beginPath();
+    let s = size/2;
+    let cx = x + s, cy = y + s;
+    for(let i=0;i<6;i++){
+      let a = Math.PI/3*i;
+      let px = cx + s*Math.cos(a), py = cy + s*Math.sin(a);
+      if(i===0) c.moveTo(px,py); else c.lineTo(px,py);
+    }
+    c.closePath();
+    c.fill();
+  } else {
+    c.fillRect(x, y, size, size);
+  }
+}
+
+// below this many screen px an object is drawn as a plain box (no path, image or overlays)
+const LOD_PX = 3;
+
+function drawAll(){
+  ctx.setTransform(1, 0, 0, 1, 0, 0);
+  ctx.clearRect(0,0,canvas.width,canvas.height);
+  // background white is already canvas background
+  const z = camera.zoom, view = viewBox();
+  ctx.setTransform(z, 0, 0, z, -camera.x * z, -camera.y * z);
+  // outlines and handles stick out of their objects by a few screen px
+  const pad = 6 / z;
+  const visible = viewQuery(view.x - pad, view.y - pad, view.w + 2*pad, view.h + 2*pad);
+  // tile layers are the background, whatever their place in the list
+  for(let t of viewIndex.tiles) drawTileLayer(ctx, t, view.x, view.y, view.w, view.h);
+  for(let e of visible){
+    const obj = e.obj;
+    if(obj.type === 'shape'){
+      if(obj.size * z < LOD_PX){
+        ctx.fillStyle = obj.image ? '#888' : (obj.color || 'blue');
+        ctx.fillRect(obj.x, obj.y, obj.size, obj.size);
+        continue;
+      }
+      drawShapeBody(ctx, obj, obj.x, obj.y, obj.size);
+
+      // overlay indicators for player/collide/kill
+      if(obj.player){
+        ctx.strokeStyle = '#FF0000';
+        ctx.lineWidth = 2 / z;
+        ctx.strokeRect(obj.x-2, obj.y-2, obj.size+4, obj.size+4);
+      } else if(obj.collide){
+        ctx.strokeStyle = '#0000FF';
+        ctx.lineWidth = 1.5 / z;
+        ctx.strokeRect(obj.x-2, obj.y-2, obj.size+4, obj.size+4);
+      }
+      if(obj.kill){
+        ctx.beginPath();
+        ctx.moveTo(obj.x, obj.y);
+        ctx.lineTo(obj.x+obj.size, obj.y+obj.size);
+        ctx.moveTo(obj.x+obj.size, obj.y);
+        ctx.lineTo(obj.x, obj.y+obj.size);
+        ctx.strokeStyle = '#000';
+        ctx.lineWidth = 1 / z;
+        ctx.stroke();
+      }
+
+    } else if(obj.type === 'text'){
+      ctx.fillStyle = obj.color || '#000';
+      const size = obj.size || 24;
+      if(size * z < LOD_PX){
+        // unreadable anyway: a bar where the line of text is
+        ctx.fillRect(obj.x, obj.y - size*0.7, Math.min(e.w, (obj.text || '').length * size * 0.5), size*0.5);
+        continue;
+      }
+      ctx.font = size + 'px Arial';
+      ctx.fillText(obj.text || '', obj.x, obj.y);
+    } else if(obj.type === 'eventZone'){
+      if(obj.visible){
+        ctx.strokeStyle = 'rgba(255,0,0,0.9)';
+        ctx.lineWidth = 2 / z;
+        ctx.strokeRect(obj.x, obj.y, obj.w, obj.h);
+        // corner handles, same size on screen at any zoom
+        ctx.fillStyle = 'rgba(255,0,0,0.9)';
+        let hs = 8 / z;
+        [[obj.x,obj.y],[obj.x+obj.w,obj.y],[obj.x,obj.y+obj.h],[obj.x+obj.w,obj.y+obj.h]].forEach(p=>{
+          ctx.fillRect(p[0]-hs/2, p[1]-hs/2, hs, hs);
+        });
+      }
+    }
+  }
+
+  if(selection.size && !play) drawSelection(view);
+
+  // brush rectangle while painting tiles
+  if(tileBrush && tileBrush.from){
+    const t = tileBrush.layer, a = tileBrush.from, b = tileBrush.to;
+    ctx.strokeStyle = 'rgba(0,120,255,0.9)';
+    ctx.lineWidth = 2 / z;
+    ctx.strokeRect(t.x + Math.min(a.c, b.c)*t.cell, t.y + Math.min(a.r, b.r)*t.cell,
+                   (Math.abs(a.c - b.c) + 1)*t.cell, (Math.abs(a.r - b.r) + 1)*t.cell);
+  }
+
+  // draw equipped preview following mouse if exists
+  if(equipped && equipped.previewPos){
+    ctx.save();
+    ctx.globalAlpha = 0.8;
+    let eq = equipped.item;
+    if(eq.type === 'shape') drawShapeBody(ctx, eq, equipped.previewPos.x, equipped.previewPos.y, eq.size);
+    ctx.restore();
+  }
+  ctx.setTransform(1, 0, 0, 1, 0, 0);
+}
+
+// pointer handlers ask for a redraw instead of drawing, so however fast events arrive there is
+// one draw (and one batch of selection moves) per frame
+let drawQueued = false;
+function requestDraw(){
+  if(drawQueued) return;
+  drawQueued = true;
+  requestAnimationFrame(()=>{
+    drawQueued = false;
+    selectionMoveFlush();
+    drawAll();
+  });
+}
+
+/////////////////////////
+// Utilities for hit testing
+/////////////////////////
+// x, y in world coordinates; only the objects filed under that point are tested
+function findTopObjectAt(x,y){
+  let hits = viewQuery(x, y, 0, 0);
+  for(let i=hits.length-1;i>=0;i--){
+    let o = hits[i].obj;
+    if(o.type === 'shape'){
+      if(x >= o.x && x <= o.x+o.size && y >= o.y && y <= o.y+o.size) return o;
+    } else if(o.type === 'text'){
+      // approximate bounding box
+      if(x >= o.x && x <= o.x+TEXT_HIT_W && y >= o.y - o.size && y <= o.y) return o;
+    } else if(o.type === 'eventZone'){
+      if(x >= o.x && x <= o.x+o.w && y >= o.y && y <= o.y+o.h) return o;
+    }
+  }
+  return null;
+}
+
+/////////////////////////
+// Selection
+// Shift-click toggles a shape or text; shift-drag on empty canvas draws a box that adds everything
+// it touches, found through the view index. Dragging a selected object moves the whole selection,
+// applied once per frame by requestDraw; the selection bar scales, deletes or copies it.
+/////////////////////////
+let selection = new Set();  // selected objects of the current window
+let rubberBand = null;      // {x0, y0, x1, y1, base} world box while shift-dragging; base: selection before it
+let groupDrag = null;       // {x0, y0, x, y, start: Map obj -> {x, y}} while moving the selection
+const selectionBounds = { x: 0, y: 0, w: 0, h: 0 };
+
+function selectable(o){ return o.type === 'shape' || o.type === 'text'; }
+
+function setSelection(objs){
+  selection = objs instanceof Set ? objs : new Set(objs);
+  selectionBar.style.display = selection.size ? 'flex' : 'none';
+  document.getElementById('selectionCount').textContent = selection.size + ' selected';
+  requestDraw();
+}
+
+function clearSelection(){ if(selection.size || rubberBand) { rubberBand = null; setSelection([]); } }
+
+function toggleSelected(o){
+  const next = new Set(selection);
+  if(next.has(o)) next.delete(o); else next.add(o);
+  setSelection(next);
+}
+
+function rubberBandBox(){
+  const b = rubberBand;
+  return { x: Math.min(b.x0, b.x1), y: Math.min(b.y0, b.y1), w: Math.abs(b.x1 - b.x0), h: Math.abs(b.y1 - b.y0) };
+}
+
+function rubberBandEnd(){
+  const box = rubberBandBox(), next = new Set(rubberBand.base);
+  for(const e of viewQuery(box.x, box.y, box.w, box.h)) if(selectable(e.obj)) next.add(e.obj);
+  rubberBand = null;
+  setSelection(next);
+}
+
+function drawSelection(view){
+  const z = camera.zoom, b = selectionBounds;
+  ctx.save();
+  ctx.setLineDash([4 / z, 3 / z]);
+  ctx.strokeStyle = 'rgba(0,120,255,0.9)';
+  ctx.lineWidth = 1.5 / z;
+  // one path for the whole selection, off-screen members left out
+  ctx.beginPath();
+  for(const o of selection){
+    if(!objectBounds(o, b)) continue;
+    if(b.x > view.x + view.w || b.y > view.y + view.h || b.x + b.w < view.x || b.y + b.h < view.y) continue;
+    ctx.rect(b.x - 3 / z, b.y - 3 / z, b.w + 6 / z, b.h + 6 / z);
+  }
+  ctx.stroke();
+  if(rubberBand){
+    const r = rubberBandBox();
+    ctx.fillStyle = 'rgba(0,120,255,0.08)';
+    ctx.fillRect(r.x, r.y, r.w, r.h);
+    ctx.strokeRect(r.x, r.y, r.w, r.h);
+  }
+  ctx.restore();
+}
+
+function groupDragStart(x, y){
+  const start = new Map();
+  for(const o of selection) start.set(o, { x: o.x, y: o.y });
+  groupDrag = { x0: x, y0: y, x, y, start, applied: true };
+}
+
+// move every selected object to where the pointer now says; called once per frame
+function selectionMoveFlush(){
+  if(!groupDrag || groupDrag.applied) return;
+  groupDrag.applied = true;
+  const dx = groupDrag.x - groupDrag.x0, dy = groupDrag.y - groupDrag.y0;
+  for(const [o, p] of groupDrag.start){
+    o.x = p.x + dx;
+    o.y = p.y + dy;
+    collabSend(['m', o.id, o.x, o.y]);
+  }
+}
+
+// scale the selection about the middle of its bounding box
+function scaleSelection(f){
+  let x0 = Infinity, y0 = Infinity, x1 = -Infinity, y1 = -Infinity;
+  const b = selectionBounds;
+  for(const o of selection){
+    if(!objectBounds(o, b)) continue;
+    x0 = Math.min(x0, b.x); y0 = Math.min(y0, b.y); x1 = Math.max(x1, b.x + b.w); y1 = Math.max(y1, b.y + b.h);
+  }
+  if(x0 > x1) return;
+  const cx = (x0 + x1) / 2, cy = (y0 + y1) / 2;
+  for(const o of selection){
+    undoProps(o, ['x', 'y', 'size']);
+    const size = Math.max(1, Math.round((o.size || (o.type === 'text' ? 24 : 50)) * f));
+    o.x = cx + (o.x - cx) * f;
+    o.y = cy + (o.y - cy) * f;
+    o.size = size;
+    collabSend(['e', o.id, { x: o.x, y: o.y, size }]);
+  }
+  requestDraw();
+}
+
+function deleteSelection(){
+  const list = objects();
+  undoDeletes(selection, list);
+  let j = 0;
+  for(const o of list) if(!selection.has(o)) list[j++] = o;   // one pass, not a splice per object
+  list.length = j;
+  for(const o of selection){
+    collabSend(['d', o.id]);
+    if(window.lastSelected === o) window.lastSelected = null;
+  }
+  setSelection([]);
+}
+
+// every distinct selected shape becomes one inventory item
+function selectionToInventory(){
+  const seen = new Set();
+  let added = 0;
+  for(const o of selection){
+    if(o.type !== 'shape') continue;
+    const copy = resolvedCopy(o);
+    delete copy.controls;
+    const key = JSON.stringify(Object.assign({}, copy, { id: 0, x: 0, y: 0 }));
+    if(seen.has(key)) continue;
+    seen.add(key);
+    inventory.push(withNewId(copy));
+    collabAdd('inv', copy);
+    added++;
+  }
+  statusSpan.textContent = 'Window ' + currentWindow + ' — ' + added + ' item' + (added === 1 ? '' : 's') + ' added to the inventory';
+  if(inventoryMenu.style.display === 'block') openInventoryMenu();
+}
+
+/////////////////////////
+// Undo / redo
+// Edits record the values they are about to replace, as inverse ops, just before changing them:
+//   ['e', id, {prop: old value}]      props (undefined: the prop was inherited from a prefab item)
+//   ['a', where, [objs], [positions]] put deleted objects back (where: window index or 'inv')
+//   ['d', [ids]]                      take added objects out again
+//   ['s', settings]                   restore playerSettings (a copy; not shared with collaborators)
+// Everything recorded in one task is one step (a delete that bakes instances, a player settings
+// apply); gestures record once, when they start moving, and inputs that fire per pixel (sliders,
+// colour pickers) pass a key so their events merge into one step while they keep coming.
+// Images are data URL strings, shared rather than copied, so a step only holds a reference (the
+// image cache keeps them anyway) and counts it as 8 bytes; past UNDO_BYTES the oldest steps go.
+// Undo and redo apply a step like a collab delta and send it on, so collaborators see them too.
+/////////////////////////
+const UNDO_BYTES = HBLOCK.undoBytes || 16 * 1024 * 1024;
+const UNDO_MERGE_MS = 1000;
+const undoButton = document.getElementById('undoButton');
+const redoButton = document.getElementById('redoButton');
+let undoStack = [], redoStack = [];  // steps: {ops, bytes, key, t, covered: Map id -> Set of props}
+let undoBytesUsed = 0;
+let undoOpen = null;                 // the step this task's records go to
+let undoApplying = false;            // replaying a step: its edits aren't recorded again
+
+// rough retained size; data URLs are references
+function undoSize(v){
+  if(typeof v === 'string') return v.startsWith('data:') ? 8 : 16 + 2 * v.length;
+  if(v === null || typeof v !== 'object') return 8;
+  if(ArrayBuffer.isView(v)) return v.byteLength;
+  let n = 16;
+  if(Array.isArray(v)){ for(const x of v) n += undoSize(x); return n; }
+  for(const k of Object.keys(v)) n += 8 + undoSize(v[k]);
+  if(v.type === 'tiles' && v.data) n += v.data.byteLength;   // the grid isn't enumerable
+  return n;
+}
+
+function undoButtons(){
+  undoButton.disabled = !undoStack.length;
+  redoButton.disabled = !redoStack.length;
+}
+
+function undoReset(){
+  undoStack = [];
+  redoStack = [];
+  undoBytesUsed = 0;
+  undoOpen = null;
+  undoButtons();
+}
+
+function undoPush(op, key){
+  if(play || undoApplying) return;
+  if(redoStack.length){
+    for(const step of redoStack) undoBytesUsed -= step.bytes;
+    redoStack = [];
+  }
+  let step = undoOpen;
+  if(!step){
+    const top = undoStack[undoStack.length - 1], now = performance.now();
+    if(key && top && top.covered && top.key === key && now - top.t < UNDO_MERGE_MS) step = top;
+    else {
+      if(top) top.covered = null;   // only the newest step can still take ops
+      step = { ops: [], bytes: 0, key, t: now, covered: new Map() };
+      undoStack.push(step);
+    }
+    step.t = now;
+    undoOpen = step;
+    queueMicrotask(()=>{ undoOpen = null; });
+  }
+  if(op[0] === 'e'){
+    // a step keeps the oldest value of every prop it touches
+    let seen = step.covered.get(op[1]);
+    if(!seen) step.covered.set(op[1], seen = new Set());
+    const props = {};
+    let fresh = false;
+    for(const k in op[2]) if(!seen.has(k)){ seen.add(k); props[k] = op[2][k]; fresh = true; }
+    if(!fresh) return;
+    op = ['e', op[1], props];
+  } else if(op[0] === 's' && step.ops.some(o=>o[0] === 's')) return;   // the oldest settings win too
+  const last = step.ops[step.ops.length - 1], bytes = undoSize(op);
+  if(op[0] === 'd' && last && last[0] === 'd') last[1].push(...op[1]);   // adds in a loop: one op
+  else step.ops.push(op);
+  step.bytes += bytes;
+  undoBytesUsed += bytes;
+  // the newest step stays even if it alone is over budget
+  while(undoBytesUsed > UNDO_BYTES && undoStack.length > 1) undoBytesUsed -= undoStack.shift().bytes;
+  undoButtons();
+}
+
+// what o[k] is now, as an 'e' op would restore it
+function undoValue(o, k){
+  if(k === 'rle') return rleEncode(o.data);
+  if(!Object.hasOwn(o, k)) return undefined;
+  const v = o[k];
+  // palettes are edited in place
+  return Array.isArray(v) ? v.map(e=>e && typeof e === 'object' ? Object.assign({}, e) : e) : v;
+}
+
+// call before changing o's props
+function undoProps(o, props, key){
+  const old = {};
+  for(const k of props) old[k] = undoValue(o, k);
+  undoPush(['e', o.id, old], key);
+}
+
+// call before changing playerSettings
+function undoSettings(){
+  undoPush(['s', structuredClone(playerSettings)]);
+}
+
+// call before removing objs from list; one pass finds where they sit
+function undoDeletes(objs, list){
+  const gone = objs instanceof Set ? objs : new Set(objs);
+  const found = [], at = [];
+  for(let i = 0; i < list.length; i++) if(gone.has(list[i])){ found.push(list[i]); at.push(i); }
+  if(found.length) undoPush(['a', list === inventory ? 'inv' : windows.indexOf(list), found, at]);
+}
+
+function undoListOf(where){ return where === 'inv' ? inventory : windows[where]; }
+
+// id -> {list, obj} for the objects a step refers to, in one pass over the project
+function undoLocate(step){
+  const want = new Set(), found = new Map();
+  for(const op of step.ops){
+    if(op[0] === 'e') want.add(op[1]);
+    else if(op[0] === 'd') for(const id of op[1]) want.add(id);
+  }
+  const scan = (list)=>{ for(const o of list) if(want.has(o.id)) found.set(o.id, {list, obj: o}); };
+  for(const w of windows) scan(w);
+  scan(inventory);
+  return found;
+}
+
+// references the editor keeps to objects that are no longer in the project
+function undoForget(gone){
+  for(const o of selection) if(gone.has(o)){ setSelection([...selection].filter(s=>!gone.has(s))); break; }
+  if(gone.has(window.lastSelected)) window.lastSelected = null;
+  if(gone.has(window.lastZone)) window.lastZone = null;
+  if(equipped && gone.has(equipped.item)) equipped = null;
+  if(tileBrush && gone.has(tileBrush.layer)) tileBrush = null;
+}
+
+// applies one op, pushing the ops that would reverse it onto inverse
+function undoApplyOp(op, at, inverse){
+  if(op[0] === 'e'){
+    const e = at.get(op[1]);
+    if(!e) return;   // a collaborator deleted it meanwhile
+    const o = e.obj, props = op[2], old = {}, sent = {};
+    for(const k in props) old[k] = undoValue(o, k);
+    if('proto' in props){
+      const item = props.proto && inventory.find(it=>it.id === props.proto);
+      Object.setPrototypeOf(o, item || Object.prototype);
+    }
+    for(const k in props){
+      if(props[k] === undefined) delete o[k]; else o[k] = props[k];
+      sent[k] = o[k];   // collaborators get inherited values as plain ones
+    }
+    if('rle' in props) setTileData(o);
+    const keys = Object.keys(props);
+    if(keys.length === 2 && 'x' in props && 'y' in props) collabSend(['m', o.id, o.x, o.y]);
+    else collabSend(['e', o.id, sent]);
+    inverse.push(['e', o.id, old]);
+  } else if(op[0] === 'a'){
+    const list = undoListOf(op[1]), objs = op[2], pos = op[3];
+    if(!list) return;
+    // merge from the back: positions are where each object ends up, ascending (past the end if
+    // collaborators have removed objects since)
+    let src = list.length - 1, k = objs.length - 1;
+    list.length += objs.length;
+    for(let dst = list.length - 1; k >= 0; dst--) list[dst] = dst <= pos[k] ? objs[k--] : list[src--];
+    for(const o of objs){ at.set(o.id, {list, obj: o}); collabAdd(op[1], o); }
+    viewIndex = null;
+    inverse.push(['d', objs.map(o=>o.id)]);
+  } else if(op[0] === 'd'){
+    const byList = new Map();
+    for(const id of op[1]){
+      const e = at.get(id);
+      if(!e) continue;
+      at.delete(id);
+      if(!byList.has(e.list)) byList.set(e.list, new Set());
+      byList.get(e.list).add(e.obj);
+    }
+    for(const [list, gone] of byList){
+      const objs = [], pos = [];
+      let j = 0;
+      for(let i = 0; i < list.length; i++){
+        const o = list[i];
+        if(gone.has(o)){ objs.push(o); pos.push(i); } else list[j++] = o;
+      }
+      list.length = j;
+      for(const o of objs) collabSend(['d', o.id]);
+      undoForget(gone);
+      inverse.push(['a', list === inventory ? 'inv' : windows.indexOf(list), objs, pos]);
+    }
+  } else if(op[0] === 's'){
+    inverse.push(['s', playerSettings]);
+    playerSettings = op[1];
+  }
+}
+
+// applies a step's ops newest first; returns the step that takes it back
+function undoApply(step){
+  const at = undoLocate(step), inverse = [];
+  undoApplying = true;
+  try {
+    for(let i = step.ops.length - 1; i >= 0; i--) undoApplyOp(step.ops[i], at, inverse);
+  } finally {
+    undoApplying = false;
+  }
+  // inventory positions may have moved under the mobile tap button
+  const tap = inventory.findIndex(it=>it.tapBinding);
+  mobileTapAssignedIndex = tap === -1 ? null : tap;
+  mobileTapButton.style.display = tap === -1 ? 'none' : 'inline-block';
+  if(tap !== -1) mobileTapButton.textContent = 'Tap (inv ' + tap + ')';
+  closeAllMenus();   // their inputs would show the old values
+  drawAll();
+  return { ops: inverse, bytes: undoSize(inverse), key: null, t: 0, covered: null };
+}
+
+function undo(){
+  if(play || !undoStack.length) return;
+  undoOpen = null;
+  const step = undoStack.pop(), back = undoApply(step);
+  undoBytesUsed += back.bytes - step.bytes;
+  redoStack.push(back);
+  undoButtons();
+}
+
+function redo(){
+  if(play || !redoStack.length) return;
+  undoOpen = null;
+  const step = redoStack.pop(), back = undoApply(step);
+  undoBytesUsed += back.bytes - step.bytes;
+  undoStack.push(back);
+  undoButtons();
+}
+
+/////////////////////////
+// Mouse / touch events: drag vs click logic
+/////////////////////////
+canvas.addEventListener('pointerdown', (ev)=>{
+  ev.preventDefault();
+  if(play) return;
+  const {x, y} = eventPoint(ev);
+  dragStart = {x,y};
+  clickMoved = false;
+  dragging = true;
+  if(tileBrush){
+    tileBrush.from = tileBrush.to = tileCellAt(tileBrush.layer, x, y);
+    drawAll();
+    return;
+  }
+
+  let top = findTopObjectAt(x,y);
+  dragTarget = maybeClickTarget = null;
+  if(ev.shiftKey && !equipped){
+    // shift: toggle what was clicked, or start a selection box on empty canvas
+    if(top && selectable(top)) toggleSelected(top);
+    else rubberBand = { x0: x, y0: y, x1: x, y1: y, base: new Set(selection) };
+    return;
+  }
+
+  // if editing a zone, check handles
+  if(top && top.type === 'eventZone' && top.visible){
+    // check corner handles (10 screen px)
+    let hs = 10 / camera.zoom;
+    let corners = [
+      {name:'tl', x:top.x, y:top.y},
+      {name:'tr', x:top.x+top.w, y:top.y},
+      {name:'bl', x:top.x, y:top.y+top.h},
+      {name:'br', x:top.x+top.w, y:top.y+top.h}
+    ];
+    for(let c of corners){
+      if(Math.abs(x-c.x) <= hs && Math.abs(y-c.y) <= hs){
+        zoneEditing = top;
+        zoneResizeHandle = c.name;
+        return;
+      }
+    }
+    // else select zone for dragging
+    if(top.type === 'eventZone'){
+      zoneEditing = top;
+      zoneResizeHandle = null;
+      dragOffset.x = x - top.x;
+      dragOffset.y = y - top.y;
+      return;
+    }
+  }
+
+  // otherwise select object for dragging: the whole selection if it is part of one
+  if(top && (top.type === 'shape' || top.type === 'text')){
+    maybeClickTarget = top;
+    if(selection.has(top) && selection.size > 1){ groupDragStart(x, y); return; }
+    if(!selection.has(top)) clearSelection();
+    dragTarget = top;
+    dragOffset.x = x - dragTarget.x;
+    dragOffset.y = y - dragTarget.y;
+  } else {
+    clearSelection();
+    // empty canvas: dragging pans (unless an item is equipped, then the preview follows)
+    if(!equipped) panning = { sx: ev.clientX, sy: ev.clientY, x: camera.x, y: camera.y };
+  }
+});
+
+canvas.addEventListener('pointermove', (ev)=>{
+  if(!dragging || play) return;
+  const {x, y} = eventPoint(ev);
+  if(panning){
+    const dx = ev.clientX - panning.sx, dy = ev.clientY - panning.sy;
+    if(!clickMoved && Math.abs(dx) + Math.abs(dy) < clickThreshold) return;
+    clickMoved = true;
+    camera.x = panning.x - dx / camera.zoom;
+    camera.y = panning.y - dy / camera.zoom;
+    requestDraw();
+    return;
+  }
+  if(rubberBand){
+    rubberBand.x1 = x;
+    rubberBand.y1 = y;
+    requestDraw();
+    return;
+  }
+  if(groupDrag){
+    if(!clickMoved) for(const o of groupDrag.start.keys()) undoProps(o, ['x', 'y']);
+    groupDrag.x = x;
+    groupDrag.y = y;
+    groupDrag.applied = false;
+    clickMoved = true;
+    requestDraw();
+    return;
+  }
+  if(tileBrush && tileBrush.from){
+    tileBrush.to = tileCellAt(tileBrush.layer, x, y);
+    requestDraw();
+    return;
+  }
+  if(zoneEditing){
+    // resize or move zoneEditing
+    if(zoneResizeHandle){
+      if(!clickMoved) undoProps(zoneEditing, ['x', 'y', 'w', 'h']);
+      // resize by handle name
+      if(zoneResizeHandle === 'tl'){
+        let newx = x, newy = y;
+        let oldr = zoneEditing.x + zoneEditing.w, oldb = zoneEditing.y + zoneEditing.h;
+        zoneEditing.x = Math.min(newx, oldr-10);
+        zoneEditing.y = Math.min(newy, oldb-10);
+        zoneEditing.w = oldr - zoneEditing.x;
+        zoneEditing.h = oldb - zoneEditing.y;
+      } else if(zoneResizeHandle === 'tr'){
+        let oldl = zoneEditing.x, oldb = zoneEditing.y + zoneEditing.h;
+        zoneEditing.y = Math.min(y, oldb-10);
+        zoneEditing.w = Math.max(10, x - zoneEditing.x);
+        zoneEditing.h = oldb - zoneEditing.y;
+      } else if(zoneResizeHandle === 'bl'){
+        let oldr = zoneEditing.x + zoneEditing.w, oldt = zoneEditing.y;
+        zoneEditing.x = Math.min(x, oldr-10);
+        zoneEditing.w = oldr - zoneEditing.x;
+        zoneEditing.h = Math.max(10, y - zoneEditing.y);
+      } else if(zoneResizeHandle === 'br'){
+        zoneEditing.w = Math.max(10, x - zoneEditing.x);
+        zoneEditing.h = Math.max(10, y - zoneEditing.y);
+      }
+      collabSend(['e', zoneEditing.id, {x:zoneEditing.x, y:zoneEditing.y, w:zoneEditing.w, h:zoneEditing.h}]);
+      requestDraw();
+      clickMoved = true;
+      return;
+    } else {
+      // dragging zone
+      if(!clickMoved) undoProps(zoneEditing, ['x', 'y']);
+      zoneEditing.x = x - dragOffset.x;
+      zoneEditing.y = y - dragOffset.y;
+      collabSend(['m', zoneEditing.id, zoneEditing.x, zoneEditing.y]);
+      requestDraw();
+      clickMoved = true;
+      return;
+    }
+  }
+
+  if(dragTarget){
+    // move object
+    if(!clickMoved) undoProps(dragTarget, ['x', 'y']);
+    dragTarget.x = x - dragOffset.x;
+    dragTarget.y = y - dragOffset.y;
+    collabSend(['m', dragTarget.id, dragTarget.x, dragTarget.y]);
+    requestDraw();
+    clickMoved = true;
+    return;
+  }
+
+  // if equipped preview, update preview pos
+  if(equipped){
+    equipped.previewPos = {x: x - (equipped.item.size||50)/2, y: y - (equipped.item.size||50)/2};
+    requestDraw();
+  }
+});
+
+canvas.addEventListener('pointerup', (ev)=>{
+  dragging = false;
+  panning = null;
+  if(play) return;
+  if(tileBrush && tileBrush.from){
+    paintTiles(tileBrush.layer, tileBrush.from, tileBrush.to, tileBrush.value);
+    tileBrush.from = tileBrush.to = null;
+    return;
+  }
+  if(rubberBand){
+    const {x, y} = eventPoint(ev);
+    rubberBand.x1 = x;
+    rubberBand.y1 = y;
+    rubberBandEnd();
+    return;
+  }
+  if(groupDrag){
+    selectionMoveFlush();   // the last position, even if its frame hasn't come yet
+    groupDrag = null;
+    if(!clickMoved && maybeClickTarget){
+      if(maybeClickTarget.type === 'shape') openShapeMenu(maybeClickTarget);
+      else openTextMenu(maybeClickTarget);
+    }
+    maybeClickTarget = null;
+    clickMoved = false;
+    return;
+  }
+  // if there was zone editing and we weren't moving significantly, maybe open zone menu on click
+  if(zoneEditing){
+    if(!clickMoved){
+      openZoneMenu(zoneEditing);
+    }
+    zoneEditing = null;
+    zoneResizeHandle = null;
+    return;
+  }
+
+  if(dragTarget){
+    // if mouse didn't move (a click) then treat as click: open menu
+    if(!clickMoved && maybeClickTarget){
+      if(maybeClickTarget.type === 'shape') openShapeMenu(maybeClickTarget);
+      else if(maybeClickTarget.type === 'text') openTextMenu(maybeClickTarget);
+    }
+  } else {
+    // if no object and equipped present and no big move, then place the equipped item
+    const {x, y} = eventPoint(ev);
+    if(equipped && !clickMoved){
+      // place an instance of the item, not a copy
+      let half = (equipped.item.size||50)/2;
+      let inst = makeInstance(equipped.item, x - half, y - half);
+      objects().push(inst);
+      collabAdd(currentWindow, inst);
+      // if the inventory item wanted to be removed on place, we could do that, but for now leave inventory untouched
+      equipped = null;
+      mobileTapButton.style.display = mobileTapAssignedIndex !== null ? 'inline-block' : 'none';
+      drawAll();
+    }
+  }
+
+  dragTarget = null;
+  maybeClickTarget = null;
+  clickMoved = false;
+});
+
+/////////////////////////
+// Create / Add items
+/////////////////////////
+function addShape(){
+  let obj = { id:newId(), type:'shape', x:camera.x + 120, y:camera.y + 120, size:80, color:'blue', shape:'square', image:null, player:false, collide:false, kill:false, speed:playerSettings.speed || 5, controls:{} };
+  objects().push(obj);
+  collabAdd(currentWindow, obj);
+  drawAll();
+}
+
+function addText(){
+  let obj = { id:newId(), type:'text', x:camera.x + 200, y:camera.y + 200, text:'Hello world', color:'#000000', size:28 };
+  objects().push(obj);
+  collabAdd(currentWindow, obj);
+  drawAll();
+}
+
+/////////////////////////
+// Menus: shared helpers
+/////////////////////////
+function closeAllMenus(){
+  [shapeMenu, textMenu, playerMenu, eventMenu, inventoryMenu, tileMenu].forEach(m => m.style.display = 'none');
+}
+
+function deleteObject(){
+  // find and remove current open-target by checking menus to see which object they reference (quick approach: capture last clicked object by maybeClickTarget)
+  // Simpler: allow delete of top-most object under the last click position by re-using maybeClickTarget or search selected shapes in proximity of menu
+  // For safety: remove last object in objects() that intersects with the menu left/top area
+  // But to make it reliable: we will store a lastSelected global whenever opening menus.
+  if(window.lastSelected){
+    let arr = objects();
+    let idx = arr.indexOf(window.lastSelected);
+    if(idx !== -1){ undoDeletes([window.lastSelected], arr); arr.splice(idx,1); collabSend(['d', window.lastSelected.id]); }
+    window.lastSelected = null;
+  }
+  closeAllMenus();
+  drawAll();
+}
+
+function escapeHtml(s){ return s.replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;'); }
+
+/////////////////////////
+// Lazy modules
+// Menus and tools are ES modules fetched on first use (URLs come fingerprinted in HBLOCK.modules).
+// Each exports its entry points and puts the functions its own markup calls from onclick on window.
+/////////////////////////
+const loadedModules = {};
+function loadModule(name){
+  if(!loadedModules[name]){
+    loadedModules[name] = import(HBLOCK.modules[name]).catch(err=>{
+      delete loadedModules[name]; // let the next click retry
+      alert('Failed to load ' + name + ': ' + err);
+      throw err;
+    });
+  }
+  return loadedModules[name];
+}
+function openShapeMenu(obj){ loadModule('shape').then(m=>m.openShapeMenu(obj)); }
+function openTextMenu(obj){ loadModule('text').then(m=>m.openTextMenu(obj)); }
+function openPlayerMenu(){ loadModule('player').then(m=>m.openPlayerMenu()); }
+function openEventMenu(){ loadModule('events').then(m=>m.openEventMenu()); }
+function openZoneMenu(zone){ loadModule('events').then(m=>m.openZoneMenu(zone)); }
+function openInventoryMenu(){ return loadModule('inventory').then(m=>m.openInventoryMenu()); }
+function openTileMenu(){ loadModule('tiles').then(m=>m.openTileMenu()); }
+function togglePlay(){ loadModule('play').then(m=>m.togglePlay()); }
+function toggleCollab(){ loadModule('collab').then(m=>m.toggleCollab()); }
+
+// opt-in timing of the hot paths (telemetry.js); remembered per browser
+function telemetryOptedIn(){
+  try{ return localStorage.getItem('hblockTelemetry') === '1'; }catch(e){ return false; }
+}
+function setTelemetry(on){
+  try{ localStorage.setItem('hblockTelemetry', on ? '1' : '0'); }catch(e){}
+  if(on || loadedModules.telemetry) loadModule('telemetry').then(m=>on ? m.startTelemetry() : m.stopTelemetry());
+}
+
+// collaboration hooks; no-ops unless collab.js has joined a room (adds are recorded for undo here)
+function collabSend(op){ viewIndexOp(op); if(collab) collab.send(op); }
+function collabAdd(where, obj){ undoPush(['d', [obj.id]]); if(collab) collab.add(where, obj); }
+
+/////////////////////////
+// Equip by key: when user presses a bound key assigned to inventory item, equip it
+/////////////////////////
+window.addEventListener('keydown', (e)=>{
+  if(play){ playKeyDown(e); return; }
+  if(tileBrush && e.key === 'Escape'){ tileBrush = null; statusSpan.textContent = 'Window ' + currentWindow; drawAll(); return; }
+  const typing = /^(INPUT|TEXTAREA|SELECT)$/.test(e.target && e.target.tagName);
+  if((e.ctrlKey || e.metaKey) && !typing){
+    const k = e.key.toLowerCase();
+    if(k === 'z' && !e.shiftKey){ e.preventDefault(); undo(); return; }
+    if(k === 'y' || k === 'z' && e.shiftKey){ e.preventDefault(); redo(); return; }
+  }
+  if(selection.size && !typing){
+    if(e.key === 'Delete' || e.key === 'Backspace'){ e.preventDefault(); deleteSelection(); return; }
+    if(e.key === 'Escape'){ clearSelection(); return; }
+  }
+  // check inventory key bindings
+  for(let i=0;i<inventory.length;i++){
+    if(inventory[i].keyBinding && e.key === inventory[i].keyBinding){
+      equipped = { item: inventory[i], previewPos: {x: camera.x + canvas.width/2/camera.zoom - inventory[i].size/2, y: camera.y + canvas.height/2/camera.zoom - inventory[i].size/2} };
+      drawAll();
+      return;
+    }
+  }
+  // other global shortcuts
+  if(e.key === 's' && (e.ctrlKey || e.metaKey)){ e.preventDefault(); saveFile(); }
+});
+
+function mobileTapEquip(ev){
+  ev.preventDefault();
+  if(mobileTapAssignedIndex === null) return;
+  let it = inventory[mobileTapAssignedIndex];
+  if(!it) return;
+  // equip it
+  equipped = { item: it, previewPos: {x: camera.x + canvas.width/2/camera.zoom - it.size/2, y: camera.y + canvas.height/2/camera.zoom - it.size/2} };
+  mobileTapButton.style.display = 'none';
+  drawAll();
+}
+
+/////////////////////////
+// Window management
+/////////////////////////
+function makeNewWindowFromMenu(){ windows.push([]); collabSend(['w', windows.length]); windowSlider.max = windows.length - 1; windowSlider.value = windows.length -1; switchWindow(windows.length-1); closeAllMenus(); }
+function switchWindow(n){ currentWindow = parseInt(n); tileBrush = null; clearSelection(); statusSpan.textContent = 'Window ' + currentWindow; drawAll(); }
+
+/////////////////////////
+// Save / Open .Hblock
+/////////////////////////
+// images are written once into "assets" and referenced as "asset:<key>" (see hblock.py)
+function projectPayload(){
+  const assets = {}, keys = new Map();
+  const packImage = (img)=>{
+    let key = keys.get(img);
+    if(key === undefined){ key = 'a' + keys.size; keys.set(img, key); assets[key] = img; }
+    return 'asset:' + key;
+  };
+  const isInline = (img)=>typeof img === 'string' && img.startsWith('data:');
+  const pack = (o)=>{
+    if(o.type === 'tiles'){
+      return Object.assign(o.toJSON(), {palette: o.palette.map(p=>isInline(p.image) ? Object.assign({}, p, {image: packImage(p.image)}) : p)});
+    }
+    // own image only: an instance's inherited one is written with its item
+    if(!Object.hasOwn(o, 'image') || !isInline(o.image)) return o;
+    return Object.assign({}, o, {image: packImage(o.image)});
+  };
+  return {
+    name: projectName,
+    windows: windows.map(w=>w.map(pack)),
+    inventory: inventory.map(pack),
+    playerSettings: playerSettings,
+    mobileTapAssignedIndex: mobileTapAssignedIndex,
+    assets: assets
+  };
+}
+
+function unpackAssets(data){
+  const assets = data.assets || {};
+  const unpack = (o)=>{
+    if(typeof o.image === 'string' && o.image.startsWith('asset:')) o.image = assets[o.image.slice(6)] || null;
+    if(o.type === 'tiles') (o.palette || []).forEach(unpack);
+  };
+  for(let w of data.windows || []) w.forEach(unpack);
+  (data.inventory || []).forEach(unpack);
+  delete data.assets;
+}
+
+// local save: build the .Hblock blob in the browser, no network round-trip
+function saveFile(){
+  const blob = new Blob([JSON.stringify(projectPayload())], {type:'application/octet-stream'});
+  downloadBlob(blob, 'project.Hblock');
+}
+
+function downloadBlob(blob, name){
+  const url = URL.createObjectURL(blob);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = name;
+  a.click();
+  setTimeout(()=>URL.revokeObjectURL(url), 0);
+}
+
+// projects bigger than this go up in resumable chunks (js/upload.js, uploads.py)
+const CHUNKED_SAVE_BYTES = 1024 * 1024;
+
+// persistent save: upload once, server keeps it under projectId and only acks
+function saveToServer(){
+  if(projectName === null) projectName = prompt('Project name (for finding it later):', '') || '';
+  const body = new Blob([JSON.stringify(projectPayload())], { type: 'application/json' });
+  statusSpan.textContent = 'Saving...';
+  let saved;
+  if(body.size > CHUNKED_SAVE_BYTES){
+    const progress = (sent, total)=>{ statusSpan.textContent = 'Saving... ' + Math.floor(100 * sent / total) + '%'; };
+    saved = loadModule('upload').then(m=>m.uploadProject(body, projectId, progress));
+  } else {
+    const url = '/save' + (projectId ? '?id=' + encodeURIComponent(projectId) : '');
+    saved = fetch(url, { method:'POST', headers: {'Content-Type':'application/json'}, body })
+      .then(r=>{ if(!r.ok) throw new Error('HTTP ' + r.status); return r.json(); });
+  }
+  saved
+    .then(ack=>{
+      projectId = ack.id;
+      statusSpan.textContent = 'Window ' + currentWindow + ' — saved as ' + ack.id + ' (' + ack.size + ' bytes)';
+    })
+    .catch(err=>{ statusSpan.textContent = 'Window ' + currentWindow; alert('Save failed: ' + err); });
+}
+
+function openFromServer(){
+  const id = prompt('Project ID to open:', projectId || '');
+  if(!id) return;
+  fetch('/projects/' + encodeURIComponent(id))
+    .then(r=>{ if(!r.ok) throw new Error('HTTP ' + r.status); return r.json(); })
+    .then(data=>{ loadProject(data); projectId = id; alert('Loaded project ' + id); })
+    .catch(err=>alert('Failed to open project: ' + err));
+}
+
+// standalone game: the server compiles the current project into one HTML file (see export.py)
+function exportGame(){
+  statusSpan.textContent = 'Exporting...';
+  fetch('/export', { method:'POST', headers: {'Content-Type':'application/json'}, body: JSON.stringify(projectPayload()) })
+    .then(r=>{ if(!r.ok) throw new Error('HTTP ' + r.status); return r.blob(); })
+    .then(blob=>{ statusSpan.textContent = 'Window ' + currentWindow; downloadBlob(blob, 'game.html'); })
+    .catch(err=>{ statusSpan.textContent = 'Window ' + currentWindow; alert('Export failed: ' + err); });
+}
+
+function openFile(){
+  fileInput.click();
+}
+function loadProject(data){
+  unpackAssets(data);
+  windows = data.windows || [[]];
+  inventory = data.inventory || [];
+  playerSettings = data.playerSettings || {count:0, speed:5, controls:{}};
+  mobileTapAssignedIndex = data.mobileTapAssignedIndex ?? null;
+  projectName = data.name ?? null;
+  camera = { x: 0, y: 0, zoom: 1 };
+  zoomButton.textContent = '100%';
+  equipped = null;
+  tileBrush = null;
+  clearSelection();
+  undoReset();
+  ensureIds();
+  reviveAll();
+  windowSlider.max = windows.length - 1;
+  windowSlider.value = 0;
+  currentWindow = 0;
+  statusSpan.textContent = 'Window ' + currentWindow;
+  // mobile button
+  if(mobileTapAssignedIndex !== null) { mobileTapButton.style.display = 'inline-block'; mobileTapButton.textContent = 'Tap (inv '+mobileTapAssignedIndex+')'; }
+  drawAll();
+}
+
+fileInput.addEventListener('change', (ev)=>{
+  const f = ev.target.files[0];
+  if(!f) return;
+  const r = new FileReader();
+  r.onload = (e)=>{
+    try{
+      if(collab) collab.leave(); // the room's copy and this file would diverge
+      loadProject(JSON.parse(e.target.result));
+      projectId = null; // a local file is not tied to a server copy
+      alert('Loaded .Hblock');
+    }catch(err){
+      alert('Failed to load file: ' + err);
+    }
+  }
+  r.readAsText(f);
+});
+
+/////////////////////////
+// Zone event trigger preview (simulate when clicking an invisible zone via a debug viewer)
+// We'll provide a simple "test trigger" tool: when events menu open, show zones visible and clicking triggers their event logic (editor-simulated)
+// For now, implement a simple function to trigger a zone manually (for debugging)
+/////////////////////////
+function triggerZone(zone){
+  if(!zone.event) { alert('Zone has no event assigned'); return; }
+  const ev = zone.event;
+  if(ev.type === 'addShape'){
+    const p = ev.params;
+    for(let i=0;i<(p.count||1);i++){
+      let s = { id:newId(), type:'shape', x: zone.x + 10 + i*10, y: zone.y + 10 + i*10, size: p.size || 50, color: p.color || '#00ff00', shape: 'square'};
+      objects().push(s);
+    }
+    drawAll();
+  } else if(ev.type === 'newWindow'){
+    windows.push([]);
+    windowSlider.max = windows.length-1;
+    switchWindow(windows.length-1);
+    drawAll();
+  } else if(ev.type === 'addInventory'){
+    const idx = ev.params.index;
+    if(inventory[idx]) inventory.push(withNewId(JSON.parse(JSON.stringify(inventory[idx]))));
+    drawAll();
+  } else if(ev.type === 'addText'){
+    const p = ev.params;
+    objects().push({ id:newId(), type:'text', x: zone.x + 10, y: zone.y + 30, text: p.text, color: p.color, size: p.size });
+    drawAll();
+  } else if(ev.type === 'removeText'){
+    // remove last text in this window
+    for(let i = objects().length-1; i>=0; i--){
+      if(objects()[i].type === 'text'){ objects().splice(i,1); break; }
+    }
+    drawAll();
+  }
+}
+
+/////////////////////////
+// UI helpers: open zone editor when clicking a zone (we do this by setting window.lastZone before opening)
+/////////////////////////
+canvas.addEventListener('click', (ev)=>{
+  if(play || tileBrush) return;
+  // find top object — if it's an eventZone (even if invisible and finalized) we should detect if the user had toggled zones visible
+  const {x, y} = eventPoint(ev);
+  let top = findTopObjectAt(x,y);
+  if(top && top.type === 'eventZone'){
+    window.lastZone = top;
+    openZoneMenu(top);
+  }
+});
+
+/////////////////////////
+// Startup
+/////////////////////////
+window.addEventListener('load', ()=>{
+  // friendly quick-start: add a blue square under Add Shape button description
+  // (not necessary but nice)
+  windowSlider.max = 0;
+  windowSlider.value = 0;
+  statusSpan.textContent = 'Window ' + currentWindow;
+  drawAll();
+  // /bench serves this page with benchmark settings (see bench.js); it decides about telemetry itself
+  if(HBLOCK.bench) loadModule('bench').then(m=>m.runBench(HBLOCK.bench));
+  else if(telemetryOptedIn()){ document.getElementById('telemetryToggle').checked = true; setTelemetry(true); }
+});
@@ -0,0 +1,195 @@
+// Events menu and event zone editor
+
+/////////////////////////
+// Events: create zone, finalize (make invisible), assign event
+/////////////////////////
+export function openEventMenu(){
+  closeAllMenus();
+  eventMenu.style.left = (canvas.getBoundingClientRect().left + 80) + 'px';
+  eventMenu.style.top = (canvas.getBoundingClientRect().top + 80) + 'px';
+  eventMenu.innerHTML = `
+    <h3>Events</h3>
+    <button onclick="createEventZone()" class="small">Select Event Activation (create zone)</button>
+    <button onclick="toggleZonesVisible()" class="small">Show/Hide Zones</button>
+    <button onclick="makeNewWindowFromMenu()" class="small">Make New Game Window</button>
+    <button onclick="addShapeToInventoryFromMenu()" class="small">Add Selected Shape To Inventory</button>
+    <div style="margin-top:8px;font-size:12px;color:#444">After creating a zone: drag to move, use corners to resize. Click zone to assign event. Finalize hides it (invisible).</div>
+    <div style="display:flex;gap:8px;margin-top:8px;">
+      <button onclick="closeAllMenus()" class="small">Close</button>
+    </div>
+  `;
+  eventMenu.style.display = 'block';
+}
+
+function createEventZone(){
+  // create an event zone object that is visible and editable
+  let z = { id:newId(), type:'eventZone', x:250, y:200, w:160, h:120, visible:true, finalized:false, event: null };
+  objects().push(z);
+  collabAdd(currentWindow, z);
+  drawAll();
+  closeAllMenus();
+  // zoneEditing will allow immediate resizing/moving by user because pointerdown logic handles it
+}
+
+function toggleZonesVisible(){
+  for(let w of windows){
+    for(let o of w) if(o.type === 'eventZone'){ undoProps(o, ['visible']); o.visible = !o.visible; collabSend(['e', o.id, {visible:o.visible}]); }
+  }
+  drawAll();
+}
+
+export function openZoneMenu(zone){
+  closeAllMenus();
+  shapeMenu.style.display = 'none';
+  // reuse shapeMenu to show zone options for simplicity
+  eventMenu.style.left = (canvas.getBoundingClientRect().left + 100) + 'px';
+  eventMenu.style.top = (canvas.getBoundingClientRect().top + 100) + 'px';
+  eventMenu.innerHTML = `
+    <h3>Event Zone</h3>
+    <label>Event:
+      <select id="zoneEventType">
+        <option value="">(none)</option>
+        <option value="addShape">Add Shape</option>
+        <option value="newWindow">Make New Window</option>
+        <option value="addInventory">Add Shape To Inventory</option>
+        <option value="addText">Add Text</option>
+        <option value="removeText">Remove Text</option>
+      </select>
+    </label>
+    <div id="zoneParams"></div>
+    <div style="display:flex;gap:6px;margin-top:8px;">
+      <button onclick="finalizeZone()" class="small">Finalize (make invisible)</button>
+      <button onclick="deleteEventZone()" class="small">Delete Zone</button>
+      <button onclick="closeAllMenus()" class="small">Close</button>
+    </div>
+  `;
+  // set currently assigned event
+  let sel = eventMenu.querySelector('#zoneEventType');
+  sel.value = zone.event ? zone.event.type : '';
+  sel.onchange = ()=>{ renderZoneParams(zone); }
+  renderZoneParams(zone);
+  eventMenu.style.display = 'block';
+}
+
+function renderZoneParams(zone){
+  const paramsDiv = eventMenu.querySelector('#zoneParams');
+  paramsDiv.innerHTML = '';
+  const type = eventMenu.querySelector('#zoneEventType').value;
+  if(type === 'addShape'){
+    paramsDiv.innerHTML = `
+      <label>Shape color <input id="zshapeColor" type="color" value="#00ff00"></label>
+      <label>Shape size <input id="zshapeSize" type="number" value="50"></label>
+      <label>How many to add? <input id="zshapeCount" type="number" value="1" min="1"></label>
+      <button onclick="assignZoneAddShape()">Assign</button>
+    `;
+  } else if(type === 'newWindow'){
+    paramsDiv.innerHTML = `<div style="font-size:13px">Creates a new game window and switches to it when event triggers.</div><button onclick="assignZoneNewWindow()">Assign</button>`;
+  } else if(type === 'addInventory'){
+    paramsDiv.innerHTML = `
+      <label>Choose inventory item index <input id="zInvIdx" type="number" min="0" max="${Math.max(0,inventory.length-1)}" value="0"></label>
+      <button onclick="assignZoneAddInventory()">Assign</button>
+    `;
+  } else if(type === 'addText'){
+    paramsDiv.innerHTML = `
+      <label>Text content <input id="zTextContent" type="text" value="Hello!"></label>
+      <label>Color <input id="zTextColor" type="color" value="#000000"></label>
+      <label>Size <input id="zTextSize" type="number" value="28"></label>
+      <button onclick="assignZoneAddText()">Assign</button>
+    `;
+  } else if(type === 'removeText'){
+    paramsDiv.innerHTML = `
+      <label>Remove most recent text? (yes removes one)</label>
+      <button onclick="assignZoneRemoveText()">Assign</button>
+    `;
+  } else {
+    paramsDiv.innerHTML = `<div style="font-size:12px;color:#333">Choose an event to assign to this zone.</div>`;
+    zone.event = null;
+  }
+}
+
+function assignZoneAddShape(){
+  let color = eventMenu.querySelector('#zshapeColor').value;
+  let size = parseInt(eventMenu.querySelector('#zshapeSize').value) || 50;
+  let count = parseInt(eventMenu.querySelector('#zshapeCount').value) || 1;
+  undoProps(window.lastZone, ['event']);
+  window.lastZone.event = { type:'addShape', params:{ color, size, count } };
+  collabSend(['e', window.lastZone.id, {event:window.lastZone.event}]);
+  alert('Zone assigned: addShape x'+count);
+  closeAllMenus();
+}
+
+function assignZoneNewWindow(){
+  undoProps(window.lastZone, ['event']);
+  window.lastZone.event = { type:'newWindow', params:{} };
+  collabSend(['e', window.lastZone.id, {event:window.lastZone.event}]);
+  alert('Zone assigned: newWindow');
+  closeAllMenus();
+}
+
+function assignZoneAddInventory(){
+  let idx = parseInt(eventMenu.querySelector('#zInvIdx').value) || 0;
+  if(!inventory[idx]) { alert('No inventory item at index '+idx); return; }
+  undoProps(window.lastZone, ['event']);
+  window.lastZone.event = { type:'addInventory', params:{ index: idx } };
+  collabSend(['e', window.lastZone.id, {event:window.lastZone.event}]);
+  alert('Zone assigned: add inventory item idx '+idx);
+  closeAllMenus();
+}
+
+function assignZoneAddText(){
+  let txt = eventMenu.querySelector('#zTextContent').value;
+  let color = eventMenu.querySelector('#zTextColor').value;
+  let size = parseInt(eventMenu.querySelector('#zTextSize').value) || 28;
+  undoProps(window.lastZone, ['event']);
+  window.lastZone.event = { type:'addText', params:{ text:txt, color, size } };
+  collabSend(['e', window.lastZone.id, {event:window.lastZone.event}]);
+  alert('Zone assigned: add text "'+txt+'"');
+  closeAllMenus();
+}
+
+function assignZoneRemoveText(){
+  undoProps(window.lastZone, ['event']);
+  window.lastZone.event = { type:'removeText', params:{} };
+  collabSend(['e', window.lastZone.id, {event:window.lastZone.event}]);
+  alert('Zone assigned: remove text');
+  closeAllMenus();
+}
+
+function finalizeZone(){
+  // finalize by setting finalized true and visible false
+  if(window.lastZone){
+    undoProps(window.lastZone, ['finalized', 'visible']);
+    window.lastZone.finalized = true;
+    window.lastZone.visible = false;
+    collabSend(['e', window.lastZone.id, {finalized:true, visible:false}]);
+    alert('Zone finalized (now invisible). You can still edit by using Events menu -> show zones -> click zone.');
+    closeAllMenus();
+    drawAll();
+  }
+}
+
+function deleteEventZone(){
+  if(window.lastZone){
+    let arr = objects();
+    let idx = arr.indexOf(window.lastZone);
+    if(idx !== -1){ undoDeletes([window.lastZone], arr); arr.splice(idx,1); collabSend(['d', window.lastZone.id]); }
+    window.lastZone = null;
+    closeAllMenus();
+    drawAll();
+  }
+}
+
+/////////////////////////
+// Add shape to inventory via Events menu: copies selected shape to inventory immediately
+/////////////////////////
+function addShapeToInventoryFromMenu(){
+  if(!window.lastSelected || window.lastSelected.type !== 'shape'){ alert('Select a shape and click "Add Selected Shape To Inventory"'); return;}
+  let copy = withNewId(resolvedCopy(window.lastSelected));
+  inventory.push(copy);
+  collabAdd('inv', copy);
+  alert('Added to inventory (idx ' + (inventory.length-1) + ')');
+  closeAllMenus();
+}
+
+// called from onclick="" in the markup built above
+Object.assign(window, { createEventZone, toggleZonesVisible, addShapeToInventoryFromMenu, finalizeZone, deleteEventZone, assignZoneAddShape, assignZoneNewWindow, assignZoneAddInventory, assignZoneAddText, assignZoneRemoveText });
@@ -0,0 +1,241 @@
+// Inventory menu
+// The list is virtualized: rows have a fixed height, only the ones inside the scroll viewport
+// exist in the DOM, and an edit re-renders just its own row. Thumbnails are drawn once per item
+// version (color/shape/image) into a small canvas and kept as PNG data URLs.
+
+/////////////////////////
+// Inventory
+/////////////////////////
+const ROW_H = 70;          // row i sits at top = i*ROW_H
+const LIST_H = 240;
+const OVERSCAN = 3;        // rows rendered beyond each edge of the viewport
+const THUMB = 40;
+
+let invList = null;        // scroll container while the menu is open
+let invSpacer = null;      // full-height child the rows are positioned in
+const rows = new Map();    // idx -> row element currently in the DOM
+const thumbs = new WeakMap(); // item -> { color, shape, image, url }
+let thumbCanvas = null;
+let scrollQueued = false;
+
+export function openInventoryMenu(){
+  closeAllMenus();
+  inventoryMenu.style.left = (canvas.getBoundingClientRect().left + 120) + 'px';
+  inventoryMenu.style.top = (canvas.getBoundingClientRect().top + 60) + 'px';
+  let html = `<h3>Inventory</h3><div id="invList" class="invList"><div id="invSpacer" class="invSpacer"></div></div>
+  <div id="invEdit"></div>
+  <div style="margin-top:8px;">
+    <button onclick="captureSelectedToInventory()" class="small">Capture Selected Shape Into Inventory</button>
+    <button onclick="closeAllMenus()" class="small">Close</button>
+  </div>
+  <div style="margin-top:6px;font-size:12px;color:#333">Assign a keyboard key or mobile tap to equip an inventory item.</div>`;
+  inventoryMenu.innerHTML = html;
+  invList = inventoryMenu.querySelector('#invList');
+  invSpacer = inventoryMenu.querySelector('#invSpacer');
+  rows.clear();
+  invList.onscroll = ()=>{
+    if(scrollQueued) return;
+    scrollQueued = true;
+    requestAnimationFrame(()=>{ scrollQueued = false; renderRows(); });
+  };
+  invList.onclick = onRowClick;
+  renderRows();
+  inventoryMenu.style.display = 'block';
+}
+
+// make the DOM hold exactly the rows in (or near) the viewport
+function renderRows(){
+  if(!invList) return;
+  const n = inventory.length;
+  invSpacer.style.height = (n * ROW_H) + 'px';
+  invList.style.height = Math.min(LIST_H, Math.max(1, n) * ROW_H) + 'px';
+  const first = Math.max(0, Math.floor(invList.scrollTop / ROW_H) - OVERSCAN);
+  const last = Math.min(n - 1, Math.ceil((invList.scrollTop + LIST_H) / ROW_H) + OVERSCAN);
+  for(const [idx, row] of rows){
+    if(idx < first || idx > last){ row.remove(); rows.delete(idx); }
+  }
+  for(let idx = first; idx <= last; idx++){
+    if(rows.has(idx)) continue;
+    const row = document.createElement('div');
+    row.className = 'invItem invRow';
+    row.dataset.idx = idx;
+    row.style.top = (idx * ROW_H) + 'px';
+    row.innerHTML = rowHtml(idx);
+    rows.set(idx, row);
+    invSpacer.appendChild(row);
+  }
+}
+
+function updateRow(idx){
+  const row = rows.get(idx);
+  if(row) row.innerHTML = rowHtml(idx);
+}
+
+// indices from idx on have shifted (removal): drop those rows and let renderRows rebuild them
+function rowsShiftedFrom(idx){
+  for(const [i, row] of rows){
+    if(i >= idx){ row.remove(); rows.delete(i); }
+  }
+  renderRows();
+}
+
+function rowHtml(idx){
+  const it = inventory[idx];
+  const url = thumbnail(it);
+  return `<div class="invThumb">${url ? '<img src="'+url+'" width="'+THUMB+'" height="'+THUMB+'">' : ''}</div>
+      <div style="display:flex;flex-direction:column;">
+        <div>Idx ${idx}</div>
+        <div style="display:flex;gap:6px;margin-top:4px;">
+          <button data-act="edit" class="tiny">Edit</button>
+          <button data-act="key" class="tiny">Assign Key</button>
+          <button data-act="tap" class="tiny">Assign Tap</button>
+          <button data-act="remove" class="tiny">Remove</button>
+        </div>
+        <div style="font-size:12px;color:#666;margin-top:4px">Key: ${escapeHtml(it.keyBinding || '(none)')} Tap: ${it.tapBinding? 'yes' : 'no'}</div>
+      </div>`;
+}
+
+const ROW_ACTIONS = { edit: editInventoryItem, key: assignKeyToInventory, tap: assignTapToInventory, remove: removeInventory };
+
+function onRowClick(e){
+  const btn = e.target.closest('button[data-act]');
+  if(!btn) return;
+  ROW_ACTIONS[btn.dataset.act](parseInt(btn.closest('.invRow').dataset.idx));
+}
+
+// small bitmap for an item, redrawn only when what it shows has changed
+function thumbnail(it){
+  let t = thumbs.get(it);
+  if(t && t.color === it.color && t.shape === it.shape && t.image === it.image) return t.url;
+  if(it.image){
+    const img = cachedImage(it.image);
+    if(!(img.complete && img.naturalWidth)){
+      img.addEventListener('load', ()=>{ const i = inventory.indexOf(it); if(i !== -1) updateRow(i); }, {once:true});
+      return null; // empty box until the image has decoded
+    }
+  }
+  if(!thumbCanvas){ thumbCanvas = document.createElement('canvas'); thumbCanvas.width = thumbCanvas.height = THUMB; }
+  const g = thumbCanvas.getContext('2d');
+  g.clearRect(0, 0, THUMB, THUMB);
+  const pad = it.image ? 0 : 8;
+  drawShapeBody(g, it, pad, pad, THUMB - pad*2);
+  t = { color: it.color, shape: it.shape, image: it.image, url: thumbCanvas.toDataURL() };
+  thumbs.set(it, t);
+  return t.url;
+}
+
+function captureSelectedToInventory(){
+  // capture lastSelected shape into inventory
+  if(!window.lastSelected || window.lastSelected.type !== 'shape'){ alert('Select a shape first (click it)'); return; }
+  let copy = withNewId(resolvedCopy(window.lastSelected));
+  // trim runtime-only props
+  delete copy.controls;
+  inventory.push(copy);
+  collabAdd('inv', copy);
+  renderRows();
+  if(invList) invList.scrollTop = inventory.length * ROW_H;
+}
+
+export function editInventoryItem(idx){
+  let it = inventory[idx];
+  let placed = 0;
+  for(let w of windows) for(let o of w) if(o.proto === it.id) placed++;
+  // small edit panel under the list
+  inventoryMenu.querySelector('#invEdit').innerHTML = `
+    <div style="margin-top:8px;">
+      <label>Color <input type="color" id="invColor" value="${it.color || '#00ff00'}"></label>
+      <label>Size <input type="number" id="invSize" value="${it.size || 60}"></label>
+      <label>Shape <select id="invShape">
+        <option value="square">Square</option>
+        <option value="circle">Circle</option>
+        <option value="triangle">Triangle</option>
+        <option value="hexagon">Hexagon</option>
+      </select></label>
+      <label>Import Image <input type="file" id="invImage" accept="image/*"></label>
+      <div style="font-size:12px;color:#666;margin-top:4px">Changes apply to ${placed} placed instance${placed === 1 ? '' : 's'}.</div>
+      <div style="display:flex;gap:6px;margin-top:6px;">
+        <button onclick="applyInventoryEdit(${idx})" class="small">Apply</button>
+        <button onclick="closeInventoryEdit()" class="small">Cancel</button>
+      </div>
+    </div>
+  `;
+  inventoryMenu.querySelector('#invShape').value = it.shape || 'square';
+  inventoryMenu.querySelector('#invImage').onchange = (ev)=>{ let f = ev.target.files[0]; let r = new FileReader(); r.onload=()=>{ undoProps(it, ['image']); it.image = r.result; collabSend(['e', it.id, {image:it.image}]); updateRow(inventory.indexOf(it)); drawAll(); }; r.readAsDataURL(f); }
+}
+
+function closeInventoryEdit(){
+  inventoryMenu.querySelector('#invEdit').innerHTML = '';
+}
+
+function applyInventoryEdit(idx){
+  let it = inventory[idx];
+  undoProps(it, ['color', 'size', 'shape']);
+  it.color = inventoryMenu.querySelector('#invColor').value;
+  it.size = parseInt(inventoryMenu.querySelector('#invSize').value) || it.size;
+  it.shape = inventoryMenu.querySelector('#invShape').value;
+  collabSend(['e', it.id, {color:it.color, size:it.size, shape:it.shape}]);
+  closeInventoryEdit();
+  updateRow(idx);
+  drawAll(); // instances follow their item
+}
+
+function assignKeyToInventory(idx){
+  alert('Press a key now to assign to inventory index '+idx+'. Press Escape to cancel.');
+  function handler(e){
+    if(e.key === 'Escape'){ window.removeEventListener('keydown', handler); alert('Cancelled'); return; }
+    undoProps(inventory[idx], ['keyBinding']);
+    inventory[idx].keyBinding = e.key;
+    collabSend(['e', inventory[idx].id, {keyBinding:e.key}]);
+    window.removeEventListener('keydown', handler);
+    updateRow(idx);
+  }
+  window.addEventListener('keydown', handler);
+}
+
+function assignTapToInventory(idx){
+  // assign the mobile tap to this index (only one tap button allowed)
+  // toggle assignment
+  const previous = mobileTapAssignedIndex;
+  if(previous !== null && previous !== idx) undoProps(inventory[previous], ['tapBinding']);
+  undoProps(inventory[idx], ['tapBinding']);
+  if(mobileTapAssignedIndex === idx){
+    mobileTapAssignedIndex = null;
+    mobileTapButton.style.display = 'none';
+    inventory[idx].tapBinding = false;
+    collabSend(['e', inventory[idx].id, {tapBinding:false}]);
+  } else {
+    // clear previous
+    if(mobileTapAssignedIndex !== null){
+      inventory[mobileTapAssignedIndex].tapBinding = false;
+      collabSend(['e', inventory[mobileTapAssignedIndex].id, {tapBinding:false}]);
+    }
+    mobileTapAssignedIndex = idx;
+    inventory[idx].tapBinding = true;
+    collabSend(['e', inventory[idx].id, {tapBinding:true}]);
+    mobileTapButton.style.display = 'inline-block';
+    mobileTapButton.textContent = 'Tap (inv '+idx+')';
+  }
+  if(previous !== null && previous !== idx) updateRow(previous);
+  updateRow(idx);
+}
+
+function removeInventory(idx){
+  const it = inventory[idx];
+  // placed instances keep their look as standalone shapes
+  for(let w of windows) for(let o of w) if(o.proto === it.id) collabSend(['e', o.id, bakeInstance(o)]);
+  if(equipped && equipped.item === it) equipped = null;
+  undoDeletes([it], inventory);
+  collabSend(['d', it.id]);
+  inventory.splice(idx,1);
+  // keep the mobile tap binding pointing at the same item
+  if(mobileTapAssignedIndex === idx){ mobileTapAssignedIndex = null; mobileTapButton.style.display = 'none'; }
+  else if(mobileTapAssignedIndex !== null && mobileTapAssignedIndex > idx){
+    mobileTapAssignedIndex--;
+    mobileTapButton.textContent = 'Tap (inv '+mobileTapAssignedIndex+')';
+  }
+  closeInventoryEdit();
+  rowsShiftedFrom(idx);
+}
+
+// called from onclick="" in the markup built above
+Object.assign(window, { captureSelectedToInventory, applyInventoryEdit, closeInventoryEdit });
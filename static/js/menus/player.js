@@ -0,0 +1,79 @@
+// Player settings menu
+
+/////////////////////////
+// Player settings menu
+/////////////////////////
+export function openPlayerMenu(){
+  closeAllMenus();
+  playerMenu.style.left = (canvas.getBoundingClientRect().left + 60) + 'px';
+  playerMenu.style.top = (canvas.getBoundingClientRect().top + 60) + 'px';
+  playerMenu.innerHTML = `
+    <h3>Player Settings</h3>
+    <label>How many players? <input id="playerCount" type="number" min="1" max="10" value="${playerSettings.count || 0}"></label>
+    <label>Default player speed <input id="playerSpeed" type="number" value="${playerSettings.speed || 5}"></label>
+    <div style="margin-top:6px;">Assign Controls (press a key after clicking action):</div>
+    <div style="display:flex;gap:6px;flex-wrap:wrap;margin-top:6px;">
+      <button class="tiny" onclick="assignControl('jump')">Jump</button>
+      <button class="tiny" onclick="assignControl('noGravityJump')">NoGravityJump</button>
+      <button class="tiny" onclick="assignControl('right')">Right</button>
+      <button class="tiny" onclick="assignControl('left')">Left</button>
+      <button class="tiny" onclick="assignControl('up')">Up</button>
+      <button class="tiny" onclick="assignControl('down')">Down</button>
+    </div>
+    <div style="display:flex;gap:8px;margin-top:8px;">
+      <button onclick="applyPlayerSettings()" class="small">Apply</button>
+      <button onclick="closeAllMenus()" class="small">Close</button>
+    </div>
+    <div style="margin-top:8px;font-size:12px;color:#444">Current key bindings: <pre id="bindingsPre" style="display:inline-block;margin:0">${JSON.stringify(playerSettings.controls)}</pre></div>
+  `;
+  playerMenu.style.display = 'block';
+}
+
+function applyPlayerSettings(){
+  const cnt = parseInt(playerMenu.querySelector('#playerCount').value) || 0;
+  const spd = parseFloat(playerMenu.querySelector('#playerSpeed').value) || 5;
+  undoSettings();
+  playerSettings.count = clamp(cnt,1,10);
+  playerSettings.speed = spd;
+  // create that many player shapes if not present (simple approach: append new players)
+  // first, remove existing player flags from shapes so duplicates aren't created automatically
+  // We'll create N players placed at top-left spaced apart
+  // Remove previous player shapes of the current window to avoid doubling
+  // But user expects global number of players => create players in current window
+  // For simplicity we will append players until count reached (per current window)
+  let existingPlayers = objects().filter(o=>o.type==='shape' && o.player);
+  if(existingPlayers.length < playerSettings.count){
+    let toAdd = playerSettings.count - existingPlayers.length;
+    for(let i=0;i<toAdd;i++){
+      let p = {id:newId(), type:'shape', x:20+80*i, y:20, size:60, color:'#ff4d4d', shape:'square', player:true, speed:playerSettings.speed, controls: {}};
+      objects().push(p);
+      collabAdd(currentWindow, p);
+    }
+  } else if(existingPlayers.length > playerSettings.count){
+    // turn extras into non-player shapes (or remove them). We'll simply set player=false on extras.
+    let extras = existingPlayers.slice(playerSettings.count);
+    for(let ex of extras){ undoProps(ex, ['player']); ex.player = false; collabSend(['e', ex.id, {player:false}]); }
+  }
+  // apply speed to all players
+  for(let o of objects()) if(o.player){ undoProps(o, ['speed']); o.speed = playerSettings.speed; collabSend(['e', o.id, {speed:o.speed}]); }
+  closeAllMenus();
+  drawAll();
+}
+
+function assignControl(action){
+  closeAllMenus();
+  playerMenu.style.display = 'block';
+  playerMenu.querySelector('#bindingsPre').textContent = JSON.stringify(playerSettings.controls);
+  alert("Press a key now to bind '"+action+"' (press Esc to cancel).");
+  function handler(e){
+    if(e.key === 'Escape'){ window.removeEventListener('keydown', handler); alert('Cancelled'); return; }
+    undoSettings();
+    playerSettings.controls[action] = e.key;
+    window.removeEventListener('keydown', handler);
+    playerMenu.querySelector('#bindingsPre').textContent = JSON.stringify(playerSettings.controls);
+  }
+  window.addEventListener('keydown', handler);
+}
+
+// called from onclick="" in the markup built above
+Object.assign(window, { applyPlayerSettings, assignControl });
@@ -0,0 +1,75 @@
+// Shape options menu (opened by clicking a shape)
+
+export function openShapeMenu(obj){
+  window.lastSelected = obj;
+  const protoIdx = obj.proto ? inventory.findIndex(it=>it.id === obj.proto) : -1;
+  closeAllMenus();
+  shapeMenu.style.left = (canvas.getBoundingClientRect().left + 20) + 'px';
+  shapeMenu.style.top = (canvas.getBoundingClientRect().top + 20) + 'px';
+  shapeMenu.innerHTML = `
+    <h3>Shape Options</h3>
+    <label>Color <input id="shapeColor" type="color" value="${obj.color || '#0000ff'}"></label>
+    <label>Shape
+      <select id="shapeType">
+        <option value="square">Square</option>
+        <option value="circle">Circle</option>
+        <option value="triangle">Triangle</option>
+        <option value="hexagon">Hexagon</option>
+      </select>
+    </label>
+    <label>Import Image <input id="shapeImage" type="file" accept="image/*"></label>
+    <div style="display:flex;gap:6px;margin-top:8px;">
+      <button class="small" id="makePlayerBtn">${obj.player? 'Player ✓' : 'Make Player'}</button>
+      <button class="small" id="makeCollideBtn">${obj.collide? 'Collide ✓' : 'Make Collideable'}</button>
+      <button class="small" id="makeKillBtn">${obj.kill? 'Kill ✓' : 'Make Kill'}</button>
+    </div>
+    <label>Size <input id="shapeSize" type="range" min="20" max="300" value="${obj.size}"></label>
+    ${protoIdx !== -1 ? `<div style="font-size:12px;color:#444;margin-top:6px;">Instance of inventory item ${protoIdx}; changes here only affect this one.
+      <button class="tiny" id="editPrefabBtn">Edit Prefab</button> <button class="tiny" id="detachBtn">Detach</button></div>` : ''}
+    <div style="display:flex;gap:6px;margin-top:8px;">
+      <button onclick="deleteObject()" class="small">Delete</button>
+      <button onclick="closeAllMenus()" class="small">Close</button>
+    </div>
+  `;
+  shapeMenu.querySelector('#shapeType').value = obj.shape || 'square';
+  shapeMenu.querySelector('#shapeColor').oninput = (e)=>{ undoProps(obj, ['color'], 'color:' + obj.id); obj.color = e.target.value; collabSend(['e', obj.id, {color:obj.color}]); drawAll(); }
+  shapeMenu.querySelector('#shapeType').onchange = (e)=>{ undoProps(obj, ['shape', 'image']); obj.shape = e.target.value; obj.image = null; collabSend(['e', obj.id, {shape:obj.shape, image:null}]); drawAll(); }
+  shapeMenu.querySelector('#shapeSize').oninput = (e)=>{ undoProps(obj, ['size'], 'size:' + obj.id); obj.size = parseInt(e.target.value); collabSend(['e', obj.id, {size:obj.size}]); drawAll(); }
+  shapeMenu.querySelector('#shapeImage').onchange = (ev)=>{
+    let f = ev.target.files[0];
+    let r = new FileReader();
+    r.onload = ()=>{ undoProps(obj, ['image']); obj.image = r.result; collabSend(['e', obj.id, {image:obj.image}]); drawAll(); }
+    r.readAsDataURL(f);
+  }
+  shapeMenu.querySelector('#makePlayerBtn').onclick = ()=>{
+    undoProps(obj, ['player', 'collide', 'kill']);
+    obj.player = !obj.player;
+    if(obj.player){ obj.collide = false; obj.kill = false; }
+    collabSend(['e', obj.id, {player:obj.player, collide:obj.collide, kill:obj.kill}]);
+    openShapeMenu(obj); // refresh
+  }
+  shapeMenu.querySelector('#makeCollideBtn').onclick = ()=>{
+    undoProps(obj, ['player', 'collide']);
+    obj.collide = !obj.collide;
+    if(obj.collide) obj.player = false;
+    collabSend(['e', obj.id, {player:obj.player, collide:obj.collide}]);
+    openShapeMenu(obj);
+  }
+  shapeMenu.querySelector('#makeKillBtn').onclick = ()=>{
+    undoProps(obj, ['player', 'kill']);
+    obj.kill = !obj.kill;
+    if(obj.kill) obj.player = false;
+    collabSend(['e', obj.id, {player:obj.player, kill:obj.kill}]);
+    openShapeMenu(obj);
+  }
+  if(protoIdx !== -1){
+    shapeMenu.querySelector('#editPrefabBtn').onclick = ()=>{
+      loadModule('inventory').then(m=>{ m.openInventoryMenu(); m.editInventoryItem(protoIdx); });
+    }
+    shapeMenu.querySelector('#detachBtn').onclick = ()=>{
+      collabSend(['e', obj.id, bakeInstance(obj)]);
+      openShapeMenu(obj);
+    }
+  }
+  shapeMenu.style.display = 'block';
+}
@@ -0,0 +1,22 @@
+// Text options menu (opened by clicking a text object)
+
+export function openTextMenu(obj){
+  window.lastSelected = obj;
+  closeAllMenus();
+  textMenu.style.left = (canvas.getBoundingClientRect().left + 40) + 'px';
+  textMenu.style.top = (canvas.getBoundingClientRect().top + 40) + 'px';
+  textMenu.innerHTML = `
+    <h3>Text Options</h3>
+    <label>Content <input id="textContent" type="text" value="${escapeHtml(obj.text || '')}"></label>
+    <label>Color <input id="textColor" type="color" value="${obj.color || '#000000'}"></label>
+    <label>Size <input id="textSize" type="range" min="8" max="120" value="${obj.size || 24}"></label>
+    <div style="display:flex;gap:6px;margin-top:8px;">
+      <button onclick="deleteObject()" class="small">Delete</button>
+      <button onclick="closeAllMenus()" class="small">Close</button>
+    </div>
+  `;
+  textMenu.querySelector('#textContent').oninput = (e)=>{ undoProps(obj, ['text'], 'text:' + obj.id); obj.text = e.target.value; collabSend(['e', obj.id, {text:obj.text}]); drawAll(); }
+  textMenu.querySelector('#textColor').oninput = (e)=>{ undoProps(obj, ['color'], 'color:' + obj.id); obj.color = e.target.value; collabSend(['e', obj.id, {color:obj.color}]); drawAll(); }
+  textMenu.querySelector('#textSize').oninput = (e)=>{ undoProps(obj, ['size'], 'size:' + obj.id); obj.size = parseInt(e.target.value); collabSend(['e', obj.id, {size:obj.size}]); drawAll(); }
+  textMenu.style.display = 'block';
+}
@@ -0,0 +1,136 @@
+// Tile layer menu: create/resize the current window's tile layer, edit its palette, paint
+
+/////////////////////////
+// Tile layer menu
+/////////////////////////
+let brushValue = 1;   // palette index the next Paint uses (0 erases)
+
+export function openTileMenu(){
+  closeAllMenus();
+  tileMenu.style.left = (canvas.getBoundingClientRect().left + 100) + 'px';
+  tileMenu.style.top = (canvas.getBoundingClientRect().top + 40) + 'px';
+  const t = tileLayerOf(objects());
+  if(!t){
+    tileMenu.innerHTML = `
+      <h3>Tile Layer</h3>
+      <div style="font-size:12px;color:#444">This window has no tile layer yet.</div>
+      <label>Columns <input id="tileCols" type="number" min="1" value="${Math.ceil(canvas.width/32)}"></label>
+      <label>Rows <input id="tileRows" type="number" min="1" value="${Math.ceil(canvas.height/32)}"></label>
+      <label>Cell size <input id="tileCell" type="number" min="4" value="32"></label>
+      <div style="display:flex;gap:6px;margin-top:8px;">
+        <button onclick="createTileLayer()" class="small">Create</button>
+        <button onclick="closeAllMenus()" class="small">Close</button>
+      </div>
+    `;
+    tileMenu.style.display = 'block';
+    return;
+  }
+  if(brushValue > t.palette.length) brushValue = t.palette.length ? 1 : 0;
+  let rows = '';
+  t.palette.forEach((p, i)=>{
+    rows += `<div class="invItem" style="margin-top:4px;">
+      <input type="radio" name="tileBrush" ${brushValue === i+1 ? 'checked' : ''} onchange="pickTileBrush(${i+1})">
+      <input type="color" value="${p.color || '#888888'}" onchange="editTileDef(${i}, {color:this.value})">
+      <label class="tiny"><input type="checkbox" ${p.collide ? 'checked' : ''} onchange="editTileDef(${i}, {collide:this.checked})"> Collide</label>
+      <label class="tiny"><input type="checkbox" ${p.kill ? 'checked' : ''} onchange="editTileDef(${i}, {kill:this.checked})"> Kill</label>
+      <input type="file" accept="image/*" style="width:90px" onchange="importTileImage(${i}, this)">
+    </div>`;
+  });
+  tileMenu.innerHTML = `
+    <h3>Tile Layer</h3>
+    <label>Columns <input id="tileCols" type="number" min="1" value="${t.cols}"></label>
+    <label>Rows <input id="tileRows" type="number" min="1" value="${t.rows}"></label>
+    <label>Cell size <input id="tileCell" type="number" min="4" value="${t.cell}"></label>
+    <button onclick="resizeTileLayer()" class="tiny">Resize</button>
+    <div style="margin-top:8px;">Palette</div>
+    <div class="invItem" style="margin-top:4px;"><input type="radio" name="tileBrush" ${brushValue === 0 ? 'checked' : ''} onchange="pickTileBrush(0)"> Eraser</div>
+    ${rows}
+    <div style="display:flex;gap:6px;margin-top:8px;">
+      <button onclick="addTileDef()" class="small">Add Tile</button>
+      <button onclick="startTilePaint()" class="small">Paint</button>
+      <button onclick="deleteTileLayer()" class="small">Delete Layer</button>
+      <button onclick="closeAllMenus()" class="small">Close</button>
+    </div>
+    <div style="margin-top:6px;font-size:12px;color:#333">Paint: drag a rectangle on the canvas to fill it. Esc stops painting.</div>
+  `;
+  tileMenu.style.display = 'block';
+}
+
+function readGridInputs(){
+  return {
+    cols: clamp(parseInt(tileMenu.querySelector('#tileCols').value) || 1, 1, 4096),
+    rows: clamp(parseInt(tileMenu.querySelector('#tileRows').value) || 1, 1, 4096),
+    cell: clamp(parseInt(tileMenu.querySelector('#tileCell').value) || 32, 4, 512)
+  };
+}
+
+function createTileLayer(){
+  const t = makeTileLayer(Object.assign({ id:newId(), palette:[{color:'#8b5a2b', collide:true}] }, readGridInputs()));
+  objects().push(t);
+  collabAdd(currentWindow, t);
+  brushValue = 1;
+  drawAll();
+  openTileMenu();
+}
+
+function resizeTileLayer(){
+  const t = tileLayerOf(objects());
+  const g = readGridInputs();
+  // keep the top-left part of the old grid
+  const data = new Uint16Array(g.cols * g.rows);
+  const w = Math.min(g.cols, t.cols);
+  for(let r = 0; r < Math.min(g.rows, t.rows); r++) data.set(t.data.subarray(r*t.cols, r*t.cols + w), r*g.cols);
+  undoProps(t, ['rle', 'cols', 'rows', 'cell']);
+  Object.assign(t, g);
+  t.data = data;
+  collabSend(['e', t.id, Object.assign({rle: rleEncode(data)}, g)]);
+  drawAll();
+  openTileMenu();
+}
+
+function deleteTileLayer(){
+  const t = tileLayerOf(objects());
+  if(!confirm('Delete this window\'s tile layer?')) return;
+  undoDeletes([t], objects());
+  objects().splice(objects().indexOf(t), 1);
+  collabSend(['d', t.id]);
+  tileBrush = null;
+  closeAllMenus();
+  drawAll();
+}
+
+function pickTileBrush(v){ brushValue = v; }
+
+function addTileDef(){
+  const t = tileLayerOf(objects());
+  undoProps(t, ['palette']);
+  t.palette.push({color: '#888888'});
+  brushValue = t.palette.length;
+  collabSend(['e', t.id, {palette: t.palette}]);
+  openTileMenu();
+}
+
+function editTileDef(i, props){
+  const t = tileLayerOf(objects());
+  undoProps(t, ['palette']);
+  Object.assign(t.palette[i], props);
+  collabSend(['e', t.id, {palette: t.palette}]);
+  drawAll();
+}
+
+function importTileImage(i, input){
+  const f = input.files[0];
+  if(!f) return;
+  const r = new FileReader();
+  r.onload = ()=>editTileDef(i, {image: r.result});
+  r.readAsDataURL(f);
+}
+
+function startTilePaint(){
+  tileBrush = { layer: tileLayerOf(objects()), value: brushValue, from: null, to: null };
+  closeAllMenus();
+  statusSpan.textContent = 'Window ' + currentWindow + ' — painting tiles (Esc to stop)';
+}
+
+// called from onclick="" in the markup built above
+Object.assign(window, { createTileLayer, resizeTileLayer, deleteTileLayer, pickTileBrush, addTileDef, editTileDef, importTileImage, startTilePaint });
@@ -0,0 +1,254 @@
+// Play mode runtime (loaded when Play is first pressed)
+
+/////////////////////////
+// Play mode
+// Fixed-timestep loop: player shapes move by their bound controls and collide with
+// collide/kill shapes and eventZones. Static bodies go into a spatial hash once per
+// window so each player only tests the cells it overlaps (broadphase), then exact AABB.
+// Collide/kill tiles are not inserted; the tile grid is already an index, so they are looked up
+// directly for the cells under the player.
+// The world's edges (walls and floor) are the box around the canvas area and everything in the
+// window that players can touch; the camera follows the first player inside it.
+/////////////////////////
+const PLAY_STEP_MS = 1000/60;
+const PLAY_MAX_STEPS = 5;     // per frame; slower frames drop time instead of spiralling
+const PLAY_CELL = 128;        // spatial hash cell size in px
+const PLAY_GRAVITY = 0.6;
+const PLAY_JUMP = 12;
+const PLAY_MAX_FALL = 18;
+const PLAY_HOVER_TICKS = 20;  // how long noGravityJump floats
+const BODY_SOLID = 1, BODY_KILL = 2, BODY_ZONE = 3;
+
+class SpatialHash {
+  constructor(cell){ this.cell = cell; this.cells = new Map(); this.mark = 0; this.hits = []; }
+  key(cx, cy){ return (cx + 32768) * 65536 + (cy + 32768); }
+  insert(obj, x, y, w, h, kind){
+    const body = { obj, x, y, w, h, kind, mark: 0 };
+    const c = this.cell;
+    for(let cy = Math.floor(y/c); cy <= Math.floor((y+h)/c); cy++){
+      for(let cx = Math.floor(x/c); cx <= Math.floor((x+w)/c); cx++){
+        const k = this.key(cx, cy);
+        let list = this.cells.get(k);
+        if(!list) this.cells.set(k, list = []);
+        list.push(body);
+      }
+    }
+  }
+  // bodies overlapping the box; the returned array is reused by the next query
+  query(x, y, w, h){
+    const c = this.cell, mark = ++this.mark, hits = this.hits;
+    hits.length = 0;
+    for(let cy = Math.floor(y/c); cy <= Math.floor((y+h)/c); cy++){
+      for(let cx = Math.floor(x/c); cx <= Math.floor((x+w)/c); cx++){
+        const list = this.cells.get(this.key(cx, cy));
+        if(!list) continue;
+        for(const b of list){
+          if(b.mark === mark) continue;
+          b.mark = mark;
+          if(x < b.x + b.w && x + w > b.x && y < b.y + b.h && y + h > b.y) hits.push(b);
+        }
+      }
+    }
+    return hits;
+  }
+}
+
+export function togglePlay(){ if(play) stopPlay(); else startPlay(); }
+
+function startPlay(){
+  closeAllMenus();
+  equipped = null;
+  // events may add objects or windows while playing; keep the editor's arrays to restore on stop
+  const positions = new Map();
+  for(let w of windows) for(let o of w) if(o.type === 'shape' && o.player) positions.set(o, {x:o.x, y:o.y});
+  play = {
+    snapshot: { windows: windows.map(w=>w.slice()), inventory: inventory.slice(), currentWindow, positions, camera: Object.assign({}, camera) },
+    keys: new Set(), acc: 0, last: performance.now(), raf: 0,
+    hash: null, tiles: [], players: [], bounds: null, window: -1, count: -1
+  };
+  playButton.textContent = 'Stop';
+  play.raf = requestAnimationFrame(playFrame);
+}
+
+function stopPlay(){
+  cancelAnimationFrame(play.raf);
+  const snap = play.snapshot;
+  play = null;
+  windows = snap.windows;
+  inventory = snap.inventory;
+  for(let [o, p] of snap.positions){ o.x = p.x; o.y = p.y; }
+  camera = snap.camera;
+  viewIndex = null;
+  windowSlider.max = windows.length - 1;
+  windowSlider.value = snap.currentWindow;
+  switchWindow(snap.currentWindow);
+  playButton.textContent = 'Play';
+  if(collab) collab.resync();
+}
+
+function playKeyDown(e){
+  if(e.key === 'Escape'){ stopPlay(); return; }
+  play.keys.add(e.key);
+  if(Object.values(playerSettings.controls).includes(e.key)) e.preventDefault();
+}
+window.addEventListener('keyup', (e)=>{ if(play) play.keys.delete(e.key); });
+window.addEventListener('blur', ()=>{ if(play) play.keys.clear(); });
+
+function playBuild(){
+  const objs = objects();
+  const prev = new Map(play.players.map(p=>[p.obj, p]));
+  const hash = new SpatialHash(PLAY_CELL);
+  const players = [], tiles = [];
+  // world edges: canvas area grown to cover shapes, zones and tile layers
+  let x0 = 0, y0 = 0, x1 = canvas.width, y1 = canvas.height;
+  const grow = (x, y, w, h)=>{ x0 = Math.min(x0, x); y0 = Math.min(y0, y); x1 = Math.max(x1, x + w); y1 = Math.max(y1, y + h); };
+  for(let o of objs){
+    if(o.type === 'tiles'){ tiles.push(o); grow(o.x, o.y, o.cols * o.cell, o.rows * o.cell); }
+    else if(o.type === 'eventZone') grow(o.x, o.y, o.w, o.h);
+    else if(o.type === 'shape') grow(o.x, o.y, o.size, o.size);
+    if(o.type === 'shape'){
+      if(o.player){
+        const controls = Object.assign({}, playerSettings.controls, o.controls);
+        players.push(prev.get(o) || {
+          obj: o, controls, speed: o.speed || playerSettings.speed || 5,
+          gravity: !!(controls.jump || controls.noGravityJump),
+          vx: 0, vy: 0, grounded: false, hover: 0, spawn: {x:o.x, y:o.y}, zones: new Set()
+        });
+      } else if(o.kill) hash.insert(o, o.x, o.y, o.size, o.size, BODY_KILL);
+      else if(o.collide) hash.insert(o, o.x, o.y, o.size, o.size, BODY_SOLID);
+    } else if(o.type === 'eventZone' && o.event){
+      hash.insert(o, o.x, o.y, o.w, o.h, BODY_ZONE);
+    }
+  }
+  play.hash = hash;
+  play.tiles = tiles;
+  play.players = players;
+  play.bounds = { x0, y0, x1, y1 };
+  play.window = currentWindow;
+  play.count = objs.length;
+}
+
+// hash bodies plus solid/kill tiles overlapping the box (the returned array is reused)
+function playQuery(x, y, w, h){
+  const hits = play.hash.query(x, y, w, h);
+  for(const t of play.tiles){
+    const cell = t.cell;
+    const c0 = Math.max(0, Math.floor((x - t.x) / cell)), c1 = Math.min(t.cols - 1, Math.floor((x + w - t.x) / cell));
+    const r0 = Math.max(0, Math.floor((y - t.y) / cell)), r1 = Math.min(t.rows - 1, Math.floor((y + h - t.y) / cell));
+    for(let r = r0; r <= r1; r++){
+      for(let c = c0; c <= c1; c++){
+        const v = t.data[r*t.cols + c];
+        const def = v && t.palette[v - 1];
+        if(!def || !(def.kill || def.collide)) continue;
+        const bx = t.x + c*cell, by = t.y + r*cell;
+        if(x < bx + cell && x + w > bx && y < by + cell && y + h > by){
+          hits.push({ obj: t, x: bx, y: by, w: cell, h: cell, kind: def.kill ? BODY_KILL : BODY_SOLID });
+        }
+      }
+    }
+  }
+  return hits;
+}
+
+function playFrame(now){
+  if(!play) return;
+  play.acc += Math.min(now - play.last, 250);
+  play.last = now;
+  let steps = 0;
+  while(play && play.acc >= PLAY_STEP_MS && steps < PLAY_MAX_STEPS){
+    playStep();
+    if(play) play.acc -= PLAY_STEP_MS;
+    steps++;
+  }
+  if(!play) return;
+  if(steps === PLAY_MAX_STEPS) play.acc = 0;
+  playFollow();
+  drawAll();
+  play.raf = requestAnimationFrame(playFrame);
+}
+
+function playStep(){
+  // events can add/remove objects or switch windows, so rebuild the index when that happens
+  if(play.window !== currentWindow || play.count !== objects().length) playBuild();
+  const keys = play.keys;
+  for(let p of play.players){
+    const ctl = p.controls;
+    p.vx = ((keys.has(ctl.right) ? 1 : 0) - (keys.has(ctl.left) ? 1 : 0)) * p.speed;
+    if(p.gravity){
+      if(p.grounded && keys.has(ctl.jump)) p.vy = -PLAY_JUMP;
+      else if(p.grounded && keys.has(ctl.noGravityJump)){ p.vy = -PLAY_JUMP/2; p.hover = PLAY_HOVER_TICKS; }
+      if(p.hover > 0) p.hover--;
+      else p.vy = Math.min(p.vy + PLAY_GRAVITY, PLAY_MAX_FALL);
+    } else {
+      p.vy = ((keys.has(ctl.down) ? 1 : 0) - (keys.has(ctl.up) ? 1 : 0)) * p.speed;
+    }
+    p.grounded = false;
+    playMove(p, p.vx, 0);
+    playMove(p, 0, p.vy);
+    playOverlaps(p);
+    if(!play) return;
+    viewIndexTouch(p.obj);
+  }
+}
+
+// move along one axis in sub-steps no longer than half the player, pushing out of solids
+function playMove(p, dx, dy){
+  const o = p.obj, size = o.size;
+  const dist = Math.abs(dx || dy);
+  if(!dist) return;
+  const n = Math.ceil(dist / Math.max(1, size/2));
+  for(let i=0;i<n;i++){
+    o.x += dx/n; o.y += dy/n;
+    let blocked = false;
+    for(let b of playQuery(o.x, o.y, size, size)){
+      if(b.kind !== BODY_SOLID) continue;
+      if(!(o.x < b.x + b.w && o.x + size > b.x && o.y < b.y + b.h && o.y + size > b.y)) continue;
+      blocked = true;
+      if(dx > 0) o.x = b.x - size;
+      else if(dx < 0) o.x = b.x + b.w;
+      else if(dy > 0){ o.y = b.y - size; p.grounded = true; p.vy = 0; }
+      else { o.y = b.y + b.h; p.vy = 0; }
+    }
+    if(blocked) break;
+  }
+  // world edges act as walls and floor
+  const b = play.bounds, maxX = b.x1 - size, maxY = b.y1 - size;
+  if(o.x < b.x0) o.x = b.x0; else if(o.x > maxX) o.x = maxX;
+  if(o.y < b.y0){ o.y = b.y0; p.vy = 0; }
+  else if(o.y >= maxY){ o.y = maxY; p.grounded = true; if(p.vy > 0) p.vy = 0; }
+}
+
+// keep the first player in the middle of the view, without showing past the world's edges
+function playFollow(){
+  const p = play.players[0];
+  if(!p) return;
+  const b = play.bounds, v = viewBox(), o = p.obj;
+  camera.x = Math.max(b.x0, Math.min(b.x1 - v.w, o.x + o.size/2 - v.w/2));
+  camera.y = Math.max(b.y0, Math.min(b.y1 - v.h, o.y + o.size/2 - v.h/2));
+}
+
+function playOverlaps(p){
+  const o = p.obj;
+  const inside = new Set();
+  let killed = false;
+  for(let b of playQuery(o.x, o.y, o.size, o.size)){
+    if(b.kind === BODY_KILL) killed = true;
+    else if(b.kind === BODY_ZONE) inside.add(b.obj);
+  }
+  if(killed){
+    o.x = p.spawn.x; o.y = p.spawn.y;
+    p.vx = p.vy = 0;
+    p.zones.clear();
+    return;
+  }
+  // fire on entry only, not on every tick spent inside the zone
+  const entered = [...inside].filter(z => !p.zones.has(z));
+  p.zones = inside;
+  for(let z of entered){
+    triggerZone(z);
+    if(!play) return;
+  }
+}
+
+// core.js forwards keydown here while playing
+Object.assign(window, { playKeyDown });
@@ -0,0 +1,102 @@
+// Opt-in performance telemetry (the "Share performance data" checkbox, kept in localStorage)
+// Wraps the editor's hot paths so each call shows up as a performance.measure in the browser's
+// profiler and lands in a log-bucketed histogram; long tasks are counted the same way. Every
+// FLUSH_MS the histograms go to /telemetry (telemetry.py), which adds them up per build and
+// device class. While off nothing is wrapped, so the cost is zero; /bench?telemetry=1 shows it while on.
+
+/////////////////////////
+// Telemetry
+/////////////////////////
+// must match telemetry.py
+const BUCKET_BASE_MS = 0.01;   // bucket i holds [BASE * 2^(i/PER_OCTAVE), BASE * 2^((i+1)/PER_OCTAVE)) ms
+const BUCKETS_PER_OCTAVE = 4;
+const BUCKETS = 96;            // up to ~16 s
+const FLUSH_MS = 3 * 60 * 1000;
+const HOT_PATHS = ['drawAll', 'findTopObjectAt', 'openInventoryMenu', 'saveFile'];
+
+let histograms = {};     // name -> {n, sum, max, b: {bucket: count}}
+let since = Date.now();
+let originals = null;    // name -> unwrapped function while running
+let observer = null, timer = null, sending = true;
+
+function bucketOf(ms){
+  return Math.max(0, Math.min(BUCKETS - 1, Math.floor(Math.log2(ms / BUCKET_BASE_MS) * BUCKETS_PER_OCTAVE)));
+}
+
+function sample(name, ms){
+  const h = histograms[name] || (histograms[name] = { n: 0, sum: 0, max: 0, b: {} });
+  h.n++;
+  h.sum += ms;
+  if(ms > h.max) h.max = ms;
+  const i = bucketOf(ms);
+  h.b[i] = (h.b[i] || 0) + 1;
+}
+
+function instrument(name, fn){
+  const label = 'hblock:' + name;
+  const done = (t0)=>{
+    const t1 = performance.now();
+    performance.measure(label, { start: t0, end: t1 });
+    sample(name, t1 - t0);
+  };
+  return function(...args){
+    const t0 = performance.now();
+    const r = fn.apply(this, args);
+    // menus that load their module first finish when the promise does
+    if(r && typeof r.then === 'function') return r.finally(()=>done(t0));
+    done(t0);
+    return r;
+  };
+}
+
+// coarse on purpose: enough to split slow phones from fast desktops, too little to fingerprint
+function deviceClass(){
+  const cores = navigator.hardwareConcurrency || 4;
+  const mem = navigator.deviceMemory || 4;
+  const tier = (cores <= 2 || mem <= 2) ? 'low' : (cores <= 4 || mem <= 4) ? 'mid' : 'high';
+  const mobile = window.matchMedia && window.matchMedia('(pointer: coarse)').matches;
+  return (mobile ? 'mobile' : 'desktop') + '-' + tier;
+}
+
+function flush(){
+  // the profiler's copies are only for looking at live; don't let them pile up
+  for(const name of HOT_PATHS) performance.clearMeasures('hblock:' + name);
+  if(!Object.keys(histograms).length) return;
+  const report = { build: HBLOCK.build, device: deviceClass(), since, until: Date.now(), histograms };
+  histograms = {};
+  since = Date.now();
+  if(!sending) return;
+  const body = JSON.stringify(report);
+  // sendBeacon survives the tab closing; fetch is the fallback where it refuses
+  if(!(navigator.sendBeacon && navigator.sendBeacon('/telemetry', new Blob([body], {type: 'application/json'})))){
+    fetch('/telemetry', { method: 'POST', headers: {'Content-Type': 'application/json'}, body, keepalive: true }).catch(()=>{});
+  }
+}
+
+function onHidden(){ if(document.visibilityState === 'hidden') flush(); }
+
+export function startTelemetry(opts = {}){
+  if(originals) return;
+  sending = opts.send !== false;
+  originals = {};
+  for(const name of HOT_PATHS){
+    originals[name] = window[name];
+    window[name] = instrument(name, window[name]);
+  }
+  if(window.PerformanceObserver && (PerformanceObserver.supportedEntryTypes || []).includes('longtask')){
+    observer = new PerformanceObserver(list=>{ for(const e of list.getEntries()) sample('longtask', e.duration); });
+    observer.observe({ type: 'longtask' });
+  }
+  timer = setInterval(flush, FLUSH_MS);
+  document.addEventListener('visibilitychange', onHidden);
+}
+
+export function stopTelemetry(){
+  if(!originals) return;
+  flush();
+  for(const name of HOT_PATHS) window[name] = originals[name];
+  originals = null;
+  if(observer){ observer.disconnect(); observer = null; }
+  clearInterval(timer);
+  document.removeEventListener('visibilitychange', onHidden);
+}
@@ -0,0 +1,142 @@
+// Resumable chunked saves (loaded by saveToServer for projects bigger than one chunk)
+// The project goes up in chunk_size pieces, each with its CRC32, to /uploads (uploads.py). A
+// failed PUT is retried after asking the server how far it got, so a flaky connection only ever
+// resends one chunk; if the save gives up, saving the same bytes again picks up where it stopped.
+// The commit sends the whole-file SHA-256 (and CRC32) and the server only keeps a match.
+
+/////////////////////////
+// Chunked upload
+/////////////////////////
+const MAX_FAILURES = 8;          // in a row, before the save gives up (and can be resumed)
+const BACKOFF_MS = [500, 1000, 2000, 4000, 8000];
+
+let pending = null;   // {upload, chunkSize, size, crc32, sha256, id} of a save that didn't finish
+
+const CRC_TABLE = (()=>{
+  const t = new Uint32Array(256);
+  for(let n=0; n<256; n++){
+    let c = n;
+    for(let k=0; k<8; k++) c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+    t[n] = c;
+  }
+  return t;
+})();
+
+// same value as Python's zlib.crc32(bytes, crc)
+function crc32(bytes, crc = 0){
+  let c = ~crc;
+  for(let i=0; i<bytes.length; i++) c = CRC_TABLE[(c ^ bytes[i]) & 0xFF] ^ (c >>> 8);
+  return ~c >>> 0;
+}
+
+const sleep = ms=>new Promise(resolve=>setTimeout(resolve, ms));
+
+async function bytesOf(blob, from, to){
+  return new Uint8Array(await blob.slice(from, to).arrayBuffer());
+}
+
+// crypto.subtle only exists on https pages and localhost; elsewhere the CRC32 has to do
+async function fingerprint(blob){
+  let crc = 0;
+  for(let at=0; at<blob.size; at+=1024*1024) crc = crc32(await bytesOf(blob, at, at + 1024*1024), crc);
+  let sha256 = null;
+  if(globalThis.crypto && crypto.subtle){
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', await blob.arrayBuffer()));
+    sha256 = Array.from(digest, b=>b.toString(16).padStart(2, '0')).join('');
+  }
+  return { size: blob.size, crc32: crc, sha256 };
+}
+
+async function json(r){
+  if(!r.ok) throw new Error('HTTP ' + r.status);
+  return r.json();
+}
+
+async function start(print, id){
+  const r = await fetch('/uploads', { method:'POST', headers: {'Content-Type':'application/json'}, body: JSON.stringify({ size: print.size }) });
+  const up = await json(r);
+  return Object.assign({ upload: up.upload, chunkSize: up.chunk_size, id }, print);
+}
+
+// where the server's copy ends; null when it doesn't know the upload any more
+async function serverOffset(up){
+  const r = await fetch('/uploads/' + up.upload);
+  if(r.status === 404) return null;
+  return (await json(r)).offset;
+}
+
+async function sendChunks(blob, up, offset, onProgress){
+  let failures = 0;
+  while(offset < up.size){
+    const chunk = await bytesOf(blob, offset, offset + up.chunkSize);
+    let r = null;
+    try {
+      r = await fetch('/uploads/' + up.upload + '?offset=' + offset, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-CRC32': crc32(chunk).toString(16) },
+        body: chunk,
+      });
+    } catch(err){ /* network error: the chunk may or may not have landed */ }
+    if(r && (r.ok || r.status === 409)){   // 409: it had landed already; go on from the server's offset
+      offset = (await r.json()).offset;
+      failures = 0;
+      onProgress(offset, up.size);
+      continue;
+    }
+    if(r && r.status === 404) throw new Error('upload expired on the server');
+    if(++failures > MAX_FAILURES) throw new Error(r ? 'HTTP ' + r.status : 'connection lost');
+    await sleep(BACKOFF_MS[Math.min(failures, BACKOFF_MS.length) - 1]);
+    try {
+      const at = await serverOffset(up);
+      if(at === null) throw new Error('upload expired on the server');
+      offset = at;
+    } catch(err){
+      if(err.message === 'upload expired on the server') throw err;
+      // still offline: the next PUT finds out where to go on
+    }
+  }
+}
+
+async function commit(up){
+  const url = '/uploads/' + up.upload + '/commit' + (up.id ? '?id=' + encodeURIComponent(up.id) : '');
+  const body = JSON.stringify(up.sha256 ? { sha256: up.sha256, crc32: up.crc32 } : { crc32: up.crc32 });
+  for(let failures=1; ; failures++){
+    try {
+      const r = await fetch(url, { method:'POST', headers: {'Content-Type':'application/json'}, body });
+      if(r.status === 404 && failures > 1) throw new Error('lost the answer to the commit; open the project to check it was saved');
+      return await json(r);
+    } catch(err){
+      if(!(err instanceof TypeError) || failures > MAX_FAILURES) throw err;   // TypeError: network error
+      await sleep(BACKOFF_MS[Math.min(failures, BACKOFF_MS.length) - 1]);
+    }
+  }
+}
+
+// Store blob as project id (a new one when id is null); resolves with the same ack as /save.
+// onProgress(bytesOnServer, totalBytes) is called after every chunk.
+export async function uploadProject(blob, id, onProgress = ()=>{}){
+  const print = await fingerprint(blob);
+  let up = null, offset = 0;
+  if(pending && pending.id === id && pending.size === print.size && pending.crc32 === print.crc32 && pending.sha256 === print.sha256){
+    try {
+      offset = await serverOffset(pending);
+      if(offset !== null) up = pending;
+    } catch(err){ /* try a fresh upload below */ }
+  }
+  if(!up){
+    up = await start(print, id);
+    offset = 0;
+  }
+  pending = up;
+  onProgress(offset, up.size);
+  try {
+    await sendChunks(blob, up, offset, onProgress);
+    const ack = await commit(up);
+    pending = null;
+    return ack;
+  } catch(err){
+    // a hash mismatch or a vanished upload can't be resumed; anything else can
+    if(/^HTTP (400|404)$/.test(err.message) || err.message === 'upload expired on the server') pending = null;
+    throw err;
+  }
+}
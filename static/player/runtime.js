@@ -0,0 +1,289 @@
+/*
+HBlock player runtime — what export.py inlines into an exported game. No editor code: it draws
+the compiled project and runs it the way the editor's Play mode does (see static/js/play.js).
+Compiled data (version 1, built by export.compile_project):
+- styles: [color, shape, image, flags, speed?, controls?]  shape 0 square 1 circle 2 triangle 3 hexagon,
+  image = index into images or -1, flags 1 player 2 collide 4 kill
+- images: [sheet, x, y, w, h] into the atlas sheets (w = 0: the whole sheet)
+- events: [type, params] as on eventZones
+- windows: { s: [x, y, size, style, ...] shapes, t: [[at, x, y, size, color, text]] texts drawn
+  after shape `at`, z: [[x, y, w, h, event]] zones, tl: tile layer {x, y, cell, cols, rows, rle, pal} }
+The world can be larger than the canvas: its edges are the box around the canvas area and
+everything in the window, and the view follows the first player inside it, as in Play mode.
+*/
+(function(){
+const STEP_MS = 1000/60, MAX_STEPS = 5, CELL = 128;
+const GRAVITY = 0.6, JUMP = 12, MAX_FALL = 18, HOVER_TICKS = 20;
+const SOLID = 1, KILL = 2, ZONE = 3;
+const F_PLAYER = 1, F_COLLIDE = 2, F_KILL = 4;
+
+const game = JSON.parse(document.getElementById('game').textContent);
+const canvas = document.getElementById('screen');
+const ctx = canvas.getContext('2d');
+const styles = game.styles, images = game.images, events = game.events;
+const sheets = game.atlas.map(src=>{ const img = new Image(); img.onload = draw; img.src = src; return img; });
+const windows = game.windows.map(w=>({ s: w.s, t: w.t, z: w.z, tl: w.tl && tileLayer(w.tl) }));
+let current = 0;
+let state = null;   // per-window physics index, rebuilt when the window or its contents change
+const view = { x: 0, y: 0 };
+const keys = new Set();
+
+function tileLayer(t){
+  const data = new Uint16Array(t.cols * t.rows);
+  for(let k = 0, i = 0; k + 1 < t.rle.length && i < data.length; k += 2){
+    const end = Math.min(data.length, i + t.rle[k]);
+    data.fill(t.rle[k+1], i, end);
+    i = end;
+  }
+  return Object.assign({}, t, { data });
+}
+
+/////////////////////////
+// drawing
+/////////////////////////
+function drawBody(st, x, y, size){
+  const im = st[2] >= 0 && images[st[2]], sheet = im && sheets[im[0]];
+  if(sheet && sheet.complete && sheet.naturalWidth){
+    if(im[3]) ctx.drawImage(sheet, im[1], im[2], im[3], im[4], x, y, size, size);
+    else ctx.drawImage(sheet, x, y, size, size);
+    return;
+  }
+  ctx.fillStyle = st[0];
+  if(st[1] === 1){
+    ctx.beginPath(); ctx.arc(x + size/2, y + size/2, size/2, 0, Math.PI*2); ctx.fill();
+  } else if(st[1] === 2){
+    ctx.beginPath(); ctx.moveTo(x + size/2, y); ctx.lineTo(x, y + size); ctx.lineTo(x + size, y + size); ctx.closePath(); ctx.fill();
+  } else if(st[1] === 3){
+    const s = size/2, cx = x + s, cy = y + s;
+    ctx.beginPath();
+    for(let i = 0; i < 6; i++){ const a = Math.PI/3*i; if(i) ctx.lineTo(cx + s*Math.cos(a), cy + s*Math.sin(a)); else ctx.moveTo(cx + s, cy); }
+    ctx.closePath(); ctx.fill();
+  } else ctx.fillRect(x, y, size, size);
+}
+
+function drawTiles(t){
+  const cell = t.cell;
+  const c0 = Math.max(0, Math.floor((view.x - t.x) / cell)), c1 = Math.min(t.cols - 1, Math.floor((view.x + canvas.width - t.x) / cell));
+  const r0 = Math.max(0, Math.floor((view.y - t.y) / cell)), r1 = Math.min(t.rows - 1, Math.floor((view.y + canvas.height - t.y) / cell));
+  for(let r = r0; r <= r1; r++){
+    for(let c = c0; c <= c1; ){
+      const v = t.data[r*t.cols + c];
+      let end = c + 1;
+      while(end <= c1 && t.data[r*t.cols + end] === v) end++;
+      if(v){
+        const st = styles[t.pal[v-1]];
+        if(st[2] >= 0) for(let k = c; k < end; k++) drawBody(st, t.x + k*cell, t.y + r*cell, cell);
+        else { ctx.fillStyle = st[0]; ctx.fillRect(t.x + c*cell, t.y + r*cell, (end - c)*cell, cell); }
+      }
+      c = end;
+    }
+  }
+}
+
+function drawText(t){
+  const size = t[3] || 24;
+  if(t[2] < view.y || t[2] - size > view.y + canvas.height || t[1] > view.x + canvas.width) return;
+  ctx.fillStyle = t[4] || '#000';
+  ctx.font = size + 'px Arial';
+  ctx.fillText(t[5] || '', t[1], t[2]);
+}
+
+function draw(){
+  const w = windows[current];
+  ctx.setTransform(1, 0, 0, 1, 0, 0);
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  ctx.setTransform(1, 0, 0, 1, -view.x, -view.y);
+  if(w.tl) drawTiles(w.tl);
+  const s = w.s, x1 = view.x + canvas.width, y1 = view.y + canvas.height;
+  let ti = 0;
+  for(let i = 0; i < s.length; i += 4){
+    while(ti < w.t.length && w.t[ti][0] <= i/4) drawText(w.t[ti++]);
+    // off-screen shapes cost a compare, not a draw call
+    if(s[i] > x1 || s[i+1] > y1 || s[i] + s[i+2] < view.x || s[i+1] + s[i+2] < view.y) continue;
+    drawBody(styles[s[i+3]], s[i], s[i+1], s[i+2]);
+  }
+  while(ti < w.t.length) drawText(w.t[ti++]);
+}
+
+/////////////////////////
+// physics (same rules as Play mode in the editor)
+/////////////////////////
+class SpatialHash {
+  constructor(cell){ this.cell = cell; this.cells = new Map(); this.mark = 0; this.hits = []; }
+  key(cx, cy){ return (cx + 32768) * 65536 + (cy + 32768); }
+  insert(ref, x, y, w, h, kind){
+    const body = { ref, x, y, w, h, kind, mark: 0 }, c = this.cell;
+    for(let cy = Math.floor(y/c); cy <= Math.floor((y+h)/c); cy++){
+      for(let cx = Math.floor(x/c); cx <= Math.floor((x+w)/c); cx++){
+        const k = this.key(cx, cy);
+        let list = this.cells.get(k);
+        if(!list) this.cells.set(k, list = []);
+        list.push(body);
+      }
+    }
+  }
+  query(x, y, w, h){
+    const c = this.cell, mark = ++this.mark, hits = this.hits;
+    hits.length = 0;
+    for(let cy = Math.floor(y/c); cy <= Math.floor((y+h)/c); cy++){
+      for(let cx = Math.floor(x/c); cx <= Math.floor((x+w)/c); cx++){
+        const list = this.cells.get(this.key(cx, cy));
+        if(!list) continue;
+        for(const b of list){
+          if(b.mark === mark) continue;
+          b.mark = mark;
+          if(x < b.x + b.w && x + w > b.x && y < b.y + b.h && y + h > b.y) hits.push(b);
+        }
+      }
+    }
+    return hits;
+  }
+}
+
+function build(){
+  const w = windows[current], s = w.s;
+  const prev = new Map(state && state.window === current ? state.players.map(p=>[p.i, p]) : []);
+  const hash = new SpatialHash(CELL), players = [];
+  // world edges: canvas area grown to cover shapes, zones and the tile layer
+  let x0 = 0, y0 = 0, x1 = canvas.width, y1 = canvas.height;
+  const grow = (x, y, bw, bh)=>{ x0 = Math.min(x0, x); y0 = Math.min(y0, y); x1 = Math.max(x1, x + bw); y1 = Math.max(y1, y + bh); };
+  if(w.tl) grow(w.tl.x, w.tl.y, w.tl.cols * w.tl.cell, w.tl.rows * w.tl.cell);
+  for(const z of w.z) grow(z[0], z[1], z[2], z[3]);
+  for(let i = 0; i < s.length; i += 4){
+    grow(s[i], s[i+1], s[i+2], s[i+2]);
+    const st = styles[s[i+3]], flags = st[3];
+    if(flags & F_PLAYER){
+      const controls = Object.assign({}, game.controls, st[5]);
+      players.push(prev.get(i) || { i, controls, speed: st[4] || game.speed || 5, gravity: !!(controls.jump || controls.noGravityJump),
+                                    vx: 0, vy: 0, grounded: false, hover: 0, spawn: {x: s[i], y: s[i+1]}, zones: new Set() });
+    } else if(flags & F_KILL) hash.insert(i, s[i], s[i+1], s[i+2], s[i+2], KILL);
+    else if(flags & F_COLLIDE) hash.insert(i, s[i], s[i+1], s[i+2], s[i+2], SOLID);
+  }
+  for(const z of w.z) if(z[4] >= 0) hash.insert(z, z[0], z[1], z[2], z[3], ZONE);
+  state = { window: current, count: s.length + w.t.length, hash, players, bounds: { x0, y0, x1, y1 } };
+}
+
+function query(x, y, w, h){
+  const hits = state.hash.query(x, y, w, h), t = windows[current].tl;
+  if(!t) return hits;
+  const cell = t.cell;
+  const c0 = Math.max(0, Math.floor((x - t.x) / cell)), c1 = Math.min(t.cols - 1, Math.floor((x + w - t.x) / cell));
+  const r0 = Math.max(0, Math.floor((y - t.y) / cell)), r1 = Math.min(t.rows - 1, Math.floor((y + h - t.y) / cell));
+  for(let r = r0; r <= r1; r++){
+    for(let c = c0; c <= c1; c++){
+      const v = t.data[r*t.cols + c], flags = v && styles[t.pal[v-1]][3];
+      if(!(flags & (F_COLLIDE | F_KILL))) continue;
+      const bx = t.x + c*cell, by = t.y + r*cell;
+      if(x < bx + cell && x + w > bx && y < by + cell && y + h > by) hits.push({ x: bx, y: by, w: cell, h: cell, kind: flags & F_KILL ? KILL : SOLID });
+    }
+  }
+  return hits;
+}
+
+function move(p, dx, dy){
+  const s = windows[current].s, i = p.i, size = s[i+2];
+  const dist = Math.abs(dx || dy);
+  if(!dist) return;
+  const n = Math.ceil(dist / Math.max(1, size/2));
+  for(let k = 0; k < n; k++){
+    s[i] += dx/n; s[i+1] += dy/n;
+    let blocked = false;
+    for(const b of query(s[i], s[i+1], size, size)){
+      if(b.kind !== SOLID) continue;
+      if(!(s[i] < b.x + b.w && s[i] + size > b.x && s[i+1] < b.y + b.h && s[i+1] + size > b.y)) continue;
+      blocked = true;
+      if(dx > 0) s[i] = b.x - size;
+      else if(dx < 0) s[i] = b.x + b.w;
+      else if(dy > 0){ s[i+1] = b.y - size; p.grounded = true; p.vy = 0; }
+      else { s[i+1] = b.y + b.h; p.vy = 0; }
+    }
+    if(blocked) break;
+  }
+  const b = state.bounds, maxX = b.x1 - size, maxY = b.y1 - size;
+  if(s[i] < b.x0) s[i] = b.x0; else if(s[i] > maxX) s[i] = maxX;
+  if(s[i+1] < b.y0){ s[i+1] = b.y0; p.vy = 0; }
+  else if(s[i+1] >= maxY){ s[i+1] = maxY; p.grounded = true; if(p.vy > 0) p.vy = 0; }
+}
+
+function overlaps(p){
+  const s = windows[current].s, i = p.i, size = s[i+2];
+  const inside = new Set();
+  let killed = false;
+  for(const b of query(s[i], s[i+1], size, size)){
+    if(b.kind === KILL) killed = true;
+    else if(b.kind === ZONE) inside.add(b.ref);
+  }
+  if(killed){ s[i] = p.spawn.x; s[i+1] = p.spawn.y; p.vx = p.vy = 0; p.zones.clear(); return false; }
+  const entered = [...inside].filter(z=>!p.zones.has(z));
+  p.zones = inside;
+  for(const z of entered) if(trigger(z)) return true;
+  return false;
+}
+
+// runs a zone's event; true when it switched windows (the players list is stale then)
+function trigger(z){
+  const [type, p] = events[z[4]], w = windows[current];
+  if(type === 'addShape'){
+    for(let i = 0; i < (p.count || 1); i++) w.s.push(z[0] + 10 + i*10, z[1] + 10 + i*10, p.size || 50, p.style);
+  } else if(type === 'newWindow'){
+    windows.push({ s: [], t: [], z: [], tl: null });
+    current = windows.length - 1;
+    return true;
+  } else if(type === 'addText'){
+    w.t.push([w.s.length/4, z[0] + 10, z[1] + 30, p.size, p.color, p.text]);
+  } else if(type === 'removeText'){
+    w.t.pop();
+  }
+  return false;
+}
+
+function step(){
+  const w = windows[current];
+  if(!state || state.window !== current || state.count !== w.s.length + w.t.length) build();
+  for(const p of state.players){
+    const ctl = p.controls;
+    p.vx = ((keys.has(ctl.right) ? 1 : 0) - (keys.has(ctl.left) ? 1 : 0)) * p.speed;
+    if(p.gravity){
+      if(p.grounded && keys.has(ctl.jump)) p.vy = -JUMP;
+      else if(p.grounded && keys.has(ctl.noGravityJump)){ p.vy = -JUMP/2; p.hover = HOVER_TICKS; }
+      if(p.hover > 0) p.hover--;
+      else p.vy = Math.min(p.vy + GRAVITY, MAX_FALL);
+    } else {
+      p.vy = ((keys.has(ctl.down) ? 1 : 0) - (keys.has(ctl.up) ? 1 : 0)) * p.speed;
+    }
+    p.grounded = false;
+    move(p, p.vx, 0);
+    move(p, 0, p.vy);
+    if(overlaps(p)) return;
+  }
+}
+
+// keep the first player in the middle of the view, without showing past the world's edges
+function follow(){
+  const p = state && state.window === current && state.players[0];
+  if(!p) return;
+  const s = windows[current].s, b = state.bounds, size = s[p.i+2];
+  view.x = Math.max(b.x0, Math.min(b.x1 - canvas.width, s[p.i] + size/2 - canvas.width/2));
+  view.y = Math.max(b.y0, Math.min(b.y1 - canvas.height, s[p.i+1] + size/2 - canvas.height/2));
+}
+
+let acc = 0, last = performance.now();
+function frame(now){
+  acc += Math.min(now - last, 250);
+  last = now;
+  let steps = 0;
+  while(acc >= STEP_MS && steps < MAX_STEPS){ step(); acc -= STEP_MS; steps++; }
+  if(steps === MAX_STEPS) acc = 0;
+  follow();
+  draw();
+  requestAnimationFrame(frame);
+}
+
+const bound = new Set(Object.values(game.controls));
+for(const st of styles) if(st[5]) Object.values(st[5]).forEach(k=>bound.add(k));
+addEventListener('keydown', e=>{ keys.add(e.key); if(bound.has(e.key)) e.preventDefault(); });
+addEventListener('keyup', e=>keys.delete(e.key));
+addEventListener('blur', ()=>keys.clear());
+draw();
+requestAnimationFrame(frame);
+})();
@@ -0,0 +1,269 @@
+# stats.py
+# Inspect .Hblock files without loading them:
+#   python stats.py project.Hblock [more.Hblock ...]
+# Prints one JSON report per file: per-window object counts by type, images (inline and
+# in the assets table), the largest objects, inventory size and event-zone usage by event type.
+# The file is parsed as a stream of events in constant memory; long strings (images) are
+# skipped with bytes.find and only their length and a short prefix are kept.
+import argparse, heapq, json, os, re, sys, time
+from collections import Counter
+
+CHUNK = 1 << 20
+LONG_STRING = 64 * 1024   # strings longer than this are skipped rather than decoded
+PREFIX = 64
+
+_WS = re.compile(rb"[ \t\r\n]*")
+_SCALAR = re.compile(rb"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+
+class JsonEvents:
+    """Pull parser yielding (kind, value, offset, size) for one JSON document.
+
+    kind is start_map, end_map, start_array, end_array, key, string or scalar.
+    offset is the byte offset of the token (just past it for end_*); size is the
+    encoded length of strings. Long string values come back as their first PREFIX characters.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = b""
+        self.pos = 0
+        self.base = 0     # file offset of buf[0]
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.base += self.pos
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def __iter__(self):
+        stack = []
+        want_key = False
+        while True:
+            p = _WS.match(self.buf, self.pos).end()
+            if p == len(self.buf):
+                self.pos = p
+                if self._fill():
+                    continue
+                if stack:
+                    raise ValueError("unexpected end of file at byte %d" % (self.base + p))
+                return
+            self.pos = p
+            c = self.buf[p]
+            off = self.base + p
+            if c == 0x22:   # "
+                text, size = self._string()
+                if want_key:
+                    want_key = False
+                    yield "key", text, off, size
+                else:
+                    yield "string", text, off, size
+            elif c == 0x7B:   # {
+                self.pos += 1
+                stack.append(True)
+                want_key = True
+                yield "start_map", None, off, 0
+            elif c == 0x5B:   # [
+                self.pos += 1
+                stack.append(False)
+                yield "start_array", None, off, 0
+            elif c == 0x7D or c == 0x5D:   # } ]
+                if not stack or stack.pop() != (c == 0x7D):
+                    raise ValueError("unexpected %r at byte %d" % (chr(c), off))
+                self.pos += 1
+                want_key = False
+                yield ("end_map" if c == 0x7D else "end_array"), None, off + 1, 0
+            elif c == 0x2C:   # ,
+                self.pos += 1
+                want_key = bool(stack) and stack[-1]
+            elif c == 0x3A:   # :
+                self.pos += 1
+            else:
+                # a number may be cut by the chunk boundary ("-0." + "5"), so match with some lookahead
+                if len(self.buf) - p < 64 and self._fill():
+                    continue
+                m = _SCALAR.match(self.buf, p)
+                if m is None:
+                    raise ValueError("unexpected byte %r at %d" % (bytes([c]), off))
+                self.pos = m.end()
+                yield "scalar", m.group(), off, m.end() - p
+
+    def _string(self):
+        """Read the string starting at self.pos; returns (text, encoded length)."""
+        i = self.pos + 1
+        while True:
+            buf = self.buf
+            q = buf.find(b'"', i)
+            if q == -1:
+                if len(buf) - self.pos > LONG_STRING:
+                    return self._skip_long_string()
+                rel = i - self.pos
+                if not self._fill():
+                    raise ValueError("unterminated string")
+                i = rel
+                continue
+            j = q - 1
+            while buf[j] == 0x5C:   # backslash
+                j -= 1
+            if (q - 1 - j) % 2:
+                i = q + 1
+                continue
+            raw = buf[self.pos + 1:q]
+            self.pos = q + 1
+            if len(raw) > LONG_STRING:
+                return raw[:PREFIX].decode("utf-8", "ignore"), len(raw)
+            if b"\\" in raw:
+                return json.loads(b'"' + raw + b'"'), len(raw)
+            return raw.decode("utf-8"), len(raw)
+
+    def _skip_long_string(self):
+        start = self.pos + 1
+        prefix = self.buf[start:start + PREFIX]
+        size = len(self.buf) - start
+        escaped = _trailing_backslashes(self.buf, start) % 2 == 1
+        while True:
+            data = self.f.read(self.chunk_size)
+            if not data:
+                raise ValueError("unterminated string")
+            self.base += len(self.buf)
+            self.buf, self.pos = data, 0
+            i = 1 if escaped else 0
+            while True:
+                q = data.find(b'"', i)
+                if q == -1:
+                    break
+                j = q - 1
+                while j >= i and data[j] == 0x5C:
+                    j -= 1
+                if (q - 1 - j) % 2:
+                    i = q + 1
+                    continue
+                self.pos = q + 1
+                return prefix.decode("utf-8", "ignore"), size + q
+            size += len(data)
+            escaped = _trailing_backslashes(data, i) % 2 == 1
+
+def _trailing_backslashes(buf, lo):
+    n, j = 0, len(buf) - 1
+    while j >= lo and buf[j] == 0x5C:
+        n += 1
+        j -= 1
+    return n
+
+#########################
+# .Hblock report
+#########################
+def project_stats(f, top=10):
+    windows = []        # per window: {"objects", "bytes", "by_type"}
+    images = Counter()
+    events = Counter()
+    inventory = {"items": 0, "bytes": 0}
+    largest = []        # min-heap of (bytes, offset, where, type)
+    keys, is_map = [], []
+    obj = None          # the window/inventory object being read
+    win_start = 0
+    for kind, value, off, size in JsonEvents(f):
+        if kind == "key":
+            keys[-1] = value
+            continue
+        if kind == "end_map" or kind == "end_array":
+            keys.pop()
+            is_map.pop()
+            depth = len(keys)
+            if obj is not None and kind == "end_map" and depth == obj["depth"] - 1:
+                nbytes = off - obj["start"]
+                item = (nbytes, obj["start"], obj["where"], obj["type"])
+                if len(largest) < top:
+                    heapq.heappush(largest, item)
+                elif nbytes > largest[0][0]:
+                    heapq.heapreplace(largest, item)
+                if obj["inventory"]:
+                    inventory["bytes"] += nbytes
+                else:
+                    windows[-1]["by_type"][obj["type"] or "(none)"] += 1
+                if obj["type"] == "eventZone":
+                    events[obj["event"] or "(none)"] += 1
+                obj = None
+            elif kind == "end_array" and depth == 2 and keys[0] == "windows":
+                windows[-1]["bytes"] = off - win_start
+            continue
+        # a value starts here; inside an array that moves the index on
+        if is_map and not is_map[-1]:
+            keys[-1] += 1
+        depth = len(keys)
+        if kind == "start_map" or kind == "start_array":
+            if kind == "start_map" and obj is None and keys:
+                if depth == 3 and keys[0] == "windows":
+                    obj = {"where": "windows[%d][%d]" % (keys[1], keys[2]), "inventory": False}
+                elif depth == 2 and keys[0] == "inventory":
+                    obj = {"where": "inventory[%d]" % keys[1], "inventory": True}
+                    inventory["items"] += 1
+                if obj is not None:
+                    obj.update(start=off, depth=depth + 1, type=None, event=None)
+            elif kind == "start_array" and depth == 2 and keys[0] == "windows":
+                windows.append({"objects": 0, "bytes": 0, "by_type": Counter()})
+                win_start = off
+            keys.append(None if kind == "start_map" else -1)
+            is_map.append(kind == "start_map")
+            continue
+        if kind != "string":
+            continue
+        if obj is not None:
+            rel = depth - obj["depth"]
+            if rel == 0 and keys[-1] == "type":
+                obj["type"] = value
+            elif keys[-1] == "image" and (rel == 0 or rel == 2 and keys[-3] == "palette"):
+                # the object's own image, or one of its tile palette entries'
+                if value.startswith("data:"):
+                    images["inline"] += 1
+                    images["inline_bytes"] += size
+                elif value.startswith("asset:"):
+                    images["asset_refs"] += 1
+            elif rel == 1 and keys[-2] == "event" and keys[-1] == "type":
+                obj["event"] = value
+        elif depth == 2 and keys[0] == "assets":
+            images["assets"] += 1
+            images["asset_bytes"] += size
+    for w in windows:
+        w["objects"] = sum(w["by_type"].values())
+        w["by_type"] = dict(w["by_type"])
+    return {
+        "windows": [dict(index=i, **w) for i, w in enumerate(windows)],
+        "images": {k: images[k] for k in ("inline", "inline_bytes", "assets", "asset_bytes", "asset_refs")},
+        "largest_objects": [{"where": w, "type": t, "bytes": b} for b, _, w, t in sorted(largest, reverse=True)],
+        "inventory": inventory,
+        "events": dict(events),
+    }
+
+def file_stats(path, top=10):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        report = project_stats(f, top)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    size = os.path.getsize(path)
+    return dict({"file": path, "bytes": size, "seconds": round(elapsed, 3), "mb_per_s": round(size / elapsed / 1e6, 1)}, **report)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Report sizes and counts of .Hblock files without loading them")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--top", type=int, default=10, help="how many of the largest objects to list")
+    args = p.parse_args(argv)
+    failed = False
+    for path in args.files:
+        try:
+            report = file_stats(path, args.top)
+        except (OSError, ValueError) as e:
+            report = {"file": path, "error": str(e)}
+            failed = True
+        print(json.dumps(report))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
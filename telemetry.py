@@ -0,0 +1,126 @@
+# telemetry.py
+# Aggregated timings from editors that opted in (static/js/telemetry.js): each report holds
+# log-bucketed histograms per hot path, which are added into SQLite per build, device class and
+# metric, so storage stays the same size however many reports arrive.
+#   python telemetry.py [--build <id>]     print p50/p95/p99 per build, device class and metric
+import argparse, math, os, re, sqlite3, sys, threading
+import hblock
+
+TELEMETRY_DB = os.environ.get("HBLOCK_TELEMETRY_DB", os.path.join(hblock.PROJECT_DIR, ".telemetry.sqlite"))
+MAX_REPORT_BYTES = 64 * 1024
+# must match static/js/telemetry.js
+BUCKET_BASE_MS = 0.01
+BUCKETS_PER_OCTAVE = 4
+BUCKETS = 96
+METRICS = ("drawAll", "findTopObjectAt", "openInventoryMenu", "saveFile", "longtask")
+DEVICE_RE = re.compile(r"^(mobile|desktop)-(low|mid|high)$")
+MAX_COUNT = 10 ** 7   # per bucket per report; more than any real session produces
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS totals (
+    build TEXT NOT NULL, device TEXT NOT NULL, metric TEXT NOT NULL,
+    reports INTEGER NOT NULL, n INTEGER NOT NULL, sum REAL NOT NULL, max REAL NOT NULL,
+    PRIMARY KEY (build, device, metric)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS buckets (
+    build TEXT NOT NULL, device TEXT NOT NULL, metric TEXT NOT NULL, bucket INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (build, device, metric, bucket)
+) WITHOUT ROWID;
+"""
+
+_local = threading.local()
+
+def connect(path=TELEMETRY_DB):
+    conns = _local.__dict__.setdefault("conns", {})
+    conn = conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conns[path] = conn
+    return conn
+
+def bucket_upper_ms(i):
+    return BUCKET_BASE_MS * 2 ** ((i + 1) / BUCKETS_PER_OCTAVE)
+
+def _number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v) and v >= 0
+
+def record(report, db=TELEMETRY_DB):
+    """Add one posted report to the totals; ValueError if it is unusable."""
+    if not isinstance(report, dict) or not isinstance(report.get("histograms"), dict):
+        raise ValueError("expected {build, device, histograms}")
+    build = str(report.get("build") or "unknown")[:40]
+    device = report.get("device")
+    if not isinstance(device, str) or not DEVICE_RE.match(device):
+        raise ValueError("bad device class")
+    rows = []
+    for metric, h in report["histograms"].items():
+        if metric not in METRICS or not isinstance(h, dict) or not isinstance(h.get("b"), dict):
+            continue
+        if not (_number(h.get("n")) and _number(h.get("sum")) and _number(h.get("max"))):
+            continue
+        counts = {}
+        for k, c in h["b"].items():
+            if str(k).isdigit() and int(k) < BUCKETS and isinstance(c, int) and 0 < c <= MAX_COUNT:
+                counts[int(k)] = c
+        if counts:
+            rows.append((metric, sum(counts.values()), float(h["sum"]), float(h["max"]), counts))
+    if not rows:
+        raise ValueError("no known metrics")
+    conn = connect(db)
+    with conn:
+        for metric, n, total, peak, counts in rows:
+            conn.execute("INSERT INTO totals (build, device, metric, reports, n, sum, max) VALUES (?, ?, ?, 1, ?, ?, ?) "
+                         "ON CONFLICT (build, device, metric) DO UPDATE SET reports = reports + 1, n = n + excluded.n, "
+                         "sum = sum + excluded.sum, max = MAX(max, excluded.max)", (build, device, metric, n, total, peak))
+            conn.executemany("INSERT INTO buckets (build, device, metric, bucket, count) VALUES (?, ?, ?, ?, ?) "
+                             "ON CONFLICT (build, device, metric, bucket) DO UPDATE SET count = count + excluded.count",
+                             [(build, device, metric, i, c) for i, c in counts.items()])
+    return {"build": build, "device": device, "metrics": len(rows)}
+
+def _percentile(counts, n, q, peak):
+    """Upper edge of the bucket holding the q-th sample (at most the largest sample), in ms."""
+    seen, want = 0, q * n
+    for i, c in counts:
+        seen += c
+        if seen >= want:
+            return round(min(bucket_upper_ms(i), peak), 3)
+    return None
+
+def summary(build=None, db=TELEMETRY_DB):
+    """[{build, device, metric, reports, n, mean, p50, p95, p99, max}, ...] by build, device and metric."""
+    conn = connect(db)
+    where, args = ("WHERE build = ?", (build,)) if build else ("", ())
+    buckets = {}
+    for b, d, m, i, c in conn.execute("SELECT build, device, metric, bucket, count FROM buckets %s ORDER BY bucket" % where, args):
+        buckets.setdefault((b, d, m), []).append((i, c))
+    out = []
+    for b, d, m, reports, n, total, peak in conn.execute(
+            "SELECT build, device, metric, reports, n, sum, max FROM totals %s ORDER BY build, device, metric" % where, args):
+        counts = buckets.get((b, d, m), [])
+        out.append({"build": b, "device": d, "metric": m, "reports": reports, "n": n,
+                    "mean": round(total / n, 3) if n else None,
+                    "p50": _percentile(counts, n, 0.5, peak), "p95": _percentile(counts, n, 0.95, peak),
+                    "p99": _percentile(counts, n, 0.99, peak),
+                    "max": round(peak, 3)})
+    return out
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Editor timings reported by opted-in users, per build and device class")
+    p.add_argument("--db", default=TELEMETRY_DB)
+    p.add_argument("--build", default=None)
+    args = p.parse_args(argv)
+    rows = summary(args.build, args.db)
+    if not rows:
+        print("no telemetry in %s" % args.db, file=sys.stderr)
+        sys.exit(1)
+    print("%-14s %-12s %-18s %8s %9s %9s %9s %9s %9s" % ("build", "device", "metric", "reports", "n", "p50 ms", "p95 ms", "p99 ms", "max ms"))
+    for r in rows:
+        print("%-14s %-12s %-18s %8d %9d %9s %9s %9s %9s" % (r["build"], r["device"], r["metric"], r["reports"], r["n"],
+                                                           r["p50"], r["p95"], r["p99"], r["max"]))
+
+if __name__ == "__main__":
+    main()
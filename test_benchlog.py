@@ -0,0 +1,40 @@
+import pytest
+import benchlog
+
+CHROME = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+EDGE = CHROME + " Edg/125.0.0.0"
+
+def run(build, p95, scene="s1"):
+    return {"build": build, "scene": scene, "metrics": {"redraw_work_ms": {"n": 10, "p50": 1, "p95": p95, "p99": p95 * 2}}}
+
+def test_browser_of_prefers_the_most_specific_name():
+    assert benchlog.browser_of(CHROME) == "Chrome 126"
+    assert benchlog.browser_of(EDGE) == "Edge 125"
+    assert benchlog.browser_of("curl/8") == "other"
+
+def test_record_keeps_known_metrics_and_appends_a_line(tmp_path):
+    path = str(tmp_path / "bench" / "results.jsonl")
+    result = run("b1", 4)
+    result["metrics"]["bogus"] = {"p50": 1, "p95": 1, "p99": 1}
+    result["metrics"]["hit_us"] = {"p50": "fast"}
+    entry = benchlog.record(result, CHROME, path)
+    assert list(entry["metrics"]) == ["redraw_work_ms"] and entry["browser"] == "Chrome 126"
+    benchlog.record(run("b1", 6), CHROME, path)
+    assert len(benchlog.load(path)) == 2
+
+@pytest.mark.parametrize("result", [None, [], {"metrics": []}, {"metrics": {"bogus": {}}}])
+def test_record_rejects_unusable_results(tmp_path, result):
+    with pytest.raises(ValueError):
+        benchlog.record(result, CHROME, str(tmp_path / "r.jsonl"))
+
+def test_compare_takes_medians_per_build_and_the_p95_change(tmp_path):
+    path = str(tmp_path / "r.jsonl")
+    for build, p95 in (("b1", 4), ("b1", 6), ("b1", 5), ("b2", 10), ("b2", 12)):
+        benchlog.record(run(build, p95), CHROME, path)
+    benchlog.record(run("b1", 1, scene="other"), CHROME, path)
+    [table] = benchlog.compare(benchlog.load(path), "s1")
+    b1, b2 = table["rows"]
+    assert (b1["build"], b1["runs"], b1["metrics"]["redraw_work_ms"]["p95"]) == ("b1", 3, 5)
+    assert b2["metrics"]["redraw_work_ms"]["p95"] == 11
+    assert b2["metrics"]["redraw_work_ms"]["p95_change"] == 1.2
+    assert "b1" in benchlog.format_tables([table])
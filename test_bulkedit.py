@@ -0,0 +1,67 @@
+import pytest
+import bulkedit
+
+def project():
+    return {
+        "windows": [
+            [{"id": "a", "type": "shape", "x": 0, "y": 0, "size": 10, "color": "red", "kill": True},
+             {"id": "b", "type": "shape", "x": 5, "y": 5, "color": "blue"},
+             {"id": "z", "type": "eventZone", "x": 1, "y": 1, "w": 20, "h": 20}],
+            [{"id": "t", "type": "text", "x": 2, "y": 2, "text": "hi"},
+             {"id": "i", "type": "shape", "x": 3, "y": 3, "proto": "item"}],
+        ],
+        "inventory": [{"id": "item", "type": "shape", "size": 40, "color": "green", "kill": True}],
+    }
+
+def objects(p):
+    return {o["id"]: o for w in p["windows"] for o in w}
+
+def test_where_limits_assignments_to_matching_rows_that_have_the_field():
+    p = project()
+    result = bulkedit.apply(p, "where kill: color = '#f00'; size *= 1.5")
+    o = objects(p)
+    assert result == {"objects": 5, "matched": [2, 2], "changed": 2}
+    assert (o["a"]["color"], o["a"]["size"]) == ("#f00", 15)
+    assert o["b"]["color"] == "blue" and "size" not in o["b"]
+    assert (o["i"]["color"], o["i"]["size"]) == ("#f00", 60)   # an instance gets overrides, not item edits
+    assert p["inventory"][0]["size"] == 40
+
+def test_assignments_to_few_rows_of_unread_columns():
+    p = project()
+    p["windows"].append([{"id": "s%d" % i, "type": "shape", "x": i, "y": 0, "size": 20} for i in range(20)])
+    result = bulkedit.apply(p, "where kill: size *= 2; color = '#0f0'; collide = True\n"
+                               "where size > 60: x = -1; where color == '#0f0': y = 7")
+    o = objects(p)
+    assert result["matched"] == [2, 2, 2, 1, 2] and result["changed"] == 2
+    assert (o["a"]["size"], o["a"]["color"], o["a"]["y"]) == (20, "#0f0", 7) and o["a"]["collide"] is True
+    assert (o["i"]["size"], o["i"]["color"], o["i"]["x"]) == (80, "#0f0", -1)
+    assert o["i"]["collide"] is True and "size" not in o["b"]
+    assert o["s3"] == {"id": "s3", "type": "shape", "x": 3, "y": 0, "size": 20}
+    assert bulkedit.apply(p, "where kill: size = size")["changed"] == 0
+
+def test_numbers_flags_and_window_column():
+    p = project()
+    bulkedit.apply(p, "x += 10\nwhere window == 1 and type == 'text': y = 100; where type == 'shape': collide = x > 12")
+    o = objects(p)
+    assert [o[k]["x"] for k in "abzti"] == [10, 15, 11, 12, 13]
+    assert isinstance(o["a"]["x"], int) and o["t"]["y"] == 100 and o["z"]["y"] == 1
+    assert o["b"]["collide"] is True and "collide" not in o["a"] and "collide" not in o["z"]
+
+def test_missing_size_reads_as_the_editor_default():
+    p = project()
+    bulkedit.apply(p, "where type == 'shape' and size == 50: size = 7")
+    assert objects(p)["b"]["size"] == 7
+
+@pytest.mark.parametrize("program", ["nope = 1", "type = 'shape'", "size = color", "where x > : y = 1",
+                                     "color += 1", "x = 1 / 0", "size = size * 'a'", "color = size"])
+def test_bad_programs_raise_and_leave_the_project_alone(program):
+    p = project()
+    with pytest.raises(bulkedit.BulkEditError):
+        bulkedit.apply(p, program)
+    assert p == project()
+
+def test_non_numeric_fields_are_reported():
+    p = project()
+    objects(p)["a"]["x"] = "left"
+    with pytest.raises(bulkedit.BulkEditError):
+        bulkedit.apply(p, "x += 1")
@@ -0,0 +1,64 @@
+import catalog, hblock
+
+IMAGE = "data:image/png;base64,AAAA"
+
+def project(name, *texts, event=None, image=None):
+    p = hblock.empty_project()
+    p["name"] = name
+    for i, t in enumerate(texts):
+        p["windows"][0].append({"id": "t%d" % i, "type": "text", "x": 0, "y": 0, "text": t})
+    if event:
+        p["windows"][0].append({"id": "z", "type": "eventZone", "x": 0, "y": 0, "w": 10, "h": 10, "event": event})
+    if image:
+        p["windows"][0].append({"id": "s", "type": "shape", "x": 0, "y": 0, "image": image})
+    return p
+
+def ids(res):
+    return [r["id"] for r in res["results"]]
+
+def test_search_matches_text_name_and_event_text(tmp_path):
+    db = str(tmp_path / "c.sqlite")
+    catalog.update("p1", project("Castle run", "the dragon sleeps"), db=db)
+    catalog.update("p2", project("Forest", "a quiet glade", event={"type": "addText", "params": {"text": "dragons ahead"}}), db=db)
+    assert sorted(ids(catalog.search("dragon", db=db))) == ["p1", "p2"]
+    assert ids(catalog.search("cast", db=db)) == ["p1"]   # words match as prefixes
+    assert ids(catalog.search("dragon", event="addText", db=db)) == ["p2"]
+    hit = catalog.search("glade", db=db)["results"][0]
+    assert hit["objects"]["texts"] == 1 and hit["objects"]["zones"] == 1 and "[glade]" in hit["snippet"]
+
+def test_event_params_that_are_not_an_object_are_skipped(tmp_path):
+    db = str(tmp_path / "c.sqlite")
+    catalog.update("p1", project("Odd", "hello", event={"type": "addText", "params": [1]}), db=db)
+    assert ids(catalog.search("hello", event="addText", db=db)) == ["p1"]
+
+def test_update_replaces_the_old_entry_and_recent_is_save_order(tmp_path):
+    db = str(tmp_path / "c.sqlite")
+    catalog.update("p1", project("One", "alpha"), db=db)
+    catalog.update("p2", project("Two", "alpha"), db=db)
+    catalog.update("p1", project("One", "beta"), db=db)
+    assert ids(catalog.search("alpha", db=db)) == ["p2"]
+    assert ids(catalog.search("", recent=True, db=db)) == ["p1", "p2"]
+
+def test_assets_are_found_by_image_hash_inline_or_packed(tmp_path):
+    db = str(tmp_path / "c.sqlite")
+    catalog.update("inline", project("a", image=IMAGE), db=db)
+    catalog.update("packed", hblock.pack_assets(project("b", image=IMAGE)), db=db)
+    assert sorted(ids(catalog.search(asset=hblock.asset_key(IMAGE), db=db))) == ["inline", "packed"]
+
+def test_pages_report_whether_there_is_more(tmp_path):
+    db = str(tmp_path / "c.sqlite")
+    for i in range(5):
+        catalog.update("p%d" % i, project("level %d" % i), db=db)
+    first = catalog.search("level", per_page=2, db=db)
+    last = catalog.search("level", page=3, per_page=2, db=db)
+    assert len(first["results"]) == 2 and first["has_more"]
+    assert len(last["results"]) == 1 and not last["has_more"]
+
+def test_rebuild_indexes_stored_files(tmp_path):
+    db = str(tmp_path / "c.sqlite")
+    (tmp_path / "p1.Hblock").write_bytes(hblock.dumps(project("Moon base", "craters")))
+    (tmp_path / "bad.Hblock").write_bytes(b"not json")
+    (tmp_path / "list.Hblock").write_bytes(b"[1]")
+    (tmp_path / "odd.Hblock").write_bytes(hblock.dumps({"windows": [[{"id": "a", "type": ["text"]}]]}))
+    assert catalog.rebuild(db, str(tmp_path)) == 1
+    assert ids(catalog.search("craters", db=db)) == ["p1"]
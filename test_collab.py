@@ -0,0 +1,67 @@
+import catalog, collab, hblock, history
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+
+    def send(self, msg):
+        self.messages.append(msg)
+
+def room_with_shape():
+    project = hblock.empty_project()
+    project["windows"][0].append({"id": "a", "type": "shape", "x": 0, "y": 0})
+    return collab.Room("r", project)
+
+def test_malformed_ops_are_dropped_on_submit():
+    room = room_with_shape()
+    bad = [["m", [1], 1, 2], ["a", 0], ["e", {"x": 1}, {}], ["d"], [], "m", [1, 2], ["w", "3"], ["m", True, 1, 2]]
+    room.submit(bad + [["m", "a", 5, 6]])
+    assert room.stats["rejected"] == len(bad)
+    assert room.tick() == 1
+    assert room.state.index["a"][1]["x"] == 5
+
+def test_coalesce_and_apply_ignore_garbage():
+    assert collab.coalesce([["m", [1], 1, 2], ["a", 0], ["m", "a", 1, 2], ["m", "a", 3, 4]]) == [["m", "a", 3, 4]]
+    state = collab.ProjectState(hblock.empty_project())
+    assert not state.apply(["m", [1], 1, 2])
+    assert not state.apply(["a", 0])
+
+def test_one_failing_room_does_not_stop_the_tick(monkeypatch, capsys):
+    room = room_with_shape()
+    room.submit([["m", "a", 1, 1]])
+    monkeypatch.setattr(room.state, "apply", lambda op: 1 / 0)
+    assert room.safe_tick() == 0
+    assert "failed to tick" in capsys.readouterr().err
+
+def test_ops_that_would_make_a_bad_object_are_rejected():
+    state = collab.ProjectState(hblock.empty_project())
+    assert not state.apply(["a", 0, {"id": "b", "type": "shape", "size": "big"}])
+    assert state.apply(["a", 0, {"id": "b", "type": "shape", "size": 10}])
+    assert not state.apply(["e", "b", {"proto": [1]}])
+    assert state.index["b"][1].get("proto") is None
+
+def stored_room(tmp_path, monkeypatch):
+    monkeypatch.setattr(hblock, "PROJECT_DIR", str(tmp_path))
+    hblock.write_atomic(hblock.stored_path("r"), hblock.dumps(hblock.empty_project()))
+    rooms = {}
+    room = collab.open_room(rooms, "r")
+    room.submit([["a", 0, {"id": "a", "type": "text", "x": 0, "y": 0, "text": "from the room"}]])
+    room.tick()
+    return rooms, room
+
+def test_closing_a_room_stores_it_like_a_save(tmp_path, monkeypatch):
+    rooms, room = stored_room(tmp_path, monkeypatch)
+    ack = collab.close_room(rooms, room)
+    assert not rooms and ack["version"] == history.versions("r")[-1]["version"]
+    assert hblock.load(hblock.stored_path("r"))["windows"][0][0]["text"] == "from the room"
+    assert "r" in [r["id"] for r in catalog.search("room")["results"]]
+
+def test_closing_a_room_never_overwrites_a_save_made_meanwhile(tmp_path, monkeypatch, capsys):
+    rooms, room = stored_room(tmp_path, monkeypatch)
+    saved = dict(hblock.empty_project(), name="saved meanwhile")
+    hblock.write_atomic(hblock.stored_path("r"), hblock.dumps(saved))
+    ack = collab.close_room(rooms, room)
+    assert hblock.load(hblock.stored_path("r")) == saved
+    assert ack["id"].startswith("r-room-")
+    assert hblock.load(hblock.stored_path(ack["id"]))["windows"][0][0]["text"] == "from the room"
+    assert ack["id"] in capsys.readouterr().err
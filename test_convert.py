@@ -0,0 +1,73 @@
+import io, json, os
+import convert, hblock
+
+def write(path, obj):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(obj))
+
+def manifest(out):
+    return [json.loads(line) for line in (out / convert.MANIFEST).read_text().splitlines()]
+
+def test_non_project_files_are_reported_not_fatal(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    write(src / "good.Hblock", hblock.empty_project())
+    write(src / "list.Hblock", [1, 2])
+    write(src / "bad_windows.Hblock", {"windows": 5})
+    log = io.StringIO()
+    stats = convert.run(str(src), str(out), workers=1, log=log)
+    assert stats["files"] == 3 and stats["errors"] == 2
+    assert (out / "good.Hblock").exists()
+    assert [e["src"] for e in manifest(out)] == ["good.Hblock"]
+    err = log.getvalue()
+    assert "list.Hblock: not a project" in err and "bad_windows.Hblock:" in err
+
+def test_tile_indices_out_of_range_fail_only_that_file(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    write(src / "a.Hblock", {"windows": [[{"type": "tiles", "cols": 2, "rows": 1, "rle": [4, 70000]}]]})
+    write(src / "b.Hblock", hblock.empty_project())
+    log = io.StringIO()
+    stats = convert.run(str(src), str(out), workers=1, log=log)
+    assert stats["errors"] == 1 and (out / "b.Hblock").exists()
+    assert "a.Hblock:" in log.getvalue()
+
+def test_resume_reconverts_a_changed_source(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    project = hblock.empty_project()
+    write(src / "p.Hblock", project)
+    convert.run(str(src), str(out), workers=1)
+    assert convert.run(str(src), str(out), workers=1)["skipped"] == 1
+    project["windows"][0].append({"id": "a", "type": "shape", "x": 1, "y": 2})
+    write(src / "p.Hblock", project)
+    stats = convert.run(str(src), str(out), workers=1)
+    assert stats["skipped"] == 0
+    assert json.loads((out / "p.Hblock").read_text())["windows"][0][0]["id"] == "a"
+    assert len(manifest(out)) == 2
+
+def test_resume_skips_on_mtime_and_size_without_reading(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    write(src / "p.Hblock", {"windows": [[{"id": "a"}]]})
+    convert.run(str(src), str(out), workers=1)
+    st = (src / "p.Hblock").stat()
+    write(src / "p.Hblock", {"windows": [[{"id": "b"}]]})   # same size and, below, same mtime
+    os.utime(src / "p.Hblock", ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert convert.run(str(src), str(out), workers=1)["skipped"] == 1
+    assert json.loads((out / "p.Hblock").read_text())["windows"][0][0]["id"] == "a"
+
+def test_touched_file_is_hashed_once_then_skipped_unread(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    write(src / "p.Hblock", hblock.empty_project())
+    convert.run(str(src), str(out), workers=1)
+    os.utime(src / "p.Hblock", ns=(1, 10**18))
+    assert convert.run(str(src), str(out), workers=1)["skipped"] == 1
+    assert [e["mtime_ns"] for e in manifest(out)][-1] == 10**18
+    assert convert.run(str(src), str(out), workers=1)["skipped"] == 1
+    assert len(manifest(out)) == 2
+
+def test_unreadable_file_is_reported_not_fatal(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    write(src / "good.Hblock", hblock.empty_project())
+    os.symlink(tmp_path / "missing", src / "gone.Hblock")
+    log = io.StringIO()
+    stats = convert.run(str(src), str(out), workers=1, log=log)
+    assert stats["errors"] == 1 and (out / "good.Hblock").exists()
+    assert "gone.Hblock: FileNotFoundError" in log.getvalue()
@@ -0,0 +1,115 @@
+import hashlib, json, os, tracemalloc, zlib
+import pytest
+import catalog, editor, export, hblock, history, projcache, projstore, stats, uploads
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(hblock, "PROJECT_DIR", str(tmp_path))
+    monkeypatch.setattr(editor, "PROJECT_DIR", str(tmp_path))
+    cache = projcache.ProjectCache(shared_dir=None)
+    monkeypatch.setattr(editor, "project_cache", cache)
+    monkeypatch.setattr(projcache, "cache", cache)
+    return editor.app.test_client()
+
+def test_save_rejects_bad_windows_without_touching_the_stored_file(client, tmp_path):
+    stored = tmp_path / "p1.Hblock"
+    stored.write_bytes(hblock.dumps(hblock.empty_project()))
+    before = stored.read_bytes()
+    r = client.post("/save?id=p1", data=json.dumps({"windows": [1, 2]}))
+    assert r.status_code == 400
+    assert stored.read_bytes() == before
+    assert [p.name for p in tmp_path.iterdir()] == ["p1.Hblock"]   # no .part left behind
+
+def test_save_rejects_event_params_that_are_not_an_object(client, tmp_path):
+    zone = {"id": "z", "type": "eventZone", "event": {"type": "addText", "params": [1]}}
+    r = client.post("/save?id=p1", data=json.dumps({"windows": [[zone]]}))
+    assert r.status_code == 400
+    assert not (tmp_path / "p1.Hblock").exists()
+
+def test_save_versions_and_indexes_outside_the_checkout(client, tmp_path):
+    r = client.post("/save?id=p1", data=hblock.dumps(hblock.empty_project()))
+    assert r.status_code == 200 and r.get_json()["sha256"]
+    here = os.path.dirname(os.path.abspath(__file__))
+    for path in (history.HISTORY_DIR, catalog.CATALOG_DB):
+        assert not os.path.abspath(path).startswith(here + os.sep)
+
+def upload(client, project_id, data):
+    uid = client.post("/uploads", json={"size": len(data)}).get_json()["upload"]
+    for offset in range(0, len(data), uploads.CHUNK_SIZE):
+        chunk = data[offset:offset + uploads.CHUNK_SIZE]
+        r = client.put("/uploads/%s?offset=%d" % (uid, offset), data=chunk, headers={"X-Chunk-CRC32": "%08x" % zlib.crc32(chunk)})
+        assert r.status_code == 200
+    tracemalloc.start()
+    try:
+        r = client.post("/uploads/%s/commit?id=%s" % (uid, project_id), json={"sha256": hashlib.sha256(data).hexdigest()})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return r, peak
+
+def big_project(*texts):
+    project = hblock.empty_project()
+    image = "data:image/png;base64," + "A" * 3000
+    project["windows"][0] = [{"id": "s%d" % i, "type": "shape", "x": i, "y": i, "size": 40, "image": image + "%06d" % i}
+                             for i in range(3000)]
+    project["windows"][0] += [{"id": "t%d" % i, "type": "text", "x": 0, "y": 0, "text": t} for i, t in enumerate(texts)]
+    return project
+
+def test_big_upload_commits_without_loading_it_and_is_indexed_by_a_child(client, monkeypatch):
+    monkeypatch.setattr(projstore, "INLINE_BYTES", 1024 * 1024)
+    data = hblock.dumps(big_project("a needle in the haystack"))
+    assert len(data) > 8 * uploads.CHUNK_SIZE
+    r, peak = upload(client, "big", data)
+    assert r.status_code == 200 and r.get_json()["version"] is None
+    assert peak < 4 * stats.CHUNK   # a few of the parser's read buffers, not the 9 MB file
+    for child in projstore._children:
+        assert child.wait(60) == 0
+    assert history.versions("big")[-1]["sha256"] == hashlib.sha256(data).hexdigest()
+    assert [h["id"] for h in catalog.search("needle")["results"]] == ["big"]
+
+def test_big_upload_with_a_bad_object_is_refused(client, tmp_path):
+    project = big_project()
+    project["windows"][0].append({"id": "x", "type": "shape", "size": "huge"})
+    r, peak = upload(client, "big2", hblock.dumps(project))
+    assert r.status_code == 400 and not (tmp_path / "big2.Hblock").exists()
+
+def test_save_rejects_a_bad_object_in_a_big_project(client, tmp_path):
+    project = hblock.empty_project()
+    project["windows"][0] = [{"id": "s%d" % i, "type": "shape", "x": i} for i in range(20000)]
+    project["windows"][0].append({"id": ["x"], "type": "shape"})
+    assert client.post("/save?id=p1", data=hblock.dumps(project)).status_code == 400
+    assert not (tmp_path / "p1.Hblock").exists()
+
+@pytest.mark.parametrize("body", [b"[]", b"1", b'{"windows": 5}'])
+def test_export_rejects_json_that_is_not_a_project(client, body):
+    assert client.post("/export", data=body).status_code == 400
+
+ZONE = {"id": "z", "type": "eventZone", "x": 0, "y": 0, "w": 10, "h": 10}
+
+@pytest.mark.parametrize("objects", [
+    [dict(ZONE, event={"type": "addShape", "params": [["color", "red"], ["size", 10]]})],   # params as pairs
+    [dict(ZONE, event={"type": "addShape", "params": {"color": "red", "size": "big"}})],
+    [{"id": "s", "type": "shape", "x": 0, "y": 0, "size": "big", "image": "data:image/png;base64,AAAA"}],
+    [{"id": "s", "type": "shape", "x": 0, "y": 0, "proto": ["p"]}],
+])
+def test_export_rejects_objects_the_compiler_cant_use(client, tmp_path, objects):
+    project = dict(hblock.empty_project(), windows=[objects])
+    assert client.post("/export", data=json.dumps(project)).status_code == 400
+    (tmp_path / "p1.Hblock").write_text(json.dumps(project))
+    assert client.get("/export/p1").status_code == 400
+
+def test_export_cli_reports_a_malformed_project(tmp_path, capsys):
+    path = tmp_path / "p.Hblock"
+    path.write_text(json.dumps({"windows": [[dict(ZONE, event={"type": "addShape", "params": [1]})]]}))
+    with pytest.raises(SystemExit):
+        export.main([str(path)])
+    assert "params" in capsys.readouterr().err and not (tmp_path / "p.html").exists()
+
+def test_export_of_a_stored_non_json_file_is_not_a_server_error(client, tmp_path):
+    (tmp_path / "p1.Hblock").write_bytes(b"\x00not json")
+    assert client.get("/export/p1").status_code == 422
+
+def test_export_rejects_tile_indices_out_of_range(client, tmp_path):
+    tiles = {"id": "t", "type": "tiles", "cols": 2, "rows": 1, "cell": 32, "rle": [4, 70000], "palette": []}
+    (tmp_path / "p1.Hblock").write_text(json.dumps({"windows": [[tiles]]}))
+    assert client.get("/export/p1").status_code == 400
@@ -0,0 +1,62 @@
+import json
+import pytest
+import hblock, history
+
+MALFORMED = [
+    {"windows": [1, 2]}, {"windows": {"a": []}}, {"inventory": "x"}, {"assets": ["x"]}, {"playerSettings": [1]},
+    {"windows": [[{"type": "tiles", "palette": 3}]]},
+    {"windows": [[{"type": "tiles", "palette": [0]}]]},
+    {"windows": [[{"type": "tiles", "cols": 2, "rows": 1, "rle": [4, 70000]}]]},
+    {"windows": [[{"type": "tiles", "cols": "2", "rows": 1, "rle": []}]]},
+    {"windows": [[{"type": "tiles", "cols": 2, "rows": 1, "rle": [-1, 3]}]]},
+    {"windows": [[{"type": "eventZone", "event": {"type": "addText", "params": [1]}}]]},
+    {"windows": [[{"type": "eventZone", "event": {"type": "addShape", "params": {"size": "big"}}}]]},
+    {"windows": [[{"id": ["a"], "type": "shape"}]]}, {"inventory": [{"id": {"a": 1}}]},
+    {"windows": [[{"id": "a", "type": "shape", "proto": [1]}]]}, {"windows": [[{"id": "a", "type": ["shape"]}]]},
+    {"windows": [[{"id": "a", "type": "shape", "size": "50"}]]}, {"windows": [[{"id": "a", "shape": {}}]]},
+]
+
+@pytest.mark.parametrize("project", MALFORMED)
+def test_malformed_projects_are_rejected(project):
+    with pytest.raises(ValueError):
+        hblock.check_project(project)
+
+@pytest.mark.parametrize("project", MALFORMED)
+def test_check_file_rejects_what_check_project_does(project, tmp_path):
+    path = tmp_path / "p.Hblock"
+    path.write_text(json.dumps(project))
+    with pytest.raises(ValueError):
+        hblock.check_file(str(path))
+
+def test_check_file_reads_a_project_one_object_at_a_time(tmp_path):
+    project = hblock.empty_project()
+    project["windows"] = [[{"id": "s%d" % i, "type": "shape", "size": 40, "image": "data:" + "A" * 100000}
+                           for i in range(5)], []]
+    project["inventory"] = [{"id": 7, "type": "text", "text": "hi"}]
+    project["windows"][1].append({"id": "t", "type": "tiles", "cols": 2, "rows": 2, "rle": [4, 1], "palette": [{"color": "red"}]})
+    path = tmp_path / "p.Hblock"
+    path.write_text(json.dumps(project))
+    assert hblock.check_file(str(path)) is True
+    hblock.check_project(project)
+
+@pytest.mark.parametrize("data", [b"\x00not json", b"[1, 2]", b'{"windows": [[{"id": ["a"]}]]', b'"text"'])
+def test_check_file_leaves_what_is_not_a_json_object_alone(data, tmp_path):
+    path = tmp_path / "p.Hblock"
+    path.write_bytes(data)   # a broken file with a bad object in it is still just not JSON
+    assert hblock.check_file(str(path)) is False
+
+def test_diff_keys_objects_with_odd_ids_by_content(tmp_path):
+    root = str(tmp_path)
+    project = {"windows": [[{"id": ["a"], "type": "shape"}, {"id": True, "x": 1}]]}
+    history.record("p", project, 1, "a" * 64, root=root)
+    project["windows"][0].append({"id": "b"})
+    history.record("p", project, 2, "b" * 64, root=root)
+    d = history.diff("p", 1, 2, root=root)
+    assert d["windows"][0]["added"] == ["b"] and d["windows"][0]["removed"] == []
+
+def test_split_objects_round_trips_odd_objects():
+    objs = [{"id": "a"}, 5, "text", None, {"type": "tiles", "palette": [{"image": "data:x"}, 0]}]
+    assets = {}
+    batches = history._split_objects(objs, assets)
+    assert [o for b in batches for o in json.loads(b)][:4] == objs[:4]
+    assert list(assets.values()) == ["data:x"]
@@ -0,0 +1,12 @@
+import glob, os, shutil, subprocess
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NODE = shutil.which("node")
+
+# the editor's scripts, run under node against the DOM stand-ins in jstests/dom.mjs
+@pytest.mark.skipif(NODE is None, reason="node is not installed")
+@pytest.mark.parametrize("script", sorted(glob.glob(os.path.join(HERE, "jstests", "*.test.mjs"))), ids=os.path.basename)
+def test_js(script):
+    r = subprocess.run([NODE, script], capture_output=True, text=True, timeout=120)
+    assert r.returncode == 0, r.stdout + r.stderr
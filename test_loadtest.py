@@ -0,0 +1,83 @@
+import argparse, asyncio, json
+import pytest
+import hblock, loadtest
+
+def test_synthetic_projects_are_deterministic_and_pack_their_images():
+    a, b = loadtest.synthetic_project("medium", 1), loadtest.synthetic_project("medium", 1)
+    assert a == b and a != loadtest.synthetic_project("medium", 2)
+    assert [len(w) for w in a["windows"]] == [800] * 3
+    [body] = loadtest.payloads({"medium": 1, "large": 0})["medium"][:1]
+    packed = json.loads(body)
+    assert len(packed["assets"]) == 4 and 400_000 < len(body) < 800_000
+
+def test_shares_parse_and_reject_bad_mixes():
+    assert loadtest._shares("load=0.5, save=0.5", loadtest.KINDS) == {"load": 0.5, "save": 0.5}
+    for bad in ("load=1,fly=1", "load=0", "load=-1,save=2", "load=x"):
+        with pytest.raises(ValueError):
+            loadtest._shares(bad, loadtest.KINDS)
+
+def test_latency_summary_counts_errors_and_quantiles():
+    samples = [("load", 0, ms / 1000, 200, 10) for ms in range(1, 101)] + [("save", 0, 0.5, 500, 0)]
+    s = loadtest.latency_summary(samples)
+    assert (s["requests"], s["errors"], s["max_ms"]) == (101, 1, 500)
+    assert s["p50_ms"] == 51 and loadtest.latency_summary([])["requests"] == 0
+
+async def serve(handler):
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+async def read_request(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int([l for l in head.split(b"\r\n") if l.lower().startswith(b"content-length")][0].split(b":")[1])
+    await reader.readexactly(length)
+    return head.split(b" ")[1].decode()
+
+def test_connection_reads_chunked_and_sized_bodies_and_reconnects():
+    async def handler(reader, writer):
+        try:
+            while True:
+                path = await read_request(reader)
+                if path == "/chunked":
+                    writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n")
+                else:
+                    writer.write(b"HTTP/1.1 404 NOT FOUND\r\nContent-Length: 4\r\nConnection: close\r\n\r\nnope")
+                    await writer.drain()
+                    writer.close()
+                    return
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    async def main():
+        server, port = await serve(handler)
+        conn = loadtest.Connection("127.0.0.1", port)
+        got = [await conn.request("GET", "/chunked"), await conn.request("POST", "/x", b"body"),
+               await conn.request("GET", "/chunked")]
+        conn.close()
+        server.close()
+        return got
+    assert asyncio.run(main()) == [(200, 5), (404, 4), (200, 5)]
+
+def test_editors_record_samples_after_warmup_only():
+    seen = []
+    async def handler(reader, writer):
+        try:
+            while True:
+                seen.append(await read_request(reader))
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    args = argparse.Namespace(seed=1, ramp=0, think=0.001, mix={"load": 1, "save": 1, "open": 1}, sizes={"small": 1})
+    bodies = loadtest.payloads(args.sizes)
+    async def main():
+        server, port = await serve(handler)
+        samples, now = [], loadtest.time.perf_counter()
+        await asyncio.gather(*(loadtest.editor(n, port, args, bodies, samples, now + 0.1, now + 0.3) for n in range(3)))
+        server.close()
+        return samples, now
+    samples, start = asyncio.run(main())
+    assert samples and all(s[1] >= start + 0.1 and s[3] == 200 for s in samples)
+    assert {s[0] for s in samples} == {"load", "save", "open"}
+    assert any(p.startswith("/save?id=lt") for p in seen) and len(seen) > len(samples)
@@ -0,0 +1,30 @@
+import json
+import pytest
+import projcache
+
+def write(path, obj):
+    path.write_text(json.dumps(obj))
+    return str(path)
+
+def test_memory_and_shared_levels_count_the_same_bytes(tmp_path):
+    path = write(tmp_path / "p.Hblock", {"windows": [[{"id": "a", "x": 1}]], "name": "x" * 100})
+    first = projcache.ProjectCache(shared_dir=str(tmp_path / "shared"))
+    first.get_file(path)
+    second = projcache.ProjectCache(shared_dir=str(tmp_path / "shared"))
+    second.get_file(path)
+    assert second.counters["shared_hits"] == 1
+    assert first.bytes == second.bytes
+
+def test_path_hashes_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(projcache, "MAX_PATHS", 3)
+    cache = projcache.ProjectCache(shared_dir=None)
+    paths = [write(tmp_path / ("p%d.Hblock" % i), {"windows": [[]], "n": i}) for i in range(5)]
+    for p in paths:
+        cache.get_file(p)
+    assert list(cache.hashes) == paths[2:]
+
+def test_non_json_file_raises_value_error(tmp_path):
+    path = tmp_path / "bad.Hblock"
+    path.write_bytes(b"\\x00not json")
+    with pytest.raises(ValueError):
+        projcache.ProjectCache(shared_dir=None).get_file(str(path))
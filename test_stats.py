@@ -0,0 +1,25 @@
+import io, json
+import pytest
+import stats
+
+def events(data, chunk_size=stats.CHUNK):
+    return list(stats.JsonEvents(io.BytesIO(data), chunk_size))
+
+@pytest.mark.parametrize("data", [b"]", b"{}}", b"[1]]", b"{]", b'{"a": [}', b"[1", b'"abc'])
+def test_unbalanced_json_raises_value_error(data):
+    with pytest.raises(ValueError):
+        events(data, chunk_size=2)
+
+def test_main_reports_malformed_file_without_traceback(tmp_path, capsys):
+    path = tmp_path / "bad.Hblock"
+    path.write_bytes(b'{"windows": [[]]]}')
+    with pytest.raises(SystemExit) as exit:
+        stats.main([str(path)])
+    assert exit.value.code == 1
+    assert "error" in json.loads(capsys.readouterr().out)
+
+def test_events_match_json_across_chunk_boundaries():
+    doc = {"windows": [[{"id": "a", "x": -0.5, "name": "q\\\"x"}]], "ok": True}
+    kinds = [e[0] for e in events(json.dumps(doc).encode(), chunk_size=3)]
+    assert kinds.count("start_map") == kinds.count("end_map") == 2
+    assert kinds.count("start_array") == kinds.count("end_array") == 2
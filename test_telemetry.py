@@ -0,0 +1,40 @@
+import pytest
+import telemetry
+
+def report(device="desktop-mid", build="b1", **histograms):
+    return {"build": build, "device": device, "histograms": histograms}
+
+def hist(samples):
+    """A histogram like telemetry.js sends, from bucket indexes and the sample times."""
+    b = {}
+    for i, _ in samples:
+        b[str(i)] = b.get(str(i), 0) + 1
+    return {"n": len(samples), "sum": sum(ms for _, ms in samples), "max": max(ms for _, ms in samples), "b": b}
+
+def test_reports_add_up_per_build_device_and_metric(tmp_path):
+    db = str(tmp_path / "t.sqlite")
+    telemetry.record(report(drawAll=hist([(10, 0.05)] * 90 + [(30, 1.5)] * 10)), db)
+    telemetry.record(report(drawAll=hist([(10, 0.05)] * 100)), db)
+    telemetry.record(report(device="mobile-low", drawAll=hist([(40, 9.0)])), db)
+    rows = {(r["device"], r["metric"]): r for r in telemetry.summary(db=db)}
+    desk = rows[("desktop-mid", "drawAll")]
+    assert (desk["reports"], desk["n"], desk["max"]) == (2, 200, 1.5)
+    assert desk["p50"] == round(telemetry.bucket_upper_ms(10), 3)
+    assert desk["p99"] == 1.5   # the bucket's upper edge, capped at the largest sample
+    assert rows[("mobile-low", "drawAll")]["n"] == 1
+    assert telemetry.summary("other", db) == []
+
+def test_unknown_metrics_and_bad_buckets_are_ignored(tmp_path):
+    db = str(tmp_path / "t.sqlite")
+    h = hist([(5, 0.03)])
+    h["b"].update({"-1": 3, "999": 1, "x": 2, "6": 0, "7": 1.5})
+    ack = telemetry.record(report(drawAll=h, bogus=hist([(1, 0.01)])), db)
+    assert ack["metrics"] == 1
+    assert [(r["metric"], r["n"]) for r in telemetry.summary(db=db)] == [("drawAll", 1)]
+
+@pytest.mark.parametrize("bad", [None, [], report(device="toaster", drawAll=hist([(1, 0.01)])),
+                                 report(bogus=hist([(1, 0.01)])),
+                                 report(drawAll=dict(hist([(1, 0.01)]), sum=float("nan")))])
+def test_unusable_reports_are_rejected(tmp_path, bad):
+    with pytest.raises(ValueError):
+        telemetry.record(bad, str(tmp_path / "t.sqlite"))
@@ -0,0 +1,72 @@
+import hashlib, io, zlib
+import pytest
+import hblock, uploads
+
+DATA = b'{"windows": [[]], "inventory": []}'
+
+def started(tmp_path):
+    return uploads.create(len(DATA), root=str(tmp_path))["upload"]
+
+def send(uid, tmp_path, offset, data, crc=None):
+    crc = zlib.crc32(data) if crc is None else crc
+    return uploads.append(uid, offset, io.BytesIO(data), len(data), crc, root=str(tmp_path))
+
+def test_corrupt_chunk_is_refused_and_not_stored(tmp_path):
+    uid = started(tmp_path)
+    with pytest.raises(ValueError):
+        send(uid, tmp_path, 0, DATA[:10], crc=zlib.crc32(DATA[:10]) ^ 1)
+    assert uploads.status(uid, root=str(tmp_path))["offset"] == 0
+    assert send(uid, tmp_path, 0, DATA[:10]) == 10
+
+def test_resent_chunk_gets_the_real_offset(tmp_path):
+    uid = started(tmp_path)
+    send(uid, tmp_path, 0, DATA[:10])
+    with pytest.raises(uploads.OffsetMismatch) as e:
+        send(uid, tmp_path, 0, DATA[:10])
+    assert e.value.offset == 10
+
+def test_short_or_oversized_chunks_are_refused(tmp_path):
+    uid = started(tmp_path)
+    with pytest.raises(ValueError):
+        uploads.append(uid, 0, io.BytesIO(DATA[:5]), 10, zlib.crc32(DATA[:10]), root=str(tmp_path))
+    with pytest.raises(ValueError):
+        send(uid, tmp_path, 0, DATA + b" ")
+
+def test_incomplete_commit_keeps_the_upload(tmp_path):
+    uid = started(tmp_path)
+    send(uid, tmp_path, 0, DATA[:10])
+    with pytest.raises(uploads.OffsetMismatch):
+        uploads.commit(uid, str(tmp_path / "p.Hblock"), crc32=zlib.crc32(DATA), root=str(tmp_path))
+    assert uploads.status(uid, root=str(tmp_path))["offset"] == 10
+
+def test_hash_mismatch_discards_the_upload(tmp_path):
+    uid = started(tmp_path)
+    send(uid, tmp_path, 0, DATA)
+    dest = tmp_path / "p.Hblock"
+    with pytest.raises(ValueError):
+        uploads.commit(uid, str(dest), sha256="0" * 64, root=str(tmp_path))
+    assert not dest.exists()
+    with pytest.raises(KeyError):
+        uploads.status(uid, root=str(tmp_path))
+
+def test_failed_check_discards_the_upload_and_keeps_dest(tmp_path):
+    dest = tmp_path / "p.Hblock"
+    dest.write_bytes(b"old")
+    uid = started(tmp_path)
+    send(uid, tmp_path, 0, DATA)
+    def check(path):
+        raise ValueError("bad shape")
+    with pytest.raises(ValueError):
+        uploads.commit(uid, str(dest), sha256=hashlib.sha256(DATA).hexdigest(), root=str(tmp_path), check=check)
+    assert dest.read_bytes() == b"old"
+    with pytest.raises(KeyError):
+        uploads.status(uid, root=str(tmp_path))
+
+def test_commit_moves_a_matching_upload(tmp_path):
+    uid = started(tmp_path)
+    send(uid, tmp_path, 0, DATA[:10])
+    send(uid, tmp_path, 10, DATA[10:])
+    dest = tmp_path / "p.Hblock"
+    size, digest = uploads.commit(uid, str(dest), crc32=zlib.crc32(DATA), root=str(tmp_path))
+    assert (size, digest) == (len(DATA), hashlib.sha256(DATA).hexdigest())
+    assert hblock.load(str(dest)) == {"windows": [[]], "inventory": []}
@@ -0,0 +1,185 @@
+# uploads.py
+# Resumable chunked uploads, for saves too big to send reliably in one POST (static/js/upload.js):
+#   POST /uploads {"size": n}                           -> {"upload": uid, "offset": 0, "chunk_size"}
+#   GET  /uploads/<uid>                                 -> {"upload", "offset": bytes kept so far, "size"}
+#   PUT  /uploads/<uid>?offset=<n>  (X-Chunk-CRC32)     -> {"offset": n + chunk length}
+#   POST /uploads/<uid>/commit?id=<project> {"sha256", "crc32"}  -> what /save answers
+# A chunk is read whole (at most MAX_CHUNK bytes), checked against its CRC32 and only then
+# appended to UPLOAD_DIR/<uid>.part, and only if it starts exactly where the file ends: a chunk
+# resent after a lost ack gets 409 with the real offset instead of being written twice.
+# The commit hashes the whole file and only a match replaces the stored project. Browsers
+# without crypto.subtle (pages not served over https or from localhost) send just the CRC32.
+# Uploads untouched for STALE_SECONDS are removed whenever a new one starts.
+#   python uploads.py [--sweep]      list (or remove the stale) unfinished uploads
+import argparse, fcntl, hashlib, json, os, re, sys, time, uuid, zlib
+import hblock
+
+# must be on the same filesystem as PROJECT_DIR: commits are a rename
+UPLOAD_DIR = os.environ.get("HBLOCK_UPLOAD_DIR", os.path.join(hblock.PROJECT_DIR, ".uploads"))
+CHUNK_SIZE = 1024 * 1024            # what clients are told to send
+MAX_CHUNK = 8 * 1024 * 1024
+MAX_UPLOAD = int(os.environ.get("HBLOCK_MAX_UPLOAD", 1024 * 1024 * 1024))
+STALE_SECONDS = 24 * 3600
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+READ_SIZE = 64 * 1024
+
+class OffsetMismatch(Exception):
+    """A chunk that doesn't start where the stored data ends; .offset is where it does."""
+    def __init__(self, offset):
+        super().__init__("expected offset %d" % offset)
+        self.offset = offset
+
+def _paths(uid, root):
+    if not UPLOAD_ID_RE.match(uid or ""):
+        raise KeyError(uid)
+    base = os.path.join(root, uid)
+    return base + ".json", base + ".part"
+
+def _meta(uid, root):
+    """KeyError if there is no such upload."""
+    meta_path, part_path = _paths(uid, root)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f), part_path
+    except FileNotFoundError:
+        raise KeyError(uid)
+
+def create(size, root=UPLOAD_DIR):
+    """Start an upload of size bytes; ValueError if the size is unusable."""
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise ValueError("expected {\"size\": bytes}")
+    if size > MAX_UPLOAD:
+        raise ValueError("too large: at most %d bytes" % MAX_UPLOAD)
+    os.makedirs(root, exist_ok=True)
+    sweep(root)
+    uid = uuid.uuid4().hex
+    meta_path, part_path = _paths(uid, root)
+    open(part_path, "wb").close()
+    hblock.write_atomic(meta_path, json.dumps({"size": size, "created": time.time()}).encode("utf-8"))
+    return {"upload": uid, "offset": 0, "size": size, "chunk_size": CHUNK_SIZE}
+
+def status(uid, root=UPLOAD_DIR):
+    meta, part_path = _meta(uid, root)
+    return {"upload": uid, "offset": os.path.getsize(part_path), "size": meta["size"]}
+
+def _read_exactly(stream, n):
+    parts, got = [], 0
+    while got < n:
+        data = stream.read(min(READ_SIZE, n - got))
+        if not data:
+            break
+        parts.append(data)
+        got += len(data)
+    return b"".join(parts)
+
+def append(uid, offset, stream, length, crc, root=UPLOAD_DIR):
+    """Add one chunk of length bytes read from stream at offset; returns the new offset.
+
+    KeyError: no such upload. OffsetMismatch: the stored data ends elsewhere. ValueError: the
+    chunk is too big, runs past the announced size, is cut short or fails its CRC32 (resend it).
+    """
+    meta, part_path = _meta(uid, root)
+    if length > MAX_CHUNK:
+        raise ValueError("chunk too large: at most %d bytes" % MAX_CHUNK)
+    if offset + length > meta["size"]:
+        raise ValueError("chunk runs past the announced size")
+    have = os.path.getsize(part_path)
+    if offset != have:
+        raise OffsetMismatch(have)   # before reading the body: a resent chunk costs nothing
+    data = _read_exactly(stream, length)
+    if len(data) != length:
+        raise ValueError("chunk cut short")
+    if zlib.crc32(data) != crc:
+        raise ValueError("chunk checksum mismatch")
+    fd = os.open(part_path, os.O_WRONLY | os.O_APPEND)
+    try:
+        # two workers may get the same chunk (a client retrying a slow request): one writes it
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        have = os.fstat(fd).st_size
+        if offset != have:
+            raise OffsetMismatch(have)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)   # releases the lock
+    return offset + length
+
+def commit(uid, dest, sha256=None, crc32=None, root=UPLOAD_DIR, check=None):
+    """Move a complete upload to dest if its whole-file hashes match; returns (size, sha256 hex).
+
+    check(path), if given, vets the complete file before it replaces dest.
+    KeyError: no such upload. OffsetMismatch: not all bytes are there yet. ValueError: no hash
+    given, one differs, or check raised it; the upload is then dropped (resending can't fix it).
+    """
+    if sha256 is None and crc32 is None:
+        raise ValueError("expected {\"sha256\"} or {\"crc32\"} of the whole file")
+    meta, part_path = _meta(uid, root)
+    size = os.path.getsize(part_path)
+    if size != meta["size"]:
+        raise OffsetMismatch(size)
+    digest, crc = hashlib.sha256(), 0
+    with open(part_path, "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(block)
+            crc = zlib.crc32(block, crc)
+    if sha256 is not None and digest.hexdigest() != str(sha256).lower() or crc32 is not None and crc != crc32:
+        discard(uid, root)
+        raise ValueError("whole-file hash mismatch; upload discarded")
+    if check is not None:
+        try:
+            check(part_path)
+        except ValueError:
+            discard(uid, root)
+            raise
+    os.replace(part_path, dest)
+    discard(uid, root)
+    return size, digest.hexdigest()
+
+def discard(uid, root=UPLOAD_DIR):
+    for path in _paths(uid, root):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def pending(root=UPLOAD_DIR):
+    """[{"upload", "offset", "size", "age"}, ...] for every unfinished upload."""
+    out, now = [], time.time()
+    if not os.path.isdir(root):
+        return out
+    for name in os.listdir(root):
+        uid, ext = os.path.splitext(name)
+        if ext != ".json" or not UPLOAD_ID_RE.match(uid):
+            continue
+        try:
+            meta, part_path = _meta(uid, root)
+            st = os.stat(part_path)
+        except (KeyError, OSError, ValueError):
+            continue
+        out.append({"upload": uid, "offset": st.st_size, "size": meta["size"], "age": now - max(st.st_mtime, meta["created"])})
+    return out
+
+def sweep(root=UPLOAD_DIR, max_age=STALE_SECONDS):
+    """Remove uploads nobody has added to for max_age seconds; returns how many."""
+    stale = [u["upload"] for u in pending(root) if u["age"] > max_age]
+    for uid in stale:
+        discard(uid, root)
+    return len(stale)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Unfinished chunked uploads")
+    p.add_argument("--dir", default=UPLOAD_DIR)
+    p.add_argument("--sweep", action="store_true", help="remove uploads idle for more than a day")
+    args = p.parse_args(argv)
+    if args.sweep:
+        print("removed %d stale uploads" % sweep(args.dir))
+        return
+    ups = pending(args.dir)
+    if not ups:
+        print("no unfinished uploads in %s" % args.dir, file=sys.stderr)
+    for u in sorted(ups, key=lambda u: u["age"]):
+        print("%s  %10d / %10d bytes  idle %.0fs" % (u["upload"], u["offset"], u["size"], u["age"]))
+
+if __name__ == "__main__":
+    main()